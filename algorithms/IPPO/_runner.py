@@ -18,7 +18,7 @@ from omegaconf import OmegaConf
 import wandb
 
 import socialjax
-from algorithms.utils import save_params, load_params, evaluate_ippo as evaluate
+from algorithms.utils import save_params, load_params, run_train, SEED_AXIS, evaluate_ippo as evaluate
 
 
 def single_run(config, make_train, *, wandb_name):
@@ -42,23 +42,25 @@ def single_run(config, make_train, *, wandb_name):
 
     rng = jax.random.PRNGKey(config["SEED"])
     rngs = jax.random.split(rng, config["NUM_SEEDS"])
-    train_jit = jax.jit(make_train(config))
-    out = jax.vmap(train_jit)(rngs)
+    out = run_train(
+        lambda config: jax.vmap(make_train(config), axis_name=SEED_AXIS), rngs, algo="IPPO", config=config,
+        train_states=lambda out: out["runner_state"][0],
+    )
 
     print("** Saving Results **")
     filename = f'{config["ENV_NAME"]}_seed{config["SEED"]}{suffix}'
-    train_state = jax.tree.map(lambda x: x[0], out["runner_state"][0])
+    seed_params = jax.tree.map(lambda x: x[0], out["params"])
     save_path = f"./checkpoints/individual/{filename}.pkl"
     if config["PARAMETER_SHARING"]:
         # NB: original code had this 'indvidual' typo, preserved here.
         save_path = f"./checkpoints/indvidual/{filename}.pkl"
-        save_params(train_state, save_path)
+        save_params(seed_params, save_path)
         params = load_params(save_path)
     else:
         params = []
         for i in range(config['ENV_KWARGS']['num_agents']):
             save_path = f"./checkpoints/individual/{filename}_{i}.pkl"
-            save_params(train_state[i], save_path)
+            save_params(jax.tree.map(lambda x: x[i], seed_params), save_path)
             params.append(load_params(save_path))
     evaluate(params, socialjax.make(config["ENV_NAME"], **config["ENV_KWARGS"]), save_path, config)
 
@@ -105,9 +107,11 @@ def tune(default_config, make_train, *, sweep_name):
 
         rng = jax.random.PRNGKey(config["SEED"])
         rngs = jax.random.split(rng, config["NUM_SEEDS"])
-        train_vjit = jax.jit(jax.vmap(make_train(config)))
-        outs = jax.block_until_ready(train_vjit(rngs))
-        train_state = jax.tree.map(lambda x: x[0], outs["runner_state"][0])
+        run_train(
+            lambda config: jax.vmap(make_train(config), axis_name=SEED_AXIS), rngs, algo="IPPO", config=config,
+            train_states=lambda out: out["runner_state"][0],
+            export=False,
+        )
 
     wandb.login()
     sweep_id = wandb.sweep(
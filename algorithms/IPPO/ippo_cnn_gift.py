@@ -11,7 +11,6 @@ import socialjax
 from socialjax.wrappers.baselines import LogWrapper
 import hydra
 from omegaconf import OmegaConf
-import wandb
 import copy
 
 # Import shared network architectures
@@ -20,6 +19,10 @@ from algorithms.utils import (
     batchify,
     batchify_dict,
     unbatchify,
+    rematerialize_obs,
+    scan_rollout,
+    calculate_gae,
+    scan_updates,
     save_params,
     load_params,
     evaluate_ippo as evaluate,
@@ -65,18 +68,20 @@ def make_train(config):
     def train(rng):
 
         # INIT NETWORK
-        if config["PARAMETER_SHARING"]:
-            network = ActorCritic(env.action_space().n, activation=config["ACTIVATION"])
-        else:
-            network = [ActorCritic(env.action_space().n, activation=config["ACTIVATION"]) for _ in range(env.num_agents)]
-        
+        # Without parameter sharing every agent has its own params, stacked on a
+        # leading agent axis and applied with jax.vmap, so the graph holds one
+        # copy of the network and loss whatever the number of agents.
+        network = ActorCritic(env.action_space().n, activation=config["ACTIVATION"], obs_encoding=env.obs_encoding)
+
         rng, _rng = jax.random.split(rng)
         init_x = jnp.zeros((1, *(env.observation_space()[0]).shape))
 
-        if config["PARAMETER_SHARING"]:
-            network_params = network.init(_rng, init_x)
-        else:
-            network_params = [network[i].init(_rng, init_x) for i in range(env.num_agents)]
+        network_params = network.init(_rng, init_x)
+        if not config["PARAMETER_SHARING"]:
+            # all agents start from the same init, as with the per-agent networks before
+            network_params = jax.tree.map(
+                lambda x: jnp.broadcast_to(x, (env.num_agents, *x.shape)), network_params
+            )
         if config["ANNEAL_LR"]:
             tx = optax.chain(
                 optax.clip_by_global_norm(config["MAX_GRAD_NORM"]),
@@ -94,11 +99,9 @@ def make_train(config):
                 tx=tx,
             )
         else:
-            train_state = [TrainState.create(
-                apply_fn=network[i].apply,
-                params=network_params[i],
-                tx=tx,
-            ) for i in range(env.num_agents)]
+            train_state = jax.vmap(
+                lambda params: TrainState.create(apply_fn=network.apply, params=params, tx=tx)
+            )(network_params)
 
         # INIT ENV
         rng, _rng = jax.random.split(rng)
@@ -127,19 +130,22 @@ def make_train(config):
                     )
                 else:
                     obs_batch = jnp.transpose(last_obs,(1,0,2,3,4))
-                    env_act = {}
-                    log_prob = []
-                    value = []
-                    for i in range(env.num_agents):
-                        pi, value_i = network[i].apply(train_state[i].params, obs_batch[i])
+
+                    def _sample_action(params, obs):
+                        pi, value = network.apply(params, obs)
                         action = pi.sample(seed=_rng)
-                        log_prob.append(pi.log_prob(action))
-                        env_act[env.agents[i]] = action
-                        value.append(value_i)
+                        return action, pi.log_prob(action), value
+
+                    action, log_prob, value = jax.vmap(_sample_action)(train_state.params, obs_batch)
+                    env_act = {agent: action[i] for i, agent in enumerate(env.agents)}
 
                 # env_act = {k: v.flatten() for k, v in env_act.items()}
                 env_act = [v for v in env_act.values()]
                 
+                # with REMAT_OBS the trajectory keeps the (much smaller) env state
+                # instead of the observations, which are rebuilt per minibatch
+                stored_obs = env_state.env_state if config.get("REMAT_OBS", False) else obs_batch
+
                 # STEP ENV
                 rng, _rng = jax.random.split(rng)
                 rng_step = jax.random.split(_rng, config["NUM_ENVS"])
@@ -161,29 +167,39 @@ def make_train(config):
                         value,
                         batchify(reward, env.agents, config["NUM_ACTORS"]).squeeze(),
                         log_prob,
-                        obs_batch,
+                        stored_obs,
                         info,
                         )
                 else:
-                    transition = []
-                    done = [v for v in done.values()]
-                    for i in range(env.num_agents):
-                        info_i = {key: jax.tree.map(lambda x: x.reshape((config["NUM_ACTORS"]),1), value[:,i]) for key, value in info.items()}
-                        transition.append(Transition(
-                            done[i],
-                            env_act[i],
-                            value[i],
-                            reward[:,i],
-                            log_prob[i],
-                            obs_batch[i],
-                            info_i,
-                        ))
+                    # (num_agents, NUM_ENVS, ...) per field
+                    info = jax.tree.map(
+                        lambda x: jnp.swapaxes(x, 0, 1).reshape((env.num_agents, config["NUM_ACTORS"], 1)), info
+                    )
+                    transition = Transition(
+                        jnp.stack([done[str(a)] for a in env.agents]),
+                        action,
+                        value,
+                        jnp.swapaxes(reward, 0, 1),
+                        log_prob,
+                        stored_obs,
+                        info,
+                    )
                 runner_state = (train_state, env_state, obsv, update_step, rng)
                 return runner_state, transition
 
-            runner_state, traj_batch = jax.lax.scan(
-                _env_step, runner_state, None, config["NUM_STEPS"]
+            # info is averaged over the rollout in the scan carry (agent 0's
+            # without parameter sharing) instead of being stored per step
+            runner_state, traj_batch, rollout_info = scan_rollout(
+                _env_step, runner_state, config["NUM_STEPS"],
+                jnp.mean if config["PARAMETER_SHARING"] else lambda x: x[0].mean(),
             )
+            if config.get("REMAT_OBS", False):
+                # (NUM_STEPS, NUM_ENVS, ...) env states, one per env step
+                obs_states = traj_batch.obs
+                traj_batch = traj_batch._replace(obs=None)
+            if not config["PARAMETER_SHARING"]:
+                # agent axis first: (num_agents, NUM_STEPS, NUM_ENVS, ...)
+                traj_batch = jax.tree.map(lambda x: jnp.swapaxes(x, 0, 1), traj_batch)
 
             # CALCULATE ADVANTAGE
             train_state, env_state, last_obs, update_step, rng = runner_state
@@ -192,57 +208,26 @@ def make_train(config):
                 _, last_val = network.apply(train_state.params, last_obs_batch)
             else:
                 last_obs_batch = jnp.transpose(last_obs,(1,0,2,3,4))
-                last_val = []
-                for i in range(env.num_agents):
-                    _, last_val_i = network[i].apply(train_state[i].params, last_obs_batch[i])
-                    last_val.append(last_val_i)
-                last_val = jnp.stack(last_val, axis=0)
+                _, last_val = jax.vmap(network.apply)(train_state.params, last_obs_batch)
 
             def _calculate_gae(traj_batch, last_val):
-                def _get_advantages(gae_and_next_value, transition):
-                    gae, next_value = gae_and_next_value
-                    done, value, reward = (
-                        transition.done,
-                        transition.value,
-                        transition.reward,
-                    )
-                    # reward_mean = jnp.mean(reward, axis=0)
-                    # # reward_std = jnp.std(reward, axis=0) + 1e-8
-                    # reward = (reward - reward_mean)# / reward_std
-                    delta = reward + config["GAMMA"] * next_value * (1 - done) - value
-                    gae = (
-                        delta
-                        + config["GAMMA"] * config["GAE_LAMBDA"] * (1 - done) * gae
-                    )
-                    return (gae, value), gae
-                
-                _, advantages = jax.lax.scan(
-                    _get_advantages,
-                    (jnp.zeros_like(last_val), last_val),
-                    traj_batch,
-                    reverse=True,
-                    unroll=16,
+                advantages = calculate_gae(
+                    traj_batch.done, traj_batch.value, traj_batch.reward, last_val,
+                    config["GAMMA"], config["GAE_LAMBDA"], config.get("GAE_METHOD", "scan"),
                 )
                 return advantages, advantages + traj_batch.value
             if config["PARAMETER_SHARING"]:
                 advantages, targets = _calculate_gae(traj_batch, last_val)
             else:
-                advantages = []
-                targets = []
-                for i in range(env.num_agents):
-                    advantages_i, targets_i = _calculate_gae(traj_batch[i], last_val[i])
-                    advantages.append(advantages_i)
-                    targets.append(targets_i)
-                advantages = jnp.stack(advantages, axis=0)
-                targets = jnp.stack(targets, axis=0)
+                advantages, targets = jax.vmap(_calculate_gae)(traj_batch, last_val)
             # UPDATE NETWORK
-            def _update_epoch(update_state, unused, i):
-                def _update_minbatch(train_state, batch_info, network_used):
+            def _update_epoch(update_state, unused):
+                def _update_minbatch(train_state, batch_info):
                     traj_batch, advantages, targets = batch_info
 
-                    def _loss_fn(params, traj_batch, gae, targets, network_used):
+                    def _loss_fn(params, traj_batch, gae, targets):
                         # RERUN NETWORK
-                        pi, value = network_used.apply(params, traj_batch.obs)
+                        pi, value = network.apply(params, traj_batch.obs)
                         log_prob = pi.log_prob(traj_batch.action)
                         # CALCULATE VALUE LOSS
                         value_pred_clipped = traj_batch.value + (
@@ -279,12 +264,12 @@ def make_train(config):
 
                     grad_fn = jax.value_and_grad(_loss_fn, has_aux=True)
                     total_loss, grads = grad_fn(
-                            train_state.params, traj_batch, advantages, targets, network_used
+                            train_state.params, traj_batch, advantages, targets
                         )
                     train_state = train_state.apply_gradients(grads=grads)
                     return train_state, total_loss
 
-                train_state, traj_batch, advantages, targets, rng = update_state
+                train_state, traj_batch, advantages, targets, agents, rng = update_state
                 rng, _rng = jax.random.split(rng)
                 batch_size = config["MINIBATCH_SIZE"] * config["NUM_MINIBATCHES"]
                 assert (
@@ -302,77 +287,68 @@ def make_train(config):
                 #         lambda x: x.reshape((batch_size,) + x.shape[2:]),  # 保持第一个维度为batch_size，自动计算第二个维度
                 #         batch
                 #     )
-                shuffled_batch = jax.tree_util.tree_map(
-                    lambda x: jnp.take(x, permutation, axis=0), batch
-                )
-                minibatches = jax.tree_util.tree_map(
-                    lambda x: jnp.reshape(
-                        x, [config["NUM_MINIBATCHES"], -1] + list(x.shape[1:])
-                    ),
-                    shuffled_batch,
+                # shuffle row indices only; each minibatch gathers its rows inside
+                # the scan instead of copying the whole shuffled batch up front
+                minibatch_idx = permutation.reshape((config["NUM_MINIBATCHES"], -1))
+
+                def _gather_minibatch(idx):
+                    minibatch = jax.tree_util.tree_map(lambda x: jnp.take(x, idx, axis=0), batch)
+                    if config.get("REMAT_OBS", False):
+                        obs = rematerialize_obs(env, obs_states, idx, agents)
+                        minibatch = (minibatch[0]._replace(obs=obs),) + minibatch[1:]
+                    return minibatch
+
+                train_state, total_loss = jax.lax.scan(
+                    lambda train_state, idx: _update_minbatch(train_state, _gather_minibatch(idx)),
+                    train_state,
+                    minibatch_idx,
                 )
-                if config["PARAMETER_SHARING"]:
-                    train_state, total_loss = jax.lax.scan(
-                        lambda state, batch_info: _update_minbatch(state, batch_info, network), train_state, minibatches
-                    )
-                else:
-                    train_state, total_loss = jax.lax.scan(
-                        lambda state, batch_info: _update_minbatch(state, batch_info, network[i]), train_state, minibatches
-                    )
 
-                update_state = (train_state, traj_batch, advantages, targets, rng)
+                update_state = (train_state, traj_batch, advantages, targets, agents, rng)
                 return update_state, total_loss
             
-            if config["PARAMETER_SHARING"]:
-                update_state = (train_state, traj_batch, advantages, targets, rng)
+            def _update_agent(train_state, traj_batch, advantages, targets, agents, rng):
+                update_state = (train_state, traj_batch, advantages, targets, agents, rng)
                 update_state, loss_info = jax.lax.scan(
-                    lambda state, unused: _update_epoch(state, unused, 0), update_state, None, config["UPDATE_EPOCHS"]
+                    _update_epoch, update_state, None, config["UPDATE_EPOCHS"]
                 )
-                train_state = update_state[0]
-                metric = traj_batch.info
-                rng = update_state[-1]
+                return update_state[0], loss_info, update_state[-1]
+
+            if config["PARAMETER_SHARING"]:
+                train_state, loss_info, rng = _update_agent(
+                    train_state, traj_batch, advantages, targets, jnp.arange(env.num_agents), rng
+                )
+                metric = rollout_info
             else:
-                update_state_dict = []
-                metric = []
-                for i in range(env.num_agents):
-                    update_state = (train_state[i], traj_batch[i], advantages[i], targets[i], rng)
-                    update_state, loss_info = jax.lax.scan(
-                        lambda state, unused: _update_epoch(state, unused, i), update_state, None, config["UPDATE_EPOCHS"]
-                    )
-                    update_state_dict.append(update_state)
-                    train_state[i] = update_state[0]
-                    metric_i = traj_batch[i].info
-                    metric_i['loss'] = loss_info[0]
-                    metric.append(metric_i)
-                    rng = update_state[-1]
-                
-            def callback(metric):
-                wandb.log(metric)
+                # one vmapped PPO update for all agents, each with its own shuffling
+                rng, _rng = jax.random.split(rng)
+                agent_rngs = jax.random.split(_rng, env.num_agents)
+                train_state, loss_info, _ = jax.vmap(_update_agent)(
+                    train_state, traj_batch, advantages, targets, jnp.arange(env.num_agents)[:, None], agent_rngs
+                )
+                metric = rollout_info
+                metric['loss'] = loss_info[0][0]
 
             update_step = update_step + 1
             metric = jax.tree.map(lambda x: x.mean(), metric)
             if config["PARAMETER_SHARING"]:
                 metric["update_step"] = update_step
                 metric["env_step"] = update_step * config["NUM_STEPS"] * config["NUM_ENVS"]
-                jax.debug.callback(callback, metric)
             else:
-                for i in range(env.num_agents):
-                    metric[i]["update_step"] = update_step
-                    metric[i]["env_step"] = update_step * config["NUM_STEPS"] * config["NUM_ENVS"]
-                metric = metric[0]
-                jax.debug.callback(callback, metric)
+                metric["update_step"] = update_step
+                metric["env_step"] = update_step * config["NUM_STEPS"] * config["NUM_ENVS"]
             metric["update_step"] = update_step
             metric["env_step"] = update_step * config["NUM_STEPS"] * config["NUM_ENVS"]
-            metric["give_actions"] = metric["give_actions"] * config["ENV_KWARGS"]["num_inner_steps"]
-            jax.debug.callback(callback, metric)
+            if "give_actions" in metric:
+                metric["give_actions"] = metric["give_actions"] * config["ENV_KWARGS"]["num_inner_steps"]
 
             runner_state = (train_state, env_state, last_obs, update_step, rng)
             return runner_state, metric
 
         rng, _rng = jax.random.split(rng)
         runner_state = (train_state, env_state, obsv, 0, _rng)
-        runner_state, metric = jax.lax.scan(
-            _update_step, runner_state, None, config["NUM_UPDATES"]
+        runner_state, metric = scan_updates(
+            _update_step, runner_state, config["NUM_UPDATES"], config
         )
         return {"runner_state": runner_state, "metrics": metric}
 
@@ -11,7 +11,6 @@ import socialjax
 from socialjax.wrappers.baselines import MAPPOWorldStateWrapper, LogWrapper
 import hydra
 from omegaconf import OmegaConf
-import wandb
 import copy
 
 # Import shared MAPPO small network architectures
@@ -25,6 +24,11 @@ from algorithms.utils import (
     load_params,
     evaluate_mappo_style as evaluate,
     IRATTransition as Transition,
+    gather_env_major,
+    rematerialize_env_obs,
+    scan_rollout,
+    calculate_gae,
+    scan_updates,
 )
 
 def make_train(config):
@@ -53,12 +57,12 @@ def make_train(config):
 
         # INIT NETWORKS
         # Individual policy and critic (use individual rewards)
-        ind_actor_network = Actor(env.action_space().n, activation=config["ACTIVATION"])
-        ind_critic_network = Critic(activation=config["ACTIVATION"])
+        ind_actor_network = Actor(env.action_space().n, activation=config["ACTIVATION"], obs_encoding=env.obs_encoding)
+        ind_critic_network = Critic(activation=config["ACTIVATION"], obs_encoding=env.obs_encoding)
 
         # Team policy and critic (use team rewards)
-        team_actor_network = Actor(env.action_space().n, activation=config["ACTIVATION"])
-        team_critic_network = Critic(activation=config["ACTIVATION"])
+        team_actor_network = Actor(env.action_space().n, activation=config["ACTIVATION"], obs_encoding=env.obs_encoding)
+        team_critic_network = Critic(activation=config["ACTIVATION"], obs_encoding=env.obs_encoding)
 
         rng, _rng_ind_actor, _rng_ind_critic, _rng_team_actor, _rng_team_critic = jax.random.split(rng, 5)
 
@@ -173,15 +177,18 @@ def make_train(config):
                 ind_value = ind_critic_network.apply(train_states[1].params, obs_batch)
                 ind_value = ind_value.reshape(config["NUM_ACTORS"])
 
-                # Team critic uses global state
+                # Team critic uses global state: one world state and one pass
+                # per env, broadcast to the env's agents (actor = agent * NUM_ENVS + env)
                 world_state = jnp.transpose(last_obs, (0,2,3,1,4)).reshape(
                     config["NUM_ENVS"], *(env.observation_space()[0]).shape[:-1], -1
                 )
-                world_state = jnp.expand_dims(world_state, axis=0)
-                world_state = jnp.tile(world_state, (env.num_agents, 1, 1, 1, 1))
-                world_state = jnp.reshape(world_state, (-1, *(world_state.shape[2:])))
                 team_value = team_critic_network.apply(train_states[3].params, world_state)
-                team_value = team_value.reshape(config["NUM_ACTORS"])
+                team_value = jnp.tile(team_value, env.num_agents)
+
+                # with REMAT_OBS the trajectory keeps the (much smaller) env state
+                # instead of the observations, which are rebuilt per minibatch
+                stored_obs = env_state.env_state if config.get("REMAT_OBS", False) else obs_batch
+                stored_world_state = None if config.get("REMAT_OBS", False) else world_state
 
                 # STEP ENV
                 rng, _rng = jax.random.split(rng)
@@ -203,8 +210,8 @@ def make_train(config):
                 # Shape: (NUM_ENVS,) then broadcast to (NUM_ACTORS,)
                 ind_reward_reshaped = ind_reward.reshape(env.num_agents, config["NUM_ENVS"])
                 team_reward_per_env = ind_reward_reshaped.mean(axis=0)  # (NUM_ENVS,) - CHANGED TO MEAN
-                # Broadcast team reward to all agents
-                team_reward = jnp.repeat(team_reward_per_env, env.num_agents)  # (NUM_ACTORS,)
+                # Broadcast team reward to all agents (agent-major, like the actors)
+                team_reward = jnp.tile(team_reward_per_env, env.num_agents)  # (NUM_ACTORS,)
 
                 transition = Transition(
                     global_done=jnp.tile(done["__all__"], env.num_agents),
@@ -217,16 +224,21 @@ def make_train(config):
                     team_log_prob=team_log_prob,
                     ind_reward=ind_reward,
                     team_reward=team_reward,
-                    obs=obs_batch,
-                    world_state=world_state,
+                    obs=stored_obs,
+                    world_state=stored_world_state,
                     info=info
                 )
                 runner_state = (train_states, env_state, obsv, done_batch, rng)
                 return runner_state, transition
 
-            runner_state, traj_batch = jax.lax.scan(
-                _env_step, runner_state, None, config["NUM_STEPS"]
+            # info is averaged over the rollout in the scan carry instead of being stored per step
+            runner_state, traj_batch, rollout_info = scan_rollout(
+                _env_step, runner_state, config["NUM_STEPS"]
             )
+            if config.get("REMAT_OBS", False):
+                # (NUM_STEPS, NUM_ENVS, ...) env states, one per env step
+                obs_states = traj_batch.obs
+                traj_batch = traj_batch._replace(obs=None)
 
             # CALCULATE ADVANTAGE (IRAT: compute BOTH individual and team advantages)
             train_states, env_state, last_obs, last_done, rng = runner_state
@@ -240,58 +252,21 @@ def make_train(config):
             last_world_state = jnp.transpose(last_obs, (0,2,3,1,4)).reshape(
                 config["NUM_ENVS"], *(env.observation_space()[0]).shape[:-1], -1
             )
-            last_world_state = jnp.expand_dims(last_world_state, axis=0)
-            last_world_state = jnp.tile(last_world_state, (env.num_agents, 1, 1, 1, 1))
-            last_world_state = jnp.reshape(last_world_state, (-1, *(last_world_state.shape[2:])))
             last_team_val = team_critic_network.apply(train_states[3].params, last_world_state)
-            last_team_val = last_team_val.reshape(config["NUM_ACTORS"])
+            last_team_val = jnp.tile(last_team_val, env.num_agents)
 
             def _calculate_dual_gae(traj_batch, last_ind_val, last_team_val):
                 # Individual advantages
-                def _get_ind_advantages(gae_and_next_value, transition):
-                    gae, next_value = gae_and_next_value
-                    done, value, reward = (
-                        transition.done,
-                        transition.ind_value,
-                        transition.ind_reward,
-                    )
-                    delta = reward + config["GAMMA"] * next_value * (1 - done) - value
-                    gae = (
-                        delta
-                        + config["GAMMA"] * config["GAE_LAMBDA"] * (1 - done) * gae
-                    )
-                    return (gae, value), gae
-
-                _, ind_advantages = jax.lax.scan(
-                    _get_ind_advantages,
-                    (jnp.zeros_like(last_ind_val), last_ind_val),
-                    traj_batch,
-                    reverse=True,
-                    unroll=16,
+                ind_advantages = calculate_gae(
+                    traj_batch.done, traj_batch.ind_value, traj_batch.ind_reward, last_ind_val,
+                    config["GAMMA"], config["GAE_LAMBDA"], config.get("GAE_METHOD", "scan"),
                 )
                 ind_targets = ind_advantages + traj_batch.ind_value
 
                 # Team advantages
-                def _get_team_advantages(gae_and_next_value, transition):
-                    gae, next_value = gae_and_next_value
-                    done, value, reward = (
-                        transition.done,
-                        transition.team_value,
-                        transition.team_reward,
-                    )
-                    delta = reward + config["GAMMA"] * next_value * (1 - done) - value
-                    gae = (
-                        delta
-                        + config["GAMMA"] * config["GAE_LAMBDA"] * (1 - done) * gae
-                    )
-                    return (gae, value), gae
-
-                _, team_advantages = jax.lax.scan(
-                    _get_team_advantages,
-                    (jnp.zeros_like(last_team_val), last_team_val),
-                    traj_batch,
-                    reverse=True,
-                    unroll=16,
+                team_advantages = calculate_gae(
+                    traj_batch.done, traj_batch.team_value, traj_batch.team_reward, last_team_val,
+                    config["GAMMA"], config["GAE_LAMBDA"], config.get("GAE_METHOD", "scan"),
                 )
                 team_targets = team_advantages + traj_batch.team_value
 
@@ -363,11 +338,9 @@ def make_train(config):
 
                     # --- TEAM CRITIC LOSS ---
                     def _team_critic_loss_fn(critic_params, traj_batch, targets):
-                        value = team_critic_network.apply(
-                            critic_params,
-                            traj_batch.world_state.reshape(-1, *(traj_batch.world_state).shape[-3:])
-                        )
-                        value = jnp.reshape(value, traj_batch.team_value.shape)
+                        # one pass per env step, broadcast to its agents
+                        value = team_critic_network.apply(critic_params, traj_batch.world_state)
+                        value = jnp.broadcast_to(value[:, None], traj_batch.team_value.shape)
 
                         value_pred_clipped = traj_batch.team_value + (value - traj_batch.team_value).clip(
                             -config["CLIP_EPS"], config["CLIP_EPS"]
@@ -428,23 +401,43 @@ def make_train(config):
                     batch_size == config["NUM_STEPS"] * config["NUM_ACTORS"]
                 ), "batch size must be equal to number of steps * number of actors"
 
-                permutation = jax.random.permutation(_rng, batch_size)
-                batch = (traj_batch, ind_advantages, ind_targets, team_advantages, team_targets)
-                batch = jax.tree_util.tree_map(
-                    lambda x: x.reshape((batch_size,) + x.shape[2:]), batch
-                )
-                shuffled_batch = jax.tree_util.tree_map(
-                    lambda x: jnp.take(x, permutation, axis=0), batch
-                )
-                minibatches = jax.tree_util.tree_map(
-                    lambda x: jnp.reshape(
-                        x, [config["NUM_MINIBATCHES"], -1] + list(x.shape[1:])
-                    ),
-                    shuffled_batch,
+                # shuffle env steps rather than actors, so a minibatch keeps all
+                # agents of an env step next to their single world state
+                num_env_steps = config["NUM_STEPS"] * config["NUM_ENVS"]
+                assert (
+                    num_env_steps % config["NUM_MINIBATCHES"] == 0
+                ), "number of steps * number of envs must be divisible by number of minibatches"
+                permutation = jax.random.permutation(_rng, num_env_steps)
+                batch = (
+                    traj_batch._replace(world_state=None),
+                    ind_advantages, ind_targets, team_advantages, team_targets,
                 )
+                if not config.get("REMAT_OBS", False):
+                    world_state = traj_batch.world_state.reshape(
+                        (num_env_steps,) + traj_batch.world_state.shape[2:]
+                    )
+                # shuffle env-step indices only; each minibatch gathers its rows
+                # (regrouped env-major) inside the scan instead of copying the
+                # whole regrouped and shuffled batch up front
+                minibatch_idx = permutation.reshape((config["NUM_MINIBATCHES"], -1))
+
+                def _gather_minibatch(idx):
+                    minibatch = jax.tree_util.tree_map(
+                        lambda x: gather_env_major(x, idx, env.num_agents, config["NUM_ENVS"]), batch
+                    )
+                    if config.get("REMAT_OBS", False):
+                        # the world state is every agent's observation stacked on channels
+                        obs = rematerialize_env_obs(env, obs_states, idx)
+                        minibatch_world_state = jnp.transpose(obs, (0,2,3,1,4)).reshape(
+                            idx.shape[0], *(env.observation_space()[0]).shape[:-1], -1
+                        )
+                        return (minibatch[0]._replace(obs=obs, world_state=minibatch_world_state),) + minibatch[1:]
+                    return (minibatch[0]._replace(world_state=world_state[idx]),) + minibatch[1:]
 
                 train_states, loss_info = jax.lax.scan(
-                    _update_minbatch, train_states, minibatches
+                    lambda train_states, idx: _update_minbatch(train_states, _gather_minibatch(idx)),
+                    train_states,
+                    minibatch_idx,
                 )
                 update_state = (
                     train_states,
@@ -470,14 +463,12 @@ def make_train(config):
                 _update_epoch, update_state, None, config["UPDATE_EPOCHS"]
             )
             train_states = update_state[0]
-            metric = traj_batch.info
+            metric = rollout_info
             # loss_info["ratio_0"] = loss_info["ratio"].at[0,0].get()
             # loss_info = jax.tree.map(lambda x: x.mean(), loss_info)
             # metric["loss"] = loss_info
             rng = update_state[-1]
 
-            def callback(metric):
-                wandb.log(metric)
             update_steps = update_steps + 1
             metric = jax.tree.map(lambda x: x.mean(), metric)
             metric["update_steps"] = update_steps
@@ -487,9 +478,6 @@ def make_train(config):
             loss_metric = jax.tree.map(lambda x: x.mean(), loss_info)
             metric.update(loss_metric)
 
-            # jax.experimental.io_callback(callback, None, metric)
-
-            jax.debug.callback(callback, metric)
             runner_state = (train_states, env_state, last_obs, last_done, rng)
             return (runner_state, update_steps), metric
 
@@ -501,10 +489,10 @@ def make_train(config):
             jnp.zeros((config["NUM_ACTORS"]), dtype=bool),
             _rng,
         )
-        runner_state, metric = jax.lax.scan(
-            _update_step, (runner_state, 0), None, config["NUM_UPDATES"]
+        runner_state, metric = scan_updates(
+            _update_step, (runner_state, 0), config["NUM_UPDATES"], config
         )
-        return {"runner_state": runner_state}
+        return {"runner_state": runner_state, "metrics": metric}
 
     return train
 
@@ -5,7 +5,6 @@ IRAT specifics:
     the team_actor (index 2) for evaluation: out["runner_state"][0][0][2].
   - tags=["IRAT", "INDIVIDUAL_REWARD"]; no wandb group.
   - filename has _reward_<REWARD> suffix.
-  - No jax.jit wrapping on make_train (per the originals).
   - Evaluation uses evaluate_mappo_style.
 """
 import copy
@@ -15,7 +14,7 @@ from omegaconf import OmegaConf
 import wandb
 
 import socialjax
-from algorithms.utils import save_params, load_params, evaluate_mappo_style as evaluate
+from algorithms.utils import save_params, load_params, run_train, SEED_AXIS, evaluate_mappo_style as evaluate
 
 
 def single_run(config, make_train, *, wandb_name):
@@ -31,15 +30,17 @@ def single_run(config, make_train, *, wandb_name):
 
     rng = jax.random.PRNGKey(config["SEED"])
     rngs = jax.random.split(rng, config["NUM_SEEDS"])
-    train_jit = make_train(config)
-    out = jax.vmap(train_jit)(rngs)
+    out = run_train(
+        lambda config: jax.vmap(make_train(config), axis_name=SEED_AXIS), rngs, algo="IRAT", config=config,
+        train_states=lambda out: out["runner_state"][0][0][2],
+    )
 
     print("** Saving Results **")
     filename = f'{config["ENV_NAME"]}_seed{config["SEED"]}_reward_{config["REWARD"]}'
     # IRAT: save team_actor (index 2) for evaluation
-    team_actor_train_state = jax.tree.map(lambda x: x[0], out["runner_state"][0][0][2])
+    team_actor_seed_params = jax.tree.map(lambda x: x[0], out["params"])
     save_path = f"./checkpoints/{filename}.pkl"
-    save_params(team_actor_train_state, save_path)
+    save_params(team_actor_params, save_path)
     params = load_params(save_path)
     print("** Evaluating Results **")
     evaluate(params, socialjax.make(config["ENV_NAME"], **config["ENV_KWARGS"]), save_path, config)
@@ -76,9 +77,11 @@ def tune(default_config, make_train, *, sweep_name):
 
         rng = jax.random.PRNGKey(config["SEED"])
         rngs = jax.random.split(rng, config["NUM_SEEDS"])
-        train_vjit = jax.jit(jax.vmap(make_train(config)))
-        outs = jax.block_until_ready(train_vjit(rngs))
-        train_state = jax.tree.map(lambda x: x[0], outs["runner_state"][0])
+        run_train(
+            lambda config: jax.vmap(make_train(config), axis_name=SEED_AXIS), rngs, algo="IRAT", config=config,
+            train_states=lambda out: out["runner_state"][0][0][2],
+            export=False,
+        )
 
     wandb.login()
     sweep_id = wandb.sweep(
@@ -1,7 +1,6 @@
 """Shared MAPPO runner: single_run / tune glue, factored out of the 9 per-env files.
 
 MAPPO specifics that differ from IPPO/SVO:
-  - No jax.jit wrapping on make_train (per the originals).
   - train_state is nested two extra levels: out["runner_state"][0][0][0]
     (because MAPPO's runner_state is ((train_states_tuple, ...), update_steps)).
   - tags=["MAPPO", "FF"]; no wandb group; filename has _reward_<REWARD> suffix.
@@ -14,7 +13,7 @@ from omegaconf import OmegaConf
 import wandb
 
 import socialjax
-from algorithms.utils import save_params, load_params, evaluate_mappo_style as evaluate
+from algorithms.utils import save_params, load_params, run_train, SEED_AXIS, evaluate_mappo_style as evaluate
 
 
 def single_run(config, make_train, *, wandb_name):
@@ -30,15 +29,16 @@ def single_run(config, make_train, *, wandb_name):
 
     rng = jax.random.PRNGKey(config["SEED"])
     rngs = jax.random.split(rng, config["NUM_SEEDS"])
-    # Note: original MAPPO doesn't wrap make_train in jax.jit.
-    train_jit = make_train(config)
-    out = jax.vmap(train_jit)(rngs)
+    out = run_train(
+        lambda config: jax.vmap(make_train(config), axis_name=SEED_AXIS), rngs, algo="MAPPO", config=config,
+        train_states=lambda out: out["runner_state"][0][0][0],
+    )
 
     print("** Saving Results **")
     filename = f'{config["ENV_NAME"]}_seed{config["SEED"]}_reward_{config["REWARD"]}'
-    train_state = jax.tree.map(lambda x: x[0], out["runner_state"][0][0][0])
+    seed_params = jax.tree.map(lambda x: x[0], out["params"])
     save_path = f"./checkpoints/{filename}.pkl"
-    save_params(train_state, save_path)
+    save_params(seed_params, save_path)
     params = load_params(save_path)
 
     evaluate(params, socialjax.make(config["ENV_NAME"], **config["ENV_KWARGS"]), save_path, config)
@@ -75,9 +75,11 @@ def tune(default_config, make_train, *, sweep_name):
 
         rng = jax.random.PRNGKey(config["SEED"])
         rngs = jax.random.split(rng, config["NUM_SEEDS"])
-        train_vjit = jax.jit(jax.vmap(make_train(config)))
-        outs = jax.block_until_ready(train_vjit(rngs))
-        train_state = jax.tree.map(lambda x: x[0], outs["runner_state"][0])
+        run_train(
+            lambda config: jax.vmap(make_train(config), axis_name=SEED_AXIS), rngs, algo="MAPPO", config=config,
+            train_states=lambda out: out["runner_state"][0][0][0],
+            export=False,
+        )
 
     wandb.login()
     sweep_id = wandb.sweep(
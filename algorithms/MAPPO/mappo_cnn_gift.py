@@ -12,7 +12,6 @@ import socialjax
 from socialjax.wrappers.baselines import MAPPOWorldStateWrapper, LogWrapper
 import hydra
 from omegaconf import OmegaConf
-import wandb
 import copy
 # Import shared MAPPO small network architectures and utilities
 from algorithms.utils import (
@@ -25,6 +24,11 @@ from algorithms.utils import (
     load_params,
     evaluate_mappo_style as evaluate,
     MAPPOTransition as Transition,
+    gather_env_major,
+    rematerialize_env_obs,
+    scan_rollout,
+    calculate_gae,
+    scan_updates,
 )
 
 def make_train(config):
@@ -52,8 +56,8 @@ def make_train(config):
     def train(rng):
 
         # INIT NETWORK
-        actor_network = Actor(env.action_space().n, activation=config["ACTIVATION"])
-        critic_network = Critic(activation=config["ACTIVATION"])
+        actor_network = Actor(env.action_space().n, activation=config["ACTIVATION"], obs_encoding=env.obs_encoding)
+        critic_network = Critic(activation=config["ACTIVATION"], obs_encoding=env.obs_encoding)
 
         rng, _rng_actor, _rng_critic = jax.random.split(rng, 3)
         ac_init_x = jnp.zeros((1, *(env.observation_space()[0]).shape))
@@ -125,16 +129,16 @@ def make_train(config):
                 env_act = [v for v in env_act.values()]
 
                 #VALUE
+                # one world state and one critic pass per env; the value is
+                # broadcast to the env's agents (actor = agent * NUM_ENVS + env)
                 world_state = jnp.transpose(last_obs, (0,2,3,1,4)).reshape(config["NUM_ENVS"], *(env.observation_space()[0]).shape[:-1], -1)
-                world_state = jnp.expand_dims(world_state, axis=0)
-                world_state = jnp.tile(world_state, (env.num_agents, 1, 1, 1, 1))
-                world_state = jnp.reshape(world_state, (-1, *(world_state.shape[2:])))
-                # world_state = last_obs["world_state"].swapaxes(0,1)  
-                # world_state = world_state.reshape((config["NUM_ACTORS"],-1))
                 value = critic_network.apply(train_states[1].params, world_state)
-                # expanded_value = jnp.expand_dims(value, axis=0)
-                # value = jnp.tile(expanded_value, (env.num_agents, 1))
-                value = value.reshape(config["NUM_ACTORS"])
+                value = jnp.tile(value, env.num_agents)
+
+                # with REMAT_OBS the trajectory keeps the (much smaller) env state
+                # instead of the observations, which are rebuilt per minibatch
+                stored_obs = env_state.env_state if config.get("REMAT_OBS", False) else obs_batch
+                stored_world_state = None if config.get("REMAT_OBS", False) else world_state
 
                 # STEP ENV
                 rng, _rng = jax.random.split(rng)
@@ -153,16 +157,21 @@ def make_train(config):
                     value,
                     batchify_numpy(reward, env.agents, config["NUM_ACTORS"]).squeeze(),
                     log_prob,
-                    obs_batch,
-                    world_state,
+                    stored_obs,
+                    stored_world_state,
                     info
                 )
                 runner_state = (train_states, env_state, obsv, done_batch, rng)
                 return runner_state, transition
 
-            runner_state, traj_batch = jax.lax.scan(
-                _env_step, runner_state, None, config["NUM_STEPS"]
+            # info is averaged over the rollout in the scan carry instead of being stored per step
+            runner_state, traj_batch, rollout_info = scan_rollout(
+                _env_step, runner_state, config["NUM_STEPS"]
             )
+            if config.get("REMAT_OBS", False):
+                # (NUM_STEPS, NUM_ENVS, ...) env states, one per env step
+                obs_states = traj_batch.obs
+                traj_batch = traj_batch._replace(obs=None)
 
             # CALCULATE ADVANTAGE
             train_states, env_state, last_obs, last_done, rng = runner_state
@@ -171,32 +180,12 @@ def make_train(config):
             # last_world_state = last_world_state.reshape((config["NUM_ACTORS"],-1))
             last_world_state = jnp.transpose(last_obs, (0,2,3,1,4)).reshape(config["NUM_ENVS"], *(env.observation_space()[0]).shape[:-1], -1)
             last_val = critic_network.apply(train_states[1].params, last_world_state)
-            last_val = jnp.expand_dims(last_val, axis=0)
-            last_val = jnp.tile(last_val, (env.num_agents, 1))
-            last_val = last_val.reshape((config["NUM_ACTORS"],-1))
-            last_val = last_val.squeeze()
+            last_val = jnp.tile(last_val, env.num_agents)
 
             def _calculate_gae(traj_batch, last_val):
-                def _get_advantages(gae_and_next_value, transition):
-                    gae, next_value = gae_and_next_value
-                    done, value, reward = (
-                        transition.done,
-                        transition.value,
-                        transition.reward,
-                    )
-                    delta = reward + config["GAMMA"] * next_value * (1 - done) - value
-                    gae = (
-                        delta
-                        + config["GAMMA"] * config["GAE_LAMBDA"] * (1 - done) * gae
-                    )
-                    return (gae, value), gae
-
-                _, advantages = jax.lax.scan(
-                    _get_advantages,
-                    (jnp.zeros_like(last_val), last_val),
-                    traj_batch,
-                    reverse=True,
-                    unroll=16,
+                advantages = calculate_gae(
+                    traj_batch.done, traj_batch.value, traj_batch.reward, last_val,
+                    config["GAMMA"], config["GAE_LAMBDA"], config.get("GAE_METHOD", "scan"),
                 )
                 return advantages, advantages + traj_batch.value
 
@@ -247,8 +236,9 @@ def make_train(config):
 
                     def _critic_loss_fn(critic_params, traj_batch, targets):
                         # RERUN NETWORK
-                        value = critic_network.apply(critic_params, traj_batch.world_state.reshape(-1, *(traj_batch.world_state).shape[-3:])) 
-                        value = jnp.reshape(value, traj_batch.value.shape)
+                        # one pass per env step, broadcast to its agents
+                        value = critic_network.apply(critic_params, traj_batch.world_state)
+                        value = jnp.broadcast_to(value[:, None], traj_batch.value.shape)
                         # CALCULATE VALUE LOSS
                         value_pred_clipped = traj_batch.value + (
                             value - traj_batch.value
@@ -322,23 +312,40 @@ def make_train(config):
                 assert (
                     batch_size == config["NUM_STEPS"] * config["NUM_ACTORS"]
                 ), "batch size must be equal to number of steps * number of actors"
-                permutation = jax.random.permutation(_rng, batch_size)
-                batch = (traj_batch, advantages, targets)
-                batch = jax.tree_util.tree_map(
-                    lambda x: x.reshape((batch_size,) + x.shape[2:]), batch
-                )
-                shuffled_batch = jax.tree_util.tree_map(
-                    lambda x: jnp.take(x, permutation, axis=0), batch
-                )
-                minibatches = jax.tree_util.tree_map(
-                    lambda x: jnp.reshape(
-                        x, [config["NUM_MINIBATCHES"], -1] + list(x.shape[1:])
-                    ),
-                    shuffled_batch,
-                )
+                # shuffle env steps rather than actors, so a minibatch keeps all
+                # agents of an env step next to their single world state
+                num_env_steps = config["NUM_STEPS"] * config["NUM_ENVS"]
+                assert (
+                    num_env_steps % config["NUM_MINIBATCHES"] == 0
+                ), "number of steps * number of envs must be divisible by number of minibatches"
+                permutation = jax.random.permutation(_rng, num_env_steps)
+                batch = (traj_batch._replace(world_state=None), advantages, targets)
+                if not config.get("REMAT_OBS", False):
+                    world_state = traj_batch.world_state.reshape(
+                        (num_env_steps,) + traj_batch.world_state.shape[2:]
+                    )
+                # shuffle env-step indices only; each minibatch gathers its rows
+                # (regrouped env-major) inside the scan instead of copying the
+                # whole regrouped and shuffled batch up front
+                minibatch_idx = permutation.reshape((config["NUM_MINIBATCHES"], -1))
+
+                def _gather_minibatch(idx):
+                    minibatch = jax.tree_util.tree_map(
+                        lambda x: gather_env_major(x, idx, env.num_agents, config["NUM_ENVS"]), batch
+                    )
+                    if config.get("REMAT_OBS", False):
+                        # the world state is every agent's observation stacked on channels
+                        obs = rematerialize_env_obs(env, obs_states, idx)
+                        minibatch_world_state = jnp.transpose(obs, (0,2,3,1,4)).reshape(
+                            idx.shape[0], *(env.observation_space()[0]).shape[:-1], -1
+                        )
+                        return (minibatch[0]._replace(obs=obs, world_state=minibatch_world_state),) + minibatch[1:]
+                    return (minibatch[0]._replace(world_state=world_state[idx]),) + minibatch[1:]
 
                 train_states, loss_info = jax.lax.scan(
-                    _update_minbatch, train_states, minibatches
+                    lambda train_states, idx: _update_minbatch(train_states, _gather_minibatch(idx)),
+                    train_states,
+                    minibatch_idx,
                 )
                 update_state = (
                     train_states,
@@ -360,24 +367,20 @@ def make_train(config):
                 _update_epoch, update_state, None, config["UPDATE_EPOCHS"]
             )
             train_states = update_state[0]
-            metric = traj_batch.info
+            metric = rollout_info
             # loss_info["ratio_0"] = loss_info["ratio"].at[0,0].get()
             # loss_info = jax.tree.map(lambda x: x.mean(), loss_info)
             # metric["loss"] = loss_info
             rng = update_state[-1]
 
-            def callback(metric):
-                wandb.log(metric)
             update_steps = update_steps + 1
             metric = jax.tree.map(lambda x: x.mean(), metric)
             metric["update_steps"] = update_steps
             metric["env_step"] = update_steps * config["NUM_STEPS"] * config["NUM_ENVS"]
 
-            metric["give_actions"] = metric["give_actions"] * config["ENV_KWARGS"]["num_inner_steps"]
-
-            # jax.experimental.io_callback(callback, None, metric)
+            if "give_actions" in metric:
+                metric["give_actions"] = metric["give_actions"] * config["ENV_KWARGS"]["num_inner_steps"]
 
-            jax.debug.callback(callback, metric)
             runner_state = (train_states, env_state, last_obs, last_done, rng)
             return (runner_state, update_steps), metric
 
@@ -389,10 +392,10 @@ def make_train(config):
             jnp.zeros((config["NUM_ACTORS"]), dtype=bool),
             _rng,
         )
-        runner_state, metric = jax.lax.scan(
-            _update_step, (runner_state, 0), None, config["NUM_UPDATES"]
+        runner_state, metric = scan_updates(
+            _update_step, (runner_state, 0), config["NUM_UPDATES"], config
         )
-        return {"runner_state": runner_state}
+        return {"runner_state": runner_state, "metrics": metric}
 
     return train
 
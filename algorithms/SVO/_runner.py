@@ -17,7 +17,7 @@ from omegaconf import OmegaConf
 import wandb
 
 import socialjax
-from algorithms.utils import save_params, load_params, evaluate_ippo as evaluate
+from algorithms.utils import save_params, load_params, run_train, SEED_AXIS, evaluate_ippo as evaluate
 
 
 def single_run(config, make_train, *, wandb_name, group_name):
@@ -36,14 +36,16 @@ def single_run(config, make_train, *, wandb_name, group_name):
 
     rng = jax.random.PRNGKey(config["SEED"])
     rngs = jax.random.split(rng, config["NUM_SEEDS"])
-    train_jit = jax.jit(make_train(config))
-    out = jax.vmap(train_jit)(rngs)
+    out = run_train(
+        lambda config: jax.vmap(make_train(config), axis_name=SEED_AXIS), rngs, algo="SVO", config=config,
+        train_states=lambda out: out["runner_state"][0],
+    )
 
     print("** Saving Results **")
     filename = f'{config["ENV_NAME"]}_seed{config["SEED"]}_reward_{config["REWARD"]}'
-    train_state = jax.tree.map(lambda x: x[0], out["runner_state"][0])
+    seed_params = jax.tree.map(lambda x: x[0], out["params"])
     save_path = f"./checkpoints/{filename}.pkl"
-    save_params(train_state, save_path)
+    save_params(seed_params, save_path)
     params = load_params(save_path)
 
     evaluate(params, socialjax.make(config["ENV_NAME"], **config["ENV_KWARGS"]), save_path, config)
@@ -89,9 +91,11 @@ def tune(default_config, make_train, *, sweep_name):
 
         rng = jax.random.PRNGKey(config["SEED"])
         rngs = jax.random.split(rng, config["NUM_SEEDS"])
-        train_vjit = jax.jit(jax.vmap(make_train(config)))
-        outs = jax.block_until_ready(train_vjit(rngs))
-        train_state = jax.tree.map(lambda x: x[0], outs["runner_state"][0])
+        run_train(
+            lambda config: jax.vmap(make_train(config), axis_name=SEED_AXIS), rngs, algo="SVO", config=config,
+            train_states=lambda out: out["runner_state"][0],
+            export=False,
+        )
 
     wandb.login()
     sweep_id = wandb.sweep(
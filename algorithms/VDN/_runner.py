@@ -18,6 +18,7 @@ import wandb
 
 import socialjax
 from socialjax.wrappers.baselines import LogWrapper
+from algorithms.utils import run_train
 
 ALG_NAME = "vdn_cnn"
 
@@ -52,13 +53,14 @@ def single_run(config, make_train):
 
     rng = jax.random.PRNGKey(config["SEED"])
     rngs = jax.random.split(rng, config["NUM_SEEDS"])
-    train_vjit = jax.jit(jax.vmap(make_train(config, env)))
-    outs = jax.block_until_ready(train_vjit(rngs))
+    outs = run_train(
+        lambda config: jax.vmap(make_train(config, env)), rngs, algo="VDN", config=config,
+        train_states=lambda out: out["runner_state"][0],
+    )
 
     if config.get("SAVE_PATH", None) is not None:
         from socialjax.wrappers.baselines import save_params
 
-        model_state = outs["runner_state"][0]
         save_dir = os.path.join(config["SAVE_PATH"], env_name)
         os.makedirs(save_dir, exist_ok=True)
         OmegaConf.save(
@@ -66,7 +68,7 @@ def single_run(config, make_train):
             os.path.join(save_dir, f'{ALG_NAME}_{env_name}_seed{config["SEED"]}_config.yaml'),
         )
         for i, rng in enumerate(rngs):
-            params = jax.tree.map(lambda x: x[i], model_state.params)
+            params = jax.tree.map(lambda x: x[i], outs["params"])
             save_path = os.path.join(
                 save_dir, f'{ALG_NAME}_{env_name}_seed{config["SEED"]}_vmap{i}.safetensors',
             )
@@ -88,8 +90,11 @@ def tune(default_config, make_train):
 
         rng = jax.random.PRNGKey(config["SEED"])
         rngs = jax.random.split(rng, config["NUM_SEEDS"])
-        train_vjit = jax.jit(jax.vmap(make_train(config, env)))
-        outs = jax.block_until_ready(train_vjit(rngs))
+        run_train(
+            lambda config: jax.vmap(make_train(config, env)), rngs, algo="VDN", config=config,
+            train_states=lambda out: out["runner_state"][0],
+            export=False,
+        )
 
     sweep_config = {
         "name": f"{ALG_NAME}_{env_name}",
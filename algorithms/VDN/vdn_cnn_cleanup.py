@@ -19,7 +19,7 @@ import socialjax
 from socialjax.wrappers.baselines import LogWrapper, CTRolloutManager
 
 # Import shared VDN network architectures
-from algorithms.utils import QNetwork
+from algorithms.utils import QNetwork, host_callbacks
 
 if not hasattr(jax, 'tree'):
     import types
@@ -118,6 +118,7 @@ def make_train(config, env):
         network = QNetwork(
             action_dim=wrapped_env.max_action_space,
             hidden_size=config["HIDDEN_SIZE"],
+            obs_encoding=env.obs_encoding,
         )
 
         def create_agent(rng):
@@ -358,7 +359,7 @@ def make_train(config, env):
                 metrics.update({"test_" + k: v for k, v in test_state.items()})
 
             # report on wandb if required
-            if config["WANDB_MODE"] != "disabled":
+            if config["WANDB_MODE"] != "disabled" and host_callbacks(config):
 
                 def callback(metrics, original_seed):
                     if config.get("WANDB_LOG_ALL_SEEDS", False):
@@ -5,6 +5,14 @@ Usage:
     python algorithms/train.py --algo IPPO --env coins SEED=42 NUM_ENVS=128
     python algorithms/train.py --algo SVO  --env harvest_open
     python algorithms/train.py --algo VDN  --env cleanup alg.NUM_ENVS=32
+    python algorithms/train.py --algo IPPO --env coins --export-dir ./exported
+
+Compiled executables are kept in a persistent cache (~/.cache/socialjax/jax,
+or $SOCIALJAX_CACHE_DIR / --compilation-cache-dir; off with
+--no-compilation-cache). With --export-dir the train function of a single run
+is exported once per (env, algo, config, shapes, source code) and reloaded by
+later runs with the same config; sweeps (TUNE) are not exported, since every
+trial changes the config. See algorithms/utils/compile_utils.py.
 
 Per-env modules (e.g. algorithms/IPPO/ippo_cnn_coins.py) expose:
     - make_train(config)              the family training loop, unchanged from
@@ -17,8 +25,11 @@ and tune(config, make_train, **kwargs).
 """
 import argparse
 import importlib
+import os
 import sys
 
+from algorithms.utils.compile_utils import EXPORT_DIR_ENV, enable_compilation_cache
+
 # (canonical algo prefix used in per-env module / config filename)
 ALGO_PREFIX = {
     "IPPO":     "ippo",
@@ -36,6 +47,11 @@ def _parse_cli():
     ap.add_argument("--algo", required=True, choices=list(ALGO_PREFIX))
     ap.add_argument("--env",  required=True,
                     help="env stem, e.g. coins / coin / harvest_open / pd_arena")
+    ap.add_argument("--compilation-cache-dir", default=None,
+                    help="persistent JAX compilation cache directory")
+    ap.add_argument("--no-compilation-cache", action="store_true")
+    ap.add_argument("--export-dir", default=None,
+                    help="directory of exported (jax.export) train functions")
     ap.add_argument("-h", "--help", action="store_true")
     args, leftover = ap.parse_known_args()
     if args.help:
@@ -43,7 +59,7 @@ def _parse_cli():
         sys.exit(0)
     # Hydra reads sys.argv directly; only let it see the overrides.
     sys.argv = [sys.argv[0]] + leftover
-    return args.algo, args.env
+    return args
 
 
 def _resolve(algo: str, env: str):
@@ -76,7 +92,12 @@ def _build_main(algo, env, env_mod, runner, config_path, config_name):
 
 
 def main():
-    algo, env = _parse_cli()
+    args = _parse_cli()
+    algo, env = args.algo, args.env
+    if not args.no_compilation_cache:
+        print(f"Compilation cache: {enable_compilation_cache(args.compilation_cache_dir)}")
+    if args.export_dir:
+        os.environ[EXPORT_DIR_ENV] = args.export_dir
     env_module, runner_module, config_path, config_name = _resolve(algo, env)
 
     try:
@@ -14,7 +14,12 @@ from algorithms.utils.data_utils import (
     batchify,
     batchify_dict,
     batchify_numpy,
-    unbatchify
+    unbatchify,
+    actors_to_env_major,
+    gather_env_major,
+    rematerialize_obs,
+    rematerialize_env_obs,
+    scan_rollout,
 )
 
 from algorithms.utils.vdn_networks import (
@@ -41,6 +46,25 @@ from algorithms.utils.transfer_utils import (
     s_from_ratio,
 )
 
+from algorithms.utils.gae_utils import (
+    calculate_gae,
+)
+
+from algorithms.utils.metrics_utils import (
+    MetricsLogger,
+    SEED_AXIS,
+    host_callbacks,
+    scan_updates,
+    close_metrics_loggers,
+)
+
+from algorithms.utils.compile_utils import (
+    enable_compilation_cache,
+    exported_train,
+    run_train,
+    log_metrics,
+)
+
 __all__ = [
     # Network architectures
     "CNN",
@@ -57,6 +81,11 @@ __all__ = [
     "batchify_dict",
     "batchify_numpy",
     "unbatchify",
+    "actors_to_env_major",
+    "gather_env_major",
+    "rematerialize_obs",
+    "rematerialize_env_obs",
+    "scan_rollout",
     # IO utilities
     "save_params",
     "load_params",
@@ -69,4 +98,17 @@ __all__ = [
     "IRATTransition",
     # TRANSFER utilities
     "s_from_ratio",
+    # Advantage estimation
+    "calculate_gae",
+    # Metrics logging
+    "MetricsLogger",
+    "SEED_AXIS",
+    "host_callbacks",
+    "scan_updates",
+    "close_metrics_loggers",
+    # Compilation cache / export
+    "enable_compilation_cache",
+    "exported_train",
+    "run_train",
+    "log_metrics",
 ]
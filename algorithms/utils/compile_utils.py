@@ -0,0 +1,289 @@
+"""
+Compilation caching for the training entry points.
+
+Tracing and compiling `make_train` (the full PPO/VDN update nested in
+`lax.scan`) can take minutes for the larger environments, and every process
+of a multi-seed or sweep run used to pay it again. Two layers avoid that:
+
+- `enable_compilation_cache` turns on JAX's persistent compilation cache, so
+  compiled XLA executables are reused across processes. JAX never writes
+  executables containing host callbacks to that cache, and the trainers pass
+  their metrics to the host through `jax.debug.callback` inside the scan (see
+  metrics_utils), so on its own the cache covers evaluation and the other
+  helper jits but not the train loop, unless no metrics sink is configured.
+- `exported_train` traces the train function once and serializes it with
+  `jax.export`, keyed by (env, algo, config hash, input shapes, source
+  hash). `jax.export` cannot serialize host callbacks, so `run_train`
+  builds the function it exports with HOST_CALLBACKS off (see
+  metrics_utils). Later runs with the same config load the serialized
+  module instead of tracing, and since it has no host callbacks its XLA
+  compilation is a persistent-cache hit. Training metrics
+  then come back as the trainer's stacked `metrics` output and are logged
+  after training with `log_metrics`. Sweep trials are not exported: their
+  hyperparameters (LR, ENT_COEF, ...) are part of the config hash, so each
+  trial would pay tracing, export and serialization on top of compiling.
+
+`algorithms/train.py` enables the cache by default; exporting is opt-in via
+`--export-dir`, the `SOCIALJAX_EXPORT_DIR` variable or an `EXPORT_DIR` config
+key. The family runners call `run_train`, which takes either path.
+"""
+
+import functools
+import glob
+import hashlib
+import inspect
+import json
+import os
+import warnings
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import jax
+import jax.numpy as jnp
+from jax import export
+from flax.training.train_state import TrainState
+import numpy as np
+
+from algorithms.utils.metrics_utils import close_metrics_loggers, metrics_logger
+
+CACHE_DIR_ENV = "SOCIALJAX_CACHE_DIR"
+EXPORT_DIR_ENV = "SOCIALJAX_EXPORT_DIR"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "socialjax", "jax")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Config keys that never change the traced program (run bookkeeping, and SEED,
+# which only enters through the rng arguments), so runs that differ only in
+# them share one exported function.
+RUNTIME_CONFIG_KEYS = (
+    "SEED", "ENTITY", "PROJECT", "WANDB_MODE", "WANDB_TAGS",
+    "TUNE", "HYP_TUNE", "EXPORT_DIR", "SAVE_PATH", "METRICS_SINKS", "METRICS_DIR",
+)
+
+
+def enable_compilation_cache(cache_dir: Optional[str] = None, min_compile_time_secs: float = 1.0) -> str:
+    """
+    Turn on JAX's persistent compilation cache.
+
+    Args:
+        cache_dir: Cache directory. Defaults to $SOCIALJAX_CACHE_DIR, else
+                   ~/.cache/socialjax/jax.
+        min_compile_time_secs: Only executables that took at least this long
+                               to compile are written to the cache.
+
+    Returns:
+        The cache directory in use.
+    """
+    cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    jax.config.update("jax_compilation_cache_dir", cache_dir)
+    jax.config.update("jax_persistent_cache_min_compile_time_secs", min_compile_time_secs)
+    return cache_dir
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Stable short hash of a config, ignoring RUNTIME_CONFIG_KEYS."""
+    program = {k: v for k, v in config.items() if k not in RUNTIME_CONFIG_KEYS}
+    text = json.dumps(program, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=None)
+def _source_hash(files: Tuple[Tuple[str, int], ...]) -> str:
+    # keyed by (path, mtime), so files edited since the last call are read again
+    digest = hashlib.sha256()
+    for path, _mtime in files:
+        digest.update(path.encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def code_hash(train_fn: Optional[Callable] = None) -> str:
+    """
+    Hash of the source code a train function is traced from.
+
+    Covers every module of `socialjax` and `algorithms/utils`, plus the file
+    defining `train_fn` (the trainer module, looked up through `vmap` and
+    other wrappers) when it is given.
+    """
+    paths = sorted(glob.glob(os.path.join(REPO_ROOT, "socialjax", "**", "*.py"), recursive=True))
+    paths += sorted(glob.glob(os.path.join(REPO_ROOT, "algorithms", "utils", "*.py")))
+    if train_fn is not None:
+        try:
+            paths.append(inspect.getsourcefile(inspect.unwrap(train_fn)))
+        except TypeError:  # no Python source, e.g. a builtin
+            pass
+    return _source_hash(tuple((p, os.stat(p).st_mtime_ns) for p in paths if p))
+
+
+def export_key(
+    env_name: str,
+    algo: str,
+    config: Dict[str, Any],
+    args: Sequence[Any],
+    train_fn: Optional[Callable] = None,
+) -> str:
+    """
+    File stem identifying an exported train function.
+
+    Combines the env, the algorithm, the config hash and the shapes and
+    dtypes of the arguments, plus the JAX version and backend the module
+    was exported with and the `code_hash` of the traced source, so an
+    edited env, trainer or utility is exported again.
+    """
+    shapes = [(tuple(np.shape(x)), str(jnp.result_type(x))) for x in jax.tree_util.tree_leaves(args)]
+    build = repr((shapes, jax.__version__, jax.default_backend(), code_hash(train_fn)))
+    shape_hash = hashlib.sha256(build.encode()).hexdigest()[:16]
+    return f"{algo}_{env_name}_{config_hash(config)}_{shape_hash}"
+
+
+def exported_train(
+    train_fn: Callable,
+    args: Sequence[Any],
+    *,
+    algo: str,
+    config: Dict[str, Any],
+    export_dir: str,
+    outputs: Callable = lambda out: out,
+) -> Callable:
+    """
+    Jitted `outputs(train_fn(*args))`, loaded from `export_dir` when exported before.
+
+    Args:
+        train_fn: The (vmapped) train function, without host callbacks
+                  (built from a config with HOST_CALLBACKS off).
+        args: Example arguments; only their shapes and dtypes are used.
+        algo: Algorithm name, part of the export key.
+        config: Training config; ENV_NAME and the config hash are part of the key.
+        export_dir: Directory holding the serialized functions.
+        outputs: Selects what the exported function returns from the train
+                 output. It must be a pytree of dicts, lists and tuples of
+                 arrays (e.g. params and metrics, not TrainState objects).
+
+    Returns:
+        A jitted function of `*args`. It runs without host callbacks, so
+        per-update metrics are only available from its return value.
+
+    Raises:
+        ValueError: If `train_fn` calls back to the host.
+    """
+    key = export_key(config["ENV_NAME"], algo, config, args, train_fn=train_fn)
+    path = os.path.join(export_dir, key + ".jaxexport")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            exported = export.deserialize(bytearray(f.read()))
+        # CPU LAPACK kernels (e.g. the QR of orthogonal init) are set up when
+        # a linalg op is first lowered, which a deserialized module skips
+        jax.jit(jnp.linalg.qr).lower(jax.ShapeDtypeStruct((1, 1), jnp.float32))
+        print(f"Loaded exported train function {path}")
+    else:
+        specs = jax.tree.map(lambda x: jax.ShapeDtypeStruct(np.shape(x), jnp.result_type(x)), args)
+        try:
+            exported = export.export(jax.jit(lambda *a: outputs(train_fn(*a))))(*specs)
+        except NotImplementedError as e:  # jax.export cannot serialize host callbacks
+            raise ValueError(
+                "exported train functions cannot call back to the host; "
+                "build train_fn from a config with HOST_CALLBACKS off"
+            ) from e
+        serialized = exported.serialize()
+        os.makedirs(export_dir, exist_ok=True)
+        # write then rename, so concurrent runs never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(serialized)
+        os.replace(tmp_path, path)
+        print(f"Exported train function to {path}")
+    return jax.jit(exported.call)
+
+
+def resolve_export_dir(config: Dict[str, Any]) -> Optional[str]:
+    """Export directory from the EXPORT_DIR config key or $SOCIALJAX_EXPORT_DIR, if any."""
+    return config.get("EXPORT_DIR") or os.environ.get(EXPORT_DIR_ENV) or None
+
+
+def params_of(train_states: Any) -> Any:
+    """The same pytree with every TrainState replaced by its params."""
+    return jax.tree.map(
+        lambda x: x.params if isinstance(x, TrainState) else x,
+        train_states,
+        is_leaf=lambda x: isinstance(x, TrainState),
+    )
+
+
+def run_train(
+    build_train: Callable[[Dict[str, Any]], Callable],
+    rngs: jax.Array,
+    *,
+    algo: str,
+    config: Dict[str, Any],
+    train_states: Callable,
+    log_fn: Optional[Callable[[Dict[str, Any]], None]] = None,
+    export: bool = True,
+) -> Dict[str, Any]:
+    """
+    Run the vmapped train function on `rngs`, exported when an export dir is set.
+
+    Args:
+        build_train: Builds the runner's vmapped train function from a config,
+                     e.g. `lambda config: jax.vmap(make_train(config))`. An
+                     exported function is built with HOST_CALLBACKS off.
+        rngs: One rng per seed.
+        algo: Algorithm name, part of the export key.
+        config: Training config (see `resolve_export_dir`).
+        train_states: Selects the trained TrainState(s) from the train output.
+        log_fn: Receives the per-update metrics of exported runs; defaults to
+                the config's metrics logger (see metrics_utils). Non-exported
+                runs log from inside the scan.
+        export: False to never export, as the runners' `tune` does: every
+                sweep trial has a new config hash, so an export would never
+                be reloaded.
+
+    Returns:
+        {"params": params of `train_states(out)`, "metrics": out["metrics"]},
+        both with a leading seed axis.
+    """
+    if config.get("ENV_KWARGS", {}).get("reset_pool_size", 0) > 0:
+        warnings.warn(
+            f'training {algo} with reset_pool_size={config["ENV_KWARGS"]["reset_pool_size"]}: every '
+            "episode after the first starts from one of that many fixed reset states, not a fresh "
+            "random reset (see socialjax.make)"
+        )
+
+    def outputs(out):
+        # some trainers only log from the scan and return no (or None) metrics
+        return {"params": params_of(train_states(out)), "metrics": out.get("metrics") or {}}
+
+    export_dir = resolve_export_dir(config) if export else None
+    if export_dir is None:
+        out = jax.block_until_ready(jax.jit(lambda r: outputs(build_train(config)(r)))(rngs))
+    else:
+        train_fn = build_train({**config, "HOST_CALLBACKS": False})
+        train = exported_train(train_fn, (rngs,), algo=algo, config=config, export_dir=export_dir, outputs=outputs)
+        out = jax.block_until_ready(train(rngs))
+        if not out["metrics"]:
+            print(f"{algo} returns no training metrics; exported runs skip per-update logging")
+        else:
+            if log_fn is None:
+                logger = metrics_logger(config)
+                log_fn = logger.log if logger is not None else None
+            if log_fn is not None:
+                log_metrics(out["metrics"], log_fn)
+    # write out the metrics still queued before the caller logs anything else
+    close_metrics_loggers()
+    return out
+
+
+def log_metrics(metrics: Dict[str, Any], log_fn: Callable[[Dict[str, Any]], None]) -> None:
+    """
+    Log stacked (num_seeds, num_updates) training metrics one update at a time.
+
+    Replays what the trainers' in-scan `jax.debug.callback` logging would
+    have sent, for runs whose train function was exported without it.
+    """
+    metrics = jax.tree.map(np.asarray, metrics)
+    leaves = jax.tree_util.tree_leaves(metrics)
+    if not leaves:
+        return
+    num_seeds, num_updates = leaves[0].shape[:2]
+    for seed in range(num_seeds):
+        for update in range(num_updates):
+            log_fn(jax.tree.map(lambda x: x[seed, update], metrics))
@@ -5,8 +5,9 @@ This module contains helper functions for batching/unbatching agent data,
 which are used across different MARL algorithms (IPPO, MAPPO, SVO, etc.).
 """
 
+import jax
 import jax.numpy as jnp
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Tuple
 
 
 def batchify(x: dict, agent_list: List, num_actors: int) -> jnp.ndarray:
@@ -104,3 +105,137 @@ def unbatchify(
     """
     x = x.reshape((num_actors, num_envs, -1))
     return {a: x[i] for i, a in enumerate(agent_list)}
+
+
+def actors_to_env_major(x: jnp.ndarray, num_agents: int, num_envs: int) -> jnp.ndarray:
+    """
+    Regroup agent-major rollout data so that each row holds one env step.
+
+    Rollouts order actors agent-major (actor index = agent * num_envs + env),
+    while a centralized critic scores one world state per env step. Grouping
+    the agents of an env step together lets a minibatch evaluate that critic
+    once per env step and broadcast the value to the agents.
+
+    Args:
+        x: Rollout array of shape [num_steps, num_actors, ...]
+        num_agents: Number of agents per environment
+        num_envs: Number of parallel environments
+
+    Returns:
+        Array of shape [num_steps * num_envs, num_agents, ...]
+
+    Example:
+        >>> values = jnp.array([[0, 1, 2, 3]])  # 1 step, 2 agents x 2 envs
+        >>> actors_to_env_major(values, num_agents=2, num_envs=2)
+        >>> # Result: [[0, 2], [1, 3]]
+    """
+    x = x.reshape((x.shape[0], num_agents, num_envs) + x.shape[2:])
+    x = jnp.swapaxes(x, 1, 2)
+    return x.reshape((-1, num_agents) + x.shape[3:])
+
+
+def gather_env_major(x: jnp.ndarray, idx: jnp.ndarray, num_agents: int, num_envs: int) -> jnp.ndarray:
+    """
+    Gather rows `idx` of `actors_to_env_major(x, num_agents, num_envs)`.
+
+    Indexes the agent-major rollout directly, so a minibatch can be gathered
+    without first regrouping (and copying) the whole rollout.
+
+    Args:
+        x: Rollout array of shape [num_steps, num_actors, ...]
+        idx: Env-step indices into [0, num_steps * num_envs)
+        num_agents: Number of agents per environment
+        num_envs: Number of parallel environments
+
+    Returns:
+        Array of shape [len(idx), num_agents, ...]
+    """
+    step, env = idx // num_envs, idx % num_envs
+    actor = jnp.arange(num_agents) * num_envs + env[:, None]
+    return x[step[:, None], actor]
+
+
+def rematerialize_obs(env, states: Any, idx: jnp.ndarray, agents: jnp.ndarray) -> jnp.ndarray:
+    """
+    Rebuild the observations of flattened rollout rows from stored env states.
+
+    With REMAT_OBS the PPO trainers store each step's env state, once per env,
+    instead of every actor's observation, and rebuild the observations of a
+    minibatch with `env.get_agent_obs` when it is gathered, so each row only
+    builds the observation of its own agent.
+
+    Args:
+        env: Environment whose `get_obs` produced the observations
+        states: Env states with leaves of shape [num_steps, num_envs, ...]
+        idx: Row indices into the [num_steps * num_actors] flattened rollout,
+             with actor index = i * num_envs + env for agent `agents[i]`
+        agents: Agent ids of the actors in the rollout
+
+    Returns:
+        Array of shape [len(idx), ...] with one observation per row
+    """
+    num_envs = jax.tree_util.tree_leaves(states)[0].shape[1]
+    num_actors = agents.shape[0] * num_envs
+    step, actor = idx // num_actors, idx % num_actors
+    rows = jax.tree_util.tree_map(lambda x: x[step, actor % num_envs], states)
+    return jax.vmap(env.get_agent_obs)(rows, agents[actor // num_envs])
+
+
+def rematerialize_env_obs(env, states: Any, idx: jnp.ndarray) -> jnp.ndarray:
+    """
+    Rebuild all agents' observations of env-step rows from stored env states.
+
+    Args:
+        env: Environment whose `get_obs` produced the observations
+        states: Env states with leaves of shape [num_steps, num_envs, ...]
+        idx: Env-step indices into [0, num_steps * num_envs)
+
+    Returns:
+        Array of shape [len(idx), num_agents, ...], the rows of
+        `actors_to_env_major` applied to the observations
+    """
+    num_envs = jax.tree_util.tree_leaves(states)[0].shape[1]
+    rows = jax.tree_util.tree_map(lambda x: x[idx // num_envs, idx % num_envs], states)
+    return jax.vmap(env.get_obs)(rows)
+
+
+def scan_rollout(
+    env_step: Callable,
+    runner_state: Any,
+    num_steps: int,
+    reduce_info: Callable = jnp.mean,
+) -> Tuple[Any, Any, Dict[str, jnp.ndarray]]:
+    """
+    Run the rollout scan, averaging the transitions' info in the scan carry.
+
+    The trainers only log the rollout mean of each info entry, so instead of
+    stacking every step's info into the trajectory (a [num_steps, num_actors]
+    array per entry, later shuffled with the rest of the batch) each step's
+    `reduce_info(x)` is added to a running sum carried by the scan.
+
+    Args:
+        env_step: Scan body env_step(runner_state, unused) -> (runner_state, transition),
+                  where `transition.info` is a dict of arrays
+        runner_state: Initial scan carry
+        num_steps: Rollout length
+        reduce_info: Reduces one step's info entry to a scalar; the mean over
+                     all actors by default
+
+    Returns:
+        (runner_state, traj_batch, info): the final carry, the stacked
+        transitions with `info=None`, and the mean of `reduce_info` over steps
+    """
+    # shapes only: the env step itself is traced once more by the scan
+    info_shape = jax.eval_shape(env_step, runner_state, None)[1].info
+    info_sum = jax.tree_util.tree_map(lambda x: jnp.zeros((), jnp.float32), info_shape)
+
+    def _step(carry, unused):
+        runner_state, info_sum = carry
+        runner_state, transition = env_step(runner_state, unused)
+        info_sum = jax.tree_util.tree_map(
+            lambda s, x: s + reduce_info(x).astype(jnp.float32), info_sum, transition.info
+        )
+        return (runner_state, info_sum), transition._replace(info=None)
+
+    (runner_state, info_sum), traj_batch = jax.lax.scan(_step, (runner_state, info_sum), None, num_steps)
+    return runner_state, traj_batch, jax.tree_util.tree_map(lambda s: s / num_steps, info_sum)
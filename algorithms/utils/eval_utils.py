@@ -6,6 +6,11 @@ Different algorithms have slightly different evaluation patterns:
 - IPPO: Uses ActorCritic with PARAMETER_SHARING logic + WandB GIF logging
 - MAPPO/IRAT: Use Actor network (no critic in eval) without WandB logging
 - SVO/TRANSFER: Use ActorCritic without PARAMETER_SHARING logic, no WandB logging
+
+Both run their episodes with `make_eval_rollout`: a jitted lax.scan over
+EVAL_NUM_STEPS steps of EVAL_NUM_EPISODES parallel episodes. Returns are
+reported over all episodes; the GIF shows the first GIF_NUM_FRAMES steps of
+episode 0, rendered once after the rollout.
 """
 
 import jax
@@ -16,7 +21,88 @@ from pathlib import Path
 import wandb
 
 from algorithms.utils.networks import ActorCritic, SmallActor
-from algorithms.utils.data_utils import unbatchify
+
+
+def render_frames(env, states):
+    """
+    Render env states stacked along a leading time axis to uint8 frames.
+
+    Envs with a batched renderer (``render_batch``) draw the whole episode in
+    one jitted call; the others fall back to ``render`` per state.
+    """
+    if hasattr(env, "render_batch"):
+        return list(np.asarray(env.render_batch(states)))
+    num_frames = jax.tree.leaves(states)[0].shape[0]
+    return [np.asarray(env.render(jax.tree.map(lambda x: x[t], states))) for t in range(num_frames)]
+
+
+def make_eval_rollout(env, policy_fn, num_steps, num_episodes, num_recorded_episodes=None):
+    """
+    Build a jitted rollout of `num_episodes` parallel evaluation episodes.
+
+    Args:
+        env: Environment instance
+        policy_fn: policy_fn(obs, rng) -> actions, mapping one env's
+            observations (num_agents, *obs_shape) to actions (num_agents,)
+        num_steps: Number of env steps per episode
+        num_episodes: Number of episodes run in parallel
+        num_recorded_episodes: Keep the states of only the first this many
+            episodes (all if None), e.g. 1 when only one GIF is rendered
+
+    Returns:
+        rollout(rng) -> (states, returns): env states stacked to
+        (num_steps + 1, num_recorded_episodes, ...) including the reset state, and
+        per-agent returns (num_episodes, num_agents) summed up to and
+        including the first step at which each episode is done.
+    """
+
+    num_recorded = num_episodes if num_recorded_episodes is None else num_recorded_episodes
+
+    def rollout(rng):
+        rng, _rng = jax.random.split(rng)
+        obs, state = jax.vmap(env.reset)(jax.random.split(_rng, num_episodes))
+
+        def _step(carry, unused):
+            obs, state, returns, alive, rng = carry
+            rng, _rng_act, _rng_step = jax.random.split(rng, 3)
+            actions = jax.vmap(policy_fn)(obs, jax.random.split(_rng_act, num_episodes))
+            env_act = [actions[:, i] for i in range(env.num_agents)]
+            obs, state, reward, done, info = jax.vmap(env.step)(
+                jax.random.split(_rng_step, num_episodes), state, env_act
+            )
+            returns = returns + reward * alive[:, None]
+            alive = alive & ~done["__all__"]
+            return (obs, state, returns, alive, rng), jax.tree.map(lambda x: x[:num_recorded], state)
+
+        returns = jnp.zeros((num_episodes, env.num_agents))
+        alive = jnp.ones((num_episodes,), dtype=bool)
+        (_, _, returns, _, _), states = jax.lax.scan(
+            _step, (obs, state, returns, alive, rng), None, num_steps
+        )
+        states = jax.tree.map(
+            lambda first, rest: jnp.concatenate([first[None, :num_recorded], rest]), state, states
+        )
+        return states, returns
+
+    return jax.jit(rollout)
+
+
+def _run_eval_rollout(env, policy_fn, config):
+    """Run the evaluation episodes; returns episode 0's GIF frames and all returns."""
+    num_frames = config["GIF_NUM_FRAMES"]
+    num_steps = max(config.get("EVAL_NUM_STEPS", num_frames), num_frames)
+    num_episodes = config.get("EVAL_NUM_EPISODES", 1)
+    rollout = make_eval_rollout(env, policy_fn, num_steps, num_episodes, num_recorded_episodes=1)
+    states, returns = jax.block_until_ready(rollout(jax.random.PRNGKey(0)))
+
+    gif_states = jax.tree.map(lambda x: x[: num_frames + 1, 0], states)
+    frames = render_frames(env, gif_states)
+    returns = np.asarray(returns)
+    print(
+        f"Evaluation over {num_episodes} episodes of {num_steps} steps: "
+        f"return per agent {returns.mean():.3f} +- {returns.std():.3f}"
+    )
+    return frames, returns
 
 
 def evaluate_ippo(params, env, save_path, config):
@@ -32,16 +118,6 @@ def evaluate_ippo(params, env, save_path, config):
         save_path: Path where params were saved (unused but kept for API compatibility)
         config: Configuration dictionary
     """
-    rng = jax.random.PRNGKey(0)
-
-    rng, _rng = jax.random.split(rng)
-    obs, state = env.reset(_rng)
-    done = False
-
-    pics = []
-    img = env.render(state)
-    pics.append(img)
-
     # Extract environment name for root_dir
     env_name = config["ENV_NAME"]
     # Map environment names to evaluation directories
@@ -62,43 +138,29 @@ def evaluate_ippo(params, env, save_path, config):
     path = Path(root_dir + "/state_pics")
     path.mkdir(parents=True, exist_ok=True)
 
-    for o_t in range(config["GIF_NUM_FRAMES"]):
-        # Use model to select actions
-        if config.get("PARAMETER_SHARING", True):
-            obs_batch = jnp.stack([obs[a] for a in env.agents]).reshape(-1, *env.observation_space()[0].shape)
-            network = ActorCritic(action_dim=env.action_space().n, activation=config.get("ACTIVATION", "relu"))
-            pi, _ = network.apply(params, obs_batch)
-            rng, _rng = jax.random.split(rng)
-            actions = pi.sample(seed=_rng)
-            # Convert action format
-            env_act = {k: v.squeeze() for k, v in unbatchify(
-                actions, env.agents, 1, env.num_agents
-            ).items()}
-        else:
-            obs_batch = jnp.stack([obs[a] for a in env.agents])
-            env_act = {}
-            network = [ActorCritic(action_dim=env.action_space().n, activation=config.get("ACTIVATION", "relu")) for _ in range(env.num_agents)]
-            for i in range(env.num_agents):
-                obs = jnp.expand_dims(obs_batch[i], axis=0)
-                pi, _ = network[i].apply(params[i], obs)
-                rng, _rng = jax.random.split(rng)
-                single_action = pi.sample(seed=_rng)
-                env_act[env.agents[i]] = single_action
-
-        # Execute actions
-        rng, _rng = jax.random.split(rng)
-        obs, state, reward, done, info = env.step(_rng, state, [v.item() for v in env_act.values()])
-        done = done["__all__"]
+    network = ActorCritic(action_dim=env.action_space().n, activation=config.get("ACTIVATION", "relu"), obs_encoding=env.obs_encoding)
+    if config.get("PARAMETER_SHARING", True):
+        def policy_fn(obs, rng):
+            pi, _ = network.apply(params, obs)
+            return pi.sample(seed=rng)
+    else:
+        # per-agent params stacked on a leading agent axis, as in training
+        agent_params = jax.tree.map(lambda *xs: jnp.stack(xs), *params)
+
+        def agent_action(agent_params, obs, rng):
+            pi, _ = network.apply(agent_params, obs[None])
+            return pi.sample(seed=rng)[0]
 
-        # Render
-        img = env.render(state)
-        pics.append(img)
+        def policy_fn(obs, rng):
+            return jax.vmap(agent_action)(agent_params, obs, jax.random.split(rng, env.num_agents))
+
+    frames, returns = _run_eval_rollout(env, policy_fn, config)
 
     # Save GIF
     print(f"Saving Episode GIF")
-    pics = [Image.fromarray(np.array(img)) for img in pics]
+    pics = [Image.fromarray(img) for img in frames]
     n_agents = len(env.agents)
-    gif_path = f"{root_dir}/{n_agents}-agents_seed-{config['SEED']}_frames-{o_t + 1}.gif"
+    gif_path = f"{root_dir}/{n_agents}-agents_seed-{config['SEED']}_frames-{config['GIF_NUM_FRAMES']}.gif"
     pics[0].save(
         gif_path,
         format="GIF",
@@ -109,9 +171,13 @@ def evaluate_ippo(params, env, save_path, config):
         loop=0,
     )
 
-    # Log the GIF to WandB
+    # Log the GIF and the evaluation returns to WandB
     print("Logging GIF to WandB")
-    wandb.log({"Episode GIF": wandb.Video(gif_path, caption="Evaluation Episode", format="gif")})
+    wandb.log({
+        "Episode GIF": wandb.Video(gif_path, caption="Evaluation Episode", format="gif"),
+        "eval/returned_episode_returns": returns.mean(),
+        "eval/returned_episode_returns_std": returns.std(),
+    })
 
 
 def evaluate_mappo_style(params, env, save_path, config, use_actor_only=True):
@@ -128,16 +194,6 @@ def evaluate_mappo_style(params, env, save_path, config, use_actor_only=True):
         config: Configuration dictionary
         use_actor_only: If True, use Actor network; if False, use ActorCritic (for SVO/TRANSFER)
     """
-    rng = jax.random.PRNGKey(0)
-
-    rng, _rng = jax.random.split(rng)
-    obs, state = env.reset(_rng)
-    done = False
-
-    pics = []
-    img = env.render(state)
-    pics.append(img)
-
     # Extract environment name for root_dir
     env_name = config["ENV_NAME"]
     # Map environment names to evaluation directories
@@ -161,40 +217,25 @@ def evaluate_mappo_style(params, env, save_path, config, use_actor_only=True):
     path = Path(root_dir + "/state_pics")
     path.mkdir(parents=True, exist_ok=True)
 
-    for o_t in range(config["GIF_NUM_FRAMES"]):
-        obs_batch = jnp.stack([obs[a] for a in env.agents]).reshape(-1, *env.observation_space()[0].shape)
+    if use_actor_only:
+        # MAPPO uses SmallActor (features=16), not Actor (features=64)
+        network = SmallActor(action_dim=env.action_space().n, activation=config.get("ACTIVATION", "relu"), obs_encoding=env.obs_encoding)
+    else:
+        network = ActorCritic(action_dim=env.action_space().n, activation=config.get("ACTIVATION", "relu"), obs_encoding=env.obs_encoding)
 
-        # Use model to select actions
-        if use_actor_only:
-            # MAPPO uses SmallActor (features=16), not Actor (features=64)
-            network = SmallActor(action_dim=env.action_space().n, activation=config.get("ACTIVATION", "relu"))
-            pi = network.apply(params, obs_batch)
-        else:
-            network = ActorCritic(action_dim=env.action_space().n, activation=config.get("ACTIVATION", "relu"))
-            pi, _ = network.apply(params, obs_batch)
-
-        rng, _rng = jax.random.split(rng)
-        actions = pi.sample(seed=_rng)
-
-        # Convert action format
-        env_act = {k: v.squeeze() for k, v in unbatchify(
-            actions, env.agents, 1, env.num_agents
-        ).items()}
-
-        # Execute actions
-        rng, _rng = jax.random.split(rng)
-        obs, state, reward, done, info = env.step(_rng, state, [v.item() for v in env_act.values()])
-        done = done["__all__"]
+    def policy_fn(obs, rng):
+        pi = network.apply(params, obs)
+        if not use_actor_only:
+            pi, _ = pi
+        return pi.sample(seed=rng)
 
-        # Render
-        img = env.render(state)
-        pics.append(img)
+    frames, returns = _run_eval_rollout(env, policy_fn, config)
 
     # Save GIF
     print(f"Saving Episode GIF")
-    pics = [Image.fromarray(np.array(img)) for img in pics]
+    pics = [Image.fromarray(img) for img in frames]
     pics[0].save(
-        f"{root_dir}/state_outer_step_{o_t+1}.gif",
+        f"{root_dir}/state_outer_step_{config['GIF_NUM_FRAMES']}.gif",
         format="GIF",
         save_all=True,
         optimize=False,
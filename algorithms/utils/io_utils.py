@@ -24,7 +24,8 @@ def save_params(train_state: TrainState, save_path: str) -> None:
     to numpy arrays for serialization, and saves them as a pickle file.
 
     Args:
-        train_state: Flax TrainState containing the model parameters to save.
+        train_state: Flax TrainState containing the model parameters to save,
+                     or the params pytree itself.
         save_path: Path where the parameters will be saved (typically .pkl file).
                    Parent directories will be created if they don't exist.
 
@@ -36,7 +37,8 @@ def save_params(train_state: TrainState, save_path: str) -> None:
         The function creates the directory structure if it doesn't exist.
     """
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    params = jax.tree_util.tree_map(lambda x: np.array(x), train_state.params)
+    params = train_state.params if isinstance(train_state, TrainState) else train_state
+    params = jax.tree_util.tree_map(lambda x: np.array(x), params)
 
     with open(save_path, 'wb') as f:
         pickle.dump(params, f)
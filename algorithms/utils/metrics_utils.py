@@ -0,0 +1,334 @@
+"""
+Buffered, asynchronous training metrics.
+
+A host callback blocks the compiled training loop until it returns, so the
+PPO-family trainers do not log from inside every update:
+
+- `scan_updates` runs the update scan in chunks of LOG_EVERY updates. The
+  metrics of a chunk are stacked on device and reach the host in one callback.
+- That callback only queues them for a `MetricsLogger`, whose background
+  thread writes them to the configured sinks, so training never waits on
+  logging I/O.
+- With no sinks configured the callback is not traced at all; the stacked
+  metrics are still returned by `make_train`.
+
+The runners vmap the seeds of a run over the SEED_AXIS axis name, and
+`scan_updates` adds the seed's position on it to the metrics as
+"seed_index" (0 outside such a vmap), so the rows of different seeds can be
+told apart in the sinks.
+
+With HOST_CALLBACKS set to False (`run_train` sets it for the train
+functions it exports, which cannot hold host callbacks) `scan_updates`
+traces no callback whatever the sinks.
+
+Sinks are chosen with the METRICS_SINKS config key, a list of "wandb",
+"jsonl", "csv" and "memory" (default ["wandb"]). "wandb" is dropped when
+WANDB_MODE is "disabled", so offline runs need no wandb at all. JSONL and CSV
+files are written to METRICS_DIR (default "metrics"). The runners call
+`close_metrics_loggers` after training so every queued row is written.
+"""
+
+import atexit
+import csv
+import json
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+METRICS_SINKS = ("wandb", "jsonl", "csv", "memory")
+
+# axis name of the vmap over the seeds of a run
+SEED_AXIS = "seed"
+
+
+class MetricsSink:
+    """Receives rows of metrics, one dict per update, on the logger thread."""
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class WandbSink(MetricsSink):
+    """Logs each row with `wandb.log` to the active run."""
+
+    def write(self, rows):
+        import wandb
+
+        for row in rows:
+            wandb.log(row)
+
+
+class JSONLSink(MetricsSink):
+    """Appends one JSON object per row to `path`."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._file = open(path, "a")
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class CSVSink(MetricsSink):
+    """Appends rows to `path`; a new file gets the keys of its first row as the header."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", newline="")
+        self._writer = None
+
+    def write(self, rows):
+        for row in rows:
+            if self._writer is None:
+                self._writer = csv.DictWriter(self._file, fieldnames=list(row), extrasaction="ignore")
+                if self._file.tell() == 0:
+                    self._writer.writeheader()
+            self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class InMemorySink(MetricsSink):
+    """Keeps the rows in `self.rows`, for tests and notebooks."""
+
+    def __init__(self):
+        self.rows = []
+
+    def write(self, rows):
+        self.rows.extend(rows)
+
+
+def _to_rows(metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Split metrics stacked on a leading update axis into one dict of Python values per update."""
+    metrics = jax.tree.map(np.asarray, metrics)
+    leaves = jax.tree_util.tree_leaves(metrics)
+    if not leaves:
+        return []
+    return [
+        jax.tree.map(lambda x: x[i].item() if x[i].size == 1 else x[i].tolist(), metrics)
+        for i in range(leaves[0].shape[0])
+    ]
+
+
+class MetricsLogger:
+    """
+    Writes metrics to `sinks` from a background thread.
+
+    `submit` and `log` only queue their input, so the host callback that
+    calls them returns right away. `flush` waits until everything queued
+    has been written; `close` also stops the thread and closes the sinks.
+    """
+
+    def __init__(self, sinks: Sequence[MetricsSink], max_pending: int = 256):
+        self.sinks = list(sinks)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="metrics-logger", daemon=True)
+        self._thread.start()
+
+    def submit(self, metrics: Dict[str, Any]) -> None:
+        """Queue metrics stacked on a leading update axis, e.g. a chunk from `scan_updates`."""
+        self._queue.put(metrics)
+
+    def log(self, row: Dict[str, Any]) -> None:
+        """Queue the metrics of a single update."""
+        self._queue.put(jax.tree.map(lambda x: np.asarray(x)[None], row))
+
+    def _run(self):
+        while True:
+            metrics = self._queue.get()
+            try:
+                if metrics is None:
+                    return
+                rows = _to_rows(metrics)
+                for sink in self.sinks:
+                    sink.write(rows)
+            except Exception as e:  # surfaced by flush/close, the thread keeps draining
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued metric has been written."""
+        self._queue.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("writing training metrics failed") from error
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        for sink in self.sinks:
+            sink.close()
+        self.flush()
+
+
+def host_callbacks(config: Dict[str, Any]) -> bool:
+    """Whether the train function may call back to the host (HOST_CALLBACKS, default True)."""
+    return bool(config.get("HOST_CALLBACKS", True))
+
+
+def sink_names(config: Dict[str, Any]) -> List[str]:
+    """The METRICS_SINKS of `config`, without "wandb" when WANDB_MODE is "disabled"."""
+    names = list(config.get("METRICS_SINKS", ["wandb"]))
+    unknown = [name for name in names if name not in METRICS_SINKS]
+    if unknown:
+        raise ValueError(f"METRICS_SINKS must be a subset of {METRICS_SINKS}, got {unknown}")
+    if config.get("WANDB_MODE") == "disabled":
+        names = [name for name in names if name != "wandb"]
+    return names
+
+
+def make_sinks(config: Dict[str, Any]) -> List[MetricsSink]:
+    """The sinks named by `sink_names(config)`."""
+    stem = os.path.join(config.get("METRICS_DIR", "metrics"), f'{config["ENV_NAME"]}_seed{config["SEED"]}')
+    sinks = []
+    for name in sink_names(config):
+        if name == "wandb":
+            sinks.append(WandbSink())
+        elif name == "jsonl":
+            sinks.append(JSONLSink(stem + ".jsonl"))
+        elif name == "csv":
+            sinks.append(CSVSink(stem + ".csv"))
+        else:
+            sinks.append(InMemorySink())
+    return sinks
+
+
+# one logger per sink configuration, shared by make_train and its runner
+_LOGGERS: Dict[str, MetricsLogger] = {}
+
+
+def metrics_logger(config: Dict[str, Any]) -> Optional[MetricsLogger]:
+    """
+    The logger for `config`'s sinks, started on first use; None if it has no sinks.
+
+    `make_train` and the runner of a run get the same logger, so the runner
+    can flush what the traced callbacks queued. After `close_metrics_loggers`
+    the next call starts a new one.
+    """
+    if not sink_names(config):
+        return None
+    key = json.dumps(
+        [config.get("METRICS_SINKS", ["wandb"]), config.get("WANDB_MODE"),
+         config.get("METRICS_DIR", "metrics"), config["ENV_NAME"], config["SEED"]],
+        default=repr,
+    )
+    if key not in _LOGGERS:
+        _LOGGERS[key] = MetricsLogger(make_sinks(config))
+    return _LOGGERS[key]
+
+
+def close_metrics_loggers() -> None:
+    """Write out and close every logger started by `metrics_logger`."""
+    while _LOGGERS:
+        _LOGGERS.popitem()[1].close()
+
+
+def _close_at_exit():
+    try:
+        close_metrics_loggers()
+    except RuntimeError as e:
+        print(f"{e}: {e.__cause__!r}")
+
+
+atexit.register(_close_at_exit)
+
+
+def seed_index() -> jnp.ndarray:
+    """Index of the current seed on the SEED_AXIS vmap, or 0 when not under it."""
+    try:
+        return jax.lax.axis_index(SEED_AXIS)
+    except NameError:
+        return jnp.zeros((), dtype=jnp.int32)
+
+
+def scan_updates(
+    update_step: Callable,
+    runner_state: Any,
+    num_updates: int,
+    config: Dict[str, Any],
+):
+    """
+    `lax.scan` of `update_step` over `num_updates` updates, logging its metrics in chunks.
+
+    The updates run as an outer scan over chunks of LOG_EVERY updates. When
+    LOG_EVERY does not divide `num_updates`, the last chunk is padded: its
+    extra updates are skipped by a `lax.cond` and their rows dropped, so
+    every callback but the last still carries LOG_EVERY updates. Each
+    update's metrics get a "seed_index" entry (see `seed_index`). After each
+    chunk, its stacked metrics go to `metrics_logger(config)` in one host
+    callback, which is left out when the config has no sinks or turns
+    HOST_CALLBACKS off.
+
+    Args:
+        update_step: Scan body update_step(runner_state, unused) -> (runner_state, metric)
+        runner_state: Initial scan carry
+        num_updates: Number of updates
+        config: Training config (LOG_EVERY and the METRICS_* keys)
+
+    Returns:
+        (runner_state, metrics), with metrics stacked to [num_updates, ...]
+        as `lax.scan` would return them
+    """
+    log = host_callbacks(config) and bool(sink_names(config))
+    log_every = max(1, min(int(config.get("LOG_EVERY", 10)), num_updates))
+    num_chunks = -(-num_updates // log_every)
+    padded = num_chunks * log_every != num_updates
+
+    def _update_step(runner_state, unused):
+        runner_state, metric = update_step(runner_state, unused)
+        return runner_state, {**metric, "seed_index": seed_index()}
+
+    if padded:
+        metric_shapes = jax.eval_shape(_update_step, runner_state, None)[1]
+
+        def _skip(runner_state, unused):
+            return runner_state, jax.tree.map(lambda x: jnp.zeros(x.shape, x.dtype), metric_shapes)
+
+        def _masked_update_step(runner_state, update):
+            # the predicate is the same for every seed, so under vmap this
+            # stays a cond and the padded updates do not run
+            return jax.lax.cond(update < num_updates, _update_step, _skip, runner_state, None)
+
+    def _chunk(runner_state, chunk):
+        if padded:
+            updates = chunk * log_every + jnp.arange(log_every)
+            runner_state, metrics = jax.lax.scan(_masked_update_step, runner_state, updates)
+        else:
+            runner_state, metrics = jax.lax.scan(_update_step, runner_state, None, log_every)
+        if log:
+            # looked up per call, so a compiled train function can be run again
+            # after its logger was closed; rows past num_updates are dropped
+            num_rows = jnp.minimum(num_updates - chunk * log_every, log_every)
+            jax.debug.callback(
+                lambda m, n: metrics_logger(config).submit(jax.tree.map(lambda x: x[: int(n)], m)),
+                metrics, num_rows,
+            )
+        return runner_state, metrics
+
+    runner_state, metrics = jax.lax.scan(_chunk, runner_state, jnp.arange(num_chunks))
+    return runner_state, jax.tree.map(
+        lambda x: x.reshape((num_chunks * log_every,) + x.shape[2:])[:num_updates], metrics
+    )
@@ -8,11 +8,43 @@ including IPPO, MAPPO, SVO, Inequity Aversion, and AAA.
 import flax.linen as nn
 import numpy as np
 from flax.linen.initializers import constant, orthogonal
-from typing import Sequence
+from typing import Optional, Sequence, Tuple
 import distrax
+import jax
 import jax.numpy as jnp
 
 
+def expand_compact_obs(x, obs_encoding):
+    """
+    Expand compact uint8 observations back to the full one-hot channel layout.
+
+    Inverse of ``socialjax.environments.observation.pack_compact_obs``. The last
+    axis may hold several compact blocks side by side (e.g. the MAPPO world
+    state, which concatenates every agent's observation); each block is
+    expanded independently.
+
+    Args:
+        x: Compact observations of shape [..., num_blocks * channels]
+        obs_encoding: (num_codes, channels) tuple exposed by the env as ``env.obs_encoding``
+
+    Returns:
+        float32 array of shape [..., num_blocks * (num_codes + 4 + channels - 2)]
+    """
+    num_codes, channels = obs_encoding
+    blocks = x.reshape(*x.shape[:-1], -1, channels)
+    code = blocks[..., 0].astype(jnp.int32)
+    angle = blocks[..., 1].astype(jnp.int32)
+    expanded = jnp.concatenate(
+        [
+            jax.nn.one_hot(code - 1, num_codes),  # items, self, other
+            jax.nn.one_hot(angle, 4),  # angle 4 (no agent) -> all zeros
+            blocks[..., 2:].astype(jnp.float32),
+        ],
+        axis=-1,
+    )
+    return expanded.reshape(*x.shape[:-1], -1)
+
+
 class CNN(nn.Module):
     """
     Convolutional Neural Network for visual feature extraction.
@@ -27,8 +59,11 @@ class CNN(nn.Module):
 
     Attributes:
         activation: Activation function name ("relu" or "tanh")
+        obs_encoding: (num_codes, channels) of compact observations, expanded
+            to one-hot before the first conv; None for full observations
     """
     activation: str = "relu"
+    obs_encoding: Optional[Tuple[int, int]] = None
 
     @nn.compact
     def __call__(self, x):
@@ -37,6 +72,9 @@ class CNN(nn.Module):
         else:
             activation = nn.tanh
 
+        if self.obs_encoding is not None:
+            x = expand_compact_obs(x, self.obs_encoding)
+
         x = nn.Conv(
             features=32,
             kernel_size=(5, 5),
@@ -88,12 +126,14 @@ class ActorCritic(nn.Module):
     Attributes:
         action_dim: Number of discrete actions
         activation: Activation function name ("relu" or "tanh")
+        obs_encoding: (num_codes, channels) of compact observations (see CNN)
 
     Returns:
         Tuple of (policy distribution, value estimate)
     """
     action_dim: Sequence[int]
     activation: str = "relu"
+    obs_encoding: Optional[Tuple[int, int]] = None
 
     @nn.compact
     def __call__(self, x):
@@ -102,7 +142,7 @@ class ActorCritic(nn.Module):
         else:
             activation = nn.tanh
 
-        embedding = CNN(self.activation)(x)
+        embedding = CNN(self.activation, obs_encoding=self.obs_encoding)(x)
 
         # Actor head
         actor_mean = nn.Dense(
@@ -140,12 +180,14 @@ class Actor(nn.Module):
     Attributes:
         action_dim: Number of discrete actions
         activation: Activation function name ("relu" or "tanh")
+        obs_encoding: (num_codes, channels) of compact observations (see CNN)
 
     Returns:
         Categorical policy distribution over actions
     """
     action_dim: int
     activation: str = "relu"
+    obs_encoding: Optional[Tuple[int, int]] = None
 
     @nn.compact
     def __call__(self, obs):
@@ -154,7 +196,7 @@ class Actor(nn.Module):
         else:
             activation = nn.tanh
 
-        embedding = CNN(self.activation)(obs)
+        embedding = CNN(self.activation, obs_encoding=self.obs_encoding)(obs)
 
         actor_mean = nn.Dense(
             64, kernel_init=orthogonal(np.sqrt(2)), bias_init=constant(0.0)
@@ -182,11 +224,13 @@ class Critic(nn.Module):
 
     Attributes:
         activation: Activation function name ("relu" or "tanh")
+        obs_encoding: (num_codes, channels) of compact observations (see CNN)
 
     Returns:
         Scalar value estimate (squeezed to remove last dimension)
     """
     activation: str = "relu"
+    obs_encoding: Optional[Tuple[int, int]] = None
 
     @nn.compact
     def __call__(self, x):
@@ -197,7 +241,7 @@ class Critic(nn.Module):
         else:
             activation = nn.tanh
 
-        embedding = CNN(self.activation)(world_state)
+        embedding = CNN(self.activation, obs_encoding=self.obs_encoding)(world_state)
 
         hidden = nn.Dense(
             features=64,
@@ -237,8 +281,11 @@ class SmallCNN(nn.Module):
 
     Attributes:
         activation: Activation function name ("relu" or "tanh")
+        obs_encoding: (num_codes, channels) of compact observations, expanded
+            to one-hot before the first conv; None for full observations
     """
     activation: str = "relu"
+    obs_encoding: Optional[Tuple[int, int]] = None
 
     @nn.compact
     def __call__(self, x):
@@ -247,6 +294,9 @@ class SmallCNN(nn.Module):
         else:
             activation = nn.tanh
 
+        if self.obs_encoding is not None:
+            x = expand_compact_obs(x, self.obs_encoding)
+
         x = nn.Conv(
             features=16,
             kernel_size=(3, 3),
@@ -281,12 +331,14 @@ class SmallActor(nn.Module):
     Attributes:
         action_dim: Number of discrete actions
         activation: Activation function name ("relu" or "tanh")
+        obs_encoding: (num_codes, channels) of compact observations (see CNN)
 
     Returns:
         Categorical policy distribution over actions
     """
     action_dim: int
     activation: str = "relu"
+    obs_encoding: Optional[Tuple[int, int]] = None
 
     @nn.compact
     def __call__(self, obs):
@@ -295,7 +347,7 @@ class SmallActor(nn.Module):
         else:
             activation = nn.tanh
 
-        embedding = SmallCNN(self.activation)(obs)
+        embedding = SmallCNN(self.activation, obs_encoding=self.obs_encoding)(obs)
 
         actor_mean = nn.Dense(
             16, kernel_init=orthogonal(np.sqrt(2)), bias_init=constant(0.0)
@@ -323,11 +375,13 @@ class SmallCritic(nn.Module):
 
     Attributes:
         activation: Activation function name ("relu" or "tanh")
+        obs_encoding: (num_codes, channels) of compact observations (see CNN)
 
     Returns:
         Scalar value estimate (squeezed to remove last dimension)
     """
     activation: str = "relu"
+    obs_encoding: Optional[Tuple[int, int]] = None
 
     @nn.compact
     def __call__(self, x):
@@ -338,7 +392,7 @@ class SmallCritic(nn.Module):
         else:
             activation = nn.tanh
 
-        embedding = SmallCNN(self.activation)(world_state)
+        embedding = SmallCNN(self.activation, obs_encoding=self.obs_encoding)(world_state)
 
         hidden = nn.Dense(
             features=16,
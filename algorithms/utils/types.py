@@ -16,7 +16,11 @@ class Transition(NamedTuple):
 
 
 class MAPPOTransition(NamedTuple):
-    """Centralized-critic transition for MAPPO (adds global_done & world_state)."""
+    """Centralized-critic transition for MAPPO (adds global_done & world_state).
+
+    world_state holds one entry per env step ([NUM_ENVS, ...] per step), not
+    one per actor; every other field is per actor.
+    """
     global_done: jnp.ndarray
     done: jnp.ndarray
     action: jnp.ndarray
@@ -29,7 +33,10 @@ class MAPPOTransition(NamedTuple):
 
 
 class IRATTransition(NamedTuple):
-    """IRAT dual-policy transition with separate individual/team heads."""
+    """IRAT dual-policy transition with separate individual/team heads.
+
+    As in MAPPOTransition, world_state holds one entry per env step.
+    """
     global_done: jnp.ndarray
     done: jnp.ndarray
     # Individual policy
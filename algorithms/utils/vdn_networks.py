@@ -7,6 +7,7 @@ VDN uses the standard CNN from the shared networks module.
 
 import flax.linen as nn
 import jax.numpy as jnp
+from typing import Optional, Tuple
 
 # Import standard CNN from shared networks
 from algorithms.utils.networks import CNN
@@ -27,6 +28,7 @@ class QNetwork(nn.Module):
         action_dim: Number of discrete actions
         hidden_size: Size of hidden layer (default: 64)
         activation: Activation function name ("relu" or "tanh")
+        obs_encoding: (num_codes, channels) of compact observations (see CNN)
 
     Returns:
         Q-values for each action (shape: [batch_size, action_dim])
@@ -34,6 +36,7 @@ class QNetwork(nn.Module):
     action_dim: int
     hidden_size: int = 64
     activation: str = "relu"
+    obs_encoding: Optional[Tuple[int, int]] = None
 
     @nn.compact
     def __call__(self, x: jnp.ndarray):
@@ -42,7 +45,7 @@ class QNetwork(nn.Module):
         else:
             activation = nn.tanh
 
-        embedding = CNN(self.activation)(x)
+        embedding = CNN(self.activation, obs_encoding=self.obs_encoding)(x)
         # no activation here as a nonlinearity has already
         # been applied to the embedding
         x = nn.Dense(self.hidden_size)(embedding)
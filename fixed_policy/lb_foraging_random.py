@@ -82,7 +82,7 @@ def main():
         print("\nInitial State:")
         print(f"  - Agent Positions: {np.array(state.agent_positions)}")
         print(f"  - Agent Levels: {np.array(state.agent_levels)}")
-        food_count = int(jnp.sum(state.food_grid > 0))
+        food_count = int(jnp.sum(state.food_levels > 0))
         print(f"  - Active Food: {food_count}/{num_food}")
         print("=" * 60 + "\n")
 
@@ -126,7 +126,7 @@ def main():
             print(f"  - Rewards: {[float(rewards[i]) for i in range(num_agents)]}")
             print(f"  - Cumulative Rewards: {[cumulative_rewards[str(i)] for i in range(num_agents)]}")
             print(f"  - Total Reward This Step: {step_reward:.2f}")
-            food_count = int(jnp.sum(state.food_grid > 0))
+            food_count = int(jnp.sum(state.food_levels > 0))
             print(f"  - Active Food: {food_count}/{num_food}")
 
         # Render and save with cumulative rewards
@@ -138,12 +138,12 @@ def main():
         if dones["__all__"]:
             if verbose:
                 print(f"\nEpisode ended at step {t + 1}")
-                food_remaining = int(jnp.sum(state.food_grid > 0))
+                food_remaining = int(jnp.sum(state.food_levels > 0))
                 print(f"Reason: {'All food collected' if food_remaining == 0 else 'Time limit reached'}")
             break
 
     # Final statistics
-    food_remaining = int(jnp.sum(state.food_grid > 0))
+    food_remaining = int(jnp.sum(state.food_levels > 0))
     food_collected = num_food - food_remaining
 
     if verbose:
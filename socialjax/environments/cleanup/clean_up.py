@@ -11,7 +11,10 @@ from flax.struct import dataclass
 import colorsys
 
 from socialjax.environments.movement import resolve_movement, resolve_respawn
-from socialjax.environments.multi_agent_env import MultiAgentEnv
+from socialjax.environments.observation import compact_obs_encoding, egocentric_obs, obs_window_origin
+from socialjax.environments.rendering import GridRenderer
+from socialjax.environments.spawning import sample_lowest
+from socialjax.environments.multi_agent_env import MultiAgentEnv, counter_dtype
 from socialjax.environments import spaces
 
 
@@ -38,11 +41,9 @@ class State:
     outer_t: int
     grid: jnp.ndarray
 
-    apples: jnp.ndarray
     freeze: jnp.ndarray
     reborn_locs: jnp.ndarray
 
-    potential_dirt_and_dirt_locs: jnp.ndarray
     potential_dirt_and_dirt_label: jnp.ndarray
     smooth_rewards: jnp.ndarray
 
@@ -212,6 +213,8 @@ class Clean_up(MultiAgentEnv):
         
         obs_size=11,
         cnn=True,
+        obs_format="full",
+        info_level="full",
 
         map_ASCII = [
                 'HFFFHFFHFHFHFHFHFHFHHFHFFFHF',
@@ -236,7 +239,7 @@ class Clean_up(MultiAgentEnv):
             ]
     ):
 
-        super().__init__(num_agents=num_agents)
+        super().__init__(num_agents=num_agents, info_level=info_level)
 
         self.maxAppleGrowthRate = maxAppleGrowthRate
         self.thresholdDepletion = thresholdDepletion
@@ -262,12 +265,19 @@ class Clean_up(MultiAgentEnv):
             self.s_interest_schedule = None
         self.s_interest_change_every = s_interest_change_every
         self.cnn = cnn
+        if obs_format not in ("full", "compact"):
+            raise ValueError(f"obs_format must be 'full' or 'compact', got {obs_format!r}")
+        self.obs_format = obs_format
+        if obs_format == "compact":
+            self.obs_encoding = compact_obs_encoding(len(Items), (len(Items)-1) + 10)
         self.num_inner_steps = num_inner_steps
         self.num_outer_steps = num_outer_steps
+        self._counter_dtype = counter_dtype(max(num_inner_steps, num_outer_steps))
         self.cf = cf
         self.cf_alpha = cf_alpha
         self.agents = list(range(num_agents))#, dtype=jnp.int16)
         self._agents = jnp.array(self.agents, dtype=jnp.int16) + len(Items)
+        self._renderer = None  # tile-atlas GridRenderer, built on first render
 
         self.PLAYER_COLOURS = generate_agent_colors(num_agents)
         self.GRID_SIZE_ROW = len(map_ASCII)
@@ -300,6 +310,8 @@ class Clean_up(MultiAgentEnv):
         self.RIVER = find_positions(nums_map, char_to_int['S'])
         self.POTENTIAL_DIRT = find_positions(nums_map, char_to_int['H'])
         self.DIRT = find_positions(nums_map, char_to_int['F'])
+        # cells that can hold dirt; their labels are in State.potential_dirt_and_dirt_label
+        self.POTENTIAL_DIRT_AND_DIRT = jnp.concatenate((self.POTENTIAL_DIRT, self.DIRT))
 
 
         
@@ -345,192 +357,6 @@ class Clean_up(MultiAgentEnv):
 
             return state_dict
         
-        def combine_channels(
-                grid: jnp.ndarray,
-                agent: int,
-                angles: jnp.ndarray,
-                agent_pickups: jnp.ndarray,
-                state: State,
-            ):
-
-            def move_and_collapse(
-                    x: jnp.ndarray,
-                    angle: jnp.ndarray,
-                ) -> jnp.ndarray:
-
-                # get agent's one-hot
-                agent_element = jnp.array([jnp.int8(x[agent])])
-
-                # mask to check if any other agent exists there
-                mask = x[len(Items)-1:] > 0
-
-                # does an agent exist which is not the subject?
-                other_agent = jnp.int8(
-                    jnp.logical_and(
-                        jnp.any(mask),
-                        jnp.logical_not(
-                            agent_element
-                        )
-                    )
-                )
-
-                # what is the class of the item in cell
-                item_idx = jnp.where(
-                    x,
-                    size=1
-                )[0]
-
-                # check if agent is frozen and can observe inventories
-                show_inv_bool = jnp.logical_and(
-                        state.freeze[
-                            agent-len(Items)
-                        ].max(axis=-1) > 0,
-                        item_idx >= len(Items)
-                )
-
-                show_inv_idxs = jnp.where(
-                    state.freeze[agent],
-                    size=12, # since, in a setting where simultaneous interac-
-                    fill_value=-1 # -tions can happen, only a max of 12 can
-                )[0] # happen at once (zap logic), regardless of pop size
-
-                inv_to_show = jnp.where(
-                    jnp.logical_or(
-                        jnp.logical_and(
-                            show_inv_bool,
-                            jnp.isin(item_idx-len(Items), show_inv_idxs),
-                        ),
-                        agent_element
-                    ),
-                    state.agent_invs[item_idx - len(Items)],
-                    jnp.array([0, 0], dtype=jnp.int8)
-                )[0]
-
-                # check if agent is not the subject & is frozen & therefore
-                # not possible to interact with
-                frozen = jnp.where(
-                    other_agent,
-                    state.freeze[
-                        item_idx-len(Items)
-                    ].max(axis=-1) > 0,
-                    0
-                )
-
-                # get pickup/inv info
-                pick_up_idx = jnp.where(
-                    jnp.any(mask),
-                    jnp.nonzero(mask, size=1)[0],
-                    jnp.int8(-1)
-                )
-                picked_up = jnp.where(
-                    pick_up_idx > -1,
-                    agent_pickups[pick_up_idx],
-                    jnp.int8(0)
-                )
-
-                # build extension
-                extension = jnp.concatenate(
-                    [
-                        agent_element,
-                        other_agent,
-                        angle,
-                        picked_up,
-                        inv_to_show,
-                        frozen
-                    ],
-                    axis=-1
-                )
-
-                # build final feature vector
-                final_vec = jnp.concatenate(
-                    [x[:len(Items)-1], extension],
-                    axis=-1
-                )
-
-                return final_vec
-
-            new_grid = jax.vmap(
-                jax.vmap(
-                    move_and_collapse
-                )
-            )(grid, angles)
-            return new_grid
-        
-        def check_relative_orientation(
-                agent: int,
-                agent_locs: jnp.ndarray,
-                grid: jnp.ndarray
-            ) -> jnp.ndarray:
-            '''
-            Check's relative orientations of all other agents in view of
-            current agent.
-            
-            Args:
-                - agent: int, an index indicating current agent number
-                - agent_locs: jax ndarray of agent locations (x, y, direction)
-                - grid: jax ndarray of current agent's obs grid
-                
-            Returns:
-                - grid with 1) int -1 in places where no agent exists, or
-                where the agent is the current agent, and 2) int in range
-                0-3 in cells of opposing agents indicating relative
-                orientation to current agent.
-            '''
-            # we decrement by num of Items when indexing as we incremented by
-            # 5 in constructor call (due to 5 non-agent Items enum & locations
-            # are indexed from 0)
-            idx = agent - len(Items)
-            agents = jnp.delete(
-                self._agents,
-                idx,
-                assume_unique_indices=True
-            )
-            curr_agent_dir = agent_locs[idx, 2]
-
-            def calc_relative_direction(cell):
-                cell_agent = cell - len(Items)
-                cell_direction = agent_locs[cell_agent, 2]
-                return (cell_direction - curr_agent_dir) % 4
-
-            angle = jnp.where(
-                jnp.isin(grid, agents),
-                jax.vmap(calc_relative_direction)(grid),
-                -1
-            )
-
-            return angle
-        
-        def rotate_grid(agent_loc: jnp.ndarray, grid: jnp.ndarray) -> jnp.ndarray:
-            '''
-            Rotates agent's observation grid k * 90 degrees, depending on agent's
-            orientation.
-
-            Args:
-                - agent_loc: jax ndarray of agent's x, y, direction
-                - grid: jax ndarray of agent's obs grid
-
-            Returns:
-                - jnp.ndarray of new rotated grid.
-
-            '''
-            grid = jnp.where(
-                agent_loc[2] == 1,
-                jnp.rot90(grid, k=1, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 2,
-                jnp.rot90(grid, k=2, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 3,
-                jnp.rot90(grid, k=3, axes=(0, 1)),
-                grid,
-            )
-
-            return grid
-
         def _get_obs_point(agent_loc: jnp.ndarray) -> jnp.ndarray:
             '''
             Obtain the position of top-left corner of obs map using
@@ -541,101 +367,40 @@ class Clean_up(MultiAgentEnv):
             Returns:
                 - x, y: ints of top-left corner of agent's obs map.
             '''
-            
-            x, y, direction = agent_loc
-
-            x, y = x + self.PADDING, y + self.PADDING
-
-            x = x - (self.OBS_SIZE // 2)
-            y = y - (self.OBS_SIZE // 2)
-
-
-            x = jnp.where(direction == 0, x + (self.OBS_SIZE//2)-1, x)
-            y = jnp.where(direction == 0, y, y)
+            return obs_window_origin(agent_loc, self.OBS_SIZE, self.PADDING)
 
-            x = jnp.where(direction == 1, x, x)
-            y = jnp.where(direction == 1, y + (self.OBS_SIZE//2)-1, y)
-
-
-            x = jnp.where(direction == 2, x - (self.OBS_SIZE//2)+1, x)
-            y = jnp.where(direction == 2, y, y)
-
-
-            x = jnp.where(direction == 3, x, x)
-            y = jnp.where(direction == 3, y - (self.OBS_SIZE//2)+1, y)
-            return x, y
-
-        def _get_obs(state: State) -> jnp.ndarray:
+        def _get_obs(state: State, agents=None) -> jnp.ndarray:
             '''
             Obtain the agent's observation of the grid.
 
             Args: 
                 - state: State object containing env state.
+                - agents: optional indices of the observing agents, all by default.
             Returns:
                 - jnp.ndarray of grid observation.
             '''
-            # create state
-            grid = jnp.pad(
-                state.grid,
-                ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)),
-                constant_values=Items.wall,
-            )
-
-            # obtain all agent obs-points
-            agent_start_idxs = jax.vmap(_get_obs_point)(state.agent_locs)
-
-            dynamic_slice = partial(
-                jax.lax.dynamic_slice,
-                operand=grid,
-                slice_sizes=(self.OBS_SIZE, self.OBS_SIZE)
-            )
-
-            # obtain agent obs grids
-            grids = jax.vmap(dynamic_slice)(start_indices=agent_start_idxs)
-
-            # rotate agent obs grids
-            grids = jax.vmap(rotate_grid)(state.agent_locs, grids)
-
-            angles = jax.vmap(
-                check_relative_orientation,
-                in_axes=(0, None, 0)
-            )(
-                self._agents,
-                state.agent_locs,
-                grids
-            )
-
-            angles = jax.nn.one_hot(angles, 4)
-
-            # one-hot (drop first channel as its empty blocks)
-            grids = jax.nn.one_hot(
-                grids - 1,
-                num_agents + len(Items) - 1, # will be collapsed into a
-                dtype=jnp.int8 # [Items, self, other, extra features] representation
-            )
-
             # check agents that can interact
-            inventory_sum = jnp.sum(state.agent_invs, axis=-1)
-            agent_pickups = jnp.where(
-                inventory_sum > INTERACT_THRESHOLD,
-                True,
-                False
-            )
+            agent_pickups = jnp.sum(state.agent_invs, axis=-1) > INTERACT_THRESHOLD
 
-            # make index len(Item) always the current agent
-            # and sum all others into an "other" agent
-            grids = jax.vmap(
-                combine_channels,
-                in_axes=(0, 0, 0, None, None)
-            )(
-                grids,
-                self._agents,
-                angles,
-                agent_pickups,
-                state
+            return egocentric_obs(
+                state.grid,
+                state.agent_locs,
+                state.agent_invs,
+                state.freeze,
+                num_items=len(Items),
+                obs_size=self.OBS_SIZE,
+                padding=self.PADDING,
+                pad_value=Items.wall,
+                agent_extras=agent_pickups[:, None],
+                compact=self.obs_format == "compact",
+                agents=agents,
             )
 
-            return grids
+        def _get_agent_obs(state: State, agent: int) -> jnp.ndarray:
+            '''
+            Observation of a single agent; only its window is gathered.
+            '''
+            return _get_obs(state, jnp.reshape(agent, (1,)))[0]
 
         def get_current_s_interest(timestep):
             """Calculate current s_interest based on timestep and schedule."""
@@ -936,7 +701,7 @@ class Clean_up(MultiAgentEnv):
                 return jnp.where((grid_clean[locs[0], locs[1]] == Items.dirt) | (grid_clean[locs[0], locs[1]] == Items.potential_dirt), grid_clean[locs[0], locs[1]], labels)
 
 
-            renew_label = jax.vmap(renew_dirt_label)(state.potential_dirt_and_dirt_locs, state.potential_dirt_and_dirt_label)
+            renew_label = jax.vmap(renew_dirt_label)(self.POTENTIAL_DIRT_AND_DIRT, state.potential_dirt_and_dirt_label)
 
 
             state = state.replace(
@@ -1025,78 +790,15 @@ class Clean_up(MultiAgentEnv):
             return state
 
 
-        def _step(
-            key: chex.PRNGKey,
-            state: State,
-            actions: jnp.ndarray,
-            timestep: int = 0
-        ):
-            """Step the environment."""
-
-            # regrowth of apply
-            grid_apple = state.grid
-            dirtCount = jnp.sum(state.potential_dirt_and_dirt_label == Items.dirt)
-            dirtFraction = dirtCount / (len(state.potential_dirt_and_dirt_locs) + len(self.RIVER))
-            depletion = self.thresholdDepletion
-            restoration = self.thresholdRestoration
-            interpolation = (dirtFraction - depletion) / (restoration - depletion)
-
-            interpolation = jnp.clip(interpolation, -jnp.inf, 1.0)
-            probability = self.maxAppleGrowthRate * interpolation
-            def regrow_apple(apple_locs, p):
-                new_apple = jnp.where((((grid_apple[apple_locs[0], apple_locs[1]] == Items.empty) & (p < probability)) 
-                                       | ((grid_apple[apple_locs[0], apple_locs[1]] == Items.apple))),  
-                                      Items.apple, Items.empty)
-                return new_apple
-            prob = jax.random.uniform(key, shape=(len(self.POTENTIAL_APPLE),))
-            new_apple = jax.vmap(regrow_apple)(self.POTENTIAL_APPLE, prob)
-
-            new_apple_grid = grid_apple.at[self.POTENTIAL_APPLE[:, 0], self.POTENTIAL_APPLE[:, 1]].set(new_apple)
-            state = state.replace(grid=new_apple_grid)
-
-            # DirtSpawning update the grid and potential_dirt_and_dirt_label
-            grid_dirt = state.grid
-
-            noise = jax.random.uniform(key, shape=(len(state.potential_dirt_and_dirt_label),)) * 1e-4
-            label_with_noise = state.potential_dirt_and_dirt_label + noise
-
-            label_with_noise_rank = jnp.sort(label_with_noise)
-            unstable_indices = jnp.argsort(label_with_noise)
-
-            unstable_sorted_locs = state.potential_dirt_and_dirt_locs[unstable_indices]
-            
-            p = jax.random.uniform(key, shape=(1,)) 
-            one_piece_dirt = jnp.where(((grid_dirt[unstable_sorted_locs[0, 0], unstable_sorted_locs[0, 1]] == Items.potential_dirt) 
-                                       & (p < self.dirtSpawnProbability) & (state.inner_t>self.delayStartOfDirtSpawning)),  
-                        Items.dirt, label_with_noise_rank[0])
-
-            label_with_noise_rank_new = label_with_noise_rank.at[0].set(one_piece_dirt[0]) 
-
-            label_rank_new = jnp.round(label_with_noise_rank_new).astype(jnp.int16)
-            
-
-            state = state.replace(potential_dirt_and_dirt_label=label_rank_new)
-            state = state.replace(potential_dirt_and_dirt_locs=unstable_sorted_locs)
-            actions = jnp.array(actions)
-
-            new_grid = state.grid.at[
-                state.agent_locs[:, 0],
-                state.agent_locs[:, 1]
-            ].set(
-                jnp.int16(Items.empty)
-            )
-
-            new_grid = new_grid.at[state.potential_dirt_and_dirt_locs[:, 0], state.potential_dirt_and_dirt_locs[:, 1]].set(state.potential_dirt_and_dirt_label)
-            
-            new_grid = new_grid.at[self.RIVER[:, 0], self.RIVER[:, 1]].set(Items.river)
-
-
-
-            x, y = state.reborn_locs[:, 0], state.reborn_locs[:, 1]
-            new_grid = new_grid.at[x, y].set(self._agents)
-            state = state.replace(grid=new_grid)
-            state = state.replace(agent_locs=state.reborn_locs)
+        def _move_agents(
+            key: chex.PRNGKey, state: State, actions: jnp.ndarray
+        ) -> Tuple[chex.PRNGKey, jnp.ndarray]:
+            '''
+            Agent locations after this step's turns and moves.
 
+            Returns the advanced key alongside, so that callers draw the
+            same keys afterwards as a full step would.
+            '''
             key, subkey = jax.random.split(key)
             all_new_locs = jax.vmap(lambda p, a: jnp.int16(p + ROTATIONS[a]) % jnp.array([self.GRID_SIZE_ROW + 1, self.GRID_SIZE_COL + 1, 4], dtype=jnp.int16))(p=state.agent_locs, a=actions).squeeze()
 
@@ -1120,66 +822,16 @@ class Clean_up(MultiAgentEnv):
             # random winner), swaps blocked, trains allowed, cascades
             # reverted to a fixed point. Final (row, col) unique.
             key, move_key = jax.random.split(key)
-            new_locs = resolve_movement(move_key, state.agent_locs, all_new_locs)
-
-            # get apples
-            def coin_matcher(p: jnp.ndarray) -> jnp.ndarray:
-                c_matches = jnp.array([
-                    state.grid[p[0], p[1]] == Items.apple
-                    ])
-                return c_matches
-            
-            apple_matches = jax.vmap(coin_matcher)(p=new_locs)
-
-            # # individual rewards
-            # rewards = jnp.zeros((self.num_agents, 1))
-            # rewards = jnp.where(apple_matches, 1, rewards)
-
-            # # single reward or sum reward
-
-            # rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
-            # rewards_sum = jnp.sum(rewards)
-            # rewards_sum_all_agents += rewards_sum
-            # rewards = rewards_sum_all_agents
-
-            new_invs = state.agent_invs + apple_matches
-
-            state = state.replace(
-                agent_invs=new_invs
-            )
-
-            # update grid
-            old_grid = state.grid
-
-            new_grid = old_grid.at[
-                state.agent_locs[:, 0],
-                state.agent_locs[:, 1]
-            ].set(
-                jnp.int16(Items.empty)
-            )
-
-            new_grid = new_grid.at[state.potential_dirt_and_dirt_locs[:, 0], state.potential_dirt_and_dirt_locs[:, 1]].set(state.potential_dirt_and_dirt_label)
-
-            new_grid = new_grid.at[self.RIVER[:, 0], self.RIVER[:, 1]].set(Items.river)
-            x, y = new_locs[:, 0], new_locs[:, 1]
-            new_grid = new_grid.at[x, y].set(self._agents)
-            state = state.replace(grid=new_grid)
-
-            # update agent locations
-            state = state.replace(agent_locs=new_locs)
-
-            reborn_players, state = _interact_fire_zapping(key, state, actions)
-
-            state = _interact_fire_cleaning(key, state, actions)
-
-            # Occupancy-aware respawn: reborn agents are placed on spawn
-            # cells not occupied by any survivor, so no overlap is possible.
-            key, respawn_key = jax.random.split(key)
-            new_re_locs = resolve_respawn(
-                respawn_key, new_locs, reborn_players.astype(bool), self.SPAWNS_PLAYERS
-            )
-            state = state.replace(reborn_locs=new_re_locs)
+            return key, resolve_movement(move_key, state.agent_locs, all_new_locs)
 
+        def _shape_rewards(
+            state: State, apple_matches: jnp.ndarray, timestep: int = 0
+        ) -> Tuple[jnp.ndarray, dict, State]:
+            '''
+            Rewards for this step's apple pickups under the configured
+            reward scheme, with its info entries and the state carrying
+            any smoothed rewards.
+            '''
             if self.shared_rewards:
                 rewards = jnp.zeros((self.num_agents, 1))
                 original_rewards = jnp.where(apple_matches, 1, rewards)
@@ -1256,10 +908,143 @@ class Clean_up(MultiAgentEnv):
                     "original_rewards": rewards.squeeze(),
                     "shaped_rewards": rewards.squeeze(),
                 }
+            return rewards, info, state
+
+        def _step(
+            key: chex.PRNGKey,
+            state: State,
+            actions: jnp.ndarray,
+            timestep: int = 0
+        ):
+            """Step the environment."""
+
+            with jax.named_scope("regrowth"):
+                # regrowth of apply
+                grid_apple = state.grid
+                dirtCount = jnp.sum(state.potential_dirt_and_dirt_label == Items.dirt)
+                dirtFraction = dirtCount / (len(self.POTENTIAL_DIRT_AND_DIRT) + len(self.RIVER))
+                depletion = self.thresholdDepletion
+                restoration = self.thresholdRestoration
+                interpolation = (dirtFraction - depletion) / (restoration - depletion)
+
+                interpolation = jnp.clip(interpolation, -jnp.inf, 1.0)
+                probability = self.maxAppleGrowthRate * interpolation
+                def regrow_apple(apple_locs, p):
+                    new_apple = jnp.where((((grid_apple[apple_locs[0], apple_locs[1]] == Items.empty) & (p < probability)) 
+                                           | ((grid_apple[apple_locs[0], apple_locs[1]] == Items.apple))),  
+                                          Items.apple, Items.empty)
+                    return new_apple
+                prob = jax.random.uniform(key, shape=(len(self.POTENTIAL_APPLE),))
+                new_apple = jax.vmap(regrow_apple)(self.POTENTIAL_APPLE, prob)
+
+                new_apple_grid = grid_apple.at[self.POTENTIAL_APPLE[:, 0], self.POTENTIAL_APPLE[:, 1]].set(new_apple)
+                state = state.replace(grid=new_apple_grid)
+
+                # DirtSpawning update the grid and potential_dirt_and_dirt_label
+                grid_dirt = state.grid
+
+                # a random potential-dirt cell (lowest label), no sort needed
+                dirt_labels = state.potential_dirt_and_dirt_label
+                dirt_idx = sample_lowest(key, dirt_labels)[0]
+                dirt_loc = self.POTENTIAL_DIRT_AND_DIRT[dirt_idx]
+            
+                p = jax.random.uniform(key, shape=(1,)) 
+                one_piece_dirt = jnp.where(((grid_dirt[dirt_loc[0], dirt_loc[1]] == Items.potential_dirt) 
+                                           & (p < self.dirtSpawnProbability) & (state.inner_t>self.delayStartOfDirtSpawning)),  
+                            Items.dirt, dirt_labels[dirt_idx])
+
+                label_rank_new = dirt_labels.at[dirt_idx].set(one_piece_dirt[0].astype(jnp.int16))
+
+                state = state.replace(potential_dirt_and_dirt_label=label_rank_new)
+            actions = jnp.array(actions)
+
+            with jax.named_scope("movement"):
+                new_grid = state.grid.at[
+                    state.agent_locs[:, 0],
+                    state.agent_locs[:, 1]
+                ].set(
+                    jnp.int16(Items.empty)
+                )
+
+                new_grid = new_grid.at[self.POTENTIAL_DIRT_AND_DIRT[:, 0], self.POTENTIAL_DIRT_AND_DIRT[:, 1]].set(state.potential_dirt_and_dirt_label)
             
-            info["clean_action_info"] = jnp.where(actions == Actions.zap_clean, 1, 0).squeeze()
-            info["cleaned_water"] = jnp.array([len(state.potential_dirt_and_dirt_label) - dirtCount] * self.num_agents).squeeze()
-            info["waste_cleared"] = jnp.array([len(state.potential_dirt_and_dirt_label) - dirtCount] * self.num_agents).squeeze() 
+                new_grid = new_grid.at[self.RIVER[:, 0], self.RIVER[:, 1]].set(Items.river)
+
+
+
+                x, y = state.reborn_locs[:, 0], state.reborn_locs[:, 1]
+                new_grid = new_grid.at[x, y].set(self._agents)
+                state = state.replace(grid=new_grid)
+                state = state.replace(agent_locs=state.reborn_locs)
+
+                key, new_locs = _move_agents(key, state, actions)
+
+                # get apples
+                def coin_matcher(p: jnp.ndarray) -> jnp.ndarray:
+                    c_matches = jnp.array([
+                        state.grid[p[0], p[1]] == Items.apple
+                        ])
+                    return c_matches
+            
+                apple_matches = jax.vmap(coin_matcher)(p=new_locs)
+
+                # # individual rewards
+                # rewards = jnp.zeros((self.num_agents, 1))
+                # rewards = jnp.where(apple_matches, 1, rewards)
+
+                # # single reward or sum reward
+
+                # rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
+                # rewards_sum = jnp.sum(rewards)
+                # rewards_sum_all_agents += rewards_sum
+                # rewards = rewards_sum_all_agents
+
+                new_invs = state.agent_invs + apple_matches
+
+                state = state.replace(
+                    agent_invs=new_invs
+                )
+
+                # update grid
+                old_grid = state.grid
+
+                new_grid = old_grid.at[
+                    state.agent_locs[:, 0],
+                    state.agent_locs[:, 1]
+                ].set(
+                    jnp.int16(Items.empty)
+                )
+
+                new_grid = new_grid.at[self.POTENTIAL_DIRT_AND_DIRT[:, 0], self.POTENTIAL_DIRT_AND_DIRT[:, 1]].set(state.potential_dirt_and_dirt_label)
+
+                new_grid = new_grid.at[self.RIVER[:, 0], self.RIVER[:, 1]].set(Items.river)
+                x, y = new_locs[:, 0], new_locs[:, 1]
+                new_grid = new_grid.at[x, y].set(self._agents)
+                state = state.replace(grid=new_grid)
+
+                # update agent locations
+                state = state.replace(agent_locs=new_locs)
+
+            with jax.named_scope("interaction"):
+                reborn_players, state = _interact_fire_zapping(key, state, actions)
+
+                state = _interact_fire_cleaning(key, state, actions)
+
+            with jax.named_scope("respawn"):
+                # Occupancy-aware respawn: reborn agents are placed on spawn
+                # cells not occupied by any survivor, so no overlap is possible.
+                key, respawn_key = jax.random.split(key)
+                new_re_locs = resolve_respawn(
+                    respawn_key, new_locs, reborn_players.astype(bool), self.SPAWNS_PLAYERS
+                )
+                state = state.replace(reborn_locs=new_re_locs)
+
+            with jax.named_scope("rewards"):
+                rewards, info, state = _shape_rewards(state, apple_matches, timestep)
+
+                info["clean_action_info"] = jnp.where(actions == Actions.zap_clean, 1, 0).squeeze()
+                info["cleaned_water"] = jnp.array([len(state.potential_dirt_and_dirt_label) - dirtCount] * self.num_agents).squeeze()
+                info["waste_cleared"] = jnp.array([len(state.potential_dirt_and_dirt_label) - dirtCount] * self.num_agents).squeeze() 
             
             state_nxt = State(
                 agent_locs=state.agent_locs,
@@ -1267,10 +1052,8 @@ class Clean_up(MultiAgentEnv):
                 inner_t=state.inner_t + 1,
                 outer_t=state.outer_t,
                 grid=state.grid,
-                apples=state.apples,
                 freeze=state.freeze,
                 reborn_locs=state.reborn_locs,
-                potential_dirt_and_dirt_locs=state.potential_dirt_and_dirt_locs,
                 potential_dirt_and_dirt_label=state.potential_dirt_and_dirt_label,
                 smooth_rewards=state.smooth_rewards
             )
@@ -1280,22 +1063,17 @@ class Clean_up(MultiAgentEnv):
             outer_t = state_nxt.outer_t
             reset_inner = inner_t == num_inner_steps
 
-            # if inner episode is done, return start state for next game
-            state_re = _reset_state(key)
-
-            state_re = state_re.replace(outer_t=outer_t + 1)
-            state = jax.tree.map(
-                lambda x, y: jnp.where(reset_inner, x, y),
-                state_re,
-                state_nxt,
-            )
+            with jax.named_scope("episode_reset"):
+                # if inner episode is done, return start state for next game
+                state = self.inner_reset(key, reset_inner, _reset_state, state_nxt)
             outer_t = state.outer_t
             reset_outer = outer_t == num_outer_steps
             done = {f'{a}': reset_outer for a in self.agents}
             # done = [reset_outer for _ in self.agents]
             done["__all__"] = reset_outer
 
-            obs = _get_obs(state)
+            with jax.named_scope("observation"):
+                obs = _get_obs(state)
             rewards = jnp.where(
                 reset_inner,
                 jnp.zeros_like(rewards, dtype=jnp.int16),
@@ -1308,8 +1086,43 @@ class Clean_up(MultiAgentEnv):
                 state,
                 rewards.squeeze(),
                 done,
-                info,
+                self.select_info(info),
+            )
+
+        def _step_rewards(
+            key: chex.PRNGKey,
+            state: State,
+            actions: jnp.ndarray,
+            timestep: int = 0
+        ) -> jnp.ndarray:
+            '''
+            The rewards step_env would return for these actions, without the
+            rest of the step: no apple regrowth or dirt spawning, no beams,
+            respawn or observations. Apples that would regrow this very step
+            are therefore not counted. Movement draws the same keys as in
+            step_env, so conflicts between agents resolve the same way.
+            '''
+            actions = jnp.array(actions)
+            grid = state.grid.at[
+                state.agent_locs[:, 0],
+                state.agent_locs[:, 1]
+            ].set(
+                jnp.int16(Items.empty)
             )
+            grid = grid.at[state.reborn_locs[:, 0], state.reborn_locs[:, 1]].set(self._agents)
+            state = state.replace(grid=grid, agent_locs=state.reborn_locs)
+
+            _, new_locs = _move_agents(key, state, actions)
+            apple_matches = (grid[new_locs[:, 0], new_locs[:, 1]] == Items.apple)[:, None]
+            rewards, _, _ = _shape_rewards(state, apple_matches, timestep)
+
+            reset_inner = state.inner_t + 1 == num_inner_steps
+            rewards = jnp.where(
+                reset_inner,
+                jnp.zeros_like(rewards, dtype=jnp.int16),
+                rewards
+            )
+            return rewards.squeeze()
 
         def _reset_state(
             key: jnp.ndarray
@@ -1324,7 +1137,6 @@ class Clean_up(MultiAgentEnv):
             player_positions = jnp.concatenate((inside_players_pos, self.SPAWNS_PLAYERS))
             agent_pos = jax.random.permutation(subkey, player_positions)[:num_agents]
             wall_pos = self.SPAWNS_WALL
-            apple_pos = self.POTENTIAL_APPLE
 
             river = self.RIVER
             potential_dirt = self.POTENTIAL_DIRT
@@ -1333,7 +1145,6 @@ class Clean_up(MultiAgentEnv):
             potential_dirt_label = jnp.zeros((len(potential_dirt)), dtype=jnp.int16) +Items.potential_dirt
             dirt_label = jnp.zeros((len(dirt)), dtype=jnp.int16) + Items.dirt
 
-            potential_dirt_and_dirt = jnp.concatenate((potential_dirt, dirt))
             potential_dirt_and_dirt_label = jnp.concatenate((potential_dirt_label, dirt_label))
 
 
@@ -1378,22 +1189,20 @@ class Clean_up(MultiAgentEnv):
 
             freeze = jnp.array(
                 [[-1]*num_agents]*num_agents,
-            dtype=jnp.int16
+            dtype=jnp.int8
             )
 
             return State(
                 agent_locs=agent_locs,
                 agent_invs=jnp.array([(0,0)]*num_agents, dtype=jnp.int8),
-                inner_t=0,
-                outer_t=0,
+                inner_t=jnp.zeros((), self._counter_dtype),
+                outer_t=jnp.zeros((), self._counter_dtype),
                 grid=grid,
-                apples=apple_pos,
 
                 freeze=freeze,
                 reborn_locs=agent_locs,
-                potential_dirt_and_dirt_locs=potential_dirt_and_dirt,
                 potential_dirt_and_dirt_label=potential_dirt_and_dirt_label,
-                smooth_rewards=jnp.zeros((self.num_agents, 1))
+                smooth_rewards=jnp.zeros((self.num_agents, 1 if self.smooth_rewards else 0))
             )
 
         def reset(
@@ -1408,15 +1217,21 @@ class Clean_up(MultiAgentEnv):
         # overwrite Gymnax as it makes single-agent assumptions
         if jit:
             self.step_env = jax.jit(_step)
+            self.step_rewards = jax.jit(_step_rewards)
             self.reset = jax.jit(reset)
             self.get_obs_point = jax.jit(_get_obs_point)
         else:
             # if you want to see values whilst debugging, don't jit
             self.step_env = _step
+            self.step_rewards = _step_rewards
             self.reset = reset
             self.get_obs_point = _get_obs_point
         ################################################################################
 
+        # exposed for MultiAgentEnv.step(reset_state=...) and speed_test/benchmark_suite.py
+        self.get_obs = jax.jit(_get_obs)
+        self.get_agent_obs = jax.jit(_get_agent_obs)
+
     @property
     def name(self) -> str:
         """Environment name."""
@@ -1441,6 +1256,14 @@ class Clean_up(MultiAgentEnv):
             else (self.OBS_SIZE**2 * ((len(Items)-1) + 10),)
         )
 
+        if self.obs_format == "compact":
+            channels = self.obs_encoding[1]
+            _shape_obs = (
+                (self.OBS_SIZE, self.OBS_SIZE, channels)
+                if self.cnn
+                else (self.OBS_SIZE**2 * channels,)
+            )
+
         return spaces.Box(
                 low=0, high=1E9, shape=_shape_obs, dtype=jnp.uint8
             ), _shape_obs
@@ -1578,82 +1401,26 @@ class Clean_up(MultiAgentEnv):
         :param r: target renderer object
         :param tile_size: tile size in pixels
         """
-        tile_size = 32
-        highlight_mask = onp.zeros_like(onp.array(self.GRID))
-
-        # Compute the total grid size
-        width_px = self.GRID.shape[1] * tile_size
-        height_px = self.GRID.shape[0] * tile_size
+        return onp.asarray(self.renderer.render(state))
 
-        img = onp.zeros(shape=(height_px, width_px, 3), dtype=onp.uint8)
+    def render_batch(self, states: State) -> jnp.ndarray:
+        """
+        Render a batch of states (leading batch axis on every field) in one
+        jitted call; returns uint8 frames of shape (B, H, W, 3).
+        """
+        return self.renderer.render_batch(states)
 
-        grid = onp.array(state.grid)
-        # print(onp.argwhere(grid == Items.clean_beam))
-        grid = onp.pad(
-            grid, ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)), constant_values=Items.wall
-        )
-        for a in range(self.num_agents):
-            startx, starty = self.get_obs_point(
-                state.agent_locs[a]
+    @property
+    def renderer(self) -> GridRenderer:
+        """Jittable tile-atlas renderer, built on first use."""
+        if self._renderer is None:
+            self._renderer = GridRenderer(
+                self,
+                values=list(range(len(Items))) + list(onp.asarray(self._agents)),
+                pad_value=Items.wall,
+                tile_size=32,
             )
-            highlight_mask[
-                startx : startx + self.OBS_SIZE, starty : starty + self.OBS_SIZE
-            ] = True
-
-        # Render the grid
-        for j in range(0, grid.shape[1]):
-            for i in range(0, grid.shape[0]):
-                cell = grid[i, j]
-                if cell == 0:
-                    cell = None
-                agent_here = []
-                for a in self._agents:
-                    agent_here.append(cell == a)
-                # if cell in [1,2]:
-                #     print(f'coordinates: {i},{j}')
-                #     print(cell)
-
-                agent_dir = None
-                for a in range(self.num_agents):
-                    agent_dir = (
-                        state.agent_locs[a,2].item()
-                        if agent_here[a]
-                        else agent_dir
-                    )
-                
-                agent_hat = False
-                # for a in range(self.num_agents):
-                #     agent_hat = (
-                #         bool(state.agent_invs[a].sum() > INTERACT_THRESHOLD)
-                #         if agent_here[a]
-                #         else agent_hat
-                #     )
-
-                tile_img = self.render_tile(
-                    cell,
-                    agent_dir=agent_dir,
-                    agent_hat=agent_hat,
-                    highlight=highlight_mask[i, j],
-                    tile_size=tile_size,
-                )
-
-                ymin = i * tile_size
-                ymax = (i + 1) * tile_size
-                xmin = j * tile_size
-                xmax = (j + 1) * tile_size
-                img[ymin:ymax, xmin:xmax, :] = tile_img
-        
-        img = onp.rot90(
-            img[
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                :,
-            ],
-            2,
-        )
-        # time = self.render_time(state, img.shape[1])
-        # img = onp.concatenate((img, time), axis=0)
-        return img
+        return self._renderer
 
 
 
@@ -1838,7 +1605,7 @@ class Clean_up(MultiAgentEnv):
 
     def get_cf_regret_from_state(self, key, state, actions):
         """
-        计算每个智能体的cf regret（反事实遗憾），通过枚举每个agent的所有可能动作，其他agent动作不变，调用环境获得奖励。
+        计算每个智能体的cf regret（反事实遗憾），通过枚举每个agent的所有可能动作，其他agent动作不变，由step_rewards获得奖励（不做完整的step_env）。
         Args:
             key: jax.random.PRNGKey
             state: 当前环境状态
@@ -1853,8 +1620,8 @@ class Clean_up(MultiAgentEnv):
             def single_action_cf(a_cf):
                 # 构造反事实动作
                 cf_actions = actions.at[agent_id].set(a_cf)
-                # 调用环境获得奖励
-                _, _, rewards, _, _ = self.step_env(key, state, cf_actions)
+                # 只计算奖励
+                rewards = self.step_rewards(key, state, cf_actions)
                 return rewards[agent_id]
             # 对该agent所有动作枚举
             return jax.vmap(single_action_cf)(jnp.arange(num_actions))  # [num_actions]
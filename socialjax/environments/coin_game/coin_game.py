@@ -11,7 +11,9 @@ from flax.struct import dataclass
 import colorsys
 
 from socialjax.environments.movement import resolve_movement
-from socialjax.environments.multi_agent_env import MultiAgentEnv
+from socialjax.environments.observation import compact_obs_encoding, egocentric_obs, obs_window_origin
+from socialjax.environments.rendering import GridRenderer
+from socialjax.environments.multi_agent_env import MultiAgentEnv, counter_dtype
 from socialjax.environments import spaces
 
 
@@ -37,7 +39,6 @@ class State:
     inner_t: int
     outer_t: int
     grid: jnp.ndarray
-    apples: jnp.ndarray
 
     freeze: jnp.ndarray
     reborn_locs: jnp.ndarray
@@ -180,6 +181,8 @@ class CoinGame(MultiAgentEnv):
         grid_size=(16,11),
         obs_size=11,
         cnn=True,
+        obs_format="full",
+        info_level="full",
         map_ASCII = [
                 "CCCCCCCCCCC",
                 "CPCCCCCCCCC",
@@ -200,17 +203,24 @@ class CoinGame(MultiAgentEnv):
             ]
     ):
 
-        super().__init__(num_agents=num_agents)
+        super().__init__(num_agents=num_agents, info_level=info_level)
         self.agents = list(range(num_agents))#, dtype=jnp.int16)
         self._agents = jnp.array(self.agents, dtype=jnp.int16) + len(Items)
+        self._renderer = None  # tile-atlas GridRenderer, built on first render
         self.num_inner_steps = num_inner_steps
         self.num_outer_steps = num_outer_steps
+        self._counter_dtype = counter_dtype(max(num_inner_steps, num_outer_steps))
 
         # self.agents = [str(i) for i in list(range(num_agents))]
 
         self.payoff_matrix = payoff_matrix
         self.shared_rewards = shared_rewards
         self.cnn = cnn
+        if obs_format not in ("full", "compact"):
+            raise ValueError(f"obs_format must be 'full' or 'compact', got {obs_format!r}")
+        self.obs_format = obs_format
+        if obs_format == "compact":
+            self.obs_encoding = compact_obs_encoding(len(Items), (len(Items)-1) + 10)
         self.inequity_aversion = inequity_aversion
         self.inequity_aversion_target_agents = inequity_aversion_target_agents
         self.inequity_aversion_alpha = inequity_aversion_alpha
@@ -258,211 +268,6 @@ class CoinGame(MultiAgentEnv):
 
         
        
-        def combine_channels(
-                grid: jnp.ndarray,
-                agent: int,
-                angles: jnp.ndarray,
-                agent_pickups: jnp.ndarray,
-                state: State,
-            ):
-            '''
-            Function to enforce symmetry in observations & generate final
-            feature representation; current agent is permuted to first 
-            position in the feature dimension.
-            
-            Args:
-                - grid: jax ndarray of current agent's obs grid
-                - agent: int, an index indicating current agent number
-                - angles: jnp.ndarray of current agents' relative orientation
-                in current agent's obs grid
-                - agent_pickups: jnp.ndarray of agents able to interact
-                - state: State, the env state obj
-            Returns:
-                - grid with current agent [x] permuted to 1st position (after
-                the first 4 "Items" features, so 5th position overall) in the
-                feature dimension, "other" [x] agent 2nd, angle [x, x, x, x]
-                3rd, pick-up [x] bool 4th, inventory [x, x] 5th, frozen [x]
-                6th, for a final obs grid of shape (5, 5, 14) (additional 4
-                one-hot places for 5 possible items)
-            '''
-            def move_and_collapse(
-                    x: jnp.ndarray,
-                    angle: jnp.ndarray,
-                ) -> jnp.ndarray:
-
-                # get agent's one-hot
-                agent_element = jnp.array([jnp.int8(x[agent])])
-
-                # mask to check if any other agent exists there
-                mask = x[len(Items)-1:] > 0
-
-                # does an agent exist which is not the subject?
-                other_agent = jnp.int8(
-                    jnp.logical_and(
-                        jnp.any(mask),
-                        jnp.logical_not(
-                            agent_element
-                        )
-                    )
-                )
-
-                # what is the class of the item in cell
-                item_idx = jnp.where(
-                    x,
-                    size=1
-                )[0]
-
-                # check if agent is frozen and can observe inventories
-                show_inv_bool = jnp.logical_and(
-                        state.freeze[
-                            agent-len(Items)
-                        ].max(axis=-1) > 0,
-                        item_idx >= len(Items)
-                )
-
-                show_inv_idxs = jnp.where(
-                    state.freeze[agent],
-                    size=12, # since, in a setting where simultaneous interac-
-                    fill_value=-1 # -tions can happen, only a max of 12 can
-                )[0] # happen at once (zap logic), regardless of pop size
-
-                inv_to_show = jnp.where(
-                    jnp.logical_or(
-                        jnp.logical_and(
-                            show_inv_bool,
-                            jnp.isin(item_idx-len(Items), show_inv_idxs),
-                        ),
-                        agent_element
-                    ),
-                    state.agent_invs[item_idx - len(Items)],
-                    jnp.array([0, 0], dtype=jnp.int8)
-                )[0]
-
-                # check if agent is not the subject & is frozen & therefore
-                # not possible to interact with
-                frozen = jnp.where(
-                    other_agent,
-                    state.freeze[
-                        item_idx-len(Items)
-                    ].max(axis=-1) > 0,
-                    0
-                )
-
-                # get pickup/inv info
-                pick_up_idx = jnp.where(
-                    jnp.any(mask),
-                    jnp.nonzero(mask, size=1)[0],
-                    jnp.int8(-1)
-                )
-                picked_up = jnp.where(
-                    pick_up_idx > -1,
-                    agent_pickups[pick_up_idx],
-                    jnp.int8(0)
-                )
-
-                # build extension
-                extension = jnp.concatenate(
-                    [
-                        agent_element,
-                        other_agent,
-                        angle,
-                        picked_up,
-                        inv_to_show,
-                        frozen
-                    ],
-                    axis=-1
-                )
-
-                # build final feature vector
-                final_vec = jnp.concatenate(
-                    [x[:len(Items)-1], extension],
-                    axis=-1
-                )
-
-                return final_vec
-
-            new_grid = jax.vmap(
-                jax.vmap(
-                    move_and_collapse
-                )
-            )(grid, angles)
-            return new_grid
-        
-        def check_relative_orientation(
-                agent: int,
-                agent_locs: jnp.ndarray,
-                grid: jnp.ndarray
-            ) -> jnp.ndarray:
-            '''
-            Check's relative orientations of all other agents in view of
-            current agent.
-            
-            Args:
-                - agent: int, an index indicating current agent number
-                - agent_locs: jax ndarray of agent locations (x, y, direction)
-                - grid: jax ndarray of current agent's obs grid
-                
-            Returns:
-                - grid with 1) int -1 in places where no agent exists, or
-                where the agent is the current agent, and 2) int in range
-                0-3 in cells of opposing agents indicating relative
-                orientation to current agent.
-            '''
-            # we decrement by num of Items when indexing as we incremented by
-            # 5 in constructor call (due to 5 non-agent Items enum & locations
-            # are indexed from 0)
-            idx = agent - len(Items)
-            agents = jnp.delete(
-                self._agents,
-                idx,
-                assume_unique_indices=True
-            )
-            curr_agent_dir = agent_locs[idx, 2]
-
-            def calc_relative_direction(cell):
-                cell_agent = cell - len(Items)
-                cell_direction = agent_locs[cell_agent, 2]
-                return (cell_direction - curr_agent_dir) % 4
-
-            angle = jnp.where(
-                jnp.isin(grid, agents),
-                jax.vmap(calc_relative_direction)(grid),
-                -1
-            )
-
-            return angle
-        
-        def rotate_grid(agent_loc: jnp.ndarray, grid: jnp.ndarray) -> jnp.ndarray:
-            '''
-            Rotates agent's observation grid k * 90 degrees, depending on agent's
-            orientation.
-
-            Args:
-                - agent_loc: jax ndarray of agent's x, y, direction
-                - grid: jax ndarray of agent's obs grid
-
-            Returns:
-                - jnp.ndarray of new rotated grid.
-
-            '''
-            grid = jnp.where(
-                agent_loc[2] == 1,
-                jnp.rot90(grid, k=1, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 2,
-                jnp.rot90(grid, k=2, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 3,
-                jnp.rot90(grid, k=3, axes=(0, 1)),
-                grid,
-            )
-
-            return grid
-
         def _get_obs_point(agent_loc: jnp.ndarray) -> jnp.ndarray:
             '''
             Obtain the position of top-left corner of obs map using
@@ -473,101 +278,40 @@ class CoinGame(MultiAgentEnv):
             Returns:
                 - x, y: ints of top-left corner of agent's obs map.
             '''
-            
-            x, y, direction = agent_loc
-
-            x, y = x + self.PADDING, y + self.PADDING
-
-            x = x - (self.OBS_SIZE // 2)
-            y = y - (self.OBS_SIZE // 2)
+            return obs_window_origin(agent_loc, self.OBS_SIZE, self.PADDING)
 
-            x = jnp.where(direction == 0, x + (self.OBS_SIZE//2)-1, x)
-            y = jnp.where(direction == 0, y, y)
-
-            x = jnp.where(direction == 1, x, x)
-            y = jnp.where(direction == 1, y + (self.OBS_SIZE//2)-1, y)
-
-
-            x = jnp.where(direction == 2, x - (self.OBS_SIZE//2)+1, x)
-            y = jnp.where(direction == 2, y, y)
-
-
-            x = jnp.where(direction == 3, x, x)
-            y = jnp.where(direction == 3, y - (self.OBS_SIZE//2)+1, y)
-
-            return x, y
-
-        def _get_obs(state: State) -> jnp.ndarray:
+        def _get_obs(state: State, agents=None) -> jnp.ndarray:
             '''
             Obtain the agent's observation of the grid.
 
             Args: 
                 - state: State object containing env state.
+                - agents: optional indices of the observing agents, all by default.
             Returns:
                 - jnp.ndarray of grid observation.
             '''
-            # create state
-            grid = jnp.pad(
-                state.grid,
-                ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)),
-                constant_values=Items.wall,
-            )
-
-            # obtain all agent obs-points
-            agent_start_idxs = jax.vmap(_get_obs_point)(state.agent_locs)
-
-            dynamic_slice = partial(
-                jax.lax.dynamic_slice,
-                operand=grid,
-                slice_sizes=(self.OBS_SIZE, self.OBS_SIZE)
-            )
-
-            # obtain agent obs grids
-            grids = jax.vmap(dynamic_slice)(start_indices=agent_start_idxs)
-
-            # rotate agent obs grids
-            grids = jax.vmap(rotate_grid)(state.agent_locs, grids)
-
-            angles = jax.vmap(
-                check_relative_orientation,
-                in_axes=(0, None, 0)
-            )(
-                self._agents,
-                state.agent_locs,
-                grids
-            )
-
-            angles = jax.nn.one_hot(angles, 4)
-
-            # one-hot (drop first channel as its empty blocks)
-            grids = jax.nn.one_hot(
-                grids - 1,
-                num_agents + len(Items) - 1, # will be collapsed into a
-                dtype=jnp.int8 # [Items, self, other, extra features] representation
-            )
-
             # check agents that can interact
-            inventory_sum = jnp.sum(state.agent_invs, axis=-1)
-            agent_pickups = jnp.where(
-                inventory_sum > INTERACT_THRESHOLD,
-                True,
-                False
-            )
+            agent_pickups = jnp.sum(state.agent_invs, axis=-1) > INTERACT_THRESHOLD
 
-            # make index len(Item) always the current agent
-            # and sum all others into an "other" agent
-            grids = jax.vmap(
-                combine_channels,
-                in_axes=(0, 0, 0, None, None)
-            )(
-                grids,
-                self._agents,
-                angles,
-                agent_pickups,
-                state
+            return egocentric_obs(
+                state.grid,
+                state.agent_locs,
+                state.agent_invs,
+                state.freeze,
+                num_items=len(Items),
+                obs_size=self.OBS_SIZE,
+                padding=self.PADDING,
+                pad_value=Items.wall,
+                agent_extras=agent_pickups[:, None],
+                compact=self.obs_format == "compact",
+                agents=agents,
             )
 
-            return grids
+        def _get_agent_obs(state: State, agent: int) -> jnp.ndarray:
+            '''
+            Observation of a single agent; only its window is gathered.
+            '''
+            return _get_obs(state, jnp.reshape(agent, (1,)))[0]
 
 
         def get_current_s_interest(timestep):
@@ -596,125 +340,128 @@ class CoinGame(MultiAgentEnv):
             #     Actions.stay,
             #     actions
             # )
-            key, subkey = jax.random.split(key)
-            # regrow apple
-            grid_apple = state.grid
-            probability = self.regrow_rate
-            def regrow_green_apple(apple_locs, p):
-                new_apple = jnp.where((((grid_apple[apple_locs[0], apple_locs[1]] == Items.empty) & (p < probability)) 
-                                       | ((grid_apple[apple_locs[0], apple_locs[1]] == Items.green_apple))),  
-                                      Items.green_apple, grid_apple[apple_locs[0], apple_locs[1]])
-                return new_apple
-            prob = jax.random.uniform(key, shape=(len(self.SPAWNS_APPLE),))
-            new_apple = jax.vmap(regrow_green_apple)(self.SPAWNS_APPLE, prob)
-            new_apple_grid = grid_apple.at[self.SPAWNS_APPLE[:, 0], self.SPAWNS_APPLE[:, 1]].set(new_apple[:])
-            state = state.replace(grid=new_apple_grid)
-
-
-            grid_apple = state.grid
-            def regrow_red_apple(apple_locs, p):
-                new_apple = jnp.where((((grid_apple[apple_locs[0], apple_locs[1]] == Items.empty) & (p < probability)) 
-                                       | ((grid_apple[apple_locs[0], apple_locs[1]] == Items.red_apple))),  
-                                      Items.red_apple, grid_apple[apple_locs[0], apple_locs[1]])
-                return new_apple
-            prob = jax.random.uniform(subkey, shape=(len(self.SPAWNS_APPLE),))
-            new_apple = jax.vmap(regrow_red_apple)(self.SPAWNS_APPLE, prob)
-            new_apple_grid = grid_apple.at[self.SPAWNS_APPLE[:, 0], self.SPAWNS_APPLE[:, 1]].set(new_apple[:])
-            state = state.replace(grid=new_apple_grid)
-
-
-            key, subkey = jax.random.split(key)
-            all_new_locs = jax.vmap(lambda p, a: jnp.int16(p + ROTATIONS[a]) % jnp.array([self.GRID_SIZE_ROW + 1, self.GRID_SIZE_COL + 1, 4], dtype=jnp.int16))(p=state.agent_locs, a=actions).squeeze()
-
-            agent_move = (actions == Actions.up) | (actions == Actions.down) | (actions == Actions.right) | (actions == Actions.left)
-            all_new_locs = jax.vmap(lambda m, n, p: jnp.where(m, n + STEP_MOVE[p], n))(m=agent_move, n=all_new_locs, p=actions)
+            with jax.named_scope("regrowth"):
+                key, subkey = jax.random.split(key)
+                # regrow apple
+                grid_apple = state.grid
+                probability = self.regrow_rate
+                def regrow_green_apple(apple_locs, p):
+                    new_apple = jnp.where((((grid_apple[apple_locs[0], apple_locs[1]] == Items.empty) & (p < probability)) 
+                                           | ((grid_apple[apple_locs[0], apple_locs[1]] == Items.green_apple))),  
+                                          Items.green_apple, grid_apple[apple_locs[0], apple_locs[1]])
+                    return new_apple
+                prob = jax.random.uniform(key, shape=(len(self.SPAWNS_APPLE),))
+                new_apple = jax.vmap(regrow_green_apple)(self.SPAWNS_APPLE, prob)
+                new_apple_grid = grid_apple.at[self.SPAWNS_APPLE[:, 0], self.SPAWNS_APPLE[:, 1]].set(new_apple[:])
+                state = state.replace(grid=new_apple_grid)
+
+
+                grid_apple = state.grid
+                def regrow_red_apple(apple_locs, p):
+                    new_apple = jnp.where((((grid_apple[apple_locs[0], apple_locs[1]] == Items.empty) & (p < probability)) 
+                                           | ((grid_apple[apple_locs[0], apple_locs[1]] == Items.red_apple))),  
+                                          Items.red_apple, grid_apple[apple_locs[0], apple_locs[1]])
+                    return new_apple
+                prob = jax.random.uniform(subkey, shape=(len(self.SPAWNS_APPLE),))
+                new_apple = jax.vmap(regrow_red_apple)(self.SPAWNS_APPLE, prob)
+                new_apple_grid = grid_apple.at[self.SPAWNS_APPLE[:, 0], self.SPAWNS_APPLE[:, 1]].set(new_apple[:])
+                state = state.replace(grid=new_apple_grid)
+
+
+            with jax.named_scope("movement"):
+                key, subkey = jax.random.split(key)
+                all_new_locs = jax.vmap(lambda p, a: jnp.int16(p + ROTATIONS[a]) % jnp.array([self.GRID_SIZE_ROW + 1, self.GRID_SIZE_COL + 1, 4], dtype=jnp.int16))(p=state.agent_locs, a=actions).squeeze()
+
+                agent_move = (actions == Actions.up) | (actions == Actions.down) | (actions == Actions.right) | (actions == Actions.left)
+                all_new_locs = jax.vmap(lambda m, n, p: jnp.where(m, n + STEP_MOVE[p], n))(m=agent_move, n=all_new_locs, p=actions)
             
-            all_new_locs = jax.vmap(
-                jnp.clip,
-                in_axes=(0, None, None)
-            )(
-                all_new_locs,
-                jnp.array([0, 0, 0], dtype=jnp.int16),
-                jnp.array(
-                    [self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1, 3],
-                    dtype=jnp.int16
-                ),
-            ).squeeze()
-
-            # Resolve agent-agent movement conflicts via the shared
-            # resolver: same-target conflicts (non-mover priority, else
-            # random winner), swaps blocked, trains allowed, cascades
-            # reverted to a fixed point. Final (row, col) unique.
-            key, move_key = jax.random.split(key)
-            new_locs = resolve_movement(move_key, state.agent_locs, all_new_locs)
-
-            # update inventories
-            def red_matcher(p: jnp.ndarray) -> jnp.ndarray:
-                c_matches = jnp.array([
-                    state.grid[p[0], p[1]] == Items.red_apple
-                    ])
-                return c_matches
+                all_new_locs = jax.vmap(
+                    jnp.clip,
+                    in_axes=(0, None, None)
+                )(
+                    all_new_locs,
+                    jnp.array([0, 0, 0], dtype=jnp.int16),
+                    jnp.array(
+                        [self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1, 3],
+                        dtype=jnp.int16
+                    ),
+                ).squeeze()
+
+                # Resolve agent-agent movement conflicts via the shared
+                # resolver: same-target conflicts (non-mover priority, else
+                # random winner), swaps blocked, trains allowed, cascades
+                # reverted to a fixed point. Final (row, col) unique.
+                key, move_key = jax.random.split(key)
+                new_locs = resolve_movement(move_key, state.agent_locs, all_new_locs)
+
+                # update inventories
+                def red_matcher(p: jnp.ndarray) -> jnp.ndarray:
+                    c_matches = jnp.array([
+                        state.grid[p[0], p[1]] == Items.red_apple
+                        ])
+                    return c_matches
             
-            def green_matcher(p: jnp.ndarray) -> jnp.ndarray:
-                c_matches = jnp.array([
-                    state.grid[p[0], p[1]] == Items.green_apple
-                    ])
-                return c_matches
+                def green_matcher(p: jnp.ndarray) -> jnp.ndarray:
+                    c_matches = jnp.array([
+                        state.grid[p[0], p[1]] == Items.green_apple
+                        ])
+                    return c_matches
 
 
-            red_apple_matches = jax.vmap(red_matcher)(p=new_locs)
-            green_apple_matches = jax.vmap(green_matcher)(p=new_locs)
+                red_apple_matches = jax.vmap(red_matcher)(p=new_locs)
+                green_apple_matches = jax.vmap(green_matcher)(p=new_locs)
 
 
-            red_red_reward = self.payoff_matrix[0][0]
-            red_green_reward = self.payoff_matrix[0][1]
-            red_penalty = self.payoff_matrix[0][2]
-            green_red_reward = self.payoff_matrix[1][0]
-            green_green_reward = self.payoff_matrix[1][1]
-            green_penalty = self.payoff_matrix[1][2]
+            with jax.named_scope("rewards"):
+                red_red_reward = self.payoff_matrix[0][0]
+                red_green_reward = self.payoff_matrix[0][1]
+                red_penalty = self.payoff_matrix[0][2]
+                green_red_reward = self.payoff_matrix[1][0]
+                green_green_reward = self.payoff_matrix[1][1]
+                green_penalty = self.payoff_matrix[1][2]
 
-            red_reward, green_reward = 0, 0
+                red_reward, green_reward = 0, 0
 
-            red_red_matches = red_apple_matches[0, :]
-            red_green_matches = green_apple_matches[0, :]
+                red_red_matches = red_apple_matches[0, :]
+                red_green_matches = green_apple_matches[0, :]
             
-            # jnp.all(
-            #     new_red_pos == state.blue_coin_pos, axis=-1
-            # )
-
-            green_red_matches = red_apple_matches[1, :]
-            # jnp.all(
-            #     new_blue_pos == state.red_coin_pos, axis=-1
-            # )
-            green_green_matches = green_apple_matches[1, :]
-            # jnp.all(
-            #     new_blue_pos == state.blue_coin_pos, axis=-1
-            # )
-
-            red_reward = jnp.where(
-                red_red_matches, red_reward + red_red_reward, red_reward
-            )
-            red_reward = jnp.where(
-                red_green_matches, red_reward + red_green_reward, red_reward
-            )
-            red_reward = jnp.where(
-                green_red_matches, red_reward + red_penalty, red_reward
-            )
+                # jnp.all(
+                #     new_red_pos == state.blue_coin_pos, axis=-1
+                # )
+
+                green_red_matches = red_apple_matches[1, :]
+                # jnp.all(
+                #     new_blue_pos == state.red_coin_pos, axis=-1
+                # )
+                green_green_matches = green_apple_matches[1, :]
+                # jnp.all(
+                #     new_blue_pos == state.blue_coin_pos, axis=-1
+                # )
+
+                red_reward = jnp.where(
+                    red_red_matches, red_reward + red_red_reward, red_reward
+                )
+                red_reward = jnp.where(
+                    red_green_matches, red_reward + red_green_reward, red_reward
+                )
+                red_reward = jnp.where(
+                    green_red_matches, red_reward + red_penalty, red_reward
+                )
 
-            green_reward = jnp.where(
-                green_red_matches, green_reward + green_red_reward, green_reward
-            )
-            green_reward = jnp.where(
-                green_green_matches, green_reward + green_green_reward, green_reward
-            )
-            green_reward = jnp.where(
-                red_green_matches, green_reward + green_penalty, green_reward
-            )
+                green_reward = jnp.where(
+                    green_red_matches, green_reward + green_red_reward, green_reward
+                )
+                green_reward = jnp.where(
+                    green_green_matches, green_reward + green_green_reward, green_reward
+                )
+                green_reward = jnp.where(
+                    red_green_matches, green_reward + green_penalty, green_reward
+                )
 
-            rewards = jnp.zeros((2, 1))
+                rewards = jnp.zeros((2, 1))
 
-            rewards = rewards.at[0, 0].set(red_reward[0])
-            rewards = rewards.at[1, 0].set(green_reward[0])
+                rewards = rewards.at[0, 0].set(red_reward[0])
+                rewards = rewards.at[1, 0].set(green_reward[0])
 
             # # single reward or sum reward
 
@@ -729,118 +476,120 @@ class CoinGame(MultiAgentEnv):
             # #     agent_invs=new_invs
             # # )
 
-            # update grid
-            old_grid = state.grid
-
-            new_grid = old_grid.at[
-                state.agent_locs[:, 0],
-                state.agent_locs[:, 1]
-            ].set(
-                jnp.int16(Items.empty)
-            )
-            x, y = new_locs[:, 0], new_locs[:, 1]
-            new_grid = new_grid.at[x, y].set(self._agents)
-            state = state.replace(grid=new_grid)
-
-            # update agent locations
-            state = state.replace(agent_locs=new_locs)
+            with jax.named_scope("movement"):
+                # update grid
+                old_grid = state.grid
 
-
-            if self.shared_rewards:
-                rewards = jnp.zeros((2, 1))
-                rewards = rewards.at[0, 0].set(red_reward[0])
-                rewards = rewards.at[1, 0].set(green_reward[0])
-                rewards_sum = jnp.sum(rewards)
-                rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
-                rewards_sum_all_agents += rewards_sum
-                rewards = rewards_sum_all_agents
-                info = {
-                    "original_rewards": rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.inequity_aversion:
-                rewards = jnp.zeros((2, 1))
-                rewards = rewards.at[0, 0].set(red_reward[0])
-                rewards = rewards.at[1, 0].set(green_reward[0])
-                original_rewards = rewards * self.num_agents
-                if self.smooth_rewards:
-                    should_smooth = (state.inner_t % 1) == 0
-                    new_smooth_rewards = 0.99 * 0.01* state.smooth_rewards + original_rewards
-                    rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(new_smooth_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
-                    state = state.replace(smooth_rewards=new_smooth_rewards)
+                new_grid = old_grid.at[
+                    state.agent_locs[:, 0],
+                    state.agent_locs[:, 1]
+                ].set(
+                    jnp.int16(Items.empty)
+                )
+                x, y = new_locs[:, 0], new_locs[:, 1]
+                new_grid = new_grid.at[x, y].set(self._agents)
+                state = state.replace(grid=new_grid)
+
+                # update agent locations
+                state = state.replace(agent_locs=new_locs)
+
+
+            with jax.named_scope("rewards"):
+                if self.shared_rewards:
+                    rewards = jnp.zeros((2, 1))
+                    rewards = rewards.at[0, 0].set(red_reward[0])
+                    rewards = rewards.at[1, 0].set(green_reward[0])
+                    rewards_sum = jnp.sum(rewards)
+                    rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
+                    rewards_sum_all_agents += rewards_sum
+                    rewards = rewards_sum_all_agents
                     info = {
-                    "original_rewards": rewards.squeeze(),
-                    "smooth_rewards": state.smooth_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-                else:
-                    rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(original_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        "original_rewards": rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.inequity_aversion:
+                    rewards = jnp.zeros((2, 1))
+                    rewards = rewards.at[0, 0].set(red_reward[0])
+                    rewards = rewards.at[1, 0].set(green_reward[0])
+                    original_rewards = rewards * self.num_agents
+                    if self.smooth_rewards:
+                        should_smooth = (state.inner_t % 1) == 0
+                        new_smooth_rewards = 0.99 * 0.01* state.smooth_rewards + original_rewards
+                        rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(new_smooth_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        state = state.replace(smooth_rewards=new_smooth_rewards)
+                        info = {
+                        "original_rewards": rewards.squeeze(),
+                        "smooth_rewards": state.smooth_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                    else:
+                        rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(original_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        info = {
+                        "original_rewards": rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.svo:
+                    rewards = jnp.zeros((2, 1))
+                    rewards = rewards.at[0, 0].set(red_reward[0])
+                    rewards = rewards.at[1, 0].set(green_reward[0])
+                    original_rewards = rewards * self.num_agents
+                    rewards, theta = self.get_svo_rewards(original_rewards, self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents)
                     info = {
-                    "original_rewards": rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.svo:
-                rewards = jnp.zeros((2, 1))
-                rewards = rewards.at[0, 0].set(red_reward[0])
-                rewards = rewards.at[1, 0].set(green_reward[0])
-                original_rewards = rewards * self.num_agents
-                rewards, theta = self.get_svo_rewards(original_rewards, self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents)
-                info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "svo_theta": theta.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.interest:
-                rewards = jnp.zeros((2, 1))
-                rewards = rewards.at[0, 0].set(red_reward[0])
-                rewards = rewards.at[1, 0].set(green_reward[0])
-                original_rewards = rewards * self.num_agents
-                original_flat = original_rewards.squeeze()
-
-                # Calculate current s_interest based on timestep
-                current_s_interest = get_current_s_interest(timestep)
-
-                # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
-                total_reward = jnp.sum(original_flat)
-                others_reward = total_reward - original_flat  # sum of all other agents' rewards
-
-                rewards = (current_s_interest * original_flat +
-                        (1 - current_s_interest) / (self.num_agents - 1) * others_reward).reshape(-1, 1)
+                        "original_rewards": original_rewards.squeeze(),
+                        "svo_theta": theta.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.interest:
+                    rewards = jnp.zeros((2, 1))
+                    rewards = rewards.at[0, 0].set(red_reward[0])
+                    rewards = rewards.at[1, 0].set(green_reward[0])
+                    original_rewards = rewards * self.num_agents
+                    original_flat = original_rewards.squeeze()
+
+                    # Calculate current s_interest based on timestep
+                    current_s_interest = get_current_s_interest(timestep)
+
+                    # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
+                    total_reward = jnp.sum(original_flat)
+                    others_reward = total_reward - original_flat  # sum of all other agents' rewards
+
+                    rewards = (current_s_interest * original_flat +
+                            (1 - current_s_interest) / (self.num_agents - 1) * others_reward).reshape(-1, 1)
 
-                info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                    "s_interest": current_s_interest,
-                }
-            else:
-                rewards = jnp.zeros((2, 1))
-                rewards = rewards.at[0, 0].set(red_reward[0])
-                org_rewards = rewards.at[1, 0].set(green_reward[0])
-                rewards = org_rewards * self.num_agents
+                    info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                        "s_interest": current_s_interest,
+                    }
+                else:
+                    rewards = jnp.zeros((2, 1))
+                    rewards = rewards.at[0, 0].set(red_reward[0])
+                    org_rewards = rewards.at[1, 0].set(green_reward[0])
+                    rewards = org_rewards * self.num_agents
                 
-                rewards_sum = jnp.sum(org_rewards)
-                rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
-                rewards_sum_all_agents += rewards_sum
-                sum_rewards = rewards_sum_all_agents
+                    rewards_sum = jnp.sum(org_rewards)
+                    rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
+                    rewards_sum_all_agents += rewards_sum
+                    sum_rewards = rewards_sum_all_agents
                 
-                info = {
-                    "original_rewards": rewards.squeeze(),
-                    "shaped_rewards": sum_rewards,
-                }
+                    info = {
+                        "original_rewards": rewards.squeeze(),
+                        "shaped_rewards": sum_rewards,
+                    }
             
-            eat_own_coins = jnp.zeros((2, 1))
-            red_reward, green_reward = 0, 0
-            red_reward = jnp.where(
-                red_red_matches, red_reward + red_red_reward, red_reward
-            )
+                eat_own_coins = jnp.zeros((2, 1))
+                red_reward, green_reward = 0, 0
+                red_reward = jnp.where(
+                    red_red_matches, red_reward + red_red_reward, red_reward
+                )
 
-            green_reward = jnp.where(
-                green_green_matches, green_reward + green_green_reward, green_reward
-            )
+                green_reward = jnp.where(
+                    green_green_matches, green_reward + green_green_reward, green_reward
+                )
 
-            eat_own_coins = eat_own_coins.at[0, 0].set(red_reward[0])
-            eat_own_coins = eat_own_coins.at[1, 0].set(green_reward[0])
-            info["eat_own_coins"] = eat_own_coins.squeeze() * self.num_agents
+                eat_own_coins = eat_own_coins.at[0, 0].set(red_reward[0])
+                eat_own_coins = eat_own_coins.at[1, 0].set(green_reward[0])
+                info["eat_own_coins"] = eat_own_coins.squeeze() * self.num_agents
 
             # if self.shared_rewards:
             #     rewards = jnp.zeros((2, 1))
@@ -863,7 +612,6 @@ class CoinGame(MultiAgentEnv):
                 inner_t=state.inner_t + 1,
                 outer_t=state.outer_t,
                 grid=state.grid,
-                apples=state.apples,
                 freeze=state.freeze,
                 reborn_locs=state.reborn_locs,
                 smooth_rewards=state.smooth_rewards
@@ -875,21 +623,16 @@ class CoinGame(MultiAgentEnv):
             reset_inner = inner_t == num_inner_steps
 
             # if inner episode is done, return start state for next game
-            state_re = _reset_state(key)
-
-            state_re = state_re.replace(outer_t=outer_t + 1)
-            state = jax.tree.map(
-                lambda x, y: jnp.where(reset_inner, x, y),
-                state_re,
-                state_nxt,
-            )
+            with jax.named_scope("episode_reset"):
+                state = self.inner_reset(key, reset_inner, _reset_state, state_nxt)
             outer_t = state.outer_t
             reset_outer = outer_t == num_outer_steps
             done = {f'{a}': reset_outer for a in self.agents}
             # done = [reset_outer for _ in self.agents]
             done["__all__"] = reset_outer
 
-            obs = _get_obs(state)
+            with jax.named_scope("observation"):
+                obs = _get_obs(state)
             rewards = jnp.where(
                 reset_inner,
                 jnp.zeros_like(rewards, dtype=jnp.int16),
@@ -901,7 +644,7 @@ class CoinGame(MultiAgentEnv):
                 state,
                 rewards.squeeze(),
                 done,
-                info,
+                self.select_info(info),
             )
 
         def _reset_state(
@@ -915,8 +658,6 @@ class CoinGame(MultiAgentEnv):
 
             agent_pos = jax.random.permutation(subkey, self.SPAWNS_PLAYERS)
 
-            apple_pos = self.SPAWNS_APPLE
-
             player_dir = jax.random.randint(
                 subkey, shape=(
                     num_agents,
@@ -935,20 +676,19 @@ class CoinGame(MultiAgentEnv):
 
             freeze = jnp.array(
                 [[-1]*num_agents]*num_agents,
-            dtype=jnp.int16
+            dtype=jnp.int8
             )
 
             return State(
                 agent_locs=agent_locs,
                 agent_invs=jnp.array([(0,0)]*num_agents, dtype=jnp.int8),
-                inner_t=0,
-                outer_t=0,
+                inner_t=jnp.zeros((), self._counter_dtype),
+                outer_t=jnp.zeros((), self._counter_dtype),
                 grid=grid,
-                apples=apple_pos,
 
                 freeze=freeze,
                 reborn_locs = agent_locs,
-                smooth_rewards=jnp.zeros((self.num_agents, 1))
+                smooth_rewards=jnp.zeros((self.num_agents, 1 if self.smooth_rewards else 0))
             )
 
         def reset(
@@ -971,6 +711,10 @@ class CoinGame(MultiAgentEnv):
             self.get_obs_point = _get_obs_point
         ################################################################################
 
+        # exposed for MultiAgentEnv.step(reset_state=...) and speed_test/benchmark_suite.py
+        self.get_obs = jax.jit(_get_obs)
+        self.get_agent_obs = jax.jit(_get_agent_obs)
+
     @property
     def name(self) -> str:
         """Environment name."""
@@ -995,6 +739,14 @@ class CoinGame(MultiAgentEnv):
             else (self.OBS_SIZE**2 * ((len(Items)-1) + 10),)
         )
 
+        if self.obs_format == "compact":
+            channels = self.obs_encoding[1]
+            _shape_obs = (
+                (self.OBS_SIZE, self.OBS_SIZE, channels)
+                if self.cnn
+                else (self.OBS_SIZE**2 * channels,)
+            )
+
         return spaces.Box(
                 low=0, high=1E9, shape=_shape_obs, dtype=jnp.uint8
             ), _shape_obs
@@ -1118,82 +870,26 @@ class CoinGame(MultiAgentEnv):
         :param r: target renderer object
         :param tile_size: tile size in pixels
         """
-        tile_size = 32
-        highlight_mask = onp.zeros_like(onp.array(self.GRID))
+        return onp.asarray(self.renderer.render(state))
 
-        # Compute the total grid size
-        width_px = self.GRID.shape[1] * tile_size
-        height_px = self.GRID.shape[0] * tile_size
+    def render_batch(self, states: State) -> jnp.ndarray:
+        """
+        Render a batch of states (leading batch axis on every field) in one
+        jitted call; returns uint8 frames of shape (B, H, W, 3).
+        """
+        return self.renderer.render_batch(states)
 
-        img = onp.zeros(shape=(height_px, width_px, 3), dtype=onp.uint8)
-        grid = onp.array(state.grid)
-        
-        grid = onp.pad(
-            grid, ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)), constant_values=Items.wall
-        )
-        for a in range(self.num_agents):
-            startx, starty = self.get_obs_point(
-                state.agent_locs[a]
+    @property
+    def renderer(self) -> GridRenderer:
+        """Jittable tile-atlas renderer, built on first use."""
+        if self._renderer is None:
+            self._renderer = GridRenderer(
+                self,
+                values=list(range(len(Items))) + list(onp.asarray(self._agents)),
+                pad_value=Items.wall,
+                tile_size=32,
             )
-            highlight_mask[
-                startx : startx + self.OBS_SIZE, starty : starty + self.OBS_SIZE
-            ] = True
-
-        # Render the grid
-        for j in range(0, grid.shape[1]):
-            for i in range(0, grid.shape[0]):
-                cell = grid[i, j]
-                if cell == 0:
-                    cell = None
-                agent_here = []
-                for a in self._agents:
-                    agent_here.append(cell == a)
-                # if cell in [1,2]:
-                #     print(f'coordinates: {i},{j}')
-                #     print(cell)
-
-                agent_dir = None
-                for a in range(self.num_agents):
-                    agent_dir = (
-                        state.agent_locs[a,2].item()
-                        if agent_here[a]
-                        else agent_dir
-                    )
-                
-                agent_hat = False
-                # for a in range(self.num_agents):
-                #     agent_hat = (
-                #         bool(state.agent_invs[a].sum() > INTERACT_THRESHOLD)
-                #         if agent_here[a]
-                #         else agent_hat
-                #     )
-
-                tile_img = self.render_tile(
-                    cell,
-                    agent_dir=agent_dir,
-                    agent_hat=agent_hat,
-                    highlight=highlight_mask[i, j],
-                    tile_size=tile_size,
-                )
-
-                ymin = i * tile_size
-                ymax = (i + 1) * tile_size
-                xmin = j * tile_size
-                xmax = (j + 1) * tile_size
-                img[ymin:ymax, xmin:xmax, :] = tile_img
-        img = onp.rot90(
-            img[
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                :,
-            ],
-            2,
-        )
-
-        # time = self.render_time(state, img.shape[1])
-        # img = onp.concatenate((img, *agent_inv, time), axis=0)
-        # img = onp.concatenate((img, time), axis=0)
-        return img
+        return self._renderer
 
 
     def render_time(self, state, width_px) -> onp.array:
@@ -11,7 +11,7 @@ from socialjax.environments import spaces
 from socialjax.environments.coop_mining.rendering import (
     render_tile, render_time, render_jax, render_time_jax, )
 from socialjax.environments.movement import resolve_movement
-from socialjax.environments.multi_agent_env import MultiAgentEnv
+from socialjax.environments.multi_agent_env import MultiAgentEnv, counter_dtype
 
 # ------------------------------------------------------------------------
 # ASCII map, CHAR_TO_INT, Items & Actions
@@ -427,9 +427,10 @@ class CoopMining(MultiAgentEnv):
             regrowth_prob_gold=0.00008,
             cnn=True,
             jit=True,
+            info_level="full",
             view_config=ViewConfig(forward=9, backward=1, left=5, right=5),
     ):
-        super().__init__(num_agents=num_agents)
+        super().__init__(num_agents=num_agents, info_level=info_level)
         self.inequity_aversion = inequity_aversion
         self.inequity_aversion_target_agents = inequity_aversion_target_agents
         self.inequity_aversion_alpha = inequity_aversion_alpha
@@ -452,6 +453,7 @@ class CoopMining(MultiAgentEnv):
         self.view_config = view_config
         self.num_inner_steps = num_inner_steps
         self.num_outer_steps = num_outer_steps
+        self._counter_dtype = counter_dtype(max(num_inner_steps, num_outer_steps))
         self.shared_rewards = shared_rewards
         self.max_miners = max_miners
         self.min_gold_miners = min_gold_miners
@@ -464,14 +466,16 @@ class CoopMining(MultiAgentEnv):
         self.cnn = cnn
         self.num_agents = num_agents
         self.agents = list(range(num_agents))
-        self._agents = jnp.array(self.agents, dtype=jnp.int32) + len(Items)
+        self._agents = jnp.array(self.agents, dtype=jnp.int16) + len(Items)
+        # ore_miners holds agent indices (-1 for a free slot)
+        self._miner_dtype = jnp.int8 if num_agents <= jnp.iinfo(jnp.int8).max else jnp.int16
         self._agent_colors = jnp.array(generate_agent_colors(num_agents), dtype=jnp.uint8)
 
         self.OBS_SIZE = view_config.forward + view_config.backward + 1
         self.PADDING = self.OBS_SIZE - 1
         self.interact_threshold = 0
 
-        self._grid_base = ascii_map_to_grid(ASCII_MAP_COOP_MINING, CHAR_TO_INT)
+        self._grid_base = ascii_map_to_grid(ASCII_MAP_COOP_MINING, CHAR_TO_INT).astype(jnp.int16)
         self.grid_shape = self._grid_base.shape
         self.GRID_SIZE_ROW = self.grid_shape[0]
         self.GRID_SIZE_COL = self.grid_shape[1]
@@ -483,6 +487,13 @@ class CoopMining(MultiAgentEnv):
         # Precompute spawn points
         self._spawn_pts = jnp.argwhere(self._grid_base == Items.spawn_point)
 
+        # Beam offsets per orientation: _beam_offsets[o, d] is the (row, col)
+        # offset of the (d+1)-th cell in front of an agent facing o
+        self._beam_offsets = (
+            STEP[:, None, :2].astype(jnp.int32)
+            * jnp.arange(1, mining_range + 1, dtype=jnp.int32)[None, :, None]
+        )
+
         # Action spaces
         self.action_spaces = {
             i: spaces.Discrete(len(Actions)) for i in range(num_agents)
@@ -574,10 +585,10 @@ class CoopMining(MultiAgentEnv):
         # Fill with -1 to indicate "no miner" in each slot
         ore_miners = -1 * jnp.ones(
             (self.GRID_SIZE_ROW, self.GRID_SIZE_COL, self.max_miners),
-            dtype=jnp.int32
+            dtype=self._miner_dtype
         )
         # partial_ore_countdown for multi-step windows
-        partial_ore_countdown = jnp.zeros((self.GRID_SIZE_ROW, self.GRID_SIZE_COL), dtype=jnp.int32)
+        partial_ore_countdown = jnp.zeros((self.GRID_SIZE_ROW, self.GRID_SIZE_COL), dtype=jnp.int16)
 
         # Initialize last actions and mined positions to -1
         last_mined_positions = -1 * jnp.ones((self.num_agents, 2), dtype=jnp.int32)
@@ -589,11 +600,11 @@ class CoopMining(MultiAgentEnv):
             occupant_grid=occupant_grid,
             ore_miners=ore_miners,
             partial_ore_countdown=partial_ore_countdown,
-            inner_t=0,
-            outer_t=0,
+            inner_t=jnp.zeros((), self._counter_dtype),
+            outer_t=jnp.zeros((), self._counter_dtype),
             last_mined_positions=last_mined_positions,
             actions_last_step=last_actions,
-            smooth_rewards=jnp.zeros((self.num_agents, 1)),
+            smooth_rewards=jnp.zeros((self.num_agents, 1 if self.smooth_rewards else 0)),
         )
 
     def get_current_s_interest(self, timestep):
@@ -625,41 +636,44 @@ class CoopMining(MultiAgentEnv):
         """
         actions = jnp.array(actions, dtype=jnp.int32).squeeze()
 
-        # 1) Update orientation from turn actions
-        new_orients = (state.agent_locs[:, 2] + ROTATIONS[actions][:, 2]) % 4
+        with jax.named_scope("movement"):
+            # 1) Update orientation from turn actions
+            new_orients = (state.agent_locs[:, 2] + ROTATIONS[actions][:, 2]) % 4
 
-        # 2) Calculate new positions
-        old_rc = state.agent_locs[:, :2]  # (N, 2)
-        offsets = STEP_MOVE[actions][:, :2]  # (N, 2), ignoring orientation in last dimension if zero
-        new_rc = old_rc + offsets  # (N, 2)
+            # 2) Calculate new positions
+            old_rc = state.agent_locs[:, :2]  # (N, 2)
+            offsets = STEP_MOVE[actions][:, :2]  # (N, 2), ignoring orientation in last dimension if zero
+            new_rc = old_rc + offsets  # (N, 2)
 
-        # 3) Clip to grid bounds
-        row_max, col_max = self.GRID_SIZE_ROW, self.GRID_SIZE_COL
-        new_rc = jnp.clip(new_rc, a_min=jnp.array([0, 0]), a_max=jnp.array([row_max - 1, col_max - 1]))
+            # 3) Clip to grid bounds
+            row_max, col_max = self.GRID_SIZE_ROW, self.GRID_SIZE_COL
+            new_rc = jnp.clip(new_rc, a_min=jnp.array([0, 0]), a_max=jnp.array([row_max - 1, col_max - 1]))
 
-        # 4. Handle walls
-        wall_mask = (state.grid[new_rc[:, 0], new_rc[:, 1]] == Items.wall)  # (N,)
-        final_rc = jnp.where(wall_mask[:, None], old_rc, new_rc)  # Revert positions where walls are
+            # 4. Handle walls
+            wall_mask = (state.grid[new_rc[:, 0], new_rc[:, 1]] == Items.wall)  # (N,)
+            final_rc = jnp.where(wall_mask[:, None], old_rc, new_rc)  # Revert positions where walls are
 
-        # 5. Handle collisions (same-target random winner, swaps blocked,
-        # trains allowed; guarantees unique final cells)
-        key, move_key = jax.random.split(key)
-        final_rc = resolve_movement(move_key, old_rc, final_rc)
+            # 5. Handle collisions (same-target random winner, swaps blocked,
+            # trains allowed; guarantees unique final cells)
+            key, move_key = jax.random.split(key)
+            final_rc = resolve_movement(move_key, old_rc, final_rc)
 
-        # 6. Update agent locations
-        new_locs = jnp.concatenate([final_rc, new_orients[:, None]], axis=-1)  # (N, 3)
+            # 6. Update agent locations
+            new_locs = jnp.concatenate([final_rc, new_orients[:, None]], axis=-1)  # (N, 3)
 
-        # 7. Identify mine actions
-        mine_flags = (actions == Actions.mine)  # shape (num_agents,)
+        with jax.named_scope("interaction"):
+            # 7. Identify mine actions
+            mine_flags = (actions == Actions.mine)  # shape (num_agents,)
 
-        # 8) Use the vectorized mining routine
-        positions, rewards_iron, rewards_gold, new_grid, new_ore_miners, new_partial_cd = self.vectorized_mining(
-            new_locs, mine_flags, state
-        )
+            # 8) Use the vectorized mining routine
+            positions, rewards_iron, rewards_gold, new_grid, new_ore_miners, new_partial_cd = self.vectorized_mining(
+                new_locs, mine_flags, state
+            )
 
-        # Check occupancy for all cells
-        occupant_cleared = jnp.zeros_like(state.occupant_grid)
-        occupant_with_agents = occupant_cleared.at[new_locs[:, 0], new_locs[:, 1]].set(self._agents)
+        with jax.named_scope("movement"):
+            # Check occupancy for all cells
+            occupant_cleared = jnp.zeros_like(state.occupant_grid)
+            occupant_with_agents = occupant_cleared.at[new_locs[:, 0], new_locs[:, 1]].set(self._agents)
 
         # agent_rows = new_locs[:, 0]  # (N,)
         # agent_cols = new_locs[:, 1]  # (N,)
@@ -667,76 +681,78 @@ class CoopMining(MultiAgentEnv):
         # grid_with_agents = new_grid.at[agent_rows, agent_cols].set(self._agents)
         # occupied = jnp.zeros((row_max, col_max), dtype=bool).at[agent_rows, agent_cols].set(True)
 
-        # Generate random numbers for regrowth
-        rng_split = jax.random.split(key, num=2)
-        rng_iron, rng_gold = rng_split
-        # Apply regrowth
-        new_grid = self.regrow_ore_vectorized(new_grid, rng_iron, rng_gold)
-
-        # Aggregate Rewards
-        if self.shared_rewards:
-            total_rewards = jnp.sum(rewards_iron + rewards_gold)  # Scalar
-            final_rewards = jnp.full((self.num_agents,), total_rewards)
-            info = {
-                "original_rewards": final_rewards.squeeze(),
-                "shaped_rewards": final_rewards.squeeze(),
-            }
-        elif self.inequity_aversion:
-            final_rewards = (rewards_iron + rewards_gold) * self.num_agents # (N,)
-            if self.smooth_rewards:
-                should_smooth = (state.inner_t % 1) == 0
-                new_smooth_rewards = 0.99 * 0.99 * state.smooth_rewards + final_rewards
-                rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(new_smooth_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
-                state = state.replace(smooth_rewards=new_smooth_rewards)
+        with jax.named_scope("regrowth"):
+            # Generate random numbers for regrowth
+            rng_split = jax.random.split(key, num=2)
+            rng_iron, rng_gold = rng_split
+            # Apply regrowth
+            new_grid = self.regrow_ore_vectorized(new_grid, rng_iron, rng_gold)
+
+        with jax.named_scope("rewards"):
+            # Aggregate Rewards
+            if self.shared_rewards:
+                total_rewards = jnp.sum(rewards_iron + rewards_gold)  # Scalar
+                final_rewards = jnp.full((self.num_agents,), total_rewards)
                 info = {
-                "original_rewards": final_rewards.squeeze(),
-                "smooth_rewards": state.smooth_rewards.squeeze(),
-                "shaped_rewards": rewards.squeeze(),
-            }
-            else:
-                rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(final_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                    "original_rewards": final_rewards.squeeze(),
+                    "shaped_rewards": final_rewards.squeeze(),
+                }
+            elif self.inequity_aversion:
+                final_rewards = (rewards_iron + rewards_gold) * self.num_agents # (N,)
+                if self.smooth_rewards:
+                    should_smooth = (state.inner_t % 1) == 0
+                    new_smooth_rewards = 0.99 * 0.99 * state.smooth_rewards + final_rewards
+                    rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(new_smooth_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                    state = state.replace(smooth_rewards=new_smooth_rewards)
+                    info = {
+                    "original_rewards": final_rewards.squeeze(),
+                    "smooth_rewards": state.smooth_rewards.squeeze(),
+                    "shaped_rewards": rewards.squeeze(),
+                }
+                else:
+                    rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(final_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                    info = {
+                    "original_rewards": final_rewards.squeeze(),
+                    "shaped_rewards": rewards.squeeze(),
+                }
+            elif self.svo:
+                final_rewards = (rewards_iron + rewards_gold) * self.num_agents  # (N,)
+                rewards, theta = self.get_svo_rewards(
+                    final_rewards.reshape(self.num_agents, 1),
+                    self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents,
+                )
+                rewards = rewards.squeeze()
                 info = {
-                "original_rewards": final_rewards.squeeze(),
-                "shaped_rewards": rewards.squeeze(),
-            }
-        elif self.svo:
-            final_rewards = (rewards_iron + rewards_gold) * self.num_agents  # (N,)
-            rewards, theta = self.get_svo_rewards(
-                final_rewards.reshape(self.num_agents, 1),
-                self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents,
-            )
-            rewards = rewards.squeeze()
-            info = {
-                "original_rewards": final_rewards.squeeze(),
-                "svo_theta": theta.squeeze(),
-                "shaped_rewards": rewards,
-            }
-            final_rewards = rewards
-        elif self.interest:
-            final_rewards = (rewards_iron + rewards_gold) * self.num_agents # (N,)
-
-            # Calculate current s_interest based on timestep
-            current_s_interest = self.get_current_s_interest(timestep)
-            original_flat = final_rewards.squeeze()
-
-            # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
-            total_reward = jnp.sum(original_flat)
-            others_reward = total_reward - original_flat  # sum of all other agents' rewards
-
-            rewards = (current_s_interest * original_flat +
-                    (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
-
-            info = {
-                "original_rewards": final_rewards.squeeze(),
-                "shaped_rewards": rewards.squeeze(),
-                "s_interest": current_s_interest,
-            }
-            final_rewards = rewards.squeeze()
-        else:
-            final_rewards = (rewards_iron + rewards_gold) * self.num_agents # (N,)
-            info = {}
+                    "original_rewards": final_rewards.squeeze(),
+                    "svo_theta": theta.squeeze(),
+                    "shaped_rewards": rewards,
+                }
+                final_rewards = rewards
+            elif self.interest:
+                final_rewards = (rewards_iron + rewards_gold) * self.num_agents # (N,)
 
-        info["mining_gold"] = rewards_gold * self.num_agents
+                # Calculate current s_interest based on timestep
+                current_s_interest = self.get_current_s_interest(timestep)
+                original_flat = final_rewards.squeeze()
+
+                # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
+                total_reward = jnp.sum(original_flat)
+                others_reward = total_reward - original_flat  # sum of all other agents' rewards
+
+                rewards = (current_s_interest * original_flat +
+                        (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
+
+                info = {
+                    "original_rewards": final_rewards.squeeze(),
+                    "shaped_rewards": rewards.squeeze(),
+                    "s_interest": current_s_interest,
+                }
+                final_rewards = rewards.squeeze()
+            else:
+                final_rewards = (rewards_iron + rewards_gold) * self.num_agents # (N,)
+                info = {}
+
+            info["mining_gold"] = rewards_gold * self.num_agents
 
         # if self.shared_rewards:
         #     total_rewards = jnp.sum(rewards_iron + rewards_gold)  # Scalar
@@ -765,13 +781,14 @@ class CoopMining(MultiAgentEnv):
         done_dict = {f"{i}": reset_outer for i in range(self.num_agents)}
         done_dict["__all__"] = reset_outer
 
-        # 11) Observations
-        obs = self._get_obs(new_state)
+        with jax.named_scope("observation"):
+            # 11) Observations
+            obs = self._get_obs(new_state)
 
         # 12) Info
         # info = {}
 
-        return obs, new_state, final_rewards, done_dict, info
+        return obs, new_state, final_rewards, done_dict, self.select_info(info)
 
     def regrow_ore_vectorized(self, items: jnp.ndarray, rng_iron, rng_gold) -> jnp.ndarray:
         # def regrow_ore_vectorized(self, items: jnp.ndarray, rng_iron, rng_gold, occupied: jnp.ndarray) -> jnp.ndarray:
@@ -793,6 +810,155 @@ class CoopMining(MultiAgentEnv):
         return new_item
 
     def vectorized_mining(self, new_locs, mine_flags, state):
+        """
+        Resolve all agents' mine actions as if applied one agent at a time,
+        in agent order, then run down the gold partnership windows.
+
+        ``batched_mining`` and ``sequential_mining`` give identical results;
+        the batched one needs every gold registry to fill up to
+        ``min_gold_miners`` before it overflows, so other configurations
+        fall back to the sequential scan.
+        """
+        if 1 <= self.min_gold_miners <= self.max_miners:
+            mined = self.batched_mining(new_locs, mine_flags, state)
+        else:
+            mined = self.sequential_mining(new_locs, mine_flags, state)
+        (final_positions, final_iron_rewards, final_gold_rewards,
+         final_grid, final_ore_miners, final_partial_cd) = mined
+
+        # Decrement partial gold timer
+        final_partial_cd = jnp.maximum(final_partial_cd - 1, 0)
+
+        # Expire the coordination window: a cell sitting in gold_partial whose
+        # countdown has run out reverts to a fresh gold_ore and its miner
+        # registry is cleared, so late/solo miners can't finalize off stale IDs.
+        expired = (final_grid == Items.gold_partial) & (final_partial_cd == 0)
+        final_grid = jnp.where(expired, Items.gold_ore, final_grid)
+        final_ore_miners = jnp.where(
+            expired[..., None],
+            -1 * jnp.ones_like(final_ore_miners),
+            final_ore_miners
+        )
+
+        return (final_positions,
+                final_iron_rewards,
+                final_gold_rewards,
+                final_grid,
+                final_ore_miners,
+                final_partial_cd)
+
+    def batched_mining(self, new_locs, mine_flags, state):
+        """
+        All beams at once. A beam hits the first ore in front of the agent
+        that no lower-index agent removed (mined iron or finalized gold)
+        earlier in the step. Who removes which cell is iterated to a fixed
+        point, which takes one or two passes in practice; by induction on
+        the agent index it needs at most num_agents + 1.
+        """
+        num_agents = self.num_agents
+        num_cols = self.GRID_SIZE_COL
+        num_cells = self.GRID_SIZE_ROW * num_cols
+        agent_idx = jnp.arange(num_agents)
+
+        # every beam cell of every agent in one gather; off-map is a wall
+        beams = new_locs[:, None, :2] + self._beam_offsets[new_locs[:, 2]]  # (N, range, 2)
+        on_map = ((beams >= 0) & (beams < jnp.array(self.grid_shape))).all(-1)
+        rows = jnp.clip(beams[..., 0], 0, self.GRID_SIZE_ROW - 1)
+        cols = jnp.clip(beams[..., 1], 0, num_cols - 1)
+        items = jnp.where(on_map, state.grid[rows, cols], Items.wall)
+        cells = jnp.where(on_map, rows * num_cols + cols, num_cells)
+
+        ore_items = jnp.array([Items.iron_ore, Items.gold_ore, Items.gold_partial], dtype=jnp.int32)
+        in_sight = jnp.cumsum(items == Items.wall, axis=1) == 0
+        ore = jnp.isin(items, ore_items) & in_sight & mine_flags[:, None]
+
+        # registries, flattened over cells with a spare all-empty row for
+        # agents that hit nothing
+        miners = jnp.concatenate([
+            state.ore_miners.reshape(num_cells, self.max_miners),
+            -1 * jnp.ones((1, self.max_miners), dtype=state.ore_miners.dtype),
+        ])
+        num_prior = jnp.sum(miners >= 0, axis=-1)
+
+        def targets(removed_by):
+            hit = ore & (removed_by[cells] >= agent_idx[:, None])
+            return jnp.where(hit.any(axis=1), jnp.argmax(hit, axis=1), -1)
+
+        def resolve(step):
+            has_target = step >= 0
+            target = jnp.where(has_target, cells[agent_idx, step], num_cells)
+            item = jnp.where(has_target, items[agent_idx, step], Items.empty)
+            is_iron = item == Items.iron_ore
+            is_gold = (item == Items.gold_ore) | (item == Items.gold_partial)
+
+            # gold: agents not yet in the cell's registry join it in agent
+            # order; the one that brings it to min_gold_miners finalizes
+            is_new = is_gold & ~jnp.any(miners[target] == agent_idx[:, None], axis=-1)
+            earlier = (target[:, None] == target[None, :]) & (agent_idx[None, :] < agent_idx[:, None])
+            rank = jnp.sum(earlier & is_new[None, :], axis=1)
+            finalizes = is_new & (num_prior[target] + rank + 1 == self.min_gold_miners)
+
+            removes = is_iron | finalizes
+            removed_by = jnp.full(num_cells + 1, num_agents).at[
+                jnp.where(removes, target, num_cells)
+            ].min(agent_idx)
+            removed_by = removed_by.at[num_cells].set(num_agents)
+            return target, item, is_iron, is_gold, is_new, rank, finalizes, removed_by
+
+        def not_converged(carry):
+            return carry[1]
+
+        def refine(carry):
+            step, _ = carry
+            new_step = targets(resolve(step)[-1])
+            return new_step, jnp.any(new_step != step)
+
+        step = targets(jnp.full(num_cells + 1, num_agents))
+        step, _ = jax.lax.while_loop(not_converged, refine, (step, jnp.array(True)))
+        target, item, is_iron, is_gold, is_new, rank, finalizes, _ = resolve(step)
+        has_target = step >= 0
+
+        positions = jnp.where(
+            has_target[:, None], beams[agent_idx, jnp.maximum(step, 0)], -1
+        ).astype(jnp.int32)
+        iron_rewards = jnp.where(is_iron, self.iron_reward, 0.0).astype(jnp.float32)
+        gold_rewards = jnp.where(finalizes, self.gold_reward, 0.0).astype(jnp.float32)
+
+        finalized = jnp.zeros(num_cells + 1, dtype=bool).at[target].max(finalizes)
+        num_hits = jax.ops.segment_sum(has_target.astype(jnp.int32), target, num_cells + 1)
+
+        # mined iron and finalized gold wait for regrowth, other gold is
+        # left partially mined
+        new_item = jnp.where(is_iron | finalized[target], Items.ore_wait, Items.gold_partial)
+        grid = state.grid.reshape(-1).at[target].set(
+            new_item.astype(state.grid.dtype), mode="drop"
+        ).reshape(state.grid.shape)
+
+        # new gold miners take the free registry slots in agent order;
+        # finalized registries are cleared
+        free = miners[target] < 0
+        slot = jnp.argmax(free & (jnp.cumsum(free, axis=-1) == rank[:, None] + 1), axis=-1)
+        joins = is_new & ~finalized[target]
+        miners = miners.at[jnp.where(joins, target, num_cells), slot].set(agent_idx.astype(miners.dtype))
+        miners = jnp.where(finalized[:, None], -1, miners)
+        ore_miners = miners[:num_cells].reshape(state.ore_miners.shape)
+
+        # the window opens when a fresh gold_ore is first mined, and closes
+        # when the cell finalizes, unless that was its only miner
+        old_cd = state.partial_ore_countdown.reshape(-1)
+        fresh_gold = item == Items.gold_ore
+        new_cd = jnp.where(
+            finalized[target],
+            jnp.where(fresh_gold & (num_hits[target] == 1), self.partial_window, 0),
+            jnp.where(fresh_gold, self.partial_window, old_cd[jnp.minimum(target, num_cells - 1)]),
+        )
+        partial_cd = old_cd.at[jnp.where(is_gold, target, num_cells)].set(
+            new_cd.astype(old_cd.dtype), mode="drop"
+        ).reshape(state.partial_ore_countdown.shape)
+
+        return (positions, iron_rewards, gold_rewards, grid, ore_miners, partial_cd)
+
+    def sequential_mining(self, new_locs, mine_flags, state):
         """Fix concurrency by updating the environment after each agent's mining."""
 
         def mine_one_agent(agent_idx, carry):
@@ -832,13 +998,13 @@ class CoopMining(MultiAgentEnv):
                 new_miners = jnp.where(
                     already_in | (free_slot >= self.max_miners),
                     miners,
-                    miners.at[free_slot].set(agent_id)
+                    miners.at[free_slot].set(agent_id.astype(miners.dtype))
                 )
                 return new_miners
 
             old_miners = jnp.where(in_bounds,
                                    ore_miners[pos[0], pos[1]],
-                                   -1 * jnp.ones(self.max_miners, dtype=jnp.int32))
+                                   -1 * jnp.ones(self.max_miners, dtype=ore_miners.dtype))
             new_miners = jax.lax.cond(
                 mining_gold,
                 lambda: insert_miner(old_miners, agent_idx),
@@ -918,20 +1084,6 @@ class CoopMining(MultiAgentEnv):
         (final_grid, final_ore_miners, final_partial_cd,
          final_positions, final_iron_rewards, final_gold_rewards) = final_carry
 
-        # Decrement partial gold timer
-        final_partial_cd = jnp.maximum(final_partial_cd - 1, 0)
-
-        # Expire the coordination window: a cell sitting in gold_partial whose
-        # countdown has run out reverts to a fresh gold_ore and its miner
-        # registry is cleared, so late/solo miners can't finalize off stale IDs.
-        expired = (final_grid == Items.gold_partial) & (final_partial_cd == 0)
-        final_grid = jnp.where(expired, Items.gold_ore, final_grid)
-        final_ore_miners = jnp.where(
-            expired[..., None],
-            -1 * jnp.ones_like(final_ore_miners),
-            final_ore_miners
-        )
-
         return (final_positions,
                 final_iron_rewards,
                 final_gold_rewards,
@@ -999,6 +1151,10 @@ class CoopMining(MultiAgentEnv):
         final_obs = jnp.concatenate([item_oh, me, other, angle_oh], axis=-1)  # (A, H, W, final_depth)
         return final_obs
 
+    def get_obs(self, state: State) -> jnp.ndarray:
+        """Observations of all agents in `state`, as returned by reset and step."""
+        return self._get_obs(state)
+
     def _get_obs(self, state: State) -> jnp.ndarray:
         """
         A new observation function that:
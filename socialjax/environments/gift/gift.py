@@ -11,7 +11,9 @@ from flax.struct import dataclass
 import colorsys
 
 from socialjax.environments.movement import resolve_movement
-from socialjax.environments.multi_agent_env import MultiAgentEnv
+from socialjax.environments.observation import compact_obs_encoding, egocentric_obs, obs_window_origin
+from socialjax.environments.rendering import GridRenderer
+from socialjax.environments.multi_agent_env import MultiAgentEnv, counter_dtype
 from socialjax.environments import spaces
 
 
@@ -40,7 +42,6 @@ class State:
     grid: jnp.ndarray
 
     freeze: jnp.ndarray
-    coins_position: jnp.ndarray
     agents_bag: jnp.ndarray
     smooth_rewards: jnp.ndarray
 
@@ -189,6 +190,8 @@ class Gift(MultiAgentEnv):
         grid_size=(25,27),
         obs_size=11,
         cnn=True,
+        obs_format="full",
+        info_level="full",
         map_ASCII = [
             "TTTTTTTTTTTTTTTTTTTTTTTTT",
             "TPTTTTTTTTTPTTTTTPTTTTTPT",
@@ -218,17 +221,24 @@ class Gift(MultiAgentEnv):
         ],
     ):
 
-        super().__init__(num_agents=num_agents)
+        super().__init__(num_agents=num_agents, info_level=info_level)
         self.agents = list(range(num_agents))#, dtype=jnp.int16)
         self._agents = jnp.array(self.agents, dtype=jnp.int16) + len(Items)
+        self._renderer = None  # tile-atlas GridRenderer, built on first render
         self.num_inner_steps = num_inner_steps
         self.num_outer_steps = num_outer_steps
+        self._counter_dtype = counter_dtype(max(num_inner_steps, num_outer_steps))
 
         # self.agents = [str(i) for i in list(range(num_agents))]
 
         self.payoff_matrix = payoff_matrix
         self.shared_rewards = shared_rewards
         self.cnn = cnn
+        if obs_format not in ("full", "compact"):
+            raise ValueError(f"obs_format must be 'full' or 'compact', got {obs_format!r}")
+        self.obs_format = obs_format
+        if obs_format == "compact":
+            self.obs_encoding = compact_obs_encoding(len(Items), (len(Items)-1) + 10)
 
         self.inequity_aversion = inequity_aversion
         self.inequity_aversion_target_agents = inequity_aversion_target_agents
@@ -283,211 +293,6 @@ class Gift(MultiAgentEnv):
 
         
        
-        def combine_channels(
-                grid: jnp.ndarray,
-                agent: int,
-                angles: jnp.ndarray,
-                agent_pickups: jnp.ndarray,
-                state: State,
-            ):
-            '''
-            Function to enforce symmetry in observations & generate final
-            feature representation; current agent is permuted to first 
-            position in the feature dimension.
-            
-            Args:
-                - grid: jax ndarray of current agent's obs grid
-                - agent: int, an index indicating current agent number
-                - angles: jnp.ndarray of current agents' relative orientation
-                in current agent's obs grid
-                - agent_pickups: jnp.ndarray of agents able to interact
-                - state: State, the env state obj
-            Returns:
-                - grid with current agent [x] permuted to 1st position (after
-                the first 4 "Items" features, so 5th position overall) in the
-                feature dimension, "other" [x] agent 2nd, angle [x, x, x, x]
-                3rd, pick-up [x] bool 4th, inventory [x, x] 5th, frozen [x]
-                6th, for a final obs grid of shape (5, 5, 14) (additional 4
-                one-hot places for 5 possible items)
-            '''
-            def move_and_collapse(
-                    x: jnp.ndarray,
-                    angle: jnp.ndarray,
-                ) -> jnp.ndarray:
-
-                # get agent's one-hot
-                agent_element = jnp.array([jnp.int8(x[agent])])
-
-                # mask to check if any other agent exists there
-                mask = x[len(Items)-1:] > 0
-
-                # does an agent exist which is not the subject?
-                other_agent = jnp.int8(
-                    jnp.logical_and(
-                        jnp.any(mask),
-                        jnp.logical_not(
-                            agent_element
-                        )
-                    )
-                )
-
-                # what is the class of the item in cell
-                item_idx = jnp.where(
-                    x,
-                    size=1
-                )[0]
-
-                # check if agent is frozen and can observe inventories
-                show_inv_bool = jnp.logical_and(
-                        state.freeze[
-                            agent-len(Items)
-                        ].max(axis=-1) > 0,
-                        item_idx >= len(Items)
-                )
-
-                show_inv_idxs = jnp.where(
-                    state.freeze[agent],
-                    size=12, # since, in a setting where simultaneous interac-
-                    fill_value=-1 # -tions can happen, only a max of 12 can
-                )[0] # happen at once (zap logic), regardless of pop size
-
-                inv_to_show = jnp.where(
-                    jnp.logical_or(
-                        jnp.logical_and(
-                            show_inv_bool,
-                            jnp.isin(item_idx-len(Items), show_inv_idxs),
-                        ),
-                        agent_element
-                    ),
-                    state.agent_invs[item_idx - len(Items)],
-                    jnp.array([0, 0], dtype=jnp.int8)
-                )[0]
-
-                # check if agent is not the subject & is frozen & therefore
-                # not possible to interact with
-                frozen = jnp.where(
-                    other_agent,
-                    state.freeze[
-                        item_idx-len(Items)
-                    ].max(axis=-1) > 0,
-                    0
-                )
-
-                # get pickup/inv info
-                pick_up_idx = jnp.where(
-                    jnp.any(mask),
-                    jnp.nonzero(mask, size=1)[0],
-                    jnp.int8(-1)
-                )
-                picked_up = jnp.where(
-                    pick_up_idx > -1,
-                    agent_pickups[pick_up_idx],
-                    jnp.int8(0)
-                )
-
-                # build extension
-                extension = jnp.concatenate(
-                    [
-                        agent_element,
-                        other_agent,
-                        angle,
-                        picked_up,
-                        inv_to_show,
-                        frozen
-                    ],
-                    axis=-1
-                )
-
-                # build final feature vector
-                final_vec = jnp.concatenate(
-                    [x[:len(Items)-1], extension],
-                    axis=-1
-                )
-
-                return final_vec
-
-            new_grid = jax.vmap(
-                jax.vmap(
-                    move_and_collapse
-                )
-            )(grid, angles)
-            return new_grid
-        
-        def check_relative_orientation(
-                agent: int,
-                agent_locs: jnp.ndarray,
-                grid: jnp.ndarray
-            ) -> jnp.ndarray:
-            '''
-            Check's relative orientations of all other agents in view of
-            current agent.
-            
-            Args:
-                - agent: int, an index indicating current agent number
-                - agent_locs: jax ndarray of agent locations (x, y, direction)
-                - grid: jax ndarray of current agent's obs grid
-                
-            Returns:
-                - grid with 1) int -1 in places where no agent exists, or
-                where the agent is the current agent, and 2) int in range
-                0-3 in cells of opposing agents indicating relative
-                orientation to current agent.
-            '''
-            # we decrement by num of Items when indexing as we incremented by
-            # 5 in constructor call (due to 5 non-agent Items enum & locations
-            # are indexed from 0)
-            idx = agent - len(Items)
-            agents = jnp.delete(
-                self._agents,
-                idx,
-                assume_unique_indices=True
-            )
-            curr_agent_dir = agent_locs[idx, 2]
-
-            def calc_relative_direction(cell):
-                cell_agent = cell - len(Items)
-                cell_direction = agent_locs[cell_agent, 2]
-                return (cell_direction - curr_agent_dir) % 4
-
-            angle = jnp.where(
-                jnp.isin(grid, agents),
-                jax.vmap(calc_relative_direction)(grid),
-                -1
-            )
-
-            return angle
-        
-        def rotate_grid(agent_loc: jnp.ndarray, grid: jnp.ndarray) -> jnp.ndarray:
-            '''
-            Rotates agent's observation grid k * 90 degrees, depending on agent's
-            orientation.
-
-            Args:
-                - agent_loc: jax ndarray of agent's x, y, direction
-                - grid: jax ndarray of agent's obs grid
-
-            Returns:
-                - jnp.ndarray of new rotated grid.
-
-            '''
-            grid = jnp.where(
-                agent_loc[2] == 1,
-                jnp.rot90(grid, k=1, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 2,
-                jnp.rot90(grid, k=2, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 3,
-                jnp.rot90(grid, k=3, axes=(0, 1)),
-                grid,
-            )
-
-            return grid
-
         def _get_obs_point(agent_loc: jnp.ndarray) -> jnp.ndarray:
             '''
             Obtain the position of top-left corner of obs map using
@@ -498,101 +303,40 @@ class Gift(MultiAgentEnv):
             Returns:
                 - x, y: ints of top-left corner of agent's obs map.
             '''
-            
-            x, y, direction = agent_loc
-
-            x, y = x + self.PADDING, y + self.PADDING
-
-            x = x - (self.OBS_SIZE // 2)
-            y = y - (self.OBS_SIZE // 2)
-
-            x = jnp.where(direction == 0, x + (self.OBS_SIZE//2)-1, x)
-            y = jnp.where(direction == 0, y, y)
-
-            x = jnp.where(direction == 1, x, x)
-            y = jnp.where(direction == 1, y + (self.OBS_SIZE//2)-1, y)
+            return obs_window_origin(agent_loc, self.OBS_SIZE, self.PADDING)
 
-
-            x = jnp.where(direction == 2, x - (self.OBS_SIZE//2)+1, x)
-            y = jnp.where(direction == 2, y, y)
-
-
-            x = jnp.where(direction == 3, x, x)
-            y = jnp.where(direction == 3, y - (self.OBS_SIZE//2)+1, y)
-
-            return x, y
-
-        def _get_obs(state: State) -> jnp.ndarray:
+        def _get_obs(state: State, agents=None) -> jnp.ndarray:
             '''
             Obtain the agent's observation of the grid.
 
             Args: 
                 - state: State object containing env state.
+                - agents: optional indices of the observing agents, all by default.
             Returns:
                 - jnp.ndarray of grid observation.
             '''
-            # create state
-            grid = jnp.pad(
-                state.grid,
-                ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)),
-                constant_values=Items.wall,
-            )
-
-            # obtain all agent obs-points
-            agent_start_idxs = jax.vmap(_get_obs_point)(state.agent_locs)
-
-            dynamic_slice = partial(
-                jax.lax.dynamic_slice,
-                operand=grid,
-                slice_sizes=(self.OBS_SIZE, self.OBS_SIZE)
-            )
-
-            # obtain agent obs grids
-            grids = jax.vmap(dynamic_slice)(start_indices=agent_start_idxs)
-
-            # rotate agent obs grids
-            grids = jax.vmap(rotate_grid)(state.agent_locs, grids)
-
-            angles = jax.vmap(
-                check_relative_orientation,
-                in_axes=(0, None, 0)
-            )(
-                self._agents,
-                state.agent_locs,
-                grids
-            )
-
-            angles = jax.nn.one_hot(angles, 4)
-
-            # one-hot (drop first channel as its empty blocks)
-            grids = jax.nn.one_hot(
-                grids - 1,
-                num_agents + len(Items) - 1, # will be collapsed into a
-                dtype=jnp.int8 # [Items, self, other, extra features] representation
-            )
-
             # check agents that can interact
-            inventory_sum = jnp.sum(state.agent_invs, axis=-1)
-            agent_pickups = jnp.where(
-                inventory_sum > INTERACT_THRESHOLD,
-                True,
-                False
-            )
+            agent_pickups = jnp.sum(state.agent_invs, axis=-1) > INTERACT_THRESHOLD
 
-            # make index len(Item) always the current agent
-            # and sum all others into an "other" agent
-            grids = jax.vmap(
-                combine_channels,
-                in_axes=(0, 0, 0, None, None)
-            )(
-                grids,
-                self._agents,
-                angles,
-                agent_pickups,
-                state
+            return egocentric_obs(
+                state.grid,
+                state.agent_locs,
+                state.agent_invs,
+                state.freeze,
+                num_items=len(Items),
+                obs_size=self.OBS_SIZE,
+                padding=self.PADDING,
+                pad_value=Items.wall,
+                agent_extras=agent_pickups[:, None],
+                compact=self.obs_format == "compact",
+                agents=agents,
             )
 
-            return grids
+        def _get_agent_obs(state: State, agent: int) -> jnp.ndarray:
+            '''
+            Observation of a single agent; only its window is gathered.
+            '''
+            return _get_obs(state, jnp.reshape(agent, (1,)))[0]
         
         def _interact(
             key: jnp.ndarray, state: State, actions: jnp.ndarray
@@ -822,19 +566,20 @@ class Gift(MultiAgentEnv):
             actions = jnp.array(actions)
             
             # regrow coins
-            grid_coins = state.grid
-            probability = 0.0002
-            def regrow_coins(coins_loc, p):
-                new_coins = jnp.where((((grid_coins[coins_loc[0], coins_loc[1]] == Items.empty) & (p < probability))
-                                      | ((grid_coins[coins_loc[0], coins_loc[1]] == Items.coins))), 
-                                      Items.coins, Items.empty)
-                return new_coins
+            with jax.named_scope("regrowth"):
+                grid_coins = state.grid
+                probability = 0.0002
+                def regrow_coins(coins_loc, p):
+                    new_coins = jnp.where((((grid_coins[coins_loc[0], coins_loc[1]] == Items.empty) & (p < probability))
+                                          | ((grid_coins[coins_loc[0], coins_loc[1]] == Items.coins))), 
+                                          Items.coins, Items.empty)
+                    return new_coins
             
-            prob = jax.random.uniform(key, shape=(len(self.COINS_POTENTIAL),))
-            new_coins = jax.vmap(regrow_coins)(self.COINS_POTENTIAL, prob)
+                prob = jax.random.uniform(key, shape=(len(self.COINS_POTENTIAL),))
+                new_coins = jax.vmap(regrow_coins)(self.COINS_POTENTIAL, prob)
 
-            new_coins_grid = grid_coins.at[self.COINS_POTENTIAL[:, 0], self.COINS_POTENTIAL[:, 1]].set(new_coins)
-            state = state.replace(grid=new_coins_grid)
+                new_coins_grid = grid_coins.at[self.COINS_POTENTIAL[:, 0], self.COINS_POTENTIAL[:, 1]].set(new_coins)
+                state = state.replace(grid=new_coins_grid)
             
             # moving all agents
             # new_grid = state.grid.at[
@@ -848,155 +593,158 @@ class Gift(MultiAgentEnv):
             # state = state.replace(grid=new_grid)
             # state = state.replace(agent_locs=state.reborn_locs)
 
-            key, subkey = jax.random.split(key)
-            all_new_locs = jax.vmap(lambda p, a: jnp.int16(p + ROTATIONS[a]) % jnp.array([self.GRID_SIZE_ROW + 1, self.GRID_SIZE_COL + 1, 4], dtype=jnp.int16))(p=state.agent_locs, a=actions).squeeze()
+            with jax.named_scope("movement"):
+                key, subkey = jax.random.split(key)
+                all_new_locs = jax.vmap(lambda p, a: jnp.int16(p + ROTATIONS[a]) % jnp.array([self.GRID_SIZE_ROW + 1, self.GRID_SIZE_COL + 1, 4], dtype=jnp.int16))(p=state.agent_locs, a=actions).squeeze()
 
-            agent_move = (actions == Actions.up) | (actions == Actions.down) | (actions == Actions.right) | (actions == Actions.left)
-            all_new_locs = jax.vmap(lambda m, n, p: jnp.where(m, n + STEP_MOVE[p], n))(m=agent_move, n=all_new_locs, p=actions)
+                agent_move = (actions == Actions.up) | (actions == Actions.down) | (actions == Actions.right) | (actions == Actions.left)
+                all_new_locs = jax.vmap(lambda m, n, p: jnp.where(m, n + STEP_MOVE[p], n))(m=agent_move, n=all_new_locs, p=actions)
             
-            all_new_locs = jax.vmap(
-                jnp.clip,
-                in_axes=(0, None, None)
-            )(
-                all_new_locs,
-                jnp.array([0, 0, 0], dtype=jnp.int16),
-                jnp.array(
-                    [self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1, 3],
-                    dtype=jnp.int16
-                ),
-            ).squeeze()
-
-            # Block impassable cells (anything that is not empty/coins/an
-            # agent stamp) BEFORE conflict resolution; cells currently
-            # holding an agent (grid code >= len(Items)) stay passable so
-            # trains/following can work.
-            target_cells = state.grid[all_new_locs[:, 0], all_new_locs[:, 1]]
-            blocked = ((target_cells != Items.empty) &
-                       (target_cells != Items.coins) &
-                       (target_cells < len(Items)))
-            all_new_locs = jnp.where(blocked[:, None], state.agent_locs, all_new_locs)
-
-            # Resolve agent-agent movement conflicts via the shared
-            # resolver: same-target conflicts (non-mover priority, else
-            # random winner), swaps blocked, trains allowed, cascades
-            # reverted to a fixed point. Final (row, col) unique.
-            key, move_key = jax.random.split(key)
-            new_locs = resolve_movement(move_key, state.agent_locs, all_new_locs)
-
-            # update inventories
-            def coin_matcher(p: jnp.ndarray) -> jnp.ndarray:
-                c_matches = jnp.array([
-                    state.grid[p[0], p[1]] == Items.coins
-                    ])
-                return c_matches
+                all_new_locs = jax.vmap(
+                    jnp.clip,
+                    in_axes=(0, None, None)
+                )(
+                    all_new_locs,
+                    jnp.array([0, 0, 0], dtype=jnp.int16),
+                    jnp.array(
+                        [self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1, 3],
+                        dtype=jnp.int16
+                    ),
+                ).squeeze()
+
+                # Block impassable cells (anything that is not empty/coins/an
+                # agent stamp) BEFORE conflict resolution; cells currently
+                # holding an agent (grid code >= len(Items)) stay passable so
+                # trains/following can work.
+                target_cells = state.grid[all_new_locs[:, 0], all_new_locs[:, 1]]
+                blocked = ((target_cells != Items.empty) &
+                           (target_cells != Items.coins) &
+                           (target_cells < len(Items)))
+                all_new_locs = jnp.where(blocked[:, None], state.agent_locs, all_new_locs)
+
+                # Resolve agent-agent movement conflicts via the shared
+                # resolver: same-target conflicts (non-mover priority, else
+                # random winner), swaps blocked, trains allowed, cascades
+                # reverted to a fixed point. Final (row, col) unique.
+                key, move_key = jax.random.split(key)
+                new_locs = resolve_movement(move_key, state.agent_locs, all_new_locs)
+
+                # update inventories
+                def coin_matcher(p: jnp.ndarray) -> jnp.ndarray:
+                    c_matches = jnp.array([
+                        state.grid[p[0], p[1]] == Items.coins
+                        ])
+                    return c_matches
             
-            coins_matches = jax.vmap(coin_matcher)(new_locs)
-            coins_matches = jnp.where(state.agents_bag[0, :] >= 15, 0, coins_matches.squeeze())
-            bag = state.agents_bag
-            bag = bag.at[0, :].set(bag[0,:] + coins_matches.squeeze())
-            state = state.replace(agents_bag=bag)
-
-            # update grid
-            old_grid = state.grid
-
-            new_grid = old_grid.at[
-                state.agent_locs[:, 0],
-                state.agent_locs[:, 1]
-            ].set(
-                jnp.int16(Items.empty)
-            )
-            x, y = new_locs[:, 0], new_locs[:, 1]
-            new_grid = new_grid.at[x, y].set(self._agents)
-            state = state.replace(grid=new_grid)
+                coins_matches = jax.vmap(coin_matcher)(new_locs)
+                coins_matches = jnp.where(state.agents_bag[0, :] >= 15, 0, coins_matches.squeeze())
+                bag = state.agents_bag
+                bag = bag.at[0, :].set(bag[0,:] + coins_matches.squeeze())
+                state = state.replace(agents_bag=bag)
+
+                # update grid
+                old_grid = state.grid
+
+                new_grid = old_grid.at[
+                    state.agent_locs[:, 0],
+                    state.agent_locs[:, 1]
+                ].set(
+                    jnp.int16(Items.empty)
+                )
+                x, y = new_locs[:, 0], new_locs[:, 1]
+                new_grid = new_grid.at[x, y].set(self._agents)
+                state = state.replace(grid=new_grid)
 
 
-            # update agent locations
-            state = state.replace(agent_locs=new_locs)
+                # update agent locations
+                state = state.replace(agent_locs=new_locs)
 
-            state = _interact(key, state, actions)
+            with jax.named_scope("interaction"):
+                state = _interact(key, state, actions)
 
-            level_two_and_three_tokens = jnp.zeros((self.num_agents, 1))
-            level_two_and_three_tokens = jnp.where(True, jnp.sum(state.agents_bag[1:, :]), level_two_and_three_tokens).squeeze()
+            with jax.named_scope("rewards"):
+                level_two_and_three_tokens = jnp.zeros((self.num_agents, 1))
+                level_two_and_three_tokens = jnp.where(True, jnp.sum(state.agents_bag[1:, :]), level_two_and_three_tokens).squeeze()
 
-            comsume_bag = state.agents_bag.transpose()
+                comsume_bag = state.agents_bag.transpose()
 
-            def renew_reward(single_bag, action):
-                return jnp.where(action == Actions.comsume, jnp.sum(single_bag), 0)
+                def renew_reward(single_bag, action):
+                    return jnp.where(action == Actions.comsume, jnp.sum(single_bag), 0)
             
-            rewards = jax.vmap(renew_reward)(comsume_bag, actions)
+                rewards = jax.vmap(renew_reward)(comsume_bag, actions)
             
-            def renew_bag(bag, action):
-                return jnp.where(action != Actions.comsume, bag, jnp.zeros(3, dtype=jnp.int16))
+                def renew_bag(bag, action):
+                    return jnp.where(action != Actions.comsume, bag, jnp.zeros(3, dtype=jnp.int16))
             
-            comsume_bag = jax.vmap(renew_bag)(comsume_bag, actions)
-
-            new_bag = comsume_bag.transpose()
-            state = state.replace(agents_bag=new_bag)
-
-            if self.shared_rewards:
-                rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
-                rewards = jnp.sum(rewards)
-                rewards_sum_all_agents += rewards
-                rewards = rewards_sum_all_agents
-                info = {
-                    "original_rewards": rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.inequity_aversion:
-                original_rewards = rewards * self.num_agents
-                if self.smooth_rewards:
-                    should_smooth = (state.inner_t % 1) == 0
-                    new_smooth_rewards = 0.99 * 0.99* state.smooth_rewards + original_rewards
-                    rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(new_smooth_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
-                    state = state.replace(smooth_rewards=new_smooth_rewards)
+                comsume_bag = jax.vmap(renew_bag)(comsume_bag, actions)
+
+                new_bag = comsume_bag.transpose()
+                state = state.replace(agents_bag=new_bag)
+
+                if self.shared_rewards:
+                    rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
+                    rewards = jnp.sum(rewards)
+                    rewards_sum_all_agents += rewards
+                    rewards = rewards_sum_all_agents
                     info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "smooth_rewards": state.smooth_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-                else:
-                    rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(original_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        "original_rewards": rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.inequity_aversion:
+                    original_rewards = rewards * self.num_agents
+                    if self.smooth_rewards:
+                        should_smooth = (state.inner_t % 1) == 0
+                        new_smooth_rewards = 0.99 * 0.99* state.smooth_rewards + original_rewards
+                        rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(new_smooth_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        state = state.replace(smooth_rewards=new_smooth_rewards)
+                        info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "smooth_rewards": state.smooth_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                    else:
+                        rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(original_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.svo:
+                    original_rewards = rewards * self.num_agents
+                    rewards, theta = self.get_svo_rewards(
+                        original_rewards.reshape(self.num_agents, 1),
+                        self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents,
+                    )
+                    rewards = rewards.squeeze()
                     info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.svo:
-                original_rewards = rewards * self.num_agents
-                rewards, theta = self.get_svo_rewards(
-                    original_rewards.reshape(self.num_agents, 1),
-                    self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents,
-                )
-                rewards = rewards.squeeze()
-                info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "svo_theta": theta.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.interest:
-                original_rewards = rewards * self.num_agents
-
-                # Calculate current s_interest based on timestep
-                current_s_interest = get_current_s_interest(timestep)
-                original_flat = original_rewards.squeeze()
-
-                # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
-                total_reward = jnp.sum(original_flat)
-                others_reward = total_reward - original_flat  # sum of all other agents' rewards
-
-                rewards = (current_s_interest * original_flat +
-                        (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
-
-                info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                    "s_interest": current_s_interest,
-                }
-            else:
-                rewards = rewards * self.num_agents
-                info = {}
-
-            info["give_actions"] = jnp.where(actions == Actions.zap_forward, 1, 0).squeeze()
-            info["level_two_and_three_tokens"] = level_two_and_three_tokens.squeeze() * 10
+                        "original_rewards": original_rewards.squeeze(),
+                        "svo_theta": theta.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.interest:
+                    original_rewards = rewards * self.num_agents
+
+                    # Calculate current s_interest based on timestep
+                    current_s_interest = get_current_s_interest(timestep)
+                    original_flat = original_rewards.squeeze()
+
+                    # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
+                    total_reward = jnp.sum(original_flat)
+                    others_reward = total_reward - original_flat  # sum of all other agents' rewards
+
+                    rewards = (current_s_interest * original_flat +
+                            (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
+
+                    info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                        "s_interest": current_s_interest,
+                    }
+                else:
+                    rewards = rewards * self.num_agents
+                    info = {}
+
+                info["give_actions"] = jnp.where(actions == Actions.zap_forward, 1, 0).squeeze()
+                info["level_two_and_three_tokens"] = level_two_and_three_tokens.squeeze() * 10
 
             # if self.shared_rewards:
             #     rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
@@ -1014,7 +762,6 @@ class Gift(MultiAgentEnv):
                 outer_t=state.outer_t,
                 grid=state.grid,
                 freeze=state.freeze,
-                coins_position=state.coins_position,
                 agents_bag=state.agents_bag,
                 smooth_rewards=state.smooth_rewards,
 
@@ -1027,21 +774,16 @@ class Gift(MultiAgentEnv):
             reset_inner = inner_t == num_inner_steps
 
             # if inner episode is done, return start state for next game
-            state_re = _reset_state(key)
-
-            state_re = state_re.replace(outer_t=outer_t + 1)
-            state = jax.tree.map(
-                lambda x, y: jnp.where(reset_inner, x, y),
-                state_re,
-                state_nxt,
-            )
+            with jax.named_scope("episode_reset"):
+                state = self.inner_reset(key, reset_inner, _reset_state, state_nxt)
             outer_t = state.outer_t
             reset_outer = outer_t == num_outer_steps
             done = {f'{a}': reset_outer for a in self.agents}
             # done = [reset_outer for _ in self.agents]
             done["__all__"] = reset_outer
 
-            obs = _get_obs(state)
+            with jax.named_scope("observation"):
+                obs = _get_obs(state)
             rewards = jnp.where(
                 reset_inner,
                 jnp.zeros_like(rewards, dtype=jnp.int16),
@@ -1054,7 +796,7 @@ class Gift(MultiAgentEnv):
                 state,
                 rewards.squeeze(),
                 done,
-                info,
+                self.select_info(info),
             )
         
 
@@ -1104,20 +846,19 @@ class Gift(MultiAgentEnv):
 
             freeze = jnp.array(
                 [[-1]*num_agents]*num_agents,
-            dtype=jnp.int16
+            dtype=jnp.int8
             )
 
 
             return State(
                 agent_locs=agent_locs,
                 agent_invs=jnp.array([(0,0)]*num_agents, dtype=jnp.int8),
-                inner_t=0,
-                outer_t=0,
+                inner_t=jnp.zeros((), self._counter_dtype),
+                outer_t=jnp.zeros((), self._counter_dtype),
                 grid=grid,
                 freeze=freeze,
-                coins_position=self.SPAWNS_PLAYERS,
                 agents_bag=agents_bag,
-                smooth_rewards = jnp.zeros((num_agents, 1), dtype=jnp.float32),
+                smooth_rewards = jnp.zeros((num_agents, 1 if self.smooth_rewards else 0), dtype=jnp.float32),
             )
 
         def reset(
@@ -1140,6 +881,10 @@ class Gift(MultiAgentEnv):
             self.get_obs_point = _get_obs_point
         ################################################################################
 
+        # exposed for MultiAgentEnv.step(reset_state=...) and speed_test/benchmark_suite.py
+        self.get_obs = jax.jit(_get_obs)
+        self.get_agent_obs = jax.jit(_get_agent_obs)
+
     @property
     def name(self) -> str:
         """Environment name."""
@@ -1164,6 +909,14 @@ class Gift(MultiAgentEnv):
             else (self.OBS_SIZE**2 * ((len(Items)-1) + 10),)
         )
 
+        if self.obs_format == "compact":
+            channels = self.obs_encoding[1]
+            _shape_obs = (
+                (self.OBS_SIZE, self.OBS_SIZE, channels)
+                if self.cnn
+                else (self.OBS_SIZE**2 * channels,)
+            )
+
         return spaces.Box(
                 low=0, high=1E9, shape=_shape_obs, dtype=jnp.uint8
             ), _shape_obs
@@ -1283,77 +1036,26 @@ class Gift(MultiAgentEnv):
         :param r: target renderer object
         :param tile_size: tile size in pixels
         """
-        tile_size = 32
-        highlight_mask = onp.zeros_like(onp.array(self.GRID))
+        return onp.asarray(self.renderer.render(state))
 
-        # Compute the total grid size
-        width_px = self.GRID.shape[1] * tile_size
-        height_px = self.GRID.shape[0] * tile_size
+    def render_batch(self, states: State) -> jnp.ndarray:
+        """
+        Render a batch of states (leading batch axis on every field) in one
+        jitted call; returns uint8 frames of shape (B, H, W, 3).
+        """
+        return self.renderer.render_batch(states)
 
-        img = onp.zeros(shape=(height_px, width_px, 3), dtype=onp.uint8)
-        grid = onp.array(state.grid)
-        
-        grid = onp.pad(
-            grid, ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)), constant_values=Items.wall
-        )
-        for a in range(self.num_agents):
-            startx, starty = self.get_obs_point(
-                state.agent_locs[a]
+    @property
+    def renderer(self) -> GridRenderer:
+        """Jittable tile-atlas renderer, built on first use."""
+        if self._renderer is None:
+            self._renderer = GridRenderer(
+                self,
+                values=list(range(len(Items))) + list(onp.asarray(self._agents)),
+                pad_value=Items.wall,
+                tile_size=32,
             )
-            highlight_mask[
-                startx : startx + self.OBS_SIZE, starty : starty + self.OBS_SIZE
-            ] = True
-
-        # Render the grid
-        for j in range(0, grid.shape[1]):
-            for i in range(0, grid.shape[0]):
-                cell = grid[i, j]
-                if cell == 0:
-                    cell = None
-                agent_here = []
-                for a in self._agents:
-                    agent_here.append(cell == a)
-                # if cell in [1,2]:
-                #     print(f'coordinates: {i},{j}')
-                #     print(cell)
-
-                agent_dir = None
-                for a in range(self.num_agents):
-                    agent_dir = (
-                        state.agent_locs[a,2].item()
-                        if agent_here[a]
-                        else agent_dir
-                    )
-                
-                agent_hat = False
-
-
-                tile_img = self.render_tile(
-                    cell,
-                    agent_dir=agent_dir,
-                    agent_hat=agent_hat,
-                    highlight=highlight_mask[i, j],
-                    tile_size=tile_size,
-                )
-
-                ymin = i * tile_size
-                ymax = (i + 1) * tile_size
-                xmin = j * tile_size
-                xmax = (j + 1) * tile_size
-                img[ymin:ymax, xmin:xmax, :] = tile_img
-        img = onp.rot90(
-            img[
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                :,
-            ],
-            2,
-        )
-
-        # time = self.render_time(state, img.shape[1])
-        # img = onp.concatenate((img, *agent_inv, time), axis=0)
-        # img = onp.concatenate((img, time), axis=0)
-        return img
+        return self._renderer
 
 
     def render_time(self, state, width_px) -> onp.array:
@@ -0,0 +1,47 @@
+"""Shared, jit-safe resolution of conflicting interaction (zap) targets.
+
+When several agents' interaction beams catch the same agent in one step, one
+of them is chosen uniformly at random to interact and the others come back
+empty-handed. Each agent draws one random priority (a single
+``jax.random.permutation``, as in ``movement.py``) and a segment-max over the
+target ids picks the highest-priority contender of every target in one pass,
+so there is no sequential dependency on the number of agents.
+
+Priorities come from one permutation, so the winners of different targets
+are independent and each is uniform over its contenders: the same joint
+distribution as resolving the conflicts one target at a time.
+"""
+
+import jax
+import jax.numpy as jnp
+
+
+def resolve_interaction_conflicts(key, targets, agent_ids, empty=0):
+    """Keep one random interaction per targeted agent.
+
+    Args:
+      key: PRNGKey, consumed by one ``jax.random.permutation`` draw; the
+        caller must pass a dedicated subkey.
+      targets: (N,) int array, the grid item each agent's interaction
+        caught (``empty`` for agents not interacting).
+      agent_ids: (N,) int array of the grid ids of the agents, contiguous
+        and increasing (``jnp.arange(N) + len(Items)`` in every env).
+      empty: grid item written for agents that lose a conflict.
+
+    Returns:
+      (N,) int16 array. Entries that are not agent ids are returned as is;
+      of all entries holding the same agent id exactly one, chosen uniformly
+      at random, is kept and the rest are set to ``empty``.
+    """
+    num_agents = targets.shape[0]
+    priority = jax.random.permutation(key, num_agents)
+
+    # non-agent targets all go to the spare segment num_agents
+    segment = targets.astype(jnp.int32) - agent_ids[0]
+    is_agent = (segment >= 0) & (segment < num_agents)
+    segment = jnp.where(is_agent, segment, num_agents)
+
+    best = jax.ops.segment_max(priority, segment, num_segments=num_agents + 1)
+    wins = priority == best[segment]
+
+    return jnp.where(is_agent & ~wins, empty, targets).astype(jnp.int16)
@@ -9,7 +9,7 @@ from flax.struct import dataclass
 
 from socialjax.environments import spaces
 from socialjax.environments.movement import resolve_movement
-from socialjax.environments.multi_agent_env import MultiAgentEnv
+from socialjax.environments.multi_agent_env import MultiAgentEnv, counter_dtype
 
 # ------------------------------------------------------------------------
 # Level-Based Foraging (LBF) Environment
@@ -39,8 +39,8 @@ class Items(IntEnum):
     empty = 0
     wall = 1
     spawn_point = 2
-    # Food levels are represented as values 10 + level (e.g., 10, 11, 12, 13 for levels 0-3)
-    # This allows us to easily extract level via: (value - 10)
+    # Food is not stored on the grid: State keeps fixed-size food_positions /
+    # food_levels arrays, so per-step cost does not depend on the grid area.
 
 
 class Actions(IntEnum):
@@ -80,7 +80,8 @@ class State:
     """LBF State - simplified from coop_mining (no orientation!)"""
     agent_positions: jnp.ndarray  # shape (num_agents, 2) => row, col only
     agent_levels: jnp.ndarray     # shape (num_agents,) => fixed level per agent
-    food_grid: jnp.ndarray        # shape (rows, cols) => 0 = no food, 10+level = food
+    food_positions: jnp.ndarray   # shape (num_food, 2) => row, col of each food slot
+    food_levels: jnp.ndarray      # shape (num_food,) => food level, 0 = no food in slot
     inner_t: int
     outer_t: int
 
@@ -150,8 +151,9 @@ class LevelBasedForaging(MultiAgentEnv):
             s_interest_change_every=30000000,
             cnn=True,
             jit=True,
+            info_level="full",
     ):
-        super().__init__(num_agents=num_agents)
+        super().__init__(num_agents=num_agents, info_level=info_level)
 
         # LBF-specific parameters
         self.grid_size = grid_size
@@ -166,6 +168,7 @@ class LevelBasedForaging(MultiAgentEnv):
         # SocialJax compatibility parameters
         self.num_inner_steps = num_inner_steps
         self.num_outer_steps = num_outer_steps
+        self._counter_dtype = counter_dtype(max(num_inner_steps, num_outer_steps))
         self.shared_rewards = shared_rewards
         self.inequity_aversion = inequity_aversion
         self.inequity_aversion_target_agents = inequity_aversion_target_agents
@@ -268,19 +271,13 @@ class LevelBasedForaging(MultiAgentEnv):
         )
 
         # 3. Spawn food items
-        food_grid = jnp.zeros(self.grid_shape, dtype=jnp.int32)
+        # One slot per food; a slot whose random cell is invalid stays empty
+        # (level 0), so the arrays keep a fixed size for JIT
+        food_positions = jnp.zeros((self.num_food, 2), dtype=jnp.int32)
+        food_levels = jnp.zeros((self.num_food,), dtype=jnp.int32)
 
-        # Pre-compute all valid positions at init time (stored in self._valid_food_positions)
-        # For JIT compatibility, we need fixed-size arrays
-        # We'll use a different approach: scatter food randomly on empty cells
-
-        # Create a flat index array for all cells
-        total_cells = self.GRID_SIZE_ROW * self.GRID_SIZE_COL
-
-        # For each food item, we'll try random positions until we find valid ones
-        # Using a scan to avoid dynamic shapes
         def place_one_food(carry, food_idx):
-            food_grid, key = carry
+            food_positions, food_levels, key = carry
 
             # Generate random position
             key, subkey = jax.random.split(key)
@@ -289,10 +286,12 @@ class LevelBasedForaging(MultiAgentEnv):
             col = jax.random.randint(subkey, (), 0, self.GRID_SIZE_COL)
 
             # Check if valid (not wall, not spawn point, not already occupied)
-            is_valid = (
-                (self._grid_base[row, col] == Items.empty) &
-                (food_grid[row, col] == 0)
+            occupied = jnp.any(
+                (food_positions[:, 0] == row) &
+                (food_positions[:, 1] == col) &
+                (food_levels > 0)
             )
+            is_valid = (self._grid_base[row, col] == Items.empty) & ~occupied
 
             # Assign random level
             key, subkey = jax.random.split(key)
@@ -302,27 +301,25 @@ class LevelBasedForaging(MultiAgentEnv):
                 level = jax.random.randint(subkey, (), 1, self.max_food_level + 1)
 
             # Place food only if valid
-            new_food_grid = jnp.where(
-                is_valid,
-                food_grid.at[row, col].set(level + 10),
-                food_grid
-            )
+            food_positions = food_positions.at[food_idx].set(jnp.stack([row, col]))
+            food_levels = food_levels.at[food_idx].set(jnp.where(is_valid, level, 0))
 
-            return (new_food_grid, key), None
+            return (food_positions, food_levels, key), None
 
         # Place all food items
-        (food_grid, key), _ = jax.lax.scan(
+        (food_positions, food_levels, key), _ = jax.lax.scan(
             place_one_food,
-            (food_grid, key),
+            (food_positions, food_levels, key),
             jnp.arange(self.num_food)
         )
 
         return State(
             agent_positions=agent_positions,
             agent_levels=agent_levels,
-            food_grid=food_grid,
-            inner_t=0,
-            outer_t=0,
+            food_positions=food_positions,
+            food_levels=food_levels,
+            inner_t=jnp.zeros((), self._counter_dtype),
+            outer_t=jnp.zeros((), self._counter_dtype),
         )
 
     def get_current_s_interest(self, timestep):
@@ -345,94 +342,101 @@ class LevelBasedForaging(MultiAgentEnv):
         """
         actions = jnp.array(actions, dtype=jnp.int32).squeeze()
 
-        # 1. Calculate intended new positions
-        old_positions = state.agent_positions  # (N, 2)
-        move_offsets = MOVE_DELTAS[actions]     # (N, 2)
-        new_positions = old_positions + move_offsets
-
-        # 2. Clip to grid bounds
-        new_positions = jnp.clip(
-            new_positions,
-            a_min=jnp.array([0, 0]),
-            a_max=jnp.array([self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1])
-        )
-
-        # 3. Check wall collisions
-        wall_mask = (self._grid_base[new_positions[:, 0], new_positions[:, 1]] == Items.wall)
-        new_positions = jnp.where(wall_mask[:, None], old_positions, new_positions)
-
-        # 4. Check food blocking (can't move onto food)
-        food_mask = (state.food_grid[new_positions[:, 0], new_positions[:, 1]] > 0)
-        new_positions = jnp.where(food_mask[:, None], old_positions, new_positions)
-
-        # 5. Resolve agent-agent conflicts (same-target random winner, swaps
-        # blocked, trains allowed; guarantees unique final cells)
-        key, move_key = jax.random.split(key)
-        final_positions = resolve_movement(move_key, old_positions, new_positions)
-
-        # 6. Process LOAD actions (food collection)
-        rewards, new_food_grid = self._process_load_actions(
-            state, final_positions, actions, key
-        )
-
-        # 7. Apply reward shaping if configured
-        if self.shared_rewards:
-            total_reward = jnp.sum(rewards)
-            final_rewards = jnp.full((self.num_agents,), total_reward)
-            shaped_rewards = final_rewards  # Set shaped_rewards
-            info = {
-                "original_rewards": final_rewards.squeeze(),
-                "shaped_rewards": final_rewards.squeeze(),
-            }
-        elif self.inequity_aversion:
-            final_rewards = rewards * self.num_agents
-            shaped_rewards, _, _ = self.get_inequity_aversion_rewards(
-                final_rewards, self.inequity_aversion_target_agents,
-                self.inequity_aversion_alpha, self.inequity_aversion_beta
+        with jax.named_scope("movement"):
+            # 1. Calculate intended new positions
+            old_positions = state.agent_positions  # (N, 2)
+            move_offsets = MOVE_DELTAS[actions]     # (N, 2)
+            new_positions = old_positions + move_offsets
+
+            # 2. Clip to grid bounds
+            new_positions = jnp.clip(
+                new_positions,
+                a_min=jnp.array([0, 0]),
+                a_max=jnp.array([self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1])
             )
-            info = {
-                "original_rewards": final_rewards.squeeze(),
-                "shaped_rewards": shaped_rewards.squeeze(),
-            }
-        elif self.svo:
-            final_rewards = rewards * self.num_agents
-            shaped_rewards, theta = self.get_svo_rewards(
-                final_rewards, self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents
+
+            # 3. Check wall collisions
+            wall_mask = (self._grid_base[new_positions[:, 0], new_positions[:, 1]] == Items.wall)
+            new_positions = jnp.where(wall_mask[:, None], old_positions, new_positions)
+
+            # 4. Check food blocking (can't move onto food)
+            on_food = jnp.all(
+                new_positions[:, None, :] == state.food_positions[None, :, :], axis=-1
+            )  # (num_agents, num_food)
+            food_mask = jnp.any(on_food & (state.food_levels > 0)[None, :], axis=1)
+            new_positions = jnp.where(food_mask[:, None], old_positions, new_positions)
+
+            # 5. Resolve agent-agent conflicts (same-target random winner, swaps
+            # blocked, trains allowed; guarantees unique final cells)
+            key, move_key = jax.random.split(key)
+            final_positions = resolve_movement(move_key, old_positions, new_positions)
+
+        with jax.named_scope("interaction"):
+            # 6. Process LOAD actions (food collection)
+            rewards, new_food_levels = self._process_load_actions(
+                state, final_positions, actions, key
             )
-            info = {
-                "original_rewards": final_rewards.squeeze(),
-                "svo_theta": theta.squeeze(),
-                "shaped_rewards": shaped_rewards.squeeze(),
-            }
-        elif self.interest:
-            final_rewards = rewards * self.num_agents
-            current_s_interest = self.get_current_s_interest(timestep)
-            total_reward = jnp.sum(final_rewards)
-            others_reward = total_reward - final_rewards
-            shaped_rewards = (current_s_interest * final_rewards +
-                            (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
-            info = {
-                "original_rewards": final_rewards.squeeze(),
-                "shaped_rewards": shaped_rewards.squeeze(),
-                "s_interest": current_s_interest,
-            }
-        else:
-            final_rewards = rewards
-            shaped_rewards = rewards
-            info = {}
+
+        with jax.named_scope("rewards"):
+            # 7. Apply reward shaping if configured
+            if self.shared_rewards:
+                total_reward = jnp.sum(rewards)
+                final_rewards = jnp.full((self.num_agents,), total_reward)
+                shaped_rewards = final_rewards  # Set shaped_rewards
+                info = {
+                    "original_rewards": final_rewards.squeeze(),
+                    "shaped_rewards": final_rewards.squeeze(),
+                }
+            elif self.inequity_aversion:
+                final_rewards = rewards * self.num_agents
+                shaped_rewards, _, _ = self.get_inequity_aversion_rewards(
+                    final_rewards, self.inequity_aversion_target_agents,
+                    self.inequity_aversion_alpha, self.inequity_aversion_beta
+                )
+                info = {
+                    "original_rewards": final_rewards.squeeze(),
+                    "shaped_rewards": shaped_rewards.squeeze(),
+                }
+            elif self.svo:
+                final_rewards = rewards * self.num_agents
+                shaped_rewards, theta = self.get_svo_rewards(
+                    final_rewards, self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents
+                )
+                info = {
+                    "original_rewards": final_rewards.squeeze(),
+                    "svo_theta": theta.squeeze(),
+                    "shaped_rewards": shaped_rewards.squeeze(),
+                }
+            elif self.interest:
+                final_rewards = rewards * self.num_agents
+                current_s_interest = self.get_current_s_interest(timestep)
+                total_reward = jnp.sum(final_rewards)
+                others_reward = total_reward - final_rewards
+                shaped_rewards = (current_s_interest * final_rewards +
+                                (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
+                info = {
+                    "original_rewards": final_rewards.squeeze(),
+                    "shaped_rewards": shaped_rewards.squeeze(),
+                    "s_interest": current_s_interest,
+                }
+            else:
+                final_rewards = rewards
+                shaped_rewards = rewards
+                info = {}
 
         # 8. Build next state
         new_state = State(
             agent_positions=final_positions,
             agent_levels=state.agent_levels,
-            food_grid=new_food_grid,
+            food_positions=state.food_positions,
+            food_levels=new_food_levels,
             inner_t=state.inner_t + 1,
             outer_t=state.outer_t,
         )
 
         # 9. Check episode termination
         # Episode ends when: (1) all food collected OR (2) max steps reached
-        all_food_collected = (jnp.sum(new_food_grid > 0) == 0)
+        all_food_collected = ~jnp.any(new_food_levels > 0)
         max_steps_reached = (new_state.inner_t >= self.num_inner_steps)
         reset_inner = all_food_collected | max_steps_reached
 
@@ -442,10 +446,11 @@ class LevelBasedForaging(MultiAgentEnv):
         done_dict = {f"{i}": reset_outer for i in range(self.num_agents)}
         done_dict["__all__"] = reset_outer
 
-        # 10. Get observations
-        obs = self._get_obs(new_state)
+        with jax.named_scope("observation"):
+            # 10. Get observations
+            obs = self._get_obs(new_state)
 
-        return obs, new_state, shaped_rewards, done_dict, info
+        return obs, new_state, shaped_rewards, done_dict, self.select_info(info)
 
     def _process_load_actions(
         self,
@@ -457,7 +462,8 @@ class LevelBasedForaging(MultiAgentEnv):
         """
         Process LOAD actions for all agents.
 
-        For each food item:
+        For each food item (all foods at once, via an agents x foods
+        adjacency matrix):
         1. Find all adjacent agents executing LOAD
         2. Check if sum(agent_levels) >= food_level
         3. If success: distribute rewards and remove food
@@ -465,100 +471,58 @@ class LevelBasedForaging(MultiAgentEnv):
 
         Returns:
             rewards: (num_agents,) array of rewards
-            new_food_grid: updated food grid
+            new_food_levels: (num_food,) food levels, 0 for collected food
         """
         # Identify agents executing LOAD action
         is_loading = (actions == Actions.LOAD)  # (num_agents,)
+        food_levels = state.food_levels
+        has_food = food_levels > 0  # (num_food,)
+
+        # Manhattan distance 1 between every agent and every food
+        agent_to_food = positions[:, None, :] - state.food_positions[None, :, :]
+        distances = jnp.abs(agent_to_food).sum(axis=-1)  # (num_agents, num_food)
+        is_adjacent = (distances == 1)
+
+        # Agents that are adjacent AND loading, for foods still present
+        participating = is_adjacent & is_loading[:, None] & has_food[None, :]
+
+        # Sum levels of participating agents per food
+        total_level = jnp.sum(
+            jnp.where(participating, state.agent_levels[:, None], 0), axis=0
+        )  # (num_food,)
+        num_participants = jnp.sum(participating, axis=0)
+        success = (total_level >= food_levels) & (num_participants > 0) & has_food
+
+        # reward_i = agent_i.level × food_level (if success)
+        individual_rewards = jnp.where(
+            participating,
+            state.agent_levels[:, None].astype(jnp.float32)
+            * food_levels[None, :].astype(jnp.float32),
+            0.0
+        )
 
-        # Initialize rewards and food grid
-        rewards = jnp.zeros((self.num_agents,), dtype=jnp.float32)
-        new_food_grid = state.food_grid.copy()
-
-        # Instead of using argwhere (which needs static size),
-        # we iterate over ALL grid cells and check if there's food
-        def process_one_cell(carry, cell_idx):
-            food_grid, agent_rewards = carry
-
-            # Convert flat index to (row, col)
-            row = cell_idx // self.GRID_SIZE_COL
-            col = cell_idx % self.GRID_SIZE_COL
-
-            # Check if this cell has food
-            has_food = food_grid[row, col] > 0
-
-            # Extract food level (or 0 if no food)
-            food_level = jnp.where(has_food, food_grid[row, col] - 10, 0)
-
-            # Find adjacent agents
-            food_pos = jnp.array([row, col])
-            agent_to_food = positions - food_pos[None, :]  # (num_agents, 2)
-            distances = jnp.abs(agent_to_food[:, 0]) + jnp.abs(agent_to_food[:, 1])
-            is_adjacent = (distances == 1)  # (num_agents,)
-
-            # Filter for agents that are BOTH adjacent AND loading
-            participating = is_adjacent & is_loading & has_food  # (num_agents,)
-
-            # Sum levels of participating agents
-            participating_levels = jnp.where(
-                participating,
-                state.agent_levels,
-                0
-            )
-            total_level = jnp.sum(participating_levels)
-
-            # Check if collection succeeds
-            num_participants = jnp.sum(participating)
-            success = (total_level >= food_level) & (num_participants > 0) & has_food
-
-            # Calculate rewards for participating agents
-            # reward_i = agent_i.level × food_level (if success)
-            individual_rewards = jnp.where(
-                participating,
-                state.agent_levels.astype(jnp.float32) * food_level.astype(jnp.float32),
-                0.0
-            )
-
-            # Apply normalization if configured
-            if self.normalize_reward:
-                # Normalize by total participating levels
-                normalization = jnp.where(
-                    success,
-                    total_level.astype(jnp.float32),
-                    1.0
-                )
-                individual_rewards = individual_rewards / normalization
-
-            # Apply rewards only if success
-            individual_rewards = jnp.where(success, individual_rewards, 0.0)
-
-            # Apply penalty if failed
-            penalty_rewards = jnp.where(
-                participating & (~success),
-                -self.load_penalty,
-                0.0
-            )
-
-            # Combine success rewards and penalties
-            total_individual_rewards = individual_rewards + penalty_rewards
-
-            # Update food grid: remove food if collected
-            new_food_val = jnp.where(success, 0, food_grid[row, col])
-            new_grid = food_grid.at[row, col].set(new_food_val)
-
-            # Accumulate rewards
-            new_rewards = agent_rewards + total_individual_rewards
+        # Apply normalization if configured
+        if self.normalize_reward:
+            # Normalize by total participating levels
+            normalization = jnp.where(success, total_level.astype(jnp.float32), 1.0)
+            individual_rewards = individual_rewards / normalization[None, :]
+
+        # Apply rewards only if success, penalty if failed
+        individual_rewards = jnp.where(success[None, :], individual_rewards, 0.0)
+        penalty_rewards = jnp.where(
+            participating & (~success[None, :]),
+            -self.load_penalty,
+            0.0
+        )
 
-            return (new_grid, new_rewards), None
+        rewards = jnp.sum(individual_rewards + penalty_rewards, axis=1)
+        new_food_levels = jnp.where(success, 0, food_levels)
 
-        # Process all grid cells
-        total_cells = self.GRID_SIZE_ROW * self.GRID_SIZE_COL
-        (final_food_grid, final_rewards), _ = jax.lax.scan(
-            process_one_cell,
-            (new_food_grid, rewards),
-            jnp.arange(total_cells)
-        )
+        return rewards, new_food_levels
 
-        return final_rewards, final_food_grid
+    def get_obs(self, state: State) -> jnp.ndarray:
+        """Observations of all agents in `state`, as returned by reset and step."""
+        return self._get_obs(state)
 
     def _get_obs(self, state: State) -> jnp.ndarray:
         """
@@ -592,12 +556,12 @@ class LevelBasedForaging(MultiAgentEnv):
             constant_values=0
         )
 
-        # Create food level grid (extract level from encoding: value - 10)
-        food_level_grid = jnp.where(
-            state.food_grid > 0,
-            state.food_grid - 10,
-            0
-        ).astype(jnp.uint8)
+        # Create food level grid (empty slots add level 0)
+        food_level_grid = jnp.zeros(self.grid_shape, dtype=jnp.uint8)
+        food_level_grid = food_level_grid.at[
+            state.food_positions[:, 0],
+            state.food_positions[:, 1]
+        ].add(state.food_levels.astype(jnp.uint8))
         padded_food = jnp.pad(
             food_level_grid,
             pad_width=((pad_width, pad_width), (pad_width, pad_width)),
@@ -723,28 +687,9 @@ class LevelBasedForaging(MultiAgentEnv):
         # Create a simple namespace object to hold state attributes
         class RenderState:
             def __init__(self, env_ref, state_obj):
-                # Extract food positions and levels from food_grid
-                food_positions = []
-                food_levels_list = []
-                food_active_list = []
-
-                food_grid_np = onp.array(state_obj.food_grid)
-                for r in range(food_grid_np.shape[0]):
-                    for c in range(food_grid_np.shape[1]):
-                        if food_grid_np[r, c] > 0:
-                            food_positions.append([r, c])
-                            food_levels_list.append(food_grid_np[r, c] - 10)
-                            food_active_list.append(True)
-
-                # Pad to num_food size (in case some food was collected)
-                while len(food_positions) < env_ref.num_food:
-                    food_positions.append([0, 0])
-                    food_levels_list.append(1)
-                    food_active_list.append(False)
-
-                self.food_pos = onp.array(food_positions[:env_ref.num_food])
-                self.food_levels = onp.array(food_levels_list[:env_ref.num_food])
-                self.food_active = onp.array(food_active_list[:env_ref.num_food])
+                self.food_pos = onp.array(state_obj.food_positions)
+                self.food_levels = onp.array(state_obj.food_levels)
+                self.food_active = self.food_levels > 0
                 self.agent_pos = onp.array(state_obj.agent_positions)
                 self.agent_levels = onp.array(state_obj.agent_levels)
                 self.step_count = state_obj.inner_t
@@ -16,6 +16,14 @@ Postcondition of both resolvers: the returned (row, col) pairs are pairwise
 distinct, so stamping agents into a grid with ``grid.at[r, c].set(...)`` is
 safe (no duplicate indices, no agent silently vanishing from observations).
 
+Movement has two interchangeable implementations that return identical
+results for the same key: ``resolve_movement_dense`` compares all N x N
+claims in each of N fixed iterations (O(N^3), fastest for small N), and
+``resolve_movement_sorted`` sorts claims by flattened cell index and stops
+at the fixed point (O(N log N) per iteration). ``resolve_movement`` picks
+one from the static number of agents; the crossover is measured by
+``speed_test/speed_test_movement.py``.
+
 The seven SocialJax-lineage environments bind ``step_env`` as
 ``__init__``-local jitted closures, so these are deliberately module-level
 functions the closures call, not base-class methods.
@@ -24,6 +32,9 @@ functions the closures call, not base-class methods.
 import jax
 import jax.numpy as jnp
 
+# resolve_movement switches to the sort-based resolver from this many agents
+SORTED_RESOLVER_MIN_AGENTS = 12
+
 
 def resolve_movement(key, old_locs, proposed_locs):
     """Resolve agent-agent movement conflicts.
@@ -47,7 +58,18 @@ def resolve_movement(key, old_locs, proposed_locs):
     Reverting the full row (heading included) is safe: only agents whose
     (row, col) changed can be reverted, and movement actions never change
     heading, so old and proposed headings agree for every revertible agent.
+
+    Dispatches on the (static) number of agents N to
+    ``resolve_movement_dense`` below ``SORTED_RESOLVER_MIN_AGENTS`` and to
+    ``resolve_movement_sorted`` otherwise; both give the same result.
     """
+    if old_locs.shape[0] >= SORTED_RESOLVER_MIN_AGENTS:
+        return resolve_movement_sorted(key, old_locs, proposed_locs)
+    return resolve_movement_dense(key, old_locs, proposed_locs)
+
+
+def resolve_movement_dense(key, old_locs, proposed_locs):
+    """``resolve_movement`` with all-pairs claim comparisons, O(N^3)."""
     N = old_locs.shape[0]
     old_rc = old_locs[:, :2]
     prop_rc = proposed_locs[:, :2]
@@ -103,6 +125,63 @@ def resolve_movement(key, old_locs, proposed_locs):
     return jnp.where(reverted[:, None], old_locs, proposed_locs)
 
 
+def _cell_ids(rc):
+    # flattened (row, col) index; locations are int16 grid coordinates, so
+    # row * 2**16 + col fits in int32
+    return rc[:, 0].astype(jnp.int32) * (1 << 16) + rc[:, 1].astype(jnp.int32)
+
+
+def resolve_movement_sorted(key, old_locs, proposed_locs):
+    """``resolve_movement`` with sorted claims, O(N log N) per iteration.
+
+    Runs the same revert iteration as ``resolve_movement_dense`` with the
+    same permutation, so the result is identical for the same key. Each
+    iteration sorts the claimed cells (ties by priority) instead of
+    comparing all pairs, and a ``while_loop`` stops at the fixed point
+    instead of always running N iterations.
+    """
+    N = old_locs.shape[0]
+    agents = jnp.arange(N)
+    old_id = _cell_ids(old_locs[:, :2])
+    prop_id = _cell_ids(proposed_locs[:, :2])
+    moved = prop_id != old_id
+
+    perm = jax.random.permutation(key, N)
+
+    # The agent (if any) whose old cell each agent proposes to enter; old
+    # cells are distinct, so there is at most one. i and that occupant form
+    # a swap if the occupant proposes i's old cell.
+    by_old = jnp.argsort(old_id)
+    pos = jnp.clip(jnp.searchsorted(old_id[by_old], prop_id), 0, N - 1)
+    occupant = by_old[pos]
+    swap_pair = (
+        moved
+        & (old_id[occupant] == prop_id)
+        & (prop_id[occupant] == old_id)
+        & (occupant != agents)
+    )
+
+    def body(carry):
+        alive, _ = carry
+        claims = jnp.where(alive, prop_id, old_id)
+        pri = jnp.where(claims == old_id, N, perm)
+        # sort by claimed cell, then priority: the last agent of each run of
+        # equal claims has the group maximum and wins the cell
+        order = jnp.lexsort((pri, claims))
+        sorted_claims = claims[order]
+        last = jnp.append(sorted_claims[1:] != sorted_claims[:-1], True)
+        wins_cell = jnp.zeros(N, dtype=bool).at[order].set(last)
+        in_swap = swap_pair & alive[occupant]
+        new_alive = alive & wins_cell & ~in_swap
+        return new_alive, jnp.all(new_alive == alive)
+
+    alive, _ = jax.lax.while_loop(
+        lambda carry: ~carry[1], body, (moved, jnp.array(False))
+    )
+    reverted = moved & ~alive
+    return jnp.where(reverted[:, None], old_locs, proposed_locs)
+
+
 def resolve_respawn(key, agent_locs, reborn_mask, spawn_points, dir_maxval=3):
     """Occupancy-aware respawn: reborn agents land on unoccupied spawn cells.
 
@@ -19,19 +19,44 @@ class State:
     step: int
 
 
+def counter_dtype(max_count: int):
+    """Dtype for step counters up to `max_count`: uint16 when it fits, else int32.
+
+    Episode timers such as `inner_t` / `outer_t` live in every vmapped env state and
+    are copied on each step and auto-reset, so they are kept narrow. Longer episodes
+    fall back to the signed int32 the counters had before.
+    """
+    return jnp.uint16 if max_count <= jnp.iinfo(jnp.uint16).max else jnp.int32
+
+
+# Granularity of the `info` dict returned by `step_env`, see MultiAgentEnv.select_info
+INFO_LEVELS = ("none", "rewards", "full")
+# info entries kept at info_level="rewards"; SVOLogWrapper needs original_rewards
+REWARD_INFO_KEYS = ("original_rewards", "shaped_rewards")
+
+
 class MultiAgentEnv(object):
     """Jittable abstract base class for all SocialJax Environments."""
 
     def __init__(
         self,
         num_agents: int,
+        info_level: str = "full",
     ) -> None:
         """
         num_agents (int): maximum number of agents within the environment, used to set array dimensions
+        info_level (str): which per-step info entries `step_env` returns, one of INFO_LEVELS
         """
+        if info_level not in INFO_LEVELS:
+            raise ValueError(f"info_level must be one of {INFO_LEVELS}, got {info_level!r}")
         self.num_agents = num_agents
+        self.info_level = info_level
         self.observation_spaces = dict()
         self.action_spaces = dict()
+        # (obs, state) pytrees stacked on a leading pool axis; see build_reset_pool
+        self.reset_pool = None
+        # (num_codes, channels) when observations are compact, see observation.py
+        self.obs_encoding = None
 
     @partial(jax.jit, static_argnums=(0,))
     def reset(self, key: chex.PRNGKey) -> Tuple[Dict[str, chex.Array], State]:
@@ -48,16 +73,32 @@ class MultiAgentEnv(object):
         reset_state: Optional[State] = None,
     ) -> Tuple[Dict[str, chex.Array], State, Dict[str, float], Dict[str, bool], Dict]:
         """Performs step transitions in the environment. Resets the environment if done.
-        To control the reset state, pass `reset_state`. Otherwise, the environment will reset randomly."""
+        To control the reset state, pass `reset_state`. Otherwise, the environment will reset
+        randomly: from the precomputed reset pool if one was built (see `build_reset_pool`),
+        else by calling `reset` only on the branch where the episode actually ended."""
 
         key, key_reset = jax.random.split(key)
         obs_st, states_st, rewards, dones, infos = self.step_env(key, state, actions, timestep)
 
-        if reset_state is None:
-            obs_re, states_re = self.reset(key_reset)
-        else:
+        if reset_state is not None:
             states_re = reset_state
             obs_re = self.get_obs(states_re)
+        elif self.reset_pool is not None:
+            # Swap in a pooled reset state by index: a gather instead of a full
+            # reset + observation build, which also stays cheap under vmap.
+            obs_pool, states_pool = self.reset_pool
+            pool_size = jax.tree.leaves(states_pool)[0].shape[0]
+            idx = jax.random.randint(key_reset, (), 0, pool_size)
+            obs_re, states_re = jax.tree.map(lambda x: x[idx], (obs_pool, states_pool))
+        else:
+            # Unbatched, lax.cond only runs the reset when the episode ends;
+            # under vmap it lowers to the same select as before.
+            obs, states = jax.lax.cond(
+                dones["__all__"],
+                lambda: self.reset(key_reset),
+                lambda: (obs_st, states_st),
+            )
+            return obs, states, rewards, dones, infos
 
         # Auto-reset environment based on termination
         states = jax.tree.map(
@@ -68,16 +109,70 @@ class MultiAgentEnv(object):
         )
         return obs, states, rewards, dones, infos
 
+    def build_reset_pool(self, key: chex.PRNGKey, pool_size: int) -> None:
+        """Precomputes `pool_size` reset (obs, state) pairs used by `step` for auto-reset.
+
+        Build the pool before the first `step` call: `step` is jitted with the env as a
+        static argument, so the pool is baked into the compiled function as a constant.
+        Auto-reset episodes then only start from these `pool_size` states instead of a
+        fresh random reset (see `socialjax.make`).
+        """
+        keys = jax.random.split(key, pool_size)
+        obs, states = jax.vmap(self.reset)(keys)
+        self.reset_pool = (obs, states)
+
+    def inner_reset(self, key: chex.PRNGKey, reset_inner: chex.Array, reset_state, state: State) -> State:
+        """The state after an inner-episode rollover: a fresh start state if `reset_inner`, else `state`.
+
+        `reset_state(key)` builds the start state, whose `outer_t` is set to `state.outer_t + 1`.
+        With a reset pool one of its states is gathered by index instead, as in `step`.
+        Otherwise lax.cond only builds the start state when the inner episode ended; under
+        vmap the cond lowers to a select and both branches run.
+        """
+        if self.reset_pool is not None:
+            states_pool = self.reset_pool[1]
+            pool_size = jax.tree.leaves(states_pool)[0].shape[0]
+            idx = jax.random.randint(key, (), 0, pool_size)
+            state_re = jax.tree.map(lambda x: x[idx], states_pool)
+            state_re = state_re.replace(outer_t=state.outer_t + 1)
+            return jax.tree.map(lambda x, y: jax.lax.select(reset_inner, x, y), state_re, state)
+        return jax.lax.cond(
+            reset_inner,
+            lambda: reset_state(key).replace(outer_t=state.outer_t + 1),
+            lambda: state,
+        )
+
     def step_env(
         self, key: chex.PRNGKey, state: State, actions: Dict[str, chex.Array], timestep: int = 0
     ) -> Tuple[Dict[str, chex.Array], State, Dict[str, float], Dict[str, bool], Dict]:
         """Environment-specific step transition."""
         raise NotImplementedError
 
+    def select_info(self, info: Dict[str, chex.Array]) -> Dict[str, chex.Array]:
+        """Drops the info entries not requested by `info_level`.
+
+        Called by `step_env` on the info it built. Under jit the computation of the
+        dropped entries is then dead code and compiled away, so training runs that
+        don't log the env-specific counters don't pay for them on every step.
+        """
+        if self.info_level == "full":
+            return info
+        if self.info_level == "rewards":
+            return {k: v for k, v in info.items() if k in REWARD_INFO_KEYS}
+        return {}
+
     def get_obs(self, state: State) -> Dict[str, chex.Array]:
         """Applies observation function to state."""
         raise NotImplementedError
 
+    def get_agent_obs(self, state: State, agent: int) -> chex.Array:
+        """Observation of a single agent, used to rebuild stored observations (REMAT_OBS).
+
+        Builds every agent's observation and keeps one; the grid envs replace it
+        with a version that only gathers that agent's window.
+        """
+        return self.get_obs(state)[agent]
+
     def observation_space(self, agent: str):
         """Observation space for a given agent."""
         return self.observation_spaces[agent]
@@ -11,7 +11,10 @@ from flax.struct import dataclass
 import colorsys
 
 from socialjax.environments.movement import resolve_movement, resolve_respawn
-from socialjax.environments.multi_agent_env import MultiAgentEnv
+from socialjax.environments.observation import compact_obs_encoding, egocentric_obs, obs_window_origin
+from socialjax.environments.rendering import GridRenderer
+from socialjax.environments.spawning import sample_lowest
+from socialjax.environments.multi_agent_env import MultiAgentEnv, counter_dtype
 from socialjax.environments import spaces
 
 
@@ -42,7 +45,6 @@ class State:
     freeze: jnp.ndarray
     reborn_locs: jnp.ndarray
     mushrooms_matches: jnp.ndarray
-    potential_empty_locs: jnp.ndarray
     potential_empty_labels: jnp.ndarray
 
     stay_time: jnp.ndarray
@@ -192,6 +194,8 @@ class Mushrooms(MultiAgentEnv):
         grid_size=(12,23),
         obs_size=11,
         cnn=True,
+        obs_format="full",
+        info_level="full",
         map_ASCII = [
             "                       ",
             "                       ",
@@ -208,11 +212,13 @@ class Mushrooms(MultiAgentEnv):
         ],
     ):
 
-        super().__init__(num_agents=num_agents)
+        super().__init__(num_agents=num_agents, info_level=info_level)
         self.agents = list(range(num_agents))#, dtype=jnp.int16)
         self._agents = jnp.array(self.agents, dtype=jnp.int16) + len(Items)
+        self._renderer = None  # tile-atlas GridRenderer, built on first render
         self.num_inner_steps = num_inner_steps
         self.num_outer_steps = num_outer_steps
+        self._counter_dtype = counter_dtype(max(num_inner_steps, num_outer_steps))
 
         self.inequity_aversion = inequity_aversion
         self.inequity_aversion_target_agents = inequity_aversion_target_agents
@@ -238,6 +244,11 @@ class Mushrooms(MultiAgentEnv):
         self.payoff_matrix = payoff_matrix
         self.shared_rewards = shared_rewards
         self.cnn = cnn
+        if obs_format not in ("full", "compact"):
+            raise ValueError(f"obs_format must be 'full' or 'compact', got {obs_format!r}")
+        self.obs_format = obs_format
+        if obs_format == "compact":
+            self.obs_encoding = compact_obs_encoding(len(Items), (len(Items)-1) + 10)
 
         self.PLAYER_COLOURS = generate_agent_colors(num_agents)
         self.GRID_SIZE_ROW = grid_size[0]
@@ -277,211 +288,6 @@ class Mushrooms(MultiAgentEnv):
 
         
        
-        def combine_channels(
-                grid: jnp.ndarray,
-                agent: int,
-                angles: jnp.ndarray,
-                agent_pickups: jnp.ndarray,
-                state: State,
-            ):
-            '''
-            Function to enforce symmetry in observations & generate final
-            feature representation; current agent is permuted to first 
-            position in the feature dimension.
-            
-            Args:
-                - grid: jax ndarray of current agent's obs grid
-                - agent: int, an index indicating current agent number
-                - angles: jnp.ndarray of current agents' relative orientation
-                in current agent's obs grid
-                - agent_pickups: jnp.ndarray of agents able to interact
-                - state: State, the env state obj
-            Returns:
-                - grid with current agent [x] permuted to 1st position (after
-                the first 4 "Items" features, so 5th position overall) in the
-                feature dimension, "other" [x] agent 2nd, angle [x, x, x, x]
-                3rd, pick-up [x] bool 4th, inventory [x, x] 5th, frozen [x]
-                6th, for a final obs grid of shape (5, 5, 14) (additional 4
-                one-hot places for 5 possible items)
-            '''
-            def move_and_collapse(
-                    x: jnp.ndarray,
-                    angle: jnp.ndarray,
-                ) -> jnp.ndarray:
-
-                # get agent's one-hot
-                agent_element = jnp.array([jnp.int8(x[agent])])
-
-                # mask to check if any other agent exists there
-                mask = x[len(Items)-1:] > 0
-
-                # does an agent exist which is not the subject?
-                other_agent = jnp.int8(
-                    jnp.logical_and(
-                        jnp.any(mask),
-                        jnp.logical_not(
-                            agent_element
-                        )
-                    )
-                )
-
-                # what is the class of the item in cell
-                item_idx = jnp.where(
-                    x,
-                    size=1
-                )[0]
-
-                # check if agent is frozen and can observe inventories
-                show_inv_bool = jnp.logical_and(
-                        state.freeze[
-                            agent-len(Items)
-                        ].max(axis=-1) > 0,
-                        item_idx >= len(Items)
-                )
-
-                show_inv_idxs = jnp.where(
-                    state.freeze[agent],
-                    size=12, # since, in a setting where simultaneous interac-
-                    fill_value=-1 # -tions can happen, only a max of 12 can
-                )[0] # happen at once (zap logic), regardless of pop size
-
-                inv_to_show = jnp.where(
-                    jnp.logical_or(
-                        jnp.logical_and(
-                            show_inv_bool,
-                            jnp.isin(item_idx-len(Items), show_inv_idxs),
-                        ),
-                        agent_element
-                    ),
-                    state.agent_invs[item_idx - len(Items)],
-                    jnp.array([0, 0], dtype=jnp.int8)
-                )[0]
-
-                # check if agent is not the subject & is frozen & therefore
-                # not possible to interact with
-                frozen = jnp.where(
-                    other_agent,
-                    state.freeze[
-                        item_idx-len(Items)
-                    ].max(axis=-1) > 0,
-                    0
-                )
-
-                # get pickup/inv info
-                pick_up_idx = jnp.where(
-                    jnp.any(mask),
-                    jnp.nonzero(mask, size=1)[0],
-                    jnp.int8(-1)
-                )
-                picked_up = jnp.where(
-                    pick_up_idx > -1,
-                    agent_pickups[pick_up_idx],
-                    jnp.int8(0)
-                )
-
-                # build extension
-                extension = jnp.concatenate(
-                    [
-                        agent_element,
-                        other_agent,
-                        angle,
-                        picked_up,
-                        inv_to_show,
-                        frozen
-                    ],
-                    axis=-1
-                )
-
-                # build final feature vector
-                final_vec = jnp.concatenate(
-                    [x[:len(Items)-1], extension],
-                    axis=-1
-                )
-
-                return final_vec
-
-            new_grid = jax.vmap(
-                jax.vmap(
-                    move_and_collapse
-                )
-            )(grid, angles)
-            return new_grid
-        
-        def check_relative_orientation(
-                agent: int,
-                agent_locs: jnp.ndarray,
-                grid: jnp.ndarray
-            ) -> jnp.ndarray:
-            '''
-            Check's relative orientations of all other agents in view of
-            current agent.
-            
-            Args:
-                - agent: int, an index indicating current agent number
-                - agent_locs: jax ndarray of agent locations (x, y, direction)
-                - grid: jax ndarray of current agent's obs grid
-                
-            Returns:
-                - grid with 1) int -1 in places where no agent exists, or
-                where the agent is the current agent, and 2) int in range
-                0-3 in cells of opposing agents indicating relative
-                orientation to current agent.
-            '''
-            # we decrement by num of Items when indexing as we incremented by
-            # 5 in constructor call (due to 5 non-agent Items enum & locations
-            # are indexed from 0)
-            idx = agent - len(Items)
-            agents = jnp.delete(
-                self._agents,
-                idx,
-                assume_unique_indices=True
-            )
-            curr_agent_dir = agent_locs[idx, 2]
-
-            def calc_relative_direction(cell):
-                cell_agent = cell - len(Items)
-                cell_direction = agent_locs[cell_agent, 2]
-                return (cell_direction - curr_agent_dir) % 4
-
-            angle = jnp.where(
-                jnp.isin(grid, agents),
-                jax.vmap(calc_relative_direction)(grid),
-                -1
-            )
-
-            return angle
-        
-        def rotate_grid(agent_loc: jnp.ndarray, grid: jnp.ndarray) -> jnp.ndarray:
-            '''
-            Rotates agent's observation grid k * 90 degrees, depending on agent's
-            orientation.
-
-            Args:
-                - agent_loc: jax ndarray of agent's x, y, direction
-                - grid: jax ndarray of agent's obs grid
-
-            Returns:
-                - jnp.ndarray of new rotated grid.
-
-            '''
-            grid = jnp.where(
-                agent_loc[2] == 1,
-                jnp.rot90(grid, k=1, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 2,
-                jnp.rot90(grid, k=2, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 3,
-                jnp.rot90(grid, k=3, axes=(0, 1)),
-                grid,
-            )
-
-            return grid
-
         def _get_obs_point(agent_loc: jnp.ndarray) -> jnp.ndarray:
             '''
             Obtain the position of top-left corner of obs map using
@@ -492,101 +298,40 @@ class Mushrooms(MultiAgentEnv):
             Returns:
                 - x, y: ints of top-left corner of agent's obs map.
             '''
-            
-            x, y, direction = agent_loc
-
-            x, y = x + self.PADDING, y + self.PADDING
-
-            x = x - (self.OBS_SIZE // 2)
-            y = y - (self.OBS_SIZE // 2)
-
-            x = jnp.where(direction == 0, x + (self.OBS_SIZE//2)-1, x)
-            y = jnp.where(direction == 0, y, y)
-
-            x = jnp.where(direction == 1, x, x)
-            y = jnp.where(direction == 1, y + (self.OBS_SIZE//2)-1, y)
+            return obs_window_origin(agent_loc, self.OBS_SIZE, self.PADDING)
 
-
-            x = jnp.where(direction == 2, x - (self.OBS_SIZE//2)+1, x)
-            y = jnp.where(direction == 2, y, y)
-
-
-            x = jnp.where(direction == 3, x, x)
-            y = jnp.where(direction == 3, y - (self.OBS_SIZE//2)+1, y)
-
-            return x, y
-
-        def _get_obs(state: State) -> jnp.ndarray:
+        def _get_obs(state: State, agents=None) -> jnp.ndarray:
             '''
             Obtain the agent's observation of the grid.
 
             Args: 
                 - state: State object containing env state.
+                - agents: optional indices of the observing agents, all by default.
             Returns:
                 - jnp.ndarray of grid observation.
             '''
-            # create state
-            grid = jnp.pad(
-                state.grid,
-                ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)),
-                constant_values=Items.wall,
-            )
-
-            # obtain all agent obs-points
-            agent_start_idxs = jax.vmap(_get_obs_point)(state.agent_locs)
-
-            dynamic_slice = partial(
-                jax.lax.dynamic_slice,
-                operand=grid,
-                slice_sizes=(self.OBS_SIZE, self.OBS_SIZE)
-            )
-
-            # obtain agent obs grids
-            grids = jax.vmap(dynamic_slice)(start_indices=agent_start_idxs)
-
-            # rotate agent obs grids
-            grids = jax.vmap(rotate_grid)(state.agent_locs, grids)
-
-            angles = jax.vmap(
-                check_relative_orientation,
-                in_axes=(0, None, 0)
-            )(
-                self._agents,
-                state.agent_locs,
-                grids
-            )
-
-            angles = jax.nn.one_hot(angles, 4)
-
-            # one-hot (drop first channel as its empty blocks)
-            grids = jax.nn.one_hot(
-                grids - 1,
-                num_agents + len(Items) - 1, # will be collapsed into a
-                dtype=jnp.int8 # [Items, self, other, extra features] representation
-            )
-
             # check agents that can interact
-            inventory_sum = jnp.sum(state.agent_invs, axis=-1)
-            agent_pickups = jnp.where(
-                inventory_sum > INTERACT_THRESHOLD,
-                True,
-                False
-            )
+            agent_pickups = jnp.sum(state.agent_invs, axis=-1) > INTERACT_THRESHOLD
 
-            # make index len(Item) always the current agent
-            # and sum all others into an "other" agent
-            grids = jax.vmap(
-                combine_channels,
-                in_axes=(0, 0, 0, None, None)
-            )(
-                grids,
-                self._agents,
-                angles,
-                agent_pickups,
-                state
+            return egocentric_obs(
+                state.grid,
+                state.agent_locs,
+                state.agent_invs,
+                state.freeze,
+                num_items=len(Items),
+                obs_size=self.OBS_SIZE,
+                padding=self.PADDING,
+                pad_value=Items.wall,
+                agent_extras=agent_pickups[:, None],
+                compact=self.obs_format == "compact",
+                agents=agents,
             )
 
-            return grids
+        def _get_agent_obs(state: State, agent: int) -> jnp.ndarray:
+            '''
+            Observation of a single agent; only its window is gathered.
+            '''
+            return _get_obs(state, jnp.reshape(agent, (1,)))[0]
         
         def _interact(
             key: jnp.ndarray, state: State, actions: jnp.ndarray
@@ -847,313 +592,314 @@ class Mushrooms(MultiAgentEnv):
             actions = jnp.array(actions).squeeze()
             
             # regrow mushrooms
-            grid_mushrooms = state.grid
-            noise = jax.random.uniform(key, shape=(len(state.potential_empty_labels),)) * 1e-4
-            label_with_noise = state.potential_empty_labels + noise
-            label_with_noise_rank = jnp.sort(label_with_noise)
-            # label_with_noise_rank = jnp.flip(label_with_noise_rank) 
-            unstable_indices = jnp.argsort(label_with_noise)
-            # unstable_indices = jnp.flip(unstable_indices) 
-
-            unstable_sorted_locs = state.potential_empty_locs[unstable_indices]
+            with jax.named_scope("regrowth"):
+                grid_mushrooms = state.grid
+                # TODO: the max mushrooms is fixed now
+                max_mushrooms = 5
+
+                # 3 * max_mushrooms + 1 regrowth cells, empty cells first in
+                # random order, without sorting the whole candidate list
+                regrow_idx = sample_lowest(key, state.potential_empty_labels, max_mushrooms * 3 + 1)
+                regrow_locs = self.SPAWNS_PLAYERS[regrow_idx]
+                num_red = jnp.sum(state.potential_empty_labels == Items.red_mushrooms)
             
-            # TODO: the max mushrooms is fixed now
-            max_mushrooms = 5
-            num_red = jnp.sum(state.potential_empty_labels == Items.red_mushrooms)
-            
-            # red mushrooms regrowth
-            red_mushrooms_regrowth_check_time = jnp.sum(state.mushrooms_matches) * 2
-            red_mushrooms_regrowth_check_time = jnp.where(jnp.sum(grid_mushrooms == Items.red_mushrooms) > max_mushrooms, 0, red_mushrooms_regrowth_check_time)
-            red_mushrooms_regrowth_check_time = jnp.array(red_mushrooms_regrowth_check_time, dtype=jnp.int16)
-            p = jax.random.uniform(key, shape=(max_mushrooms,))
+                # red mushrooms regrowth
+                red_mushrooms_regrowth_check_time = jnp.sum(state.mushrooms_matches) * 2
+                red_mushrooms_regrowth_check_time = jnp.where(jnp.sum(grid_mushrooms == Items.red_mushrooms) > max_mushrooms, 0, red_mushrooms_regrowth_check_time)
+                red_mushrooms_regrowth_check_time = jnp.array(red_mushrooms_regrowth_check_time, dtype=jnp.int16)
+                p = jax.random.uniform(key, shape=(max_mushrooms,))
 
-            p = jnp.where(jnp.arange(p.shape[0]) >= red_mushrooms_regrowth_check_time, 1.0, p)
+                p = jnp.where(jnp.arange(p.shape[0]) >= red_mushrooms_regrowth_check_time, 1.0, p)
 
-            red_mushrooms_locs = unstable_sorted_locs[:max_mushrooms, :]
+                red_mushrooms_locs = regrow_locs[:max_mushrooms, :]
 
-            def regrow_red_mushrooms(p, red_loc) -> jnp.ndarray:
-                red_sch_cat = jnp.where(p<self.regrow_rate_red, Items.red_mushrooms, grid_mushrooms[red_loc[0], red_loc[1]])
-                return red_sch_cat
+                def regrow_red_mushrooms(p, red_loc) -> jnp.ndarray:
+                    red_sch_cat = jnp.where(p<self.regrow_rate_red, Items.red_mushrooms, grid_mushrooms[red_loc[0], red_loc[1]])
+                    return red_sch_cat
         
-            red_mushrooms_regrowth = jax.vmap(regrow_red_mushrooms)(p, red_mushrooms_locs)
-            grid_mushrooms = grid_mushrooms.at[red_mushrooms_locs[:, 0], red_mushrooms_locs[:, 1]].set(red_mushrooms_regrowth)
+                red_mushrooms_regrowth = jax.vmap(regrow_red_mushrooms)(p, red_mushrooms_locs)
+                grid_mushrooms = grid_mushrooms.at[red_mushrooms_locs[:, 0], red_mushrooms_locs[:, 1]].set(red_mushrooms_regrowth)
             
-            label_with_noise_rank_new = label_with_noise_rank.at[0:max_mushrooms].set(red_mushrooms_regrowth) 
-            label_rank_new = jnp.round(label_with_noise_rank_new).astype(jnp.int16)
+                label_rank_new = state.potential_empty_labels.astype(jnp.int16).at[regrow_idx[0:max_mushrooms]].set(red_mushrooms_regrowth)
 
-            #=====================================================================#
-            # green mushrooms regrowth
-            num_green = jnp.sum(state.potential_empty_labels == Items.green_mushrooms)
+                #=====================================================================#
+                # green mushrooms regrowth
+                num_green = jnp.sum(state.potential_empty_labels == Items.green_mushrooms)
 
-            green_mushrooms_regrowth_check_time = jnp.sum(state.mushrooms_matches[:,1:3]) * 2
-            green_mushrooms_regrowth_check_time = jnp.where(jnp.sum(grid_mushrooms == Items.green_mushrooms) > max_mushrooms, 0, green_mushrooms_regrowth_check_time)
-            green_mushrooms_regrowth_check_time = jnp.array(green_mushrooms_regrowth_check_time, dtype=jnp.int16)
-            p = jax.random.uniform(key, shape=(max_mushrooms,))
-            p = jnp.where(jnp.arange(p.shape[0]) >= green_mushrooms_regrowth_check_time, 1.0, p)
+                green_mushrooms_regrowth_check_time = jnp.sum(state.mushrooms_matches[:,1:3]) * 2
+                green_mushrooms_regrowth_check_time = jnp.where(jnp.sum(grid_mushrooms == Items.green_mushrooms) > max_mushrooms, 0, green_mushrooms_regrowth_check_time)
+                green_mushrooms_regrowth_check_time = jnp.array(green_mushrooms_regrowth_check_time, dtype=jnp.int16)
+                p = jax.random.uniform(key, shape=(max_mushrooms,))
+                p = jnp.where(jnp.arange(p.shape[0]) >= green_mushrooms_regrowth_check_time, 1.0, p)
 
-            green_mushrooms_locs = unstable_sorted_locs[max_mushrooms:max_mushrooms*2, :]
+                green_mushrooms_locs = regrow_locs[max_mushrooms:max_mushrooms*2, :]
 
-            def regrow_green_mushrooms(p, green_loc) -> jnp.ndarray:
-                green_sch_cat = jnp.where(p<self.regrow_rate_green, Items.green_mushrooms, grid_mushrooms[green_loc[0], green_loc[1]])
-                return green_sch_cat
+                def regrow_green_mushrooms(p, green_loc) -> jnp.ndarray:
+                    green_sch_cat = jnp.where(p<self.regrow_rate_green, Items.green_mushrooms, grid_mushrooms[green_loc[0], green_loc[1]])
+                    return green_sch_cat
         
-            green_mushrooms_regrowth = jax.vmap(regrow_green_mushrooms)(p, green_mushrooms_locs)
-            grid_mushrooms = grid_mushrooms.at[green_mushrooms_locs[:, 0], green_mushrooms_locs[:, 1]].set(green_mushrooms_regrowth)
+                green_mushrooms_regrowth = jax.vmap(regrow_green_mushrooms)(p, green_mushrooms_locs)
+                grid_mushrooms = grid_mushrooms.at[green_mushrooms_locs[:, 0], green_mushrooms_locs[:, 1]].set(green_mushrooms_regrowth)
             
-            label_rank_new = label_rank_new.at[max_mushrooms:max_mushrooms*2].set(green_mushrooms_regrowth) 
-
-            #=====================================================================#
-            # blue mushrooms regrowth
-            num_blue = jnp.sum(state.potential_empty_labels == Items.blue_mushrooms)
-
-            blue_mushrooms_regrowth_check_time = jnp.sum(state.mushrooms_matches[:,2:3]) * 2
-            blue_mushrooms_regrowth_check_time = jnp.where(jnp.sum(grid_mushrooms == Items.blue_mushrooms) > max_mushrooms, 0, blue_mushrooms_regrowth_check_time)
-            blue_mushrooms_regrowth_check_time = jnp.array(blue_mushrooms_regrowth_check_time, dtype=jnp.int16)
-            p = jax.random.uniform(key, shape=(max_mushrooms,))
-            p = jnp.where(jnp.arange(p.shape[0]) >= blue_mushrooms_regrowth_check_time, 1.0, p)
-
-            blue_mushrooms_locs = unstable_sorted_locs[max_mushrooms*2:max_mushrooms*3, :]
-
-            def regrow_blue_mushrooms(p, blue_loc) -> jnp.ndarray:
-                blue_sch_cat = jnp.where(p<self.regrow_rate_blue, Items.blue_mushrooms, grid_mushrooms[blue_loc[0], blue_loc[1]])
-                return blue_sch_cat
-            blue_mushrooms_regrowth = jax.vmap(regrow_blue_mushrooms)(p, blue_mushrooms_locs)
-            grid_mushrooms = grid_mushrooms.at[blue_mushrooms_locs[:, 0], blue_mushrooms_locs[:, 1]].set(blue_mushrooms_regrowth)
-            label_rank_new = label_rank_new.at[max_mushrooms*2:max_mushrooms*3].set(blue_mushrooms_regrowth)
-
-            #=====================================================================#
-            # only one orange mushroom would exist in the map
-            # orange mushrooms regrowth
-            orange_mushrooms_regrowth_check_time = jnp.sum(state.mushrooms_matches[:,3:4])
-            p = jax.random.uniform(key, shape=(1,))
-            p = jnp.where(jnp.arange(p.shape[0]) >= orange_mushrooms_regrowth_check_time, 1.0, p)
-
-            orange_mushrooms_locs = unstable_sorted_locs[max_mushrooms*3:max_mushrooms*3 + 1, :]
-
-            def regrow_orange_mushrooms(p, orange_loc) -> jnp.ndarray:
-                orange_sch_cat = jnp.where(p<self.regrow_rate_orange, Items.orange_mushrooms, grid_mushrooms[orange_loc[0], orange_loc[1]])
-                return orange_sch_cat
-            orange_mushrooms_regrowth = jax.vmap(regrow_orange_mushrooms)(p, orange_mushrooms_locs)
-            grid_mushrooms = grid_mushrooms.at[orange_mushrooms_locs[:, 0], orange_mushrooms_locs[:, 1]].set(orange_mushrooms_regrowth)
-            label_rank_new = label_rank_new.at[max_mushrooms*3:max_mushrooms*3 + 1].set(orange_mushrooms_regrowth)
-            #=====================================================================#
+                label_rank_new = label_rank_new.at[regrow_idx[max_mushrooms:max_mushrooms*2]].set(green_mushrooms_regrowth) 
+
+                #=====================================================================#
+                # blue mushrooms regrowth
+                num_blue = jnp.sum(state.potential_empty_labels == Items.blue_mushrooms)
+
+                blue_mushrooms_regrowth_check_time = jnp.sum(state.mushrooms_matches[:,2:3]) * 2
+                blue_mushrooms_regrowth_check_time = jnp.where(jnp.sum(grid_mushrooms == Items.blue_mushrooms) > max_mushrooms, 0, blue_mushrooms_regrowth_check_time)
+                blue_mushrooms_regrowth_check_time = jnp.array(blue_mushrooms_regrowth_check_time, dtype=jnp.int16)
+                p = jax.random.uniform(key, shape=(max_mushrooms,))
+                p = jnp.where(jnp.arange(p.shape[0]) >= blue_mushrooms_regrowth_check_time, 1.0, p)
+
+                blue_mushrooms_locs = regrow_locs[max_mushrooms*2:max_mushrooms*3, :]
+
+                def regrow_blue_mushrooms(p, blue_loc) -> jnp.ndarray:
+                    blue_sch_cat = jnp.where(p<self.regrow_rate_blue, Items.blue_mushrooms, grid_mushrooms[blue_loc[0], blue_loc[1]])
+                    return blue_sch_cat
+                blue_mushrooms_regrowth = jax.vmap(regrow_blue_mushrooms)(p, blue_mushrooms_locs)
+                grid_mushrooms = grid_mushrooms.at[blue_mushrooms_locs[:, 0], blue_mushrooms_locs[:, 1]].set(blue_mushrooms_regrowth)
+                label_rank_new = label_rank_new.at[regrow_idx[max_mushrooms*2:max_mushrooms*3]].set(blue_mushrooms_regrowth)
+
+                #=====================================================================#
+                # only one orange mushroom would exist in the map
+                # orange mushrooms regrowth
+                orange_mushrooms_regrowth_check_time = jnp.sum(state.mushrooms_matches[:,3:4])
+                p = jax.random.uniform(key, shape=(1,))
+                p = jnp.where(jnp.arange(p.shape[0]) >= orange_mushrooms_regrowth_check_time, 1.0, p)
+
+                orange_mushrooms_locs = regrow_locs[max_mushrooms*3:max_mushrooms*3 + 1, :]
+
+                def regrow_orange_mushrooms(p, orange_loc) -> jnp.ndarray:
+                    orange_sch_cat = jnp.where(p<self.regrow_rate_orange, Items.orange_mushrooms, grid_mushrooms[orange_loc[0], orange_loc[1]])
+                    return orange_sch_cat
+                orange_mushrooms_regrowth = jax.vmap(regrow_orange_mushrooms)(p, orange_mushrooms_locs)
+                grid_mushrooms = grid_mushrooms.at[orange_mushrooms_locs[:, 0], orange_mushrooms_locs[:, 1]].set(orange_mushrooms_regrowth)
+                label_rank_new = label_rank_new.at[regrow_idx[max_mushrooms*3:max_mushrooms*3 + 1]].set(orange_mushrooms_regrowth)
+                #=====================================================================#
             
 
-            state = state.replace(potential_empty_labels=label_rank_new)
-            state = state.replace(potential_empty_locs=unstable_sorted_locs)
+                state = state.replace(potential_empty_labels=label_rank_new)
 
-            new_grid = grid_mushrooms
+            with jax.named_scope("movement"):
+                new_grid = grid_mushrooms
 
-            new_grid = grid_mushrooms.at[
-                state.agent_locs[:, 0],
-                state.agent_locs[:, 1]
-            ].set(
-                jnp.int16(Items.empty)
-            )
+                new_grid = grid_mushrooms.at[
+                    state.agent_locs[:, 0],
+                    state.agent_locs[:, 1]
+                ].set(
+                    jnp.int16(Items.empty)
+                )
 
-            # new_grid = grid_mushrooms  # .at[state.potential_empty_locs[:, 0], state.potential_empty_locs[:, 1]].set(state.potential_empty_labels)
-            x, y = state.reborn_locs[:, 0], state.reborn_locs[:, 1]
-            new_grid = new_grid.at[x, y].set(self._agents)
-            state = state.replace(grid=new_grid)
-            state = state.replace(agent_locs=state.reborn_locs)
+                # new_grid = grid_mushrooms  # .at[self.SPAWNS_PLAYERS[:, 0], self.SPAWNS_PLAYERS[:, 1]].set(state.potential_empty_labels)
+                x, y = state.reborn_locs[:, 0], state.reborn_locs[:, 1]
+                new_grid = new_grid.at[x, y].set(self._agents)
+                state = state.replace(grid=new_grid)
+                state = state.replace(agent_locs=state.reborn_locs)
 
-            #=======================================================================================================#
-            # update players in labels
-            def renew_empty_labels(locs, labels):
-                return jnp.where(1, new_grid[locs[0], locs[1]], 0)
+                #=======================================================================================================#
+                # update players in labels
+                def renew_empty_labels(locs, labels):
+                    return jnp.where(1, new_grid[locs[0], locs[1]], 0)
             
-            renew_label = jax.vmap(renew_empty_labels)(state.potential_empty_locs, state.potential_empty_labels)
-            state = state.replace(potential_empty_labels=renew_label)
+                renew_label = jax.vmap(renew_empty_labels)(self.SPAWNS_PLAYERS, state.potential_empty_labels)
+                state = state.replace(potential_empty_labels=renew_label)
 
-            #=======================================================================================================#
+                #=======================================================================================================#
 
-            key, subkey = jax.random.split(key)
-            all_new_locs = jax.vmap(lambda p, a: jnp.int16(p + ROTATIONS[a]) % jnp.array([self.GRID_SIZE_ROW + 1, self.GRID_SIZE_COL + 1, 4], dtype=jnp.int16))(p=state.agent_locs, a=actions).squeeze()
+                key, subkey = jax.random.split(key)
+                all_new_locs = jax.vmap(lambda p, a: jnp.int16(p + ROTATIONS[a]) % jnp.array([self.GRID_SIZE_ROW + 1, self.GRID_SIZE_COL + 1, 4], dtype=jnp.int16))(p=state.agent_locs, a=actions).squeeze()
 
-            agent_move = (actions == Actions.up) | (actions == Actions.down) | (actions == Actions.right) | (actions == Actions.left)
-            all_new_locs = jax.vmap(lambda m, n, p: jnp.where(m, n + STEP_MOVE[p], n))(m=agent_move, n=all_new_locs, p=actions)
+                agent_move = (actions == Actions.up) | (actions == Actions.down) | (actions == Actions.right) | (actions == Actions.left)
+                all_new_locs = jax.vmap(lambda m, n, p: jnp.where(m, n + STEP_MOVE[p], n))(m=agent_move, n=all_new_locs, p=actions)
             
-            all_new_locs = jax.vmap(
-                jnp.clip,
-                in_axes=(0, None, None)
-            )(
-                all_new_locs,
-                jnp.array([0, 0, 0], dtype=jnp.int16),
-                jnp.array(
-                    [self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1, 3],
-                    dtype=jnp.int16
-                ),
-            ).squeeze()
-
-            # Resolve agent-agent movement conflicts via the shared
-            # resolver: same-target conflicts (non-mover priority, else
-            # random winner), swaps blocked, trains allowed, cascades
-            # reverted to a fixed point. Final (row, col) unique.
-            key, move_key = jax.random.split(key)
-            new_locs = resolve_movement(move_key, state.agent_locs, all_new_locs)
-
-            def red_matcher(p: jnp.ndarray) -> jnp.ndarray:
-                c_matches = jnp.array([
-                    state.grid[p[0], p[1]] == Items.red_mushrooms
-                    ])
-                return c_matches
+                all_new_locs = jax.vmap(
+                    jnp.clip,
+                    in_axes=(0, None, None)
+                )(
+                    all_new_locs,
+                    jnp.array([0, 0, 0], dtype=jnp.int16),
+                    jnp.array(
+                        [self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1, 3],
+                        dtype=jnp.int16
+                    ),
+                ).squeeze()
+
+                # Resolve agent-agent movement conflicts via the shared
+                # resolver: same-target conflicts (non-mover priority, else
+                # random winner), swaps blocked, trains allowed, cascades
+                # reverted to a fixed point. Final (row, col) unique.
+                key, move_key = jax.random.split(key)
+                new_locs = resolve_movement(move_key, state.agent_locs, all_new_locs)
+
+                def red_matcher(p: jnp.ndarray) -> jnp.ndarray:
+                    c_matches = jnp.array([
+                        state.grid[p[0], p[1]] == Items.red_mushrooms
+                        ])
+                    return c_matches
             
-            red_matches = jax.vmap(red_matcher)(p=new_locs)
+                red_matches = jax.vmap(red_matcher)(p=new_locs)
 
-            stay_time = state.stay_time
-            stay_time = jnp.where(red_matches.squeeze(), 10, stay_time)
+                stay_time = state.stay_time
+                stay_time = jnp.where(red_matches.squeeze(), 10, stay_time)
 
-            def green_matcher(p: jnp.ndarray) -> jnp.ndarray:
-                c_matches = jnp.array([
-                    state.grid[p[0], p[1]] == Items.green_mushrooms
-                    ])
-                return c_matches
-            green_matches = jax.vmap(green_matcher)(p=new_locs)
+                def green_matcher(p: jnp.ndarray) -> jnp.ndarray:
+                    c_matches = jnp.array([
+                        state.grid[p[0], p[1]] == Items.green_mushrooms
+                        ])
+                    return c_matches
+                green_matches = jax.vmap(green_matcher)(p=new_locs)
 
-            stay_time = jnp.where(green_matches.squeeze(), 15, stay_time)
+                stay_time = jnp.where(green_matches.squeeze(), 15, stay_time)
 
-            def blue_matcher(p: jnp.ndarray) -> jnp.ndarray:
-                c_matches = jnp.array([
-                    state.grid[p[0], p[1]] == Items.blue_mushrooms
-                    ])
-                return c_matches
-            blue_matches = jax.vmap(blue_matcher)(p=new_locs)
+                def blue_matcher(p: jnp.ndarray) -> jnp.ndarray:
+                    c_matches = jnp.array([
+                        state.grid[p[0], p[1]] == Items.blue_mushrooms
+                        ])
+                    return c_matches
+                blue_matches = jax.vmap(blue_matcher)(p=new_locs)
 
-            stay_time = jnp.where(blue_matches.squeeze(), 20, stay_time)
-            state = state.replace(stay_time=stay_time)
+                stay_time = jnp.where(blue_matches.squeeze(), 20, stay_time)
+                state = state.replace(stay_time=stay_time)
 
-            def orange_matcher(p: jnp.ndarray) -> jnp.ndarray:
-                c_matches = jnp.array([
-                    state.grid[p[0], p[1]] == Items.orange_mushrooms
-                    ])
-                return c_matches
-            orange_matches = jax.vmap(orange_matcher)(p=new_locs)
+                def orange_matcher(p: jnp.ndarray) -> jnp.ndarray:
+                    c_matches = jnp.array([
+                        state.grid[p[0], p[1]] == Items.orange_mushrooms
+                        ])
+                    return c_matches
+                orange_matches = jax.vmap(orange_matcher)(p=new_locs)
 
 
-            rewards = jnp.zeros((self.num_agents, 1))
+            with jax.named_scope("rewards"):
+                rewards = jnp.zeros((self.num_agents, 1))
 
-            # red mushrooms reward
-            red_rewards = jnp.where(red_matches, 1, 0)
+                # red mushrooms reward
+                red_rewards = jnp.where(red_matches, 1, 0)
 
-            # green mushrooms reward
-            num_enten_green_mushrooms = jnp.sum(green_matches)
-            green_rewards = jnp.zeros((self.num_agents, 1)) + num_enten_green_mushrooms * 2/self.num_agents
+                # green mushrooms reward
+                num_enten_green_mushrooms = jnp.sum(green_matches)
+                green_rewards = jnp.zeros((self.num_agents, 1)) + num_enten_green_mushrooms * 2/self.num_agents
 
-            # blue mushrooms reward
-            num_enten_blue_mushrooms = jnp.sum(blue_matches)
-            blue_reward_share = 3 / (self.num_agents - 1)
-            blue_rewards_pos = (num_enten_blue_mushrooms - blue_matches) * blue_reward_share
-            # TODO whether to add the negative reward
-            blue_rewards_neg = jnp.where(blue_matches, 0, 0)
-            blue_rewards = blue_rewards_pos + blue_rewards_neg
+                # blue mushrooms reward
+                num_enten_blue_mushrooms = jnp.sum(blue_matches)
+                blue_reward_share = 3 / (self.num_agents - 1)
+                blue_rewards_pos = (num_enten_blue_mushrooms - blue_matches) * blue_reward_share
+                # TODO whether to add the negative reward
+                blue_rewards_neg = jnp.where(blue_matches, 0, 0)
+                blue_rewards = blue_rewards_pos + blue_rewards_neg
 
-            # orange mushrooms reward
-            orange_rewards = jnp.zeros((self.num_agents, 1)) - 0.2 * jnp.sum(orange_matches)
+                # orange mushrooms reward
+                orange_rewards = jnp.zeros((self.num_agents, 1)) - 0.2 * jnp.sum(orange_matches)
 
-            rewards = red_rewards + green_rewards + blue_rewards + orange_rewards
+                rewards = red_rewards + green_rewards + blue_rewards + orange_rewards
 
-            mushrooms_matches = jnp.concatenate((red_matches, green_matches, blue_matches, orange_matches), axis=1)
-            state = state.replace(mushrooms_matches=mushrooms_matches)
+                mushrooms_matches = jnp.concatenate((red_matches, green_matches, blue_matches, orange_matches), axis=1)
+                state = state.replace(mushrooms_matches=mushrooms_matches)
 
 
             # update grid
-            old_grid = state.grid
-
-            new_grid = old_grid.at[
-                state.agent_locs[:, 0],
-                state.agent_locs[:, 1]
-            ].set(
-                jnp.int16(Items.empty)
-            )
-            x, y = new_locs[:, 0], new_locs[:, 1]
-            new_grid = new_grid.at[x, y].set(self._agents)
-            state = state.replace(grid=new_grid)
-
-            #=======================================================================================================#
-            # update players in labels
-            def renew_empty_labels(locs, labels):
-                return jnp.where(1, new_grid[locs[0], locs[1]], 0)
+            with jax.named_scope("movement"):
+                old_grid = state.grid
+
+                new_grid = old_grid.at[
+                    state.agent_locs[:, 0],
+                    state.agent_locs[:, 1]
+                ].set(
+                    jnp.int16(Items.empty)
+                )
+                x, y = new_locs[:, 0], new_locs[:, 1]
+                new_grid = new_grid.at[x, y].set(self._agents)
+                state = state.replace(grid=new_grid)
+
+                #=======================================================================================================#
+                # update players in labels
+                def renew_empty_labels(locs, labels):
+                    return jnp.where(1, new_grid[locs[0], locs[1]], 0)
             
-            renew_label = jax.vmap(renew_empty_labels)(state.potential_empty_locs, state.potential_empty_labels)
-            state = state.replace(potential_empty_labels=renew_label)
+                renew_label = jax.vmap(renew_empty_labels)(self.SPAWNS_PLAYERS, state.potential_empty_labels)
+                state = state.replace(potential_empty_labels=renew_label)
 
-            #=======================================================================================================#
+                #=======================================================================================================#
 
-            # update agent locations
-            state = state.replace(agent_locs=new_locs)
+                # update agent locations
+                state = state.replace(agent_locs=new_locs)
 
-            reborn_players, state = _interact(key, state, actions)
+            with jax.named_scope("interaction"):
+                reborn_players, state = _interact(key, state, actions)
 
             # Occupancy-aware respawn: reborn agents are placed on spawn
             # cells not occupied by any survivor, so no overlap is possible.
-            key, respawn_key = jax.random.split(key)
-            new_re_locs = resolve_respawn(
-                respawn_key, new_locs, reborn_players.astype(bool), self.SPAWNS_PLAYERS
-            )
-            state = state.replace(reborn_locs=new_re_locs)
-
-            rewards = rewards * self.num_agents
-
-            if self.shared_rewards:
-                rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
-                rewards = jnp.mean(rewards)
-                rewards_sum_all_agents += rewards
-                rewards = rewards_sum_all_agents
-                info = {
-                    "original_rewards": rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.inequity_aversion:
-                original_rewards = rewards
-                if self.smooth_rewards:
-                    should_smooth = (state.inner_t % 1) == 0
-                    new_smooth_rewards = 0.99 * 0.01* state.smooth_rewards + original_rewards
-                    rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(new_smooth_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
-                    state = state.replace(smooth_rewards=new_smooth_rewards)
+            with jax.named_scope("respawn"):
+                key, respawn_key = jax.random.split(key)
+                new_re_locs = resolve_respawn(
+                    respawn_key, new_locs, reborn_players.astype(bool), self.SPAWNS_PLAYERS
+                )
+                state = state.replace(reborn_locs=new_re_locs)
+
+            with jax.named_scope("rewards"):
+                rewards = rewards * self.num_agents
+
+                if self.shared_rewards:
+                    rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
+                    rewards = jnp.mean(rewards)
+                    rewards_sum_all_agents += rewards
+                    rewards = rewards_sum_all_agents
                     info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "smooth_rewards": state.smooth_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-                else:
-                    rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(original_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        "original_rewards": rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.inequity_aversion:
+                    original_rewards = rewards
+                    if self.smooth_rewards:
+                        should_smooth = (state.inner_t % 1) == 0
+                        new_smooth_rewards = 0.99 * 0.01* state.smooth_rewards + original_rewards
+                        rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(new_smooth_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        state = state.replace(smooth_rewards=new_smooth_rewards)
+                        info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "smooth_rewards": state.smooth_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                    else:
+                        rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(original_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.svo:
+                    original_rewards =  rewards
+                    rewards, theta = self.get_svo_rewards(original_rewards, self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents)
+                    info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "svo_theta": theta.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.interest:
+                    original_rewards = rewards
+
+                    # Calculate current s_interest based on timestep
+                    current_s_interest = get_current_s_interest(timestep)
+                    original_flat = original_rewards.squeeze()
+
+                    # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
+                    total_reward = jnp.sum(original_flat)
+                    others_reward = total_reward - original_flat  # sum of all other agents' rewards
+
+                    rewards = (current_s_interest * original_flat +
+                            (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
+
                     info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.svo:
-                original_rewards =  rewards
-                rewards, theta = self.get_svo_rewards(original_rewards, self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents)
-                info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "svo_theta": theta.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.interest:
-                original_rewards = rewards
-
-                # Calculate current s_interest based on timestep
-                current_s_interest = get_current_s_interest(timestep)
-                original_flat = original_rewards.squeeze()
-
-                # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
-                total_reward = jnp.sum(original_flat)
-                others_reward = total_reward - original_flat  # sum of all other agents' rewards
-
-                rewards = (current_s_interest * original_flat +
-                        (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
-
-                info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                    "s_interest": current_s_interest,
-                }
-            else:
-                rewards = rewards
-                info = {}
+                        "original_rewards": original_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                        "s_interest": current_s_interest,
+                    }
+                else:
+                    rewards = rewards
+                    info = {}
             
-            blue_reward  = jnp.where(blue_matches, 1, 0)
-            info["eat_blue_mushrooms"] = blue_reward.squeeze()
+                blue_reward  = jnp.where(blue_matches, 1, 0)
+                info["eat_blue_mushrooms"] = blue_reward.squeeze()
 
 
  
@@ -1166,7 +912,6 @@ class Mushrooms(MultiAgentEnv):
                 freeze=state.freeze,
                 reborn_locs=state.reborn_locs,
                 mushrooms_matches=state.mushrooms_matches,
-                potential_empty_locs=state.potential_empty_locs,
                 potential_empty_labels=state.potential_empty_labels,
                 stay_time=state.stay_time,
                 smooth_rewards=state.smooth_rewards,
@@ -1178,21 +923,16 @@ class Mushrooms(MultiAgentEnv):
             reset_inner = inner_t == num_inner_steps
 
             # if inner episode is done, return start state for next game
-            state_re = _reset_state(key)
-
-            state_re = state_re.replace(outer_t=outer_t + 1)
-            state = jax.tree.map(
-                lambda x, y: jnp.where(reset_inner, x, y),
-                state_re,
-                state_nxt,
-            )
+            with jax.named_scope("episode_reset"):
+                state = self.inner_reset(key, reset_inner, _reset_state, state_nxt)
             outer_t = state.outer_t
             reset_outer = outer_t == num_outer_steps
             done = {f'{a}': reset_outer for a in self.agents}
             # done = [reset_outer for _ in self.agents]
             done["__all__"] = reset_outer
 
-            obs = _get_obs(state)
+            with jax.named_scope("observation"):
+                obs = _get_obs(state)
             rewards = jnp.where(
                 reset_inner,
                 jnp.zeros_like(rewards, dtype=jnp.int16),
@@ -1205,7 +945,7 @@ class Mushrooms(MultiAgentEnv):
                 state,
                 rewards.squeeze(),
                 done,
-                info,
+                self.select_info(info),
             )
         
 
@@ -1285,7 +1025,7 @@ class Mushrooms(MultiAgentEnv):
 
             freeze = jnp.array(
                 [[-1]*num_agents]*num_agents,
-            dtype=jnp.int16
+            dtype=jnp.int8
             )
 
             mushroom_matches = jnp.array([[False] * 4]*num_agents, dtype=jnp.bool_)
@@ -1295,16 +1035,15 @@ class Mushrooms(MultiAgentEnv):
             return State(
                 agent_locs=agent_locs,
                 agent_invs=jnp.array([(0,0)]*num_agents, dtype=jnp.int8),
-                inner_t=0,
-                outer_t=0,
+                inner_t=jnp.zeros((), self._counter_dtype),
+                outer_t=jnp.zeros((), self._counter_dtype),
                 grid=grid,
                 freeze=freeze,
                 reborn_locs = agent_locs,
                 mushrooms_matches=mushroom_matches,
-                potential_empty_locs=self.SPAWNS_PLAYERS,
                 potential_empty_labels=potential_empty_labels,
                 stay_time=stay_time,
-                smooth_rewards = jnp.zeros((num_agents, 1), dtype=jnp.float32),
+                smooth_rewards = jnp.zeros((num_agents, 1 if self.smooth_rewards else 0), dtype=jnp.float32),
             )
 
         def reset(
@@ -1327,6 +1066,10 @@ class Mushrooms(MultiAgentEnv):
             self.get_obs_point = _get_obs_point
         ################################################################################
 
+        # exposed for MultiAgentEnv.step(reset_state=...) and speed_test/benchmark_suite.py
+        self.get_obs = jax.jit(_get_obs)
+        self.get_agent_obs = jax.jit(_get_agent_obs)
+
     @property
     def name(self) -> str:
         """Environment name."""
@@ -1351,6 +1094,14 @@ class Mushrooms(MultiAgentEnv):
             else (self.OBS_SIZE**2 * ((len(Items)-1) + 10),)
         )
 
+        if self.obs_format == "compact":
+            channels = self.obs_encoding[1]
+            _shape_obs = (
+                (self.OBS_SIZE, self.OBS_SIZE, channels)
+                if self.cnn
+                else (self.OBS_SIZE**2 * channels,)
+            )
+
         return spaces.Box(
                 low=0, high=1E9, shape=_shape_obs, dtype=jnp.uint8
             ), _shape_obs
@@ -1482,77 +1233,26 @@ class Mushrooms(MultiAgentEnv):
         :param r: target renderer object
         :param tile_size: tile size in pixels
         """
-        tile_size = 32
-        highlight_mask = onp.zeros_like(onp.array(self.GRID))
+        return onp.asarray(self.renderer.render(state))
 
-        # Compute the total grid size
-        width_px = self.GRID.shape[1] * tile_size
-        height_px = self.GRID.shape[0] * tile_size
+    def render_batch(self, states: State) -> jnp.ndarray:
+        """
+        Render a batch of states (leading batch axis on every field) in one
+        jitted call; returns uint8 frames of shape (B, H, W, 3).
+        """
+        return self.renderer.render_batch(states)
 
-        img = onp.zeros(shape=(height_px, width_px, 3), dtype=onp.uint8)
-        grid = onp.array(state.grid)
-        
-        grid = onp.pad(
-            grid, ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)), constant_values=Items.wall
-        )
-        for a in range(self.num_agents):
-            startx, starty = self.get_obs_point(
-                state.agent_locs[a]
+    @property
+    def renderer(self) -> GridRenderer:
+        """Jittable tile-atlas renderer, built on first use."""
+        if self._renderer is None:
+            self._renderer = GridRenderer(
+                self,
+                values=list(range(len(Items))) + list(onp.asarray(self._agents)),
+                pad_value=Items.wall,
+                tile_size=32,
             )
-            highlight_mask[
-                startx : startx + self.OBS_SIZE, starty : starty + self.OBS_SIZE
-            ] = True
-
-        # Render the grid
-        for j in range(0, grid.shape[1]):
-            for i in range(0, grid.shape[0]):
-                cell = grid[i, j]
-                if cell == 0:
-                    cell = None
-                agent_here = []
-                for a in self._agents:
-                    agent_here.append(cell == a)
-                # if cell in [1,2]:
-                #     print(f'coordinates: {i},{j}')
-                #     print(cell)
-
-                agent_dir = None
-                for a in range(self.num_agents):
-                    agent_dir = (
-                        state.agent_locs[a,2].item()
-                        if agent_here[a]
-                        else agent_dir
-                    )
-                
-                agent_hat = False
-
-
-                tile_img = self.render_tile(
-                    cell,
-                    agent_dir=agent_dir,
-                    agent_hat=agent_hat,
-                    highlight=highlight_mask[i, j],
-                    tile_size=tile_size,
-                )
-
-                ymin = i * tile_size
-                ymax = (i + 1) * tile_size
-                xmin = j * tile_size
-                xmax = (j + 1) * tile_size
-                img[ymin:ymax, xmin:xmax, :] = tile_img
-        img = onp.rot90(
-            img[
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                :,
-            ],
-            2,
-        )
-
-        # time = self.render_time(state, img.shape[1])
-        # img = onp.concatenate((img, *agent_inv, time), axis=0)
-        # img = onp.concatenate((img, time), axis=0)
-        return img
+        return self._renderer
 
 
     def render_time(self, state, width_px) -> onp.array:
@@ -0,0 +1,243 @@
+"""Shared, jit-safe observation encodings for the grid environments.
+
+The SocialJax-lineage grid environments emit, per agent, an egocentric
+(OBS_SIZE, OBS_SIZE, C) tensor whose channels are laid out as
+
+    [item one-hot (num_items - 1), self, other, relative angle one-hot (4), extras...]
+
+where ``num_items == len(Items)`` for the env and the extras (pickup flags,
+inventories, freeze flag, ...) are small non-negative integers. The one-hot
+blocks make this tensor large: it dominates rollout memory when stored in a
+trajectory.
+
+``obs_format="compact"`` replaces it with a uint8 tensor of
+``2 + num_extras`` channels:
+
+    channel 0   cell code: 0..num_items-1 for items, num_items for the
+                observing agent, num_items + 1 for any other agent
+    channel 1   relative angle of the agent in the cell (0-3), 4 if none
+    channel 2+  the extras, verbatim
+
+The encoding is lossless: ``algorithms.utils.networks`` expands it back to
+the full layout in the first network layer (see ``expand_compact_obs``).
+
+``egocentric_obs`` builds these observations (in either format) for all
+agents at once, or for a subset of them. The per-cell features that only
+depend on which agent stands in a cell (its heading, inventory, pickup and
+freeze flags) are computed once on the global grid; every observing agent's
+rotated window is then read with a single gather through precomputed
+per-heading index tables (``rotation_tables``), instead of padding the grid,
+slicing, evaluating all ``jnp.rot90`` variants and one-hot encoding per
+agent.
+"""
+
+import jax
+import jax.numpy as jnp
+import numpy as onp
+
+NUM_ANGLES = 4
+# at most this many frozen agents' inventories are shown to a zapping agent
+MAX_SHOWN_INVENTORIES = 12
+
+
+def rotation_tables(obs_size):
+    """
+    Window cells read by each cell of a rotated observation.
+
+    Returns:
+        int32 numpy array of shape (NUM_ANGLES, obs_size, obs_size, 2):
+        ``tables[d, a, b]`` is the (row, col) of the unrotated window shown
+        at (a, b) to an agent with heading ``d``, i.e. the observation is
+        ``jnp.rot90(window, k=d)``.
+    """
+    cells = onp.arange(obs_size * obs_size).reshape(obs_size, obs_size)
+    rotated = onp.stack([onp.rot90(cells, k=d, axes=(0, 1)) for d in range(NUM_ANGLES)])
+    return onp.stack(onp.divmod(rotated, obs_size), axis=-1).astype(onp.int32)
+
+
+def obs_window_origin(agent_loc, obs_size, padding):
+    """
+    Top-left corner, in padded-grid coordinates, of the (obs_size, obs_size)
+    window an agent at (row, col, heading) sees: the window extends in
+    front of the agent, with the agent on its last row before rotation.
+    """
+    x, y, direction = agent_loc
+    x = x + padding - (obs_size // 2)
+    y = y + padding - (obs_size // 2)
+    x = jnp.where(direction == 0, x + (obs_size // 2) - 1, x)
+    y = jnp.where(direction == 1, y + (obs_size // 2) - 1, y)
+    x = jnp.where(direction == 2, x - (obs_size // 2) + 1, x)
+    y = jnp.where(direction == 3, y - (obs_size // 2) + 1, y)
+    return x, y
+
+
+def _cell_planes(grid, agent_locs, agent_invs, freeze, num_items, agent_extras):
+    """(..., P) int32 features of each cell that depend only on its content."""
+    num_agents = agent_locs.shape[0]
+    is_agent = (grid >= num_items) & (grid < num_items + num_agents)
+    agent = jnp.where(is_agent, grid - num_items, 0)
+    # inventory and freeze flag are read one agent index down (wrapping),
+    # as the per-agent observation code this replaces indexed them
+    prev = (agent - 1) % num_agents
+    planes = [
+        grid,
+        agent_locs[agent, 2],
+        agent_invs[prev, 0],
+        agent_invs[prev, 1],
+        jnp.max(freeze[prev], axis=-1) > 0,
+    ]
+    if agent_extras is not None:
+        extras = jnp.where(is_agent[..., None], agent_extras[agent], 0)
+        planes += [extras[..., k] for k in range(agent_extras.shape[-1])]
+    return jnp.stack([p.astype(jnp.int32) for p in planes], axis=-1)
+
+
+def egocentric_obs(
+    grid,
+    agent_locs,
+    agent_invs,
+    freeze,
+    num_items,
+    obs_size,
+    padding,
+    pad_value,
+    agent_extras=None,
+    shared_extras=None,
+    compact=False,
+    agents=None,
+):
+    """
+    Egocentric observations of all agents, in the full or compact layout.
+
+    Args:
+        grid: (H, W) int grid; agent ``i`` is stored as ``num_items + i``.
+        agent_locs: (N, 3) agent (row, col, heading).
+        agent_invs: (N, 2) agent inventories.
+        freeze: (N, N) freeze counters.
+        num_items: ``len(Items)`` of the env.
+        obs_size: side of the square observation window.
+        padding: wall padding assumed around the grid by ``obs_window_origin``.
+        pad_value: cell value outside the grid (``Items.wall``).
+        agent_extras: optional (N, E) features shown in the cells occupied by
+            each agent (e.g. pickup flags), 0 elsewhere.
+        shared_extras: optional (E',) features shown in every cell.
+        compact: return the compact uint8 layout instead of the full one.
+        agents: optional (K,) indices of the observing agents; only their
+            windows are gathered. Defaults to all N agents.
+
+    Returns:
+        (K, obs_size, obs_size, C): float32 full observations with extras
+        ``[agent_extras, shared_extras, inventory (2), frozen]``, or their
+        ``pack_compact_obs`` encoding when ``compact``.
+    """
+    num_agents = agent_locs.shape[0]
+    height, width = grid.shape
+    agents = jnp.arange(num_agents) if agents is None else jnp.asarray(agents, jnp.int32)
+    observers = jnp.arange(agents.shape[0])
+    headings = agent_locs[agents, 2].astype(jnp.int32)
+
+    planes = _cell_planes(grid.astype(jnp.int32), agent_locs, agent_invs, freeze, num_items, agent_extras)
+    pad_planes = _cell_planes(jnp.int32(pad_value), agent_locs, agent_invs, freeze, num_items, agent_extras)
+
+    # one gather of every agent's rotated window; the window origin is
+    # clamped to the padded grid as jax.lax.dynamic_slice would
+    x, y = jax.vmap(obs_window_origin, in_axes=(0, None, None))(agent_locs[agents], obs_size, padding)
+    x = jnp.clip(x, 0, height + 2 * padding - obs_size).astype(jnp.int32)
+    y = jnp.clip(y, 0, width + 2 * padding - obs_size).astype(jnp.int32)
+    cells = jnp.asarray(rotation_tables(obs_size))[headings]  # (K, O, O, 2)
+    rows = x[:, None, None] + cells[..., 0] - padding
+    cols = y[:, None, None] + cells[..., 1] - padding
+    inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+    window = planes[jnp.clip(rows, 0, height - 1), jnp.clip(cols, 0, width - 1)]
+    window = jnp.where(inside[..., None], window, pad_planes)
+
+    value, cell_heading = window[..., 0], window[..., 1]
+    inventory, frozen = window[..., 2:4], window[..., 4] > 0
+    cell_extras = window[..., 5:]
+    per_agent = (slice(None), None, None)
+
+    is_agent = (value >= num_items) & (value < num_items + num_agents)
+    # the "self" flag marks agent i + 1 (the last agent marks itself), as
+    # the per-agent observation code this replaces read it; kept so that
+    # observations are unchanged
+    self_value = num_items + jnp.minimum(agents + 1, num_agents - 1)
+    is_self = value == self_value[per_agent]
+    is_other = is_agent & ~is_self
+    angle = jnp.where(
+        is_agent & (value != (num_items + agents)[per_agent]),
+        (cell_heading - headings[per_agent]) % NUM_ANGLES,
+        -1,
+    )
+
+    # inventories are shown for the observer's own flagged cell and, while
+    # the observer freezes someone, for the first MAX_SHOWN_INVENTORIES
+    # agents in its freeze row
+    freeze_row = freeze[jnp.minimum(num_items + agents, num_agents - 1)] != 0
+    shown = freeze_row & (jnp.cumsum(freeze_row, axis=-1) <= MAX_SHOWN_INVENTORIES)
+    shown = shown & (jnp.max(freeze[agents], axis=-1) > 0)[:, None]
+    shown_idx = jnp.clip(value - num_items - 1, 0, num_agents - 1)
+    show_inventory = is_self | (
+        is_agent & (value > num_items) & shown[observers[per_agent], shown_idx]
+    )
+    inventory = jnp.where(show_inventory[..., None], inventory, 0)
+    frozen = is_other & frozen
+
+    extras = [cell_extras]
+    if shared_extras is not None:
+        extras.append(jnp.broadcast_to(shared_extras, value.shape + shared_extras.shape))
+    extras += [inventory, frozen[..., None]]
+    extras = jnp.concatenate([e.astype(jnp.int32) for e in extras], axis=-1)
+
+    if compact:
+        is_item = (value >= 1) & (value < num_items)
+        code = jnp.where(is_item, value, 0) + is_self * num_items + is_other * (num_items + 1)
+        angle_code = jnp.where(angle >= 0, angle, NUM_ANGLES)
+        return jnp.concatenate(
+            [code[..., None], angle_code[..., None], extras], axis=-1
+        ).astype(jnp.uint8)
+
+    return jnp.concatenate(
+        [
+            jax.nn.one_hot(value - 1, num_items - 1),
+            is_self[..., None].astype(jnp.float32),
+            is_other[..., None].astype(jnp.float32),
+            jax.nn.one_hot(angle, NUM_ANGLES),
+            extras.astype(jnp.float32),
+        ],
+        axis=-1,
+    )
+
+
+def compact_obs_encoding(num_items, num_full_channels):
+    """Return ``(num_codes, num_compact_channels)`` describing compact obs.
+
+    ``num_codes`` is the width of the item + self + other one-hot block
+    (``num_items + 1``), which together with the channel count is all a
+    network needs to undo ``pack_compact_obs``.
+    """
+    num_extras = num_full_channels - (num_items - 1) - 2 - NUM_ANGLES
+    return num_items + 1, 2 + num_extras
+
+
+def pack_compact_obs(obs, num_items):
+    """Pack full one-hot observations (..., C) into compact uint8 (..., 2 + extras)."""
+    n = num_items - 1
+    items = obs[..., :n]
+    self_ch = obs[..., n]
+    other_ch = obs[..., n + 1]
+    angle = obs[..., n + 2 : n + 2 + NUM_ANGLES]
+    extras = obs[..., n + 2 + NUM_ANGLES :]
+
+    code = (
+        jnp.sum(items * jnp.arange(1, num_items), axis=-1)
+        + self_ch * num_items
+        + other_ch * (num_items + 1)
+    )
+    angle_code = jnp.where(
+        jnp.any(angle > 0, axis=-1),
+        jnp.argmax(angle, axis=-1),
+        NUM_ANGLES,
+    )
+    return jnp.concatenate(
+        [code[..., None], angle_code[..., None], extras], axis=-1
+    ).astype(jnp.uint8)
@@ -10,8 +10,11 @@ import numpy as onp
 from flax.struct import dataclass
 import colorsys
 
+from socialjax.environments.interaction import resolve_interaction_conflicts
 from socialjax.environments.movement import resolve_movement, resolve_respawn
-from socialjax.environments.multi_agent_env import MultiAgentEnv
+from socialjax.environments.observation import compact_obs_encoding, egocentric_obs, obs_window_origin
+from socialjax.environments.rendering import GridRenderer
+from socialjax.environments.multi_agent_env import MultiAgentEnv, counter_dtype
 from socialjax.environments import spaces
 
 
@@ -194,6 +197,8 @@ class PD_Arena(MultiAgentEnv):
         obs_size=11,
         num_coins=6,
         cnn=True,
+        obs_format="full",
+        info_level="full",
         map_ASCII = [
     "WWWWWWWWWWWWWWWWWWWWWWWWW",
     "WPPPP      W W      PPPPW",
@@ -247,9 +252,10 @@ class PD_Arena(MultiAgentEnv):
 #     "WWWWWWWWWWWWWWWWWWWWWWWWW"
 # ]
     ):
-        super().__init__(num_agents=num_agents)
+        super().__init__(num_agents=num_agents, info_level=info_level)
         self.agents = list(range(num_agents))#, dtype=jnp.int16)
         self._agents = jnp.array(self.agents, dtype=jnp.int16) + len(Items)
+        self._renderer = None  # tile-atlas GridRenderer, built on first render
 
         # self.agents = [str(i) for i in list(range(num_agents))]
         self.freeze_penalty = freeze_penalty
@@ -307,139 +313,17 @@ class PD_Arena(MultiAgentEnv):
         self.SPAWNS_DEFECT = find_positions(nums_map, 1)
         self.SPAWNS_WALL = find_positions(nums_map, 3)
 
+        # spawn cells are static, so resource regrowth only needs these
+        # (GRID_SIZE_ROW, GRID_SIZE_COL) masks instead of per-step coord tests
+        spawn_mask = jnp.zeros((self.GRID_SIZE_ROW, self.GRID_SIZE_COL), dtype=jnp.bool_)
+        self.SPAWN_MASK_COOP = spawn_mask.at[
+            self.SPAWNS_COOP[:, 0], self.SPAWNS_COOP[:, 1]
+        ].set(True)
+        self.SPAWN_MASK_DEFECT = spawn_mask.at[
+            self.SPAWNS_DEFECT[:, 0], self.SPAWNS_DEFECT[:, 1]
+        ].set(True)
 
-        def rand_interaction(
-                key: int,
-                conflicts: jnp.ndarray,
-                conflicts_matrix: jnp.ndarray,
-                step_arr: jnp.ndarray
-            ) -> jnp.ndarray:
-            '''
-            Function for randomly choosing between conflicting interactions.
-            
-            Args:
-                - key: jax PRNGKey for randomisation.
-                - conflicts: jnp.ndarray of bools where True if agent is in a
-                conflicting interaction, False otherwise.
-                - conflicts_matrix: jnp.ndarray matrix of bools of agents in
-                conflicting interactions.
-                - step_arr: jnp.ndarray, where each index is the index of an
-                agent, and the element at each index is the item found at that
-                agent's respective target location in the grid.
-
-                
-            Returns:
-                - jnp.ndarray array of final interactions, where each index is
-                an agent, and each element is caught in its interaction beam.
-            '''
-            def scan_fn(
-                    state,
-                    idx
-            ):
-
-                key, conflicts, conflicts_matrix, step_arr = state
-
-                return jax.lax.cond(
-                    conflicts[idx] > 0,
-                    lambda: _rand_interaction(
-                        key,
-                        conflicts,
-                        conflicts_matrix,
-                        step_arr
-                    ),
-                    lambda: (state, step_arr.astype(jnp.int16))
-                )
-
-            _, ys = jax.lax.scan(
-                scan_fn,
-                (key, conflicts, conflicts_matrix, step_arr.astype(jnp.int16)),
-                jnp.arange(self.num_agents)
-            )
-
-            final_itxs = ys[-1]
-            return final_itxs
-
-        def _rand_interaction(
-                key: int,
-                conflicts: jnp.ndarray,
-                conflicts_matrix: jnp.ndarray,
-                step_arr: jnp.ndarray
-            ) -> jnp.ndarray:
-            '''
-            Function for randomly choosing between conflicting interactions.
-            
-            Args:
-                - key: jax PRNGKey for randomisation.
-                - conflicts: jnp.ndarray of bools where True if agent is in a
-                conflicting interaction, False otherwise.
-                - conflicts_matrix: jnp.ndarray matrix of bools of agents in
-                conflicting interactions.
-                - step_arr: jnp.ndarray, where each index is the index of an
-                agent, and the element at each index is the item found at that
-                agent's respective target location in the grid.
-
-                
-            Returns:
-                - jnp.ndarray array of final interactions, where each index is
-                an agent, and each element is caught in its interaction beam.
-            '''
-            conflict_idx = jnp.nonzero(
-                conflicts,
-                size=self.num_agents,
-                fill_value=-1
-            )[0][0]
-
-            agent_conflicts = conflicts_matrix[conflict_idx]
-
-            agent_conflicts_idx = jnp.nonzero(
-                agent_conflicts,
-                size=self.num_agents,
-                fill_value=-1
-            )[0]
-            max_rand = jnp.sum(agent_conflicts_idx > -1)
-
-            # preparing random agent selection
-            k1, k2 = jax.random.split(key, 2)
-            random_number = jax.random.randint(
-                k1,
-                (1,),
-                0,
-                max_rand
-            )
-
-            # index in main matrix of agent of successful interaction
-            rand_agent_idx = agent_conflicts_idx[random_number]
-
-            # set that agent's bool to False, for inversion later
-            new_agent_conflict = agent_conflicts.at[rand_agent_idx].set(False)
-
-            # set all remaining True agents' values as the "empty" item
-            step_arr = jnp.where(
-                new_agent_conflict,
-                Items.empty,
-                step_arr
-            ).astype(jnp.int16)
-
-            # update conflict bools to reflect the post-conflict state
-            _conflicts = conflicts.at[agent_conflicts_idx].set(0)
-            conflicts = jnp.where(
-                agent_conflicts,
-                0,
-                conflicts
-            )
-            conflicts = conflicts.at[conflict_idx].set(0)
-            conflicts_matrix = jax.vmap(
-                lambda c, x: jnp.where(c, x, jnp.array([False]*conflicts.shape[0]))
-            )(conflicts, conflicts_matrix)
 
-            # deal with next conflict
-            return ((
-                k2,
-                conflicts,
-                conflicts_matrix,
-                step_arr
-            ), step_arr)
-        
         def fix_interactions(
             key: jnp.ndarray,
             all_interacts: jnp.ndarray,
@@ -486,20 +370,11 @@ class PD_Arena(MultiAgentEnv):
                 Items.empty
             )
 
-            conflicts_matrix = check_interaction_conflict(forward) * (forward != Items.empty)[:, None]
-
-            conflicts = jnp.clip(
-                jnp.sum(conflicts_matrix, axis=-1),
-                0,
-                1
-            )
-
             k1, k2, k3  = jax.random.split(key, 3)
-            one_step = rand_interaction(
+            one_step = resolve_interaction_conflicts(
                 k2,
-                conflicts,
-                conflicts_matrix,
-                forward
+                forward,
+                self._agents
             )
 
             # if an interaction 2 steps away (diagonally or straight ahead)
@@ -598,22 +473,11 @@ class PD_Arena(MultiAgentEnv):
                 ).astype(jnp.int16)
             )(same_dist, all_two_step, actions)
 
-            two_step_conflicts_matrix = check_interaction_conflict(
-                same_dist_targets
-            ) * (same_dist_targets != Items.empty)[:, None]
-
-            two_step_conflicts = jnp.clip(
-                jnp.sum(two_step_conflicts_matrix, axis=-1),
-                0,
-                1
-            )
-
             k1, k2  = jax.random.split(k3, 2)
-            two_step_interacts = rand_interaction(
+            two_step_interacts = resolve_interaction_conflicts(
                 k2,
-                two_step_conflicts,
-                two_step_conflicts_matrix,
-                same_dist_targets
+                same_dist_targets,
+                self._agents
             )
 
             # combine one & two step interactions
@@ -675,35 +539,6 @@ class PD_Arena(MultiAgentEnv):
             )
 
         
-        # first attempt at func - needs improvement
-        # inefficient due to double-checking collisions
-        def check_interaction_conflict(
-                items: jnp.ndarray
-            ) -> jnp.ndarray:
-            '''
-            Function to check conflicting interaction targets.
-            
-            Args:
-                - items: jnp.ndarray, the agent itemss at the interaction
-                targets.
-                
-            Returns:
-                - jnp.ndarray matrix of bool of agents in collision.
-            '''
-            matcher = jax.vmap(
-                lambda x,y: jnp.logical_and(
-                    jnp.all(x == y),
-                    jnp.isin(x, self._agents)
-                ),
-                in_axes=(0, None)
-            )
-
-            collisions = jax.vmap(
-                matcher,
-                in_axes=(None, 0)
-            )(items, items)
-
-            return collisions
 
 
         def to_dict(
@@ -743,220 +578,6 @@ class PD_Arena(MultiAgentEnv):
 
             return state_dict
         
-        def combine_channels(
-                grid: jnp.ndarray,
-                agent: int,
-                angles: jnp.ndarray,
-                # agent_pickups: jnp.ndarray,
-                coop_resources: jnp.ndarray,
-                defect_resources: jnp.ndarray,
-                state: State,
-            ):
-            '''
-            Function to enforce symmetry in observations & generate final
-            feature representation; current agent is permuted to first 
-            position in the feature dimension.
-            
-            Args:
-                - grid: jax ndarray of current agent's obs grid
-                - agent: int, an index indicating current agent number
-                - angles: jnp.ndarray of current agents' relative orientation
-                in current agent's obs grid
-                - agent_pickups: jnp.ndarray of agents able to interact
-                - state: State, the env state obj
-            Returns:
-                - grid with current agent [x] permuted to 1st position (after
-                the first 4 "Items" features, so 5th position overall) in the
-                feature dimension, "other" [x] agent 2nd, angle [x, x, x, x]
-                3rd, pick-up [x] bool 4th, inventory [x, x] 5th, frozen [x]
-                6th, for a final obs grid of shape (5, 5, 14) (additional 4
-                one-hot places for 5 possible items)
-            '''
-            def move_and_collapse(
-                    x: jnp.ndarray,
-                    angle: jnp.ndarray,
-                ) -> jnp.ndarray:
-
-                # get agent's one-hot
-                agent_element = jnp.array([jnp.int8(x[agent])])
-
-                # mask to check if any other agent exists there
-                mask = x[len(Items)-1:] > 0
-
-                # does an agent exist which is not the subject?
-                other_agent = jnp.int8(
-                    jnp.logical_and(
-                        jnp.any(mask),
-                        jnp.logical_not(
-                            agent_element
-                        )
-                    )
-                )
-
-                # what is the class of the item in cell
-                item_idx = jnp.where(
-                    x,
-                    size=1
-                )[0]
-
-                # check if agent is frozen and can observe inventories
-                show_inv_bool = jnp.logical_and(
-                        state.freeze[
-                            agent-len(Items)
-                        ].max(axis=-1) > 0,
-                        item_idx >= len(Items)
-                )
-
-                show_inv_idxs = jnp.where(
-                    state.freeze[agent],
-                    size=12, # since, in a setting where simultaneous interac-
-                    fill_value=-1 # -tions can happen, only a max of 12 can
-                )[0] # happen at once (zap logic), regardless of pop size
-
-                inv_to_show = jnp.where(
-                    jnp.logical_or(
-                        jnp.logical_and(
-                            show_inv_bool,
-                            jnp.isin(item_idx-len(Items), show_inv_idxs),
-                        ),
-                        agent_element
-                    ),
-                    state.agent_invs[item_idx - len(Items)],
-                    jnp.array([0, 0], dtype=jnp.int8)
-                )[0]
-
-                # check if agent is not the subject & is frozen & therefore
-                # not possible to interact with
-                frozen = jnp.where(
-                    other_agent,
-                    state.freeze[
-                        item_idx-len(Items)
-                    ].max(axis=-1) > 0,
-                    0
-                )
-
-                # get pickup/inv info
-                # pick_up_idx = jnp.where(
-                #     jnp.any(mask),
-                #     jnp.nonzero(mask, size=1)[0],
-                #     jnp.int8(-1)
-                # )
-                # picked_up = jnp.where(
-                #     pick_up_idx > -1,
-                #     agent_pickups[pick_up_idx],
-                #     jnp.int8(0)
-                # )
-
-                # check coop_resources and defect_resources
-                coop_resources = state.coop_resources
-                defect_resources = state.defect_resources
-                    
-
-                # build extension
-                extension = jnp.concatenate(
-                    [
-                        agent_element,
-                        other_agent,
-                        angle,
-                        # picked_up,
-                        coop_resources,
-                        defect_resources,
-                        inv_to_show,
-                        frozen
-                    ],
-                    axis=-1
-                )
-
-                # build final feature vector
-                final_vec = jnp.concatenate(
-                    [x[:len(Items)-1], extension],
-                    axis=-1
-                )
-
-                return final_vec
-
-            new_grid = jax.vmap(
-                jax.vmap(
-                    move_and_collapse
-                )
-            )(grid, angles)
-            return new_grid
-        
-        def check_relative_orientation(
-                agent: int,
-                agent_locs: jnp.ndarray,
-                grid: jnp.ndarray
-            ) -> jnp.ndarray:
-            '''
-            Check's relative orientations of all other agents in view of
-            current agent.
-            
-            Args:
-                - agent: int, an index indicating current agent number
-                - agent_locs: jax ndarray of agent locations (x, y, direction)
-                - grid: jax ndarray of current agent's obs grid
-                
-            Returns:
-                - grid with 1) int -1 in places where no agent exists, or
-                where the agent is the current agent, and 2) int in range
-                0-3 in cells of opposing agents indicating relative
-                orientation to current agent.
-            '''
-            # we decrement by num of Items when indexing as we incremented by
-            # 5 in constructor call (due to 5 non-agent Items enum & locations
-            # are indexed from 0)
-            idx = agent - len(Items)
-            agents = jnp.delete(
-                self._agents,
-                idx,
-                assume_unique_indices=True
-            )
-            curr_agent_dir = agent_locs[idx, 2]
-
-            def calc_relative_direction(cell):
-                cell_agent = cell - len(Items)
-                cell_direction = agent_locs[cell_agent, 2]
-                return (cell_direction - curr_agent_dir) % 4
-
-            angle = jnp.where(
-                jnp.isin(grid, agents),
-                jax.vmap(calc_relative_direction)(grid),
-                -1
-            )
-
-            return angle
-        
-        def rotate_grid(agent_loc: jnp.ndarray, grid: jnp.ndarray) -> jnp.ndarray:
-            '''
-            Rotates agent's observation grid k * 90 degrees, depending on agent's
-            orientation.
-
-            Args:
-                - agent_loc: jax ndarray of agent's x, y, direction
-                - grid: jax ndarray of agent's obs grid
-
-            Returns:
-                - jnp.ndarray of new rotated grid.
-
-            '''
-            grid = jnp.where(
-                agent_loc[2] == 1,
-                jnp.rot90(grid, k=1, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 2,
-                jnp.rot90(grid, k=2, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 3,
-                jnp.rot90(grid, k=3, axes=(0, 1)),
-                grid,
-            )
-
-            return grid
-
         def _get_obs_point(agent_loc: jnp.ndarray) -> jnp.ndarray:
             '''
             Obtain the position of top-left corner of obs map using
@@ -967,119 +588,38 @@ class PD_Arena(MultiAgentEnv):
             Returns:
                 - x, y: ints of top-left corner of agent's obs map.
             '''
-            
-            x, y, direction = agent_loc
-
-            x, y = x + self.PADDING, y + self.PADDING
-
-            x = x - (self.OBS_SIZE // 2)
-            y = y - (self.OBS_SIZE // 2)
-
-
-            # x = jnp.where(direction == 3, x - (self.OBS_SIZE // 2), x)
-            # y = jnp.where(direction == 3, y - (self.OBS_SIZE // 2), y)
-
-            x = jnp.where(direction == 0, x + (self.OBS_SIZE//2)-1, x)
-            y = jnp.where(direction == 0, y, y)
-
-            x = jnp.where(direction == 1, x, x)
-            y = jnp.where(direction == 1, y + (self.OBS_SIZE//2)-1, y)
-
-
-            x = jnp.where(direction == 2, x - (self.OBS_SIZE//2)+1, x)
-            y = jnp.where(direction == 2, y, y)
-
-
-            x = jnp.where(direction == 3, x, x)
-            y = jnp.where(direction == 3, y - (self.OBS_SIZE//2)+1, y)
+            return obs_window_origin(agent_loc, self.OBS_SIZE, self.PADDING)
 
-            # x = jnp.where(direction == 1, x - (self.OBS_SIZE // 2), x)
-            # y = jnp.where(direction == 1, y - (self.OBS_SIZE - 1), y)
-
-            # x = jnp.where(direction == 2, x - (self.OBS_SIZE - 1), x)
-            # y = jnp.where(direction == 2, y - (self.OBS_SIZE // 2), y)
-
-            # x = jnp.where(direction == 2, x - (self.OBS_SIZE // 2), x)
-            # x = jnp.where(direction == 3, x - (self.OBS_SIZE - 1), x)
-
-            # y = jnp.where(direction == 0, y - (self.OBS_SIZE // 2), y)
-            # y = jnp.where(direction == 2, y - (self.OBS_SIZE - 1), y)
-            # y = jnp.where(direction == 3, y - (self.OBS_SIZE // 2), y)
-            return x, y
-
-        def _get_obs(state: State) -> jnp.ndarray:
+        def _get_obs(state: State, agents=None) -> jnp.ndarray:
             '''
             Obtain the agent's observation of the grid.
 
             Args: 
                 - state: State object containing env state.
+                - agents: optional indices of the observing agents, all by default.
             Returns:
                 - jnp.ndarray of grid observation.
             '''
-            # create state
-            grid = jnp.pad(
+            return egocentric_obs(
                 state.grid,
-                ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)),
-                constant_values=Items.wall,
-            )
-
-            # obtain all agent obs-points
-            agent_start_idxs = jax.vmap(_get_obs_point)(state.agent_locs)
-
-            dynamic_slice = partial(
-                jax.lax.dynamic_slice,
-                operand=grid,
-                slice_sizes=(self.OBS_SIZE, self.OBS_SIZE)
-            )
-
-            # obtain agent obs grids
-            grids = jax.vmap(dynamic_slice)(start_indices=agent_start_idxs)
-
-            # rotate agent obs grids
-            grids = jax.vmap(rotate_grid)(state.agent_locs, grids)
-
-            angles = jax.vmap(
-                check_relative_orientation,
-                in_axes=(0, None, 0)
-            )(
-                self._agents,
                 state.agent_locs,
-                grids
-            )
-
-            angles = jax.nn.one_hot(angles, 4)
-
-            # one-hot (drop first channel as its empty blocks)
-            grids = jax.nn.one_hot(
-                grids - 1,
-                num_agents + len(Items) - 1, # will be collapsed into a
-                dtype=jnp.int8 # [Items, self, other, extra features] representation
-            )
-
-            # check agents that can interact
-            inventory_sum = jnp.sum(state.agent_invs, axis=-1)
-            agent_pickups = jnp.where(
-                inventory_sum > INTERACT_THRESHOLD,
-                True,
-                False
+                state.agent_invs,
+                state.freeze,
+                num_items=len(Items),
+                obs_size=self.OBS_SIZE,
+                padding=self.PADDING,
+                pad_value=Items.wall,
+                # coop / defect resource counts of all agents, shown in every cell
+                shared_extras=jnp.concatenate([state.coop_resources, state.defect_resources]),
+                compact=self.obs_format == "compact",
+                agents=agents,
             )
 
-            # make index len(Item) always the current agent
-            # and sum all others into an "other" agent
-            grids = jax.vmap(
-                combine_channels,
-                in_axes=(0, 0, 0, None, None, None)
-            )(
-                grids,
-                self._agents,
-                angles,
-                # agent_pickups,
-                state.coop_resources,
-                state.defect_resources,
-                state
-            )
-
-            return grids
+        def _get_agent_obs(state: State, agent: int) -> jnp.ndarray:
+            '''
+            Observation of a single agent; only its window is gathered.
+            '''
+            return _get_obs(state, jnp.reshape(agent, (1,)))[0]
 
         def _get_reward(
                 state: State,
@@ -1749,6 +1289,40 @@ class PD_Arena(MultiAgentEnv):
             phase_idx = phase % self.s_interest_schedule.shape[0]
             return self.s_interest_schedule[phase_idx]
 
+        def _regrow_resources(
+                grid: jnp.ndarray,
+                key_coop: chex.PRNGKey,
+                key_defect: chex.PRNGKey
+            ) -> jnp.ndarray:
+            '''
+            Regrow coop and defect resources on their empty spawn cells, each
+            with probability 0.1. Coop is placed first, so a cell that is a
+            spawn point of both types never receives both.
+
+            Args:
+                - grid: jnp.ndarray of the current grid.
+                - key_coop, key_defect: jax PRNGKeys for the regrowth draws.
+            Returns:
+                - jnp.ndarray of the grid with regrown resources.
+            '''
+            empty = grid == Items.empty
+            coop = (
+                self.SPAWN_MASK_COOP
+                & empty
+                & (jax.random.uniform(key_coop, grid.shape) < 0.1)  # 10%的概率生成资源
+            )
+            defect = (
+                self.SPAWN_MASK_DEFECT
+                & empty
+                & ~coop
+                & (jax.random.uniform(key_defect, grid.shape) < 0.1)
+            )
+            return jnp.where(
+                coop,
+                jnp.int16(Items.coop),
+                jnp.where(defect, jnp.int16(Items.defect), grid),
+            )
+
         def _step(
             key: chex.PRNGKey,
             state: State,
@@ -1769,247 +1343,214 @@ class PD_Arena(MultiAgentEnv):
             actions = jnp.array(actions).squeeze()
             
             # 资源生成
-            grid_resources = state.grid
-            
-            def update_grid(grid, coords, items_empty, items_key, key):
-                # 创建掩码
-                grid_shape = grid.shape
-                y, x = jnp.mgrid[0:grid_shape[0], 0:grid_shape[1]]
-                grid_coords = jnp.stack([y.flatten(), x.flatten()], axis=1)
-                
-                def check_point(p):
-                    point_matches = jnp.any(jnp.all(p == coords, axis=1))
-                    is_empty = grid[p[0], p[1]] == items_empty
-                    return point_matches & is_empty
-                
-                base_mask = jax.vmap(check_point)(grid_coords).reshape(grid_shape)
-                random_mask = jax.random.uniform(key, grid_shape) < 0.1  # 10%的概率生成资源
-                final_mask = base_mask & random_mask
-                
-                return jnp.where(final_mask, items_key, grid)
-            
-            # 为合作和背叛资源分别生成随机key
-            key, key_coop, key_defect = jax.random.split(key, 3)
-            
-            # 更新合作资源位置
-            grid_resources = update_grid(
-                grid_resources,
-                self.SPAWNS_COOP,
-                Items.empty,
-                Items.coop,
-                key_coop
-            )
-            
-            # 更新背叛资源位置
-            grid_resources = update_grid(
-                grid_resources,
-                self.SPAWNS_DEFECT,
-                Items.empty,
-                Items.defect,
-                key_defect
-            )
-            
-            state = state.replace(grid=grid_resources)
+            with jax.named_scope("regrowth"):
+                key, key_coop, key_defect = jax.random.split(key, 3)
+                state = state.replace(
+                    grid=_regrow_resources(state.grid, key_coop, key_defect)
+                )
             
             # moving all agents
 
-            new_grid = state.grid.at[
-                state.agent_locs[:, 0],
-                state.agent_locs[:, 1]
-            ].set(
-                jnp.int16(Items.empty)
-            )
+            with jax.named_scope("movement"):
+                new_grid = state.grid.at[
+                    state.agent_locs[:, 0],
+                    state.agent_locs[:, 1]
+                ].set(
+                    jnp.int16(Items.empty)
+                )
 
-            x, y = state.reborn_locs[:, 0], state.reborn_locs[:, 1]
-            new_grid = new_grid.at[x, y].set(self._agents)
-            state = state.replace(grid=new_grid)
-            state = state.replace(agent_locs=state.reborn_locs)
+                x, y = state.reborn_locs[:, 0], state.reborn_locs[:, 1]
+                new_grid = new_grid.at[x, y].set(self._agents)
+                state = state.replace(grid=new_grid)
+                state = state.replace(agent_locs=state.reborn_locs)
 
-            # state = state.replace(reborn_locs=state.agent_locs)
+                # state = state.replace(reborn_locs=state.agent_locs)
 
-            key, subkey = jax.random.split(key)
-            all_new_locs = jax.vmap(lambda p, a: jnp.int16(p + ROTATIONS[a]) % jnp.array([self.GRID_SIZE_ROW + 1, self.GRID_SIZE_COL + 1, 4], dtype=jnp.int16))(p=state.agent_locs, a=actions).squeeze()
+                key, subkey = jax.random.split(key)
+                all_new_locs = jax.vmap(lambda p, a: jnp.int16(p + ROTATIONS[a]) % jnp.array([self.GRID_SIZE_ROW + 1, self.GRID_SIZE_COL + 1, 4], dtype=jnp.int16))(p=state.agent_locs, a=actions).squeeze()
 
-            agent_move = (actions == Actions.up) | (actions == Actions.down) | (actions == Actions.right) | (actions == Actions.left)
-            all_new_locs = jax.vmap(lambda m, n, p: jnp.where(m, n + STEP_MOVE[p], n))(m=agent_move, n=all_new_locs, p=actions)
+                agent_move = (actions == Actions.up) | (actions == Actions.down) | (actions == Actions.right) | (actions == Actions.left)
+                all_new_locs = jax.vmap(lambda m, n, p: jnp.where(m, n + STEP_MOVE[p], n))(m=agent_move, n=all_new_locs, p=actions)
             
-            all_new_locs = jax.vmap(
-                jnp.clip,
-                in_axes=(0, None, None)
-            )(
-                all_new_locs,
-                jnp.array([0, 0, 0], dtype=jnp.int16),
-                jnp.array(
-                    [self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1, 3],
-                    dtype=jnp.int16
-                ),
-            ).squeeze()
-
-            # Block wall cells BEFORE conflict resolution so that a wall
-            # revert can never re-create an agent-agent overlap.
-            def check_wall_positions(grid, positions):
-                def check_single_position(pos):
-                    is_wall = grid[pos[0], pos[1]] != Items.empty
-                    return jnp.where(is_wall, pos, jnp.array([-1, -1]))
-                return jax.vmap(check_single_position)(positions)
-
-            wall_position = check_wall_positions(state.grid, self.SPAWNS_WALL)
-            def handle_wall_collisions(original_positions, agent_positions, wall_positions):
-                """
-                agent_positions: shape (n_agents, 3) - (x, y, angle)
-                wall_positions: shape (n_walls, 2) - (x, y)
-                """
-                def check_single_agent(original_pos,agent_pos):
-
-                    agent_xy = agent_pos[:2]
-
-                    collisions = jnp.all(agent_xy == wall_positions, axis=1)
-                    any_collision = jnp.any(collisions)
-
-                    return jax.lax.cond(
-                        any_collision,
-                        lambda _: original_pos,
-                        lambda _: agent_pos,
-                        operand=None
-                    )
-                return jax.vmap(check_single_agent)(original_positions, agent_positions)
+                all_new_locs = jax.vmap(
+                    jnp.clip,
+                    in_axes=(0, None, None)
+                )(
+                    all_new_locs,
+                    jnp.array([0, 0, 0], dtype=jnp.int16),
+                    jnp.array(
+                        [self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1, 3],
+                        dtype=jnp.int16
+                    ),
+                ).squeeze()
+
+                # Block wall cells BEFORE conflict resolution so that a wall
+                # revert can never re-create an agent-agent overlap.
+                def check_wall_positions(grid, positions):
+                    def check_single_position(pos):
+                        is_wall = grid[pos[0], pos[1]] != Items.empty
+                        return jnp.where(is_wall, pos, jnp.array([-1, -1]))
+                    return jax.vmap(check_single_position)(positions)
+
+                wall_position = check_wall_positions(state.grid, self.SPAWNS_WALL)
+                def handle_wall_collisions(original_positions, agent_positions, wall_positions):
+                    """
+                    agent_positions: shape (n_agents, 3) - (x, y, angle)
+                    wall_positions: shape (n_walls, 2) - (x, y)
+                    """
+                    def check_single_agent(original_pos,agent_pos):
+
+                        agent_xy = agent_pos[:2]
+
+                        collisions = jnp.all(agent_xy == wall_positions, axis=1)
+                        any_collision = jnp.any(collisions)
+
+                        return jax.lax.cond(
+                            any_collision,
+                            lambda _: original_pos,
+                            lambda _: agent_pos,
+                            operand=None
+                        )
+                    return jax.vmap(check_single_agent)(original_positions, agent_positions)
 
-            all_new_locs = handle_wall_collisions(state.agent_locs, all_new_locs, wall_position)
+                all_new_locs = handle_wall_collisions(state.agent_locs, all_new_locs, wall_position)
 
-            # Resolve agent-agent movement conflicts via the shared
-            # resolver: same-target conflicts (non-mover priority, else
-            # random winner), swaps blocked, trains allowed, cascades
-            # reverted to a fixed point. Final (row, col) unique.
-            key, move_key = jax.random.split(key)
-            new_locs = resolve_movement(move_key, state.agent_locs, all_new_locs)
+                # Resolve agent-agent movement conflicts via the shared
+                # resolver: same-target conflicts (non-mover priority, else
+                # random winner), swaps blocked, trains allowed, cascades
+                # reverted to a fixed point. Final (row, col) unique.
+                key, move_key = jax.random.split(key)
+                new_locs = resolve_movement(move_key, state.agent_locs, all_new_locs)
 
-            condition_coop = jnp.where((state.grid[new_locs[:, 0], new_locs[:, 1]]==Items.coop), 1, 0)
+                condition_coop = jnp.where((state.grid[new_locs[:, 0], new_locs[:, 1]]==Items.coop), 1, 0)
 
-            def get_resources_values(grid, coords, items_type):
-                return jax.vmap(lambda coord: (grid[coord[0], coord[1]] == items_type).astype(jnp.int16))(coords[:, :2])
+                def get_resources_values(grid, coords, items_type):
+                    return jax.vmap(lambda coord: (grid[coord[0], coord[1]] == items_type).astype(jnp.int16))(coords[:, :2])
 
-            coop_matches = get_resources_values(state.grid,new_locs,Items.coop) + state.coop_resources
-            defect_matches = get_resources_values(state.grid,new_locs,Items.defect) + state.defect_resources
-            state = state.replace(defect_resources=defect_matches, coop_resources=coop_matches)
+                coop_matches = get_resources_values(state.grid,new_locs,Items.coop) + state.coop_resources
+                defect_matches = get_resources_values(state.grid,new_locs,Items.defect) + state.defect_resources
+                state = state.replace(defect_resources=defect_matches, coop_resources=coop_matches)
 
             
-            old_grid = state.grid
+                old_grid = state.grid
 
-            new_grid = old_grid.at[
-                state.agent_locs[:, 0],
-                state.agent_locs[:, 1]
-            ].set(
-                jnp.int16(Items.empty)
-            )
-            x, y = new_locs[:, 0], new_locs[:, 1]
-            new_grid = new_grid.at[x, y].set(self._agents)
-            state = state.replace(grid=new_grid)
-
-
-            def update_close_grid(search_array, exists, grid):
-                def scan_fn(g, inputs):
-                    coord, flag = inputs
-                    return (
-                        jax.lax.select(
-                            flag,
-                            g.at[coord[0], coord[1]].set(coord[2]),
-                            g
-                        ),
-                        None
-                    )
-                return jax.lax.scan(scan_fn, grid, (search_array, exists))[0]
+                new_grid = old_grid.at[
+                    state.agent_locs[:, 0],
+                    state.agent_locs[:, 1]
+                ].set(
+                    jnp.int16(Items.empty)
+                )
+                x, y = new_locs[:, 0], new_locs[:, 1]
+                new_grid = new_grid.at[x, y].set(self._agents)
+                state = state.replace(grid=new_grid)
+
+
+                def update_close_grid(search_array, exists, grid):
+                    def scan_fn(g, inputs):
+                        coord, flag = inputs
+                        return (
+                            jax.lax.select(
+                                flag,
+                                g.at[coord[0], coord[1]].set(coord[2]),
+                                g
+                            ),
+                            None
+                        )
+                    return jax.lax.scan(scan_fn, grid, (search_array, exists))[0]
             
 
-            # update agent locations
-            state = state.replace(agent_locs=new_locs)
+                # update agent locations
+                state = state.replace(agent_locs=new_locs)
             
-            if self.shared_rewards:
-                rewards, state, reborn_players = _interact_pd(key, state, actions)
-                rewards_output = jnp.array([0]* self.num_agents)
-                rewards = rewards.squeeze()
-                # Scale per-agent mean by num_agents (== sum-over-agents) to match
-                # cleanup/coop_mining and to give MAPPO/PPO enough gradient signal.
-                common_reward = rewards.mean() * self.num_agents
-                rewards_output = jnp.array([common_reward] * self.num_agents).squeeze()
-                rewards = rewards_output
-
-                # rewards = jnp.array([common_reward] * self.num_agents)
-                info = {}
-
-            elif self.svo:
-                rewards, state, reborn_players = _interact_pd(key, state, actions)
-                # Scale per-agent reward by num_agents to match other envs' convention.
-                original_rewards = rewards * self.num_agents
-                rewards, theta = self.get_svo_rewards(original_rewards, self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents)
-                info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "svo_theta": theta.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-
-            elif self.interest:
-                rewards, state, reborn_players = _interact_pd(key, state, actions)
-                # Scale per-agent reward by num_agents to match other envs' convention.
-                original_rewards = rewards * self.num_agents
-
-                # Calculate current s_interest based on timestep
-                current_s_interest = get_current_s_interest(timestep)
-                original_flat = original_rewards.squeeze()
-
-                # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
-                total_reward = jnp.sum(original_flat)
-                others_reward = total_reward - original_flat  # sum of all other agents' rewards
-
-                rewards = (current_s_interest * original_flat +
-                        (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
-
-                info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                    "s_interest": current_s_interest,
-                }
-
-            else:
-                rewards, state, reborn_players = _interact_pd(key, state, actions)
-                # Scale per-agent reward by num_agents to match other envs' convention.
-                rewards = rewards * self.num_agents
-                # rewards_output = jnp.array([0]* self.num_agents)
-                # rewards = rewards.squeeze()
-                # common_reward = rewards.mean()
-                # ind_reward = rewards[:3].mean()
-                # rewards_output = jnp.array([common_reward] * self.num_agents).squeeze()
-                # rewards_output = rewards_output.at[0].set(ind_reward)
-                # rewards = rewards_output
-
-                # rewards = jnp.array([common_reward] * self.num_agents)
-                # info = {
-                #     "common_reward": jnp.array([common_reward]* self.num_agents)* 1000,
-                #     "ind_reward": jnp.array([ind_reward]* self.num_agents)* 1000,
-                # }
-                info = {}
+            with jax.named_scope("interaction"):
+                if self.shared_rewards:
+                    rewards, state, reborn_players = _interact_pd(key, state, actions)
+                    rewards_output = jnp.array([0]* self.num_agents)
+                    rewards = rewards.squeeze()
+                    # Scale per-agent mean by num_agents (== sum-over-agents) to match
+                    # cleanup/coop_mining and to give MAPPO/PPO enough gradient signal.
+                    common_reward = rewards.mean() * self.num_agents
+                    rewards_output = jnp.array([common_reward] * self.num_agents).squeeze()
+                    rewards = rewards_output
+
+                    # rewards = jnp.array([common_reward] * self.num_agents)
+                    info = {}
+
+                elif self.svo:
+                    rewards, state, reborn_players = _interact_pd(key, state, actions)
+                    # Scale per-agent reward by num_agents to match other envs' convention.
+                    original_rewards = rewards * self.num_agents
+                    rewards, theta = self.get_svo_rewards(original_rewards, self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents)
+                    info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "svo_theta": theta.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+
+                elif self.interest:
+                    rewards, state, reborn_players = _interact_pd(key, state, actions)
+                    # Scale per-agent reward by num_agents to match other envs' convention.
+                    original_rewards = rewards * self.num_agents
+
+                    # Calculate current s_interest based on timestep
+                    current_s_interest = get_current_s_interest(timestep)
+                    original_flat = original_rewards.squeeze()
+
+                    # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
+                    total_reward = jnp.sum(original_flat)
+                    others_reward = total_reward - original_flat  # sum of all other agents' rewards
+
+                    rewards = (current_s_interest * original_flat +
+                            (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
+
+                    info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                        "s_interest": current_s_interest,
+                    }
+
+                else:
+                    rewards, state, reborn_players = _interact_pd(key, state, actions)
+                    # Scale per-agent reward by num_agents to match other envs' convention.
+                    rewards = rewards * self.num_agents
+                    # rewards_output = jnp.array([0]* self.num_agents)
+                    # rewards = rewards.squeeze()
+                    # common_reward = rewards.mean()
+                    # ind_reward = rewards[:3].mean()
+                    # rewards_output = jnp.array([common_reward] * self.num_agents).squeeze()
+                    # rewards_output = rewards_output.at[0].set(ind_reward)
+                    # rewards = rewards_output
+
+                    # rewards = jnp.array([common_reward] * self.num_agents)
+                    # info = {
+                    #     "common_reward": jnp.array([common_reward]* self.num_agents)* 1000,
+                    #     "ind_reward": jnp.array([ind_reward]* self.num_agents)* 1000,
+                    # }
+                    info = {}
             
-            info['eat_coop_tokens_number'] = jnp.array([jnp.sum(condition_coop)] * self.num_agents).squeeze() * self.num_inner_steps
+                info['eat_coop_tokens_number'] = jnp.array([jnp.sum(condition_coop)] * self.num_agents).squeeze() * self.num_inner_steps
                 
             # rewards, state, reborn_players = _interact_pd(key, state, actions)
             # info = {
             #     "original_rewards": rewards.squeeze(),
             #     "shaped_rewards": rewards.squeeze(),
             # }
-            p = jax.random.randint(key, shape=(self.num_agents,), minval=10, maxval=101)
+            with jax.named_scope("respawn"):
+                p = jax.random.randint(key, shape=(self.num_agents,), minval=10, maxval=101)
 
-            stay_time = jnp.where(reborn_players == True , p, stay_time)
-            state = state.replace(stay_time=stay_time)
+                stay_time = jnp.where(reborn_players == True , p, stay_time)
+                state = state.replace(stay_time=stay_time)
 
 
-            # state = state.replace(reborn_locs=state.agent_locs)
+                # state = state.replace(reborn_locs=state.agent_locs)
 
-            # Occupancy-aware respawn: reborn agents are placed on spawn
-            # cells not occupied by any survivor, so no overlap is possible.
-            key, respawn_key = jax.random.split(key)
-            new_re_locs = resolve_respawn(
-                respawn_key, new_locs, reborn_players.astype(bool), self.SPAWNS_PLAYER
-            )
-            state = state.replace(reborn_locs=new_re_locs)
+                # Occupancy-aware respawn: reborn agents are placed on spawn
+                # cells not occupied by any survivor, so no overlap is possible.
+                key, respawn_key = jax.random.split(key)
+                new_re_locs = resolve_respawn(
+                    respawn_key, new_locs, reborn_players.astype(bool), self.SPAWNS_PLAYER
+                )
+                state = state.replace(reborn_locs=new_re_locs)
             stay_time = state.stay_time.astype(jnp.int16)
             state_nxt = State(
                 agent_locs=state.agent_locs,
@@ -2031,21 +1572,16 @@ class PD_Arena(MultiAgentEnv):
             reset_inner = inner_t == num_inner_steps
 
             # if inner episode is done, return start state for next game
-            state_re = _reset_state(key)
-
-            state_re = state_re.replace(outer_t=outer_t + 1)
-            state = jax.tree.map(
-                lambda x, y: jnp.where(reset_inner, x, y),
-                state_re,
-                state_nxt,
-            )
+            with jax.named_scope("episode_reset"):
+                state = self.inner_reset(key, reset_inner, _reset_state, state_nxt)
             outer_t = state.outer_t
             reset_outer = outer_t == num_outer_steps
             done = {f'{a}': reset_outer for a in self.agents}
             # done = [reset_outer for _ in self.agents]
             done["__all__"] = reset_outer
 
-            obs = _get_obs(state)
+            with jax.named_scope("observation"):
+                obs = _get_obs(state)
             rewards = jnp.where(
                 reset_inner,
                 jnp.zeros_like(rewards, dtype=jnp.int16),
@@ -2058,7 +1594,7 @@ class PD_Arena(MultiAgentEnv):
                 state,
                 rewards.squeeze(),
                 done,
-                info,
+                self.select_info(info),
             )
 
         def _reset_state(
@@ -2110,8 +1646,8 @@ class PD_Arena(MultiAgentEnv):
             return State(
                 agent_locs=agent_locs,
                 agent_invs=jnp.array([(0,0)]*num_agents, dtype=jnp.int16),
-                inner_t=jnp.array(0, dtype=jnp.int16),
-                outer_t=jnp.array(0, dtype=jnp.int16),
+                inner_t=jnp.zeros((), self._counter_dtype),
+                outer_t=jnp.zeros((), self._counter_dtype),
                 grid=grid,
                 defect_resources=jnp.array([0]*num_agents, dtype=jnp.int16),
                 coop_resources=jnp.array([0]*num_agents, dtype=jnp.int16),
@@ -2145,10 +1681,19 @@ class PD_Arena(MultiAgentEnv):
 
         # for debugging
         self.get_obs = jax.jit(_get_obs)
+        self.get_agent_obs = jax.jit(_get_agent_obs)
+        # exposed for speed_test/speed_test_regrowth.py
+        self.regrow_resources = jax.jit(_regrow_resources)
         self.cnn = cnn
+        if obs_format not in ("full", "compact"):
+            raise ValueError(f"obs_format must be 'full' or 'compact', got {obs_format!r}")
+        self.obs_format = obs_format
+        if obs_format == "compact":
+            self.obs_encoding = compact_obs_encoding(len(Items), (len(Items)-1) + 9 + 2 * num_agents)
 
         self.num_inner_steps = num_inner_steps
         self.num_outer_steps = num_outer_steps
+        self._counter_dtype = counter_dtype(max(num_inner_steps, num_outer_steps))
 
     @property
     def name(self) -> str:
@@ -2169,11 +1714,19 @@ class PD_Arena(MultiAgentEnv):
     def observation_space(self) -> spaces.Dict:
         """Observation space of the environment."""
         _shape_obs = (
-            (self.OBS_SIZE, self.OBS_SIZE, (len(Items)-1) + 17)
+            (self.OBS_SIZE, self.OBS_SIZE, (len(Items)-1) + 9 + 2 * self.num_agents)
             if self.cnn
-            else (self.OBS_SIZE**2 * ((len(Items)-1) + 10),)
+            else (self.OBS_SIZE**2 * ((len(Items)-1) + 9 + 2 * self.num_agents),)
         )
 
+        if self.obs_format == "compact":
+            channels = self.obs_encoding[1]
+            _shape_obs = (
+                (self.OBS_SIZE, self.OBS_SIZE, channels)
+                if self.cnn
+                else (self.OBS_SIZE**2 * channels,)
+            )
+
         return spaces.Box(
                 low=0, high=1E9, shape=_shape_obs, dtype=jnp.uint8
             ), _shape_obs
@@ -2303,89 +1856,26 @@ class PD_Arena(MultiAgentEnv):
         :param r: target renderer object
         :param tile_size: tile size in pixels
         """
-        tile_size = 32
-        highlight_mask = onp.zeros_like(onp.array(self.GRID))
+        return onp.asarray(self.renderer.render(state))
 
-        # Compute the total grid size
-        width_px = self.GRID.shape[1] * tile_size
-        height_px = self.GRID.shape[0] * tile_size
+    def render_batch(self, states: State) -> jnp.ndarray:
+        """
+        Render a batch of states (leading batch axis on every field) in one
+        jitted call; returns uint8 frames of shape (B, H, W, 3).
+        """
+        return self.renderer.render_batch(states)
 
-        img = onp.zeros(shape=(height_px, width_px, 3), dtype=onp.uint8)
-        grid = onp.array(state.grid)
-        grid = onp.pad(
-            grid, ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)), constant_values=Items.wall
-        )
-        for a in range(self.num_agents):
-            startx, starty = self.get_obs_point(
-                state.agent_locs[a]
+    @property
+    def renderer(self) -> GridRenderer:
+        """Jittable tile-atlas renderer, built on first use."""
+        if self._renderer is None:
+            self._renderer = GridRenderer(
+                self,
+                values=list(range(len(Items))) + list(onp.asarray(self._agents)),
+                pad_value=Items.wall,
+                tile_size=32, time_bar=True,
             )
-            highlight_mask[
-                startx : startx + self.OBS_SIZE, starty : starty + self.OBS_SIZE
-            ] = True
-
-        # Render the grid
-        for j in range(0, grid.shape[1]):
-            for i in range(0, grid.shape[0]):
-                cell = grid[i, j]
-                if cell == 0:
-                    cell = None
-                agent_here = []
-                for a in self._agents:
-                    agent_here.append(cell == a)
-                # if cell in [1,2]:
-                #     print(f'coordinates: {i},{j}')
-                #     print(cell)
-
-                agent_dir = None
-                for a in range(self.num_agents):
-                    agent_dir = (
-                        state.agent_locs[a,2].item()
-                        if agent_here[a]
-                        else agent_dir
-                    )
-                
-                agent_hat = False
-                # for a in range(self.num_agents):
-                #     agent_hat = (
-                #         bool(state.agent_invs[a].sum() > INTERACT_THRESHOLD)
-                #         if agent_here[a]
-                #         else agent_hat
-                #     )
-                # if jnp.any(jnp.all(jnp.array([i,j]) == state.claimed_resources[:, :2], axis=1)):
-                #     claimed_resources_array = jnp.arange(1000,1000+self.num_agents)
-                #     agent_index = state.claimed_resources[jnp.where(jnp.all(jnp.array([i,j]) == state.claimed_resources[:, :2], axis=1))][0][-1]
-                #     cell = claimed_resources_array[agent_index].item()
-                tile_img = self.render_tile(
-                    cell,
-                    agent_dir=agent_dir,
-                    agent_hat=agent_hat,
-                    highlight=highlight_mask[i, j],
-                    tile_size=tile_size,
-                )
-
-                ymin = i * tile_size
-                ymax = (i + 1) * tile_size
-                xmin = j * tile_size
-                xmax = (j + 1) * tile_size
-                img[ymin:ymax, xmin:xmax, :] = tile_img
-        img = onp.rot90(
-            img[
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                :,
-            ],
-            2,
-        )
-        # Render the inventory
-        # agent_inv = []
-        # for a in range(self.num_agents):
-        #     agent_inv.append(self.render_inventory(state.agent_inventories[a], img.shape[1]))
-
-
-        time = self.render_time(state, img.shape[1])
-        # img = onp.concatenate((img, *agent_inv, time), axis=0)
-        img = onp.concatenate((img, time), axis=0)
-        return img
+        return self._renderer
 
     def render_inventory(self, inventory, width_px) -> onp.array:
         tile_height = 32
@@ -0,0 +1,218 @@
+"""Per-phase cost breakdown of an environment's step function.
+
+Every env's ``step_env`` wraps its phases in ``jax.named_scope``:
+
+    regrowth       resource / apple / dirt / mushroom / ore regrowth
+    movement       proposed moves, ``resolve_movement``, pick-ups, grid update
+    interaction    zapping / cleaning / claiming / mining / loading
+    respawn        ``resolve_respawn`` for agents removed this step
+    rewards        reward shaping (shared, inequity aversion, SVO, ...)
+    episode_reset  the inner-episode reset folded into the step
+    observation    the observation build
+
+The scopes are metadata only (no runtime cost). They label the ops in
+profiler traces (``jax.profiler.trace``) and in the HLO. They are also what
+``profile_step_phases`` uses to cut the traced step into one jitted
+function per phase, so each phase can be timed on its own:
+
+    env = socialjax.make("clean_up", jit=False)
+    for phase, r in profile_step_phases(env, num_envs=128)["phases"].items():
+        print(phase, r["time_s"], r["share"])
+
+Ops outside any phase scope are reported as ``other``. The scope names are
+read from JAX's internal name stack; ``check_phase_split`` probes that it
+still works and raises otherwise, rather than reporting everything as
+``other`` after a JAX upgrade. The phases run
+separately cannot fuse across phase boundaries, so their sum is usually a
+little above the fused step time; the split shows where the time goes, not
+an exact decomposition.
+"""
+
+import functools
+import time
+from collections import defaultdict
+
+import jax
+import jax.numpy as jnp
+from jax.extend import core as jex_core
+
+PHASES = (
+    "regrowth",
+    "movement",
+    "interaction",
+    "respawn",
+    "rewards",
+    "episode_reset",
+    "observation",
+)
+UNSCOPED = "other"
+
+
+def _phase_of(eqn):
+    # the outermost phase scope wins; transforms (vmap, ...) are skipped.
+    # The name stack is not public JAX API, see check_phase_split.
+    try:
+        stack = eqn.source_info.name_stack.stack
+        for scope in stack:
+            if type(scope).__name__ == "Scope" and scope.name in PHASES:
+                return scope.name
+    except AttributeError as e:
+        raise _split_broken() from e
+    return UNSCOPED
+
+
+def _split_broken():
+    return RuntimeError(
+        f"the jax.named_scope phases cannot be read from traced equations with JAX "
+        f"{jax.__version__}; socialjax/environments/profiling.py:_phase_of needs updating"
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def check_phase_split():
+    """
+    Raise RuntimeError unless ``_phase_of`` finds a phase scope under vmap.
+
+    The phase split reads ``jax.named_scope`` names from JAX's internal
+    name stack. If a JAX upgrade changes it, every op would silently land
+    in ``other``; this probe turns that into an error instead.
+    """
+    def probe(x):
+        with jax.named_scope(PHASES[0]):
+            return jnp.sin(x)
+
+    eqns = jax.make_jaxpr(jax.vmap(probe))(jnp.zeros((2,))).jaxpr.eqns
+    if not eqns or any(_phase_of(eqn) != PHASES[0] for eqn in eqns):
+        raise _split_broken()
+
+
+def _is_var(atom):
+    return not isinstance(atom, jex_core.Literal)
+
+
+def _time(fn, args, repeats):
+    jax.block_until_ready(fn(*args))  # compile + warm up
+    times = []
+    for _ in range(repeats):
+        before = time.perf_counter()
+        jax.block_until_ready(fn(*args))
+        times.append(time.perf_counter() - before)
+    return sorted(times)[len(times) // 2]
+
+
+def split_step_phases(closed_jaxpr):
+    """
+    Split a traced step into one sub-jaxpr per phase scope.
+
+    Returns:
+        dict phase -> (eqns, input vars, output vars), in first-seen order.
+        Inputs are the vars a phase reads but does not define; outputs are
+        the vars it defines that another phase or the step's result reads.
+
+    Raises:
+        RuntimeError: if the phase scopes cannot be read with this JAX
+            version (see ``check_phase_split``).
+    """
+    check_phase_split()
+    jaxpr = closed_jaxpr.jaxpr
+    eqns = defaultdict(list)
+    for eqn in jaxpr.eqns:
+        eqns[_phase_of(eqn)].append(eqn)
+
+    defined, used = {}, {}
+    for phase, phase_eqns in eqns.items():
+        defined[phase] = {v for e in phase_eqns for v in e.outvars}
+        used[phase] = {v for e in phase_eqns for v in e.invars if _is_var(v)}
+    step_outputs = {v for v in jaxpr.outvars if _is_var(v)}
+
+    phases = {}
+    for phase, phase_eqns in eqns.items():
+        read_elsewhere = step_outputs.union(
+            *(used[p] for p in eqns if p != phase)
+        )
+        inputs = sorted(used[phase] - defined[phase], key=lambda v: v.count)
+        outputs = sorted(defined[phase] & read_elsewhere, key=lambda v: v.count)
+        phases[phase] = (phase_eqns, inputs, outputs)
+    return phases
+
+
+def profile_step_phases(env, num_envs=128, repeats=5, warmup_steps=10, seed=0):
+    """
+    Time each phase of ``env.step_env`` as a separately jitted function.
+
+    The env must be constructed with ``jit=False``; a jitted ``step_env``
+    traces to a single call and cannot be split into phases.
+
+    Args:
+        env: the environment.
+        num_envs: batch of envs the step is vmapped over.
+        repeats: timed runs per phase; the median is reported.
+        warmup_steps: random steps taken from reset before profiling, so the
+            profiled state is mid-episode.
+        seed: PRNG seed.
+
+    Returns:
+        {"step_s": fused step time, "phases": {phase: {"num_eqns", "time_s",
+        "share"}}} with times in seconds per batched step and share the
+        fraction of the summed phase times.
+    """
+    rng = jax.random.PRNGKey(seed)
+    num_actions = env.action_space().n
+
+    def batched_step(keys, state, actions):
+        return jax.vmap(env.step_env)(keys, state, [actions[:, i] for i in range(env.num_agents)])
+
+    def random_args(rng, state):
+        rng_act, rng_step = jax.random.split(rng)
+        actions = jax.random.randint(rng_act, (num_envs, env.num_agents), 0, num_actions)
+        return jax.random.split(rng_step, num_envs), state, actions
+
+    rng, _rng = jax.random.split(rng)
+    _, state = jax.vmap(env.reset)(jax.random.split(_rng, num_envs))
+    step_jit = jax.jit(batched_step)
+    for t in range(warmup_steps):
+        _, state, _, _, _ = step_jit(*random_args(jax.random.fold_in(rng, t), state))
+    args = random_args(jax.random.fold_in(rng, warmup_steps), state)
+
+    closed = jax.make_jaxpr(batched_step)(*args)
+    phases = split_step_phases(closed)
+    if set(phases) == {UNSCOPED}:
+        raise ValueError(
+            "no phase scopes found in the traced step; construct the env with jit=False"
+        )
+
+    # concrete values of every var that crosses a phase boundary, from one
+    # jitted run of the full step
+    jaxpr = closed.jaxpr
+    flat_args = jax.tree.leaves(args)
+    known = dict(zip(jaxpr.constvars, closed.consts))
+    known.update(zip(jaxpr.invars, flat_args))
+    crossing = sorted(
+        {v for _, inputs, _ in phases.values() for v in inputs if v not in known},
+        key=lambda v: v.count,
+    )
+    crossing_fn = jex_core.jaxpr_as_fun(jex_core.ClosedJaxpr(
+        jex_core.Jaxpr(jaxpr.constvars, jaxpr.invars, crossing, jaxpr.eqns, jaxpr.effects),
+        closed.consts,
+    ))
+    known.update(zip(crossing, jax.jit(crossing_fn)(*flat_args)))
+
+    results = {}
+    for phase, (phase_eqns, inputs, outputs) in phases.items():
+        effects = frozenset().union(*(e.effects for e in phase_eqns))
+        phase_fn = jax.jit(jex_core.jaxpr_as_fun(jex_core.ClosedJaxpr(
+            jex_core.Jaxpr([], inputs, outputs, phase_eqns, effects), []
+        )))
+        results[phase] = {
+            "num_eqns": len(phase_eqns),
+            "time_s": _time(phase_fn, [known[v] for v in inputs], repeats),
+        }
+    total = sum(r["time_s"] for r in results.values())
+    for r in results.values():
+        r["share"] = r["time_s"] / total
+
+    order = list(PHASES) + [UNSCOPED]
+    return {
+        "step_s": _time(step_jit, args, repeats),
+        "phases": {p: results[p] for p in order if p in results},
+    }
@@ -0,0 +1,138 @@
+"""Shared, jittable and batched renderer for the grid environments.
+
+The SocialJax-lineage grid environments (clean_up, coin_game, harvest_open,
+gift, mushrooms, territory_open, pd_arena) draw a frame by calling their
+``render_tile`` for every cell of the padded grid. ``GridRenderer`` calls
+``render_tile`` once per distinct (cell value, agent direction, highlight)
+combination to build a tile atlas. After that a frame is a gather from the
+atlas, so it can be jitted and vmapped over a batch of states:
+
+    renderer = GridRenderer(env, values, pad_value=Items.wall)
+    frame = renderer.render(state)            # (H, W, 3) uint8
+    frames = renderer.render_batch(states)    # (B, H, W, 3) uint8
+
+The frames are identical to the per-cell ``render`` loop they replace:
+tiles are cropped to one wall layer around the map, the observation windows
+of all agents are highlighted and the image is rotated by 180 degrees.
+"""
+
+import jax
+import jax.numpy as jnp
+import numpy as onp
+
+NUM_DIRS = 4
+NO_AGENT = NUM_DIRS  # direction slot of atlas tiles without an agent
+TIME_BAR_HEIGHT = 32
+
+
+def build_tile_atlas(render_tile, values, agent_values, tile_size=32):
+    """
+    Render every tile a frame can contain with the env's ``render_tile``.
+
+    Args:
+        render_tile: the env's (numpy) ``render_tile`` method.
+        values: iterable of cell values that can appear on the grid.
+        agent_values: the subset of ``values`` that are agents; only these
+            are drawn with a direction.
+        tile_size: tile size in pixels.
+
+    Returns:
+        (values, tiles): sorted int32 array of shape (V,), and uint8 tiles of
+        shape (V, NUM_DIRS + 1, 2, tile_size, tile_size, 3) indexed by
+        [value, direction (NO_AGENT for none), highlight].
+    """
+    values = sorted(set(int(v) for v in values) | {0})
+    agent_values = set(int(v) for v in agent_values)
+    tiles = onp.zeros(
+        (len(values), NUM_DIRS + 1, 2, tile_size, tile_size, 3), dtype=onp.uint8
+    )
+    for i, value in enumerate(values):
+        obj = None if value == 0 else value
+        dirs = range(NUM_DIRS) if value in agent_values else [None]
+        for d in dirs:
+            for highlight in (False, True):
+                tile = render_tile(
+                    obj,
+                    agent_dir=d,
+                    agent_hat=False,
+                    highlight=highlight,
+                    tile_size=tile_size,
+                )
+                slot = NO_AGENT if d is None else d
+                tiles[i, slot, int(highlight)] = onp.asarray(tile).astype(onp.uint8)
+    return jnp.array(values, dtype=jnp.int32), jnp.array(tiles)
+
+
+class GridRenderer:
+    """
+    Jittable renderer for one grid environment, built from its tile atlas.
+
+    Args:
+        env: the environment; uses ``render_tile``, ``get_obs_point``,
+            ``_agents``, ``GRID``, ``PADDING`` and ``OBS_SIZE``.
+        values: cell values that can appear on the grid (see
+            ``build_tile_atlas``); values outside this set render as empty.
+        pad_value: value of the wall padding around the map.
+        tile_size: tile size in pixels.
+        time_bar: append the inner/outer step bar below the map, as
+            ``env.render_time`` does.
+    """
+
+    def __init__(self, env, values, pad_value, tile_size=32, time_bar=False):
+        self.env = env
+        self.tile_size = tile_size
+        self.pad_value = pad_value
+        self.time_bar = time_bar
+        self.agent_values = jnp.asarray(env._agents, dtype=jnp.int32)
+        self.values, self.tiles = build_tile_atlas(
+            env.render_tile, values, onp.asarray(env._agents), tile_size
+        )
+        self.render = jax.jit(self._render)
+        self.render_batch = jax.jit(jax.vmap(self._render))
+
+    def _render(self, state):
+        env = self.env
+        padding, obs_size, t = env.PADDING, env.OBS_SIZE, self.tile_size
+        grid = jnp.pad(
+            state.grid.astype(jnp.int32),
+            ((padding, padding), (padding, padding)),
+            constant_values=self.pad_value,
+        )
+        rows, cols = grid.shape
+
+        # union of the agents' observation windows (padded coordinates)
+        start_x, start_y = jax.vmap(env.get_obs_point)(state.agent_locs)
+        r = jnp.arange(rows)[None, :, None]
+        c = jnp.arange(cols)[None, None, :]
+        in_view = (
+            (r >= start_x[:, None, None]) & (r < start_x[:, None, None] + obs_size)
+            & (c >= start_y[:, None, None]) & (c < start_y[:, None, None] + obs_size)
+        )
+        highlight = jnp.any(in_view, axis=0).astype(jnp.int32)
+
+        # agents are drawn with the direction of the agent whose id is in the cell
+        is_agent = grid[..., None] == self.agent_values
+        agent_dir = state.agent_locs[jnp.argmax(is_agent, axis=-1), 2]
+        direction = jnp.where(jnp.any(is_agent, axis=-1), agent_dir, NO_AGENT)
+
+        idx = jnp.clip(jnp.searchsorted(self.values, grid), 0, self.values.shape[0] - 1)
+        idx = jnp.where(self.values[idx] == grid, idx, 0)  # unknown values render as empty
+
+        # keep one wall layer around the map, as the numpy renderer crops
+        crop = slice(padding - 1, None if padding == 1 else -(padding - 1))
+        tiles = self.tiles[idx, direction, highlight][crop, crop]
+        h, w = tiles.shape[:2]
+        img = tiles.transpose(0, 2, 1, 3, 4).reshape(h * t, w * t, 3)
+        img = img[::-1, ::-1]
+
+        if self.time_bar:
+            img = jnp.concatenate([img, self._render_time(state, img.shape[1])], axis=0)
+        return img
+
+    def _render_time(self, state, width_px):
+        """Inner/outer step progress bar, matching ``env.render_time``."""
+        x = jnp.arange(width_px)
+        inner = x < state.inner_t * (width_px // self.env.num_inner_steps)
+        outer = x < state.outer_t * (width_px // self.env.num_outer_steps)
+        rows = jnp.stack([inner, outer]).repeat(TIME_BAR_HEIGHT, axis=0)
+        return jnp.where(rows[..., None], 255, 0).astype(jnp.uint8).repeat(3, axis=-1)
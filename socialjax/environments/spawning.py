@@ -0,0 +1,43 @@
+"""Shared, sort-free spawn-cell sampling for the grid environments.
+
+Clean_up (dirt) and Mushrooms (regrowth) keep a fixed list of candidate
+cells together with the item label currently on each cell, and spawn on
+the cells with the lowest label (potential dirt before dirt, empty cells
+before mushrooms before agents), choosing uniformly at random among cells
+with equal labels.
+
+They used to do this by adding a small noise to the labels and sorting the
+whole list every step (``jnp.sort`` + ``jnp.argsort``), then taking the
+first entries. ``sample_lowest`` draws the same selection with
+``jnp.argmin`` (one cell) or ``jax.lax.top_k`` (a fixed budget of k cells).
+Both are a single pass over the candidates for the small k used here, and
+the candidate list stays in place instead of being permuted every step.
+"""
+
+import jax
+import jax.numpy as jnp
+
+# Tie-breaking noise is drawn in [0, TIE_NOISE), strictly below the gap of
+# 1 between integer labels, so it only orders cells with equal labels.
+TIE_NOISE = 0.5
+
+
+def sample_lowest(key, labels, k=1):
+    """Indices of the k cells with the lowest labels, ties broken at random.
+
+    Args:
+      key: PRNGKey for the tie-breaking noise.
+      labels: (S,) integer item labels of the candidate cells.
+      k: static number of cells to select, k <= S.
+
+    Returns:
+      (k,) int32 indices into ``labels``, ordered by label (the first index
+      has the lowest label). Among cells with the same label every order is
+      equally likely, i.e. the selection has the distribution of the first k
+      entries of a uniformly shuffled stable sort by label.
+    """
+    noisy = labels.astype(jnp.float32) + jax.random.uniform(key, labels.shape) * TIE_NOISE
+    if k == 1:
+        return jnp.argmin(noisy)[None].astype(jnp.int32)
+    _, idx = jax.lax.top_k(-noisy, k)
+    return idx.astype(jnp.int32)
@@ -10,8 +10,11 @@ import numpy as onp
 from flax.struct import dataclass
 import colorsys
 
+from socialjax.environments.interaction import resolve_interaction_conflicts
 from socialjax.environments.movement import resolve_movement, resolve_respawn
-from socialjax.environments.multi_agent_env import MultiAgentEnv
+from socialjax.environments.observation import compact_obs_encoding, egocentric_obs, obs_window_origin
+from socialjax.environments.rendering import GridRenderer
+from socialjax.environments.multi_agent_env import MultiAgentEnv, counter_dtype
 from socialjax.environments import spaces
 
 
@@ -28,6 +31,9 @@ from socialjax.environments.territory.rendering import (
 NUM_TYPES = 4  # empty (0), wall (1), resource unclaimed (2), resource claimed (3)
 NUM_COIN_TYPES = 1
 INTERACT_THRESHOLD = 0
+# steps a cell must stay claimed by the same agent before it pays a reward;
+# the per-cell claim timers saturate here, so they fit in uint8
+CLAIM_REWARD_DELAY = 100
 
 @dataclass
 class State:
@@ -36,7 +42,6 @@ class State:
     inner_t: int
     outer_t: int
     grid: jnp.ndarray
-    resources: jnp.ndarray
     freeze: jnp.ndarray
     reborn_locs: jnp.ndarray
     claimed_resources: jnp.ndarray
@@ -191,6 +196,8 @@ class Territory_open(MultiAgentEnv):
         grid_size=(23,39),
         obs_size=11,
         cnn=True,
+        obs_format="full",
+        info_level="full",
         jit=True,
         # map_ASCII = [
         #         "JRRRRRLJRRRRRLJRRRRRL",
@@ -241,9 +248,10 @@ class Territory_open(MultiAgentEnv):
     "WWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWW"
 ]
     ):
-        super().__init__(num_agents=num_agents)
+        super().__init__(num_agents=num_agents, info_level=info_level)
         self.agents = list(range(num_agents))#, dtype=jnp.int16)
         self._agents = jnp.array(self.agents, dtype=jnp.int16) + len(Items)
+        self._renderer = None  # tile-atlas GridRenderer, built on first render
         self.shared_rewards = shared_rewards
         self.inequity_aversion = inequity_aversion
         self.inequity_aversion_target_agents = inequity_aversion_target_agents
@@ -298,138 +306,32 @@ class Territory_open(MultiAgentEnv):
         self.SPAWNS_RESOURCE_UNCLAIMED = find_positions(nums_map, 7)
         self.SPAWNS_WALL = find_positions(nums_map, 1)
 
-        def rand_interaction(
-                key: int,
-                conflicts: jnp.ndarray,
-                conflicts_matrix: jnp.ndarray,
-                step_arr: jnp.ndarray
-            ) -> jnp.ndarray:
+        # static lookup grids, so that checking a position against the
+        # resources or walls is a single gather: RESOURCE_ID holds the index
+        # of each resource in SPAWNS_RESOURCE_UNCLAIMED and -1 elsewhere
+        self.NUM_RESOURCES = len(self.SPAWNS_RESOURCE_UNCLAIMED)
+        self.RESOURCE_ID = jnp.full(
+            (self.GRID_SIZE_ROW, self.GRID_SIZE_COL), -1, dtype=jnp.int32
+        ).at[
+            self.SPAWNS_RESOURCE_UNCLAIMED[:, 0],
+            self.SPAWNS_RESOURCE_UNCLAIMED[:, 1]
+        ].set(jnp.arange(self.NUM_RESOURCES))
+        self.WALL_MASK = jnp.zeros(
+            (self.GRID_SIZE_ROW, self.GRID_SIZE_COL), dtype=bool
+        ).at[self.SPAWNS_WALL[:, 0], self.SPAWNS_WALL[:, 1]].set(True)
+
+        def resource_at(coords: jnp.ndarray) -> jnp.ndarray:
             '''
-            Function for randomly choosing between conflicting interactions.
-            
-            Args:
-                - key: jax PRNGKey for randomisation.
-                - conflicts: jnp.ndarray of bools where True if agent is in a
-                conflicting interaction, False otherwise.
-                - conflicts_matrix: jnp.ndarray matrix of bools of agents in
-                conflicting interactions.
-                - step_arr: jnp.ndarray, where each index is the index of an
-                agent, and the element at each index is the item found at that
-                agent's respective target location in the grid.
-
-                
-            Returns:
-                - jnp.ndarray array of final interactions, where each index is
-                an agent, and each element is caught in its interaction beam.
+            Index of the resource at each (row, col) in coords, -1 where
+            there is none or the position is off the map.
             '''
-            def scan_fn(
-                    state,
-                    idx
-            ):
-
-                key, conflicts, conflicts_matrix, step_arr = state
-
-                return jax.lax.cond(
-                    conflicts[idx] > 0,
-                    lambda: _rand_interaction(
-                        key,
-                        conflicts,
-                        conflicts_matrix,
-                        step_arr
-                    ),
-                    lambda: (state, step_arr.astype(jnp.int16))
-                )
-
-            _, ys = jax.lax.scan(
-                scan_fn,
-                (key, conflicts, conflicts_matrix, step_arr.astype(jnp.int16)),
-                jnp.arange(self.num_agents)
+            row, col = coords[:, 0], coords[:, 1]
+            on_map = (
+                (row >= 0) & (row < self.GRID_SIZE_ROW)
+                & (col >= 0) & (col < self.GRID_SIZE_COL)
             )
+            return jnp.where(on_map, self.RESOURCE_ID[row, col], -1)
 
-            final_itxs = ys[-1]
-            return final_itxs
-
-        def _rand_interaction(
-                key: int,
-                conflicts: jnp.ndarray,
-                conflicts_matrix: jnp.ndarray,
-                step_arr: jnp.ndarray
-            ) -> jnp.ndarray:
-            '''
-            Function for randomly choosing between conflicting interactions.
-            
-            Args:
-                - key: jax PRNGKey for randomisation.
-                - conflicts: jnp.ndarray of bools where True if agent is in a
-                conflicting interaction, False otherwise.
-                - conflicts_matrix: jnp.ndarray matrix of bools of agents in
-                conflicting interactions.
-                - step_arr: jnp.ndarray, where each index is the index of an
-                agent, and the element at each index is the item found at that
-                agent's respective target location in the grid.
-
-                
-            Returns:
-                - jnp.ndarray array of final interactions, where each index is
-                an agent, and each element is caught in its interaction beam.
-            '''
-            conflict_idx = jnp.nonzero(
-                conflicts,
-                size=self.num_agents,
-                fill_value=-1
-            )[0][0]
-
-            agent_conflicts = conflicts_matrix[conflict_idx]
-
-            agent_conflicts_idx = jnp.nonzero(
-                agent_conflicts,
-                size=self.num_agents,
-                fill_value=-1
-            )[0]
-            max_rand = jnp.sum(agent_conflicts_idx > -1)
-
-            # preparing random agent selection
-            k1, k2 = jax.random.split(key, 2)
-            random_number = jax.random.randint(
-                k1,
-                (1,),
-                0,
-                max_rand
-            )
-
-            # index in main matrix of agent of successful interaction
-            rand_agent_idx = agent_conflicts_idx[random_number]
-
-            # set that agent's bool to False, for inversion later
-            new_agent_conflict = agent_conflicts.at[rand_agent_idx].set(False)
-
-            # set all remaining True agents' values as the "empty" item
-            step_arr = jnp.where(
-                new_agent_conflict,
-                Items.empty,
-                step_arr
-            ).astype(jnp.int16)
-
-            # update conflict bools to reflect the post-conflict state
-            _conflicts = conflicts.at[agent_conflicts_idx].set(0)
-            conflicts = jnp.where(
-                agent_conflicts,
-                0,
-                conflicts
-            )
-            conflicts = conflicts.at[conflict_idx].set(0)
-            conflicts_matrix = jax.vmap(
-                lambda c, x: jnp.where(c, x, jnp.array([False]*conflicts.shape[0]))
-            )(conflicts, conflicts_matrix)
-
-            # deal with next conflict
-            return ((
-                k2,
-                conflicts,
-                conflicts_matrix,
-                step_arr
-            ), step_arr)
-        
         def fix_interactions(
             key: jnp.ndarray,
             all_interacts: jnp.ndarray,
@@ -476,20 +378,11 @@ class Territory_open(MultiAgentEnv):
                 Items.empty
             )
 
-            conflicts_matrix = check_interaction_conflict(forward) * (forward != Items.empty)[:, None]
-
-            conflicts = jnp.clip(
-                jnp.sum(conflicts_matrix, axis=-1),
-                0,
-                1
-            )
-
             k1, k2, k3  = jax.random.split(key, 3)
-            one_step = rand_interaction(
+            one_step = resolve_interaction_conflicts(
                 k2,
-                conflicts,
-                conflicts_matrix,
-                forward
+                forward,
+                self._agents
             )
 
             # if an interaction 2 steps away (diagonally or straight ahead)
@@ -588,22 +481,11 @@ class Territory_open(MultiAgentEnv):
                 ).astype(jnp.int16)
             )(same_dist, all_two_step, actions)
 
-            two_step_conflicts_matrix = check_interaction_conflict(
-                same_dist_targets
-            ) * (same_dist_targets != Items.empty)[:, None]
-
-            two_step_conflicts = jnp.clip(
-                jnp.sum(two_step_conflicts_matrix, axis=-1),
-                0,
-                1
-            )
-
             k1, k2  = jax.random.split(k3, 2)
-            two_step_interacts = rand_interaction(
+            two_step_interacts = resolve_interaction_conflicts(
                 k2,
-                two_step_conflicts,
-                two_step_conflicts_matrix,
-                same_dist_targets
+                same_dist_targets,
+                self._agents
             )
 
             # combine one & two step interactions
@@ -665,35 +547,6 @@ class Territory_open(MultiAgentEnv):
             )
 
         
-        # first attempt at func - needs improvement
-        # inefficient due to double-checking collisions
-        def check_interaction_conflict(
-                items: jnp.ndarray
-            ) -> jnp.ndarray:
-            '''
-            Function to check conflicting interaction targets.
-            
-            Args:
-                - items: jnp.ndarray, the agent itemss at the interaction
-                targets.
-                
-            Returns:
-                - jnp.ndarray matrix of bool of agents in collision.
-            '''
-            matcher = jax.vmap(
-                lambda x,y: jnp.logical_and(
-                    jnp.all(x == y),
-                    jnp.isin(x, self._agents)
-                ),
-                in_axes=(0, None)
-            )
-
-            collisions = jax.vmap(
-                matcher,
-                in_axes=(None, 0)
-            )(items, items)
-
-            return collisions
 
 
         def to_dict(
@@ -733,211 +586,6 @@ class Territory_open(MultiAgentEnv):
 
             return state_dict
         
-        def combine_channels(
-                grid: jnp.ndarray,
-                agent: int,
-                angles: jnp.ndarray,
-                agent_pickups: jnp.ndarray,
-                state: State,
-            ):
-            '''
-            Function to enforce symmetry in observations & generate final
-            feature representation; current agent is permuted to first 
-            position in the feature dimension.
-            
-            Args:
-                - grid: jax ndarray of current agent's obs grid
-                - agent: int, an index indicating current agent number
-                - angles: jnp.ndarray of current agents' relative orientation
-                in current agent's obs grid
-                - agent_pickups: jnp.ndarray of agents able to interact
-                - state: State, the env state obj
-            Returns:
-                - grid with current agent [x] permuted to 1st position (after
-                the first 4 "Items" features, so 5th position overall) in the
-                feature dimension, "other" [x] agent 2nd, angle [x, x, x, x]
-                3rd, pick-up [x] bool 4th, inventory [x, x] 5th, frozen [x]
-                6th, for a final obs grid of shape (5, 5, 14) (additional 4
-                one-hot places for 5 possible items)
-            '''
-            def move_and_collapse(
-                    x: jnp.ndarray,
-                    angle: jnp.ndarray,
-                ) -> jnp.ndarray:
-
-                # get agent's one-hot
-                agent_element = jnp.array([jnp.int8(x[agent])])
-
-                # mask to check if any other agent exists there
-                mask = x[len(Items)-1:] > 0
-
-                # does an agent exist which is not the subject?
-                other_agent = jnp.int8(
-                    jnp.logical_and(
-                        jnp.any(mask),
-                        jnp.logical_not(
-                            agent_element
-                        )
-                    )
-                )
-
-                # what is the class of the item in cell
-                item_idx = jnp.where(
-                    x,
-                    size=1
-                )[0]
-
-                # check if agent is frozen and can observe inventories
-                show_inv_bool = jnp.logical_and(
-                        state.freeze[
-                            agent-len(Items)
-                        ].max(axis=-1) > 0,
-                        item_idx >= len(Items)
-                )
-
-                show_inv_idxs = jnp.where(
-                    state.freeze[agent],
-                    size=12, # since, in a setting where simultaneous interac-
-                    fill_value=-1 # -tions can happen, only a max of 12 can
-                )[0] # happen at once (zap logic), regardless of pop size
-
-                inv_to_show = jnp.where(
-                    jnp.logical_or(
-                        jnp.logical_and(
-                            show_inv_bool,
-                            jnp.isin(item_idx-len(Items), show_inv_idxs),
-                        ),
-                        agent_element
-                    ),
-                    state.agent_invs[item_idx - len(Items)],
-                    jnp.array([0, 0], dtype=jnp.int8)
-                )[0]
-
-                # check if agent is not the subject & is frozen & therefore
-                # not possible to interact with
-                frozen = jnp.where(
-                    other_agent,
-                    state.freeze[
-                        item_idx-len(Items)
-                    ].max(axis=-1) > 0,
-                    0
-                )
-
-                # get pickup/inv info
-                pick_up_idx = jnp.where(
-                    jnp.any(mask),
-                    jnp.nonzero(mask, size=1)[0],
-                    jnp.int8(-1)
-                )
-                picked_up = jnp.where(
-                    pick_up_idx > -1,
-                    agent_pickups[pick_up_idx],
-                    jnp.int8(0)
-                )
-
-                # build extension
-                extension = jnp.concatenate(
-                    [
-                        agent_element,
-                        other_agent,
-                        angle,
-                        picked_up,
-                        inv_to_show,
-                        frozen
-                    ],
-                    axis=-1
-                )
-
-                # build final feature vector
-                final_vec = jnp.concatenate(
-                    [x[:len(Items)-1], extension],
-                    axis=-1
-                )
-
-                return final_vec
-
-            new_grid = jax.vmap(
-                jax.vmap(
-                    move_and_collapse
-                )
-            )(grid, angles)
-            return new_grid
-        
-        def check_relative_orientation(
-                agent: int,
-                agent_locs: jnp.ndarray,
-                grid: jnp.ndarray
-            ) -> jnp.ndarray:
-            '''
-            Check's relative orientations of all other agents in view of
-            current agent.
-            
-            Args:
-                - agent: int, an index indicating current agent number
-                - agent_locs: jax ndarray of agent locations (x, y, direction)
-                - grid: jax ndarray of current agent's obs grid
-                
-            Returns:
-                - grid with 1) int -1 in places where no agent exists, or
-                where the agent is the current agent, and 2) int in range
-                0-3 in cells of opposing agents indicating relative
-                orientation to current agent.
-            '''
-            # we decrement by num of Items when indexing as we incremented by
-            # 5 in constructor call (due to 5 non-agent Items enum & locations
-            # are indexed from 0)
-            idx = agent - len(Items)
-            agents = jnp.delete(
-                self._agents,
-                idx,
-                assume_unique_indices=True
-            )
-            curr_agent_dir = agent_locs[idx, 2]
-
-            def calc_relative_direction(cell):
-                cell_agent = cell - len(Items)
-                cell_direction = agent_locs[cell_agent, 2]
-                return (cell_direction - curr_agent_dir) % 4
-
-            angle = jnp.where(
-                jnp.isin(grid, agents),
-                jax.vmap(calc_relative_direction)(grid),
-                -1
-            )
-
-            return angle
-        
-        def rotate_grid(agent_loc: jnp.ndarray, grid: jnp.ndarray) -> jnp.ndarray:
-            '''
-            Rotates agent's observation grid k * 90 degrees, depending on agent's
-            orientation.
-
-            Args:
-                - agent_loc: jax ndarray of agent's x, y, direction
-                - grid: jax ndarray of agent's obs grid
-
-            Returns:
-                - jnp.ndarray of new rotated grid.
-
-            '''
-            grid = jnp.where(
-                agent_loc[2] == 1,
-                jnp.rot90(grid, k=1, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 2,
-                jnp.rot90(grid, k=2, axes=(0, 1)),
-                grid,
-            )
-            grid = jnp.where(
-                agent_loc[2] == 3,
-                jnp.rot90(grid, k=3, axes=(0, 1)),
-                grid,
-            )
-
-            return grid
-
         def _get_obs_point(agent_loc: jnp.ndarray) -> jnp.ndarray:
             '''
             Obtain the position of top-left corner of obs map using
@@ -948,117 +596,40 @@ class Territory_open(MultiAgentEnv):
             Returns:
                 - x, y: ints of top-left corner of agent's obs map.
             '''
-            
-            x, y, direction = agent_loc
-
-            x, y = x + self.PADDING, y + self.PADDING
-
-            x = x - (self.OBS_SIZE // 2)
-            y = y - (self.OBS_SIZE // 2)
-
-
-            # x = jnp.where(direction == 3, x - (self.OBS_SIZE // 2), x)
-            # y = jnp.where(direction == 3, y - (self.OBS_SIZE // 2), y)
-
-            x = jnp.where(direction == 0, x + (self.OBS_SIZE//2)-1, x)
-            y = jnp.where(direction == 0, y, y)
-
-            x = jnp.where(direction == 1, x, x)
-            y = jnp.where(direction == 1, y + (self.OBS_SIZE//2)-1, y)
-
-
-            x = jnp.where(direction == 2, x - (self.OBS_SIZE//2)+1, x)
-            y = jnp.where(direction == 2, y, y)
-
-
-            x = jnp.where(direction == 3, x, x)
-            y = jnp.where(direction == 3, y - (self.OBS_SIZE//2)+1, y)
-
-            # x = jnp.where(direction == 1, x - (self.OBS_SIZE // 2), x)
-            # y = jnp.where(direction == 1, y - (self.OBS_SIZE - 1), y)
+            return obs_window_origin(agent_loc, self.OBS_SIZE, self.PADDING)
 
-            # x = jnp.where(direction == 2, x - (self.OBS_SIZE - 1), x)
-            # y = jnp.where(direction == 2, y - (self.OBS_SIZE // 2), y)
-
-            # x = jnp.where(direction == 2, x - (self.OBS_SIZE // 2), x)
-            # x = jnp.where(direction == 3, x - (self.OBS_SIZE - 1), x)
-
-            # y = jnp.where(direction == 0, y - (self.OBS_SIZE // 2), y)
-            # y = jnp.where(direction == 2, y - (self.OBS_SIZE - 1), y)
-            # y = jnp.where(direction == 3, y - (self.OBS_SIZE // 2), y)
-            return x, y
-
-        def _get_obs(state: State) -> jnp.ndarray:
+        def _get_obs(state: State, agents=None) -> jnp.ndarray:
             '''
             Obtain the agent's observation of the grid.
 
             Args: 
                 - state: State object containing env state.
+                - agents: optional indices of the observing agents, all by default.
             Returns:
                 - jnp.ndarray of grid observation.
             '''
-            # create state
-            grid = jnp.pad(
-                state.grid,
-                ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)),
-                constant_values=Items.wall,
-            )
-
-            # obtain all agent obs-points
-            agent_start_idxs = jax.vmap(_get_obs_point)(state.agent_locs)
-
-            dynamic_slice = partial(
-                jax.lax.dynamic_slice,
-                operand=grid,
-                slice_sizes=(self.OBS_SIZE, self.OBS_SIZE)
-            )
-
-            # obtain agent obs grids
-            grids = jax.vmap(dynamic_slice)(start_indices=agent_start_idxs)
-
-            # rotate agent obs grids
-            grids = jax.vmap(rotate_grid)(state.agent_locs, grids)
-
-            angles = jax.vmap(
-                check_relative_orientation,
-                in_axes=(0, None, 0)
-            )(
-                self._agents,
-                state.agent_locs,
-                grids
-            )
-
-            angles = jax.nn.one_hot(angles, 4)
-
-            # one-hot (drop first channel as its empty blocks)
-            grids = jax.nn.one_hot(
-                grids - 1,
-                num_agents + len(Items) - 1, # will be collapsed into a
-                dtype=jnp.int8 # [Items, self, other, extra features] representation
-            )
-
             # check agents that can interact
-            inventory_sum = jnp.sum(state.agent_invs, axis=-1)
-            agent_pickups = jnp.where(
-                inventory_sum > INTERACT_THRESHOLD,
-                True,
-                False
-            )
+            agent_pickups = jnp.sum(state.agent_invs, axis=-1) > INTERACT_THRESHOLD
 
-            # make index len(Item) always the current agent
-            # and sum all others into an "other" agent
-            grids = jax.vmap(
-                combine_channels,
-                in_axes=(0, 0, 0, None, None)
-            )(
-                grids,
-                self._agents,
-                angles,
-                agent_pickups,
-                state
+            return egocentric_obs(
+                state.grid,
+                state.agent_locs,
+                state.agent_invs,
+                state.freeze,
+                num_items=len(Items),
+                obs_size=self.OBS_SIZE,
+                padding=self.PADDING,
+                pad_value=Items.wall,
+                agent_extras=agent_pickups[:, None],
+                compact=self.obs_format == "compact",
+                agents=agents,
             )
 
-            return grids
+        def _get_agent_obs(state: State, agent: int) -> jnp.ndarray:
+            '''
+            Observation of a single agent; only its window is gathered.
+            '''
+            return _get_obs(state, jnp.reshape(agent, (1,)))[0]
 
 
 
@@ -1438,8 +1009,7 @@ class Territory_open(MultiAgentEnv):
 
             # remove old interacts
             interact_index = jnp.arange(1000, 1000+self.num_agents)
-            # claimed_resources_indicator = jnp.zeros((21, 21), dtype=bool).at[state.resources[:, 0], state.resources[:, 1]].set(True)
-            claimed_resources_indicator = jnp.zeros((23, 39), dtype=bool).at[state.resources[:, 0], state.resources[:, 1]].set(True)
+            claimed_resources_indicator = self.RESOURCE_ID >= 0
             mask = jnp.logical_and(jnp.isin(state.grid, interact_index),~claimed_resources_indicator)
             new_grid = jnp.where(mask, jnp.int16(Items.empty), state.grid)
             state = state.replace(grid=new_grid)
@@ -1456,7 +1026,7 @@ class Territory_open(MultiAgentEnv):
                 Check target agent exists, isn't frozen, can interact, and
                 is not the zapping-agent's self.
                 '''
-                return jnp.any(jnp.all(state.resources == beam, axis=1))
+                return jnp.any(jnp.all(self.SPAWNS_RESOURCE_UNCLAIMED == beam, axis=1))
 
             # check 1 ahead
             clip_row = partial(jnp.clip, a_min=0, a_max=self.GRID_SIZE_ROW - 1)
@@ -1540,23 +1110,19 @@ class Territory_open(MultiAgentEnv):
             #     target_coords = coordinates_180       
             #     matches = (coords_to_check[:, None, :] == target_coords[None, :, :]).all(axis=-1)
             #     return matches.any(axis=1)
-            def combined_check(grid, search_array, coordinates_180):
+            def combined_check(grid, search_array):
                 """
                 检查grid中的值并与坐标匹配
                 
                 Args:
-                    grid: shape (24, 25) 的网格
-                    search_array: shape (18, 3) 的搜索坐标
-                    coordinates_180: shape (180, 3) 的目标坐标
+                    grid: shape (ROW, COL) 的网格
+                    search_array: shape (2N, 3) 的搜索坐标
                 
                 Returns:
-                    shape (18,) 的布尔数组
+                    shape (2N,) 的布尔数组
                 """
-                # 检查18个坐标与180个坐标的匹配
-                coords_to_check = search_array[:, :2]  # (18, 2)
-                target_coords = coordinates_180[:, :2]  # (180, 2)
-                matches = (coords_to_check[:, None, :] == target_coords[None, :, :]).all(axis=-1)  # (18, 180)
-                coord_matches = matches.any(axis=1)  # (18,)
+                # 坐标是否为资源格
+                coord_matches = resource_at(search_array) >= 0  # (2N,)
                 
                 # 检查grid中对应位置的值
                 grid_values = grid.at[search_array[:, 0], search_array[:, 1]].get()
@@ -1574,7 +1140,7 @@ class Territory_open(MultiAgentEnv):
                 # 与bool_array做and操作
                 return jnp.logical_and(grid_values, bool_array)
             
-            exists_claimed_pos = combined_check(state.grid,all_zaped_locs,state.resources)
+            exists_claimed_pos = combined_check(state.grid,all_zaped_locs)
             exists_claimed_pos = jnp.logical_and(exists_claimed_pos, zaps_4_locs_judge.squeeze())
             exists_claimed_pos = combine_bool_masks(state.grid, all_zaped_locs, exists_claimed_pos)
             # potential_dirt_all_zap = all_zaped_locs[zaps_4_locs_judge]
@@ -1583,16 +1149,20 @@ class Territory_open(MultiAgentEnv):
             # agent_index = agent_index[exists]
             
             def claim_grid(search_array, exists, grid):
-                pairs = jnp.stack([exists, search_array[:, 0], search_array[:, 1], search_array[:, 2]], axis=1)
-                
-                def step_fn(grid, pair):
-                    flag, x, y, value = pair
-                    return jax.lax.select(
-                        flag,
-                        grid.at[x, y].set(value),
-                        grid
-                    )
-                return jax.lax.scan(lambda g, p: (step_fn(g, p), None), grid, pairs)[0]
+                # one scatter; when several beams claim the same cell the
+                # last one in search_array wins, as if applied in order
+                num_cells = grid.size
+                order = jnp.arange(search_array.shape[0])
+                cells = jnp.where(
+                    exists,
+                    search_array[:, 0].astype(jnp.int32) * grid.shape[1] + search_array[:, 1],
+                    num_cells
+                )
+                last = jnp.full(num_cells, -1).at[cells].max(order, mode="drop")
+                wins = exists & (last[jnp.minimum(cells, num_cells - 1)] == order)
+                return grid.reshape(-1).at[jnp.where(wins, cells, num_cells)].set(
+                    search_array[:, 2], mode="drop"
+                ).reshape(grid.shape)
             # def claim_grid(search_array, exists, grid, state):
             #     def update_single(exist_flag, coord):
             #         # 在resources中找到对应坐标的索引
@@ -1651,276 +1221,212 @@ class Territory_open(MultiAgentEnv):
 
             # moving all agents
 
-            new_grid = state.grid.at[
-                state.agent_locs[:, 0],
-                state.agent_locs[:, 1]
-            ].set(
-                jnp.int16(Items.empty)
-            )
+            with jax.named_scope("movement"):
+                new_grid = state.grid.at[
+                    state.agent_locs[:, 0],
+                    state.agent_locs[:, 1]
+                ].set(
+                    jnp.int16(Items.empty)
+                )
 
-            x, y = state.reborn_locs[:, 0], state.reborn_locs[:, 1]
-            new_grid = new_grid.at[x, y].set(self._agents)
-            state = state.replace(grid=new_grid)
-            state = state.replace(agent_locs=state.reborn_locs)
+                x, y = state.reborn_locs[:, 0], state.reborn_locs[:, 1]
+                new_grid = new_grid.at[x, y].set(self._agents)
+                state = state.replace(grid=new_grid)
+                state = state.replace(agent_locs=state.reborn_locs)
 
-            # state = state.replace(reborn_locs=state.agent_locs)
+                # state = state.replace(reborn_locs=state.agent_locs)
 
-            key, subkey = jax.random.split(key)
-            all_new_locs = jax.vmap(lambda p, a: jnp.int16(p + ROTATIONS[a]) % jnp.array([self.GRID_SIZE_ROW + 1, self.GRID_SIZE_COL + 1, 4], dtype=jnp.int16))(p=state.agent_locs, a=actions).squeeze()
+                key, subkey = jax.random.split(key)
+                all_new_locs = jax.vmap(lambda p, a: jnp.int16(p + ROTATIONS[a]) % jnp.array([self.GRID_SIZE_ROW + 1, self.GRID_SIZE_COL + 1, 4], dtype=jnp.int16))(p=state.agent_locs, a=actions).squeeze()
 
-            agent_move = (actions == Actions.up) | (actions == Actions.down) | (actions == Actions.right) | (actions == Actions.left)
-            all_new_locs = jax.vmap(lambda m, n, p: jnp.where(m, n + STEP_MOVE[p], n))(m=agent_move, n=all_new_locs, p=actions)
+                agent_move = (actions == Actions.up) | (actions == Actions.down) | (actions == Actions.right) | (actions == Actions.left)
+                all_new_locs = jax.vmap(lambda m, n, p: jnp.where(m, n + STEP_MOVE[p], n))(m=agent_move, n=all_new_locs, p=actions)
             
-            all_new_locs = jax.vmap(
-                jnp.clip,
-                in_axes=(0, None, None)
-            )(
-                all_new_locs,
-                jnp.array([0, 0, 0], dtype=jnp.int16),
-                jnp.array(
-                    [self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1, 3],
-                    dtype=jnp.int16
-                ),
-            ).squeeze()
-
-            # Block resource/wall cells BEFORE conflict resolution so that a
-            # blocked move can never re-create an agent-agent overlap.
-            def check_wall_positions(grid, positions):
-                def check_single_position(pos):
-                    is_wall = grid[pos[0], pos[1]] != Items.empty
-                    return jnp.where(is_wall, pos, jnp.array([-1, -1]))
-                return jax.vmap(check_single_position)(positions)
-            resources_position = check_wall_positions(state.grid, state.resources)
-            wall_position = check_wall_positions(state.grid, self.SPAWNS_WALL)
-            def handle_wall_collisions(original_positions, agent_positions, wall_positions):
-                """
-                agent_positions: shape (n_agents, 3) - (x, y, angle)
-                wall_positions: shape (n_walls, 2) - (x, y)
-                """
-                def check_single_agent(original_pos,agent_pos):
-                    # 只检查前两个坐标 (x,y)
-                    agent_xy = agent_pos[:2]
-                    # 检查是否与任何墙重叠
-                    collisions = jnp.all(agent_xy == wall_positions, axis=1)
-                    any_collision = jnp.any(collisions)
-
-                    # 如果碰撞，返回原位置；否则返回新位置
-                    return jax.lax.cond(
-                        any_collision,
-                        lambda _: original_pos,  # 保持角度不变
-                        lambda _: agent_pos,
-                        operand=None
+                all_new_locs = jax.vmap(
+                    jnp.clip,
+                    in_axes=(0, None, None)
+                )(
+                    all_new_locs,
+                    jnp.array([0, 0, 0], dtype=jnp.int16),
+                    jnp.array(
+                        [self.GRID_SIZE_ROW - 1, self.GRID_SIZE_COL - 1, 3],
+                        dtype=jnp.int16
+                    ),
+                ).squeeze()
+
+                # Block resource/wall cells BEFORE conflict resolution so that a
+                # blocked move can never re-create an agent-agent overlap.
+                # A resource or wall cell blocks while it is not empty; the
+                # proposals are clipped to the map, so a gather suffices.
+                row, col = all_new_locs[:, 0], all_new_locs[:, 1]
+                blocked = jnp.logical_and(
+                    (self.RESOURCE_ID[row, col] >= 0) | self.WALL_MASK[row, col],
+                    state.grid[row, col] != Items.empty
+                )
+                all_new_locs = jnp.where(blocked[:, None], state.agent_locs, all_new_locs)
+
+                # Resolve agent-agent movement conflicts via the shared
+                # resolver: same-target conflicts (non-mover priority, else
+                # random winner), swaps blocked, trains allowed, cascades
+                # reverted to a fixed point. Final (row, col) unique.
+                key, move_key = jax.random.split(key)
+                new_locs = resolve_movement(move_key, state.agent_locs, all_new_locs)
+
+
+            with jax.named_scope("interaction"):
+                def facing_owners(agent_locs: jnp.ndarray) -> jnp.ndarray:
+                    """
+                    For each resource, the lowest index of the agents facing
+                    it from an adjacent cell, or num_agents if none is.
+                    """
+                    directions = jnp.array([
+                        [1, 0],  # North (0)
+                        [0, 1],  # West  (1) 
+                        [-1, 0],   # South (2)
+                        [0, -1],   # East  (3)
+                    ], dtype=jnp.int16)
+                    faced = resource_at(agent_locs[:, :2] + directions[agent_locs[:, 2]])
+                    faced = jnp.where(faced >= 0, faced, self.NUM_RESOURCES)
+                    return jnp.full(self.NUM_RESOURCES, self.num_agents).at[faced].min(
+                        jnp.arange(self.num_agents), mode="drop"
                     )
 
-                # 使用 vmap 并行处理所有 agent
-                return jax.vmap(check_single_agent)(original_positions, agent_positions)
-            all_new_locs = handle_wall_collisions(state.agent_locs, all_new_locs, resources_position)
-            all_new_locs = handle_wall_collisions(state.agent_locs, all_new_locs, wall_position)
-
-            # Resolve agent-agent movement conflicts via the shared
-            # resolver: same-target conflicts (non-mover priority, else
-            # random winner), swaps blocked, trains allowed, cascades
-            # reverted to a fixed point. Final (row, col) unique.
-            key, move_key = jax.random.split(key)
-            new_locs = resolve_movement(move_key, state.agent_locs, all_new_locs)
-
-
-            def check_resource_interaction(
-                agent_locs: jnp.ndarray,  # Shape: [num_agents, 3] - (x, y, direction)
-                resource_locs: jnp.ndarray,  # Shape: [num_resources, 2] - (x, y)
-                interaction_range: int = 1
-            ) -> jnp.ndarray:  # Shape: [N, 3] where N is number of interactions, third column is agent index
-                """
-                Check which resources each agent is facing within range.
-                Returns array of [resource_x, resource_y, agent_index] for each valid interaction.
-                Returns empty array if no resources are faced.
-                """
-                directions = jnp.array([
-                    [1, 0],  # North (0)
-                    [0, 1],  # West  (1) 
-                    [-1, 0],   # South (2)
-                    [0, -1],   # East  (3)
-                ])
-                
-                agent_pos = agent_locs[:, :2]
-                agent_dirs = agent_locs[:, 2]
-                agent_direction_vectors = directions[agent_dirs]
-                
-                def check_facing(pos, dir_vec, resource_pos):
-                    return jnp.all(pos + dir_vec == resource_pos)
-                
-                # Vectorize the check across all agents and resources
-                is_facing = jax.vmap(
-                    jax.vmap(check_facing, in_axes=(None, None, 0)), 
-                    in_axes=(0, 0, None)
-                )(agent_pos, agent_direction_vectors, resource_locs)
-                
-                # Calculate distances
-                rel_positions = jnp.expand_dims(resource_locs, 0) - jnp.expand_dims(agent_pos, 1)
-                distances = jnp.sqrt(jnp.sum(rel_positions ** 2, axis=-1))
-                in_range = distances <= interaction_range
-                
-                # Combine conditions
-                can_interact = jnp.logical_and(in_range, is_facing)
-                
-                # Get indices where interactions are possible
-                # agent_indices, resource_indices = jnp.where(can_interact)
-                
-                
-                return can_interact
-
-            def process_matches(bool_matrix, coord_matrix):
-                # 对每一列，找出其中是否有True以及True在哪一行
-                has_true = jnp.any(bool_matrix, axis=0)  # shape: (180,)
-                true_rows = jnp.argmax(bool_matrix, axis=0)  # shape: (180,)
-                
-                # 构建结果数组
-                return jnp.where(
-                    has_true[:, None],  # 扩展维度以广播
-                    jnp.column_stack((coord_matrix, true_rows)),  # True时：实际坐标和agent_index
-                    # jnp.full((180, 3), 1000)  # False时：[1000,1000,1000]
-                    jnp.full((88, 3), 1000)  # False时：[1000,1000,1000]
-                )
-            can_interact = check_resource_interaction(new_locs,state.resources)
-            claimed_resources_matrix = process_matches(can_interact,state.resources)
-            state = state.replace(claimed_resources=claimed_resources_matrix.astype(jnp.int16))
+                def process_matches(owners, coord_matrix):
+                    # 构建结果数组: 被面对的资源为 [x, y, agent_index]，其余为 [1000,1000,1000]
+                    return jnp.where(
+                        (owners < self.num_agents)[:, None],
+                        jnp.column_stack((coord_matrix, owners)),
+                        jnp.full((self.NUM_RESOURCES, 3), 1000)
+                    )
+                owners = facing_owners(new_locs)
+                claimed_resources_matrix = process_matches(owners, self.SPAWNS_RESOURCE_UNCLAIMED)
+                state = state.replace(claimed_resources=claimed_resources_matrix.astype(jnp.int16))
 
 
-            # rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
-            # rewards_sum = jnp.sum(rewards)
-            # rewards_sum_all_agents += rewards_sum
-            # rewards = rewards_sum_all_agents
+                # rewards_sum_all_agents = jnp.zeros((self.num_agents, 1))
+                # rewards_sum = jnp.sum(rewards)
+                # rewards_sum_all_agents += rewards_sum
+                # rewards = rewards_sum_all_agents
 
-            # new_invs = state.agent_invs + apple_matches
+                # new_invs = state.agent_invs + apple_matches
 
-            # state = state.replace(
-            #     agent_invs=new_invs
-            # )
+                # state = state.replace(
+                #     agent_invs=new_invs
+                # )
 
-            # update grid
-            old_grid = state.grid
+                # update grid
+                old_grid = state.grid
 
-            new_grid = old_grid.at[
-                state.agent_locs[:, 0],
-                state.agent_locs[:, 1]
-            ].set(
-                jnp.int16(Items.empty)
-            )
-            x, y = new_locs[:, 0], new_locs[:, 1]
-            new_grid = new_grid.at[x, y].set(self._agents)
-            state = state.replace(grid=new_grid)
+                new_grid = old_grid.at[
+                    state.agent_locs[:, 0],
+                    state.agent_locs[:, 1]
+                ].set(
+                    jnp.int16(Items.empty)
+                )
+                x, y = new_locs[:, 0], new_locs[:, 1]
+                new_grid = new_grid.at[x, y].set(self._agents)
+                state = state.replace(grid=new_grid)
 
 
-            exists_claimed_resources = ~jnp.all(state.claimed_resources == 1000, axis=1)
-            claimed_resources_color_array = jnp.where(
-                            state.claimed_resources[:, 2:3] == 1000,
-                            state.claimed_resources,
-                            jnp.column_stack((state.claimed_resources[:, :2], jnp.arange(1000,1000+self.num_agents)[state.claimed_resources[:, 2]]))
-                            )
-            def update_close_grid(search_array, exists, grid):
-                def scan_fn(g, inputs):
-                    coord, flag = inputs
-                    return (
-                        jax.lax.select(
-                            flag,
-                            g.at[coord[0], coord[1]].set(coord[2]),
-                            g
-                        ),
-                        None
+                def update_close_grid(owners, grid):
+                    # resource cells are distinct, so all claims are one scatter
+                    x, y = self.SPAWNS_RESOURCE_UNCLAIMED[:, 0], self.SPAWNS_RESOURCE_UNCLAIMED[:, 1]
+                    return grid.at[x, y].set(
+                        jnp.where(owners < self.num_agents, 1000 + owners, grid[x, y]).astype(grid.dtype)
                     )
-                return jax.lax.scan(scan_fn, grid, (search_array, exists))[0]
-            state = state.replace(grid=update_close_grid(search_array=claimed_resources_color_array, exists=exists_claimed_resources,grid=state.grid))
+                state = state.replace(grid=update_close_grid(owners, state.grid))
 
-            claimed_indicator_old_grid = state.grid
+                claimed_indicator_old_grid = state.grid
 
-            # update agent locations
-            state = state.replace(agent_locs=new_locs)
+                # update agent locations
+                state = state.replace(agent_locs=new_locs)
             
-            color = jnp.arange(1000, 1000+self.num_agents)
-            prev_claimed_resources = jnp.equal(state.grid[None, ...], color[:, None, None])
+                color = jnp.arange(1000, 1000+self.num_agents)
+                prev_claimed_resources = jnp.equal(state.grid[None, ...], color[:, None, None])
             
-            state = _interact_fire_cleaning(key, state, actions)
+                state = _interact_fire_cleaning(key, state, actions)
             
             
-            coord_claimed_resources =  jnp.isin(state.grid, color)
-            state = state.replace(claimed_coord=coord_claimed_resources)
+                coord_claimed_resources =  jnp.isin(state.grid, color)
+                state = state.replace(claimed_coord=coord_claimed_resources)
 
-            reborn_players, state = _interact(key, state, actions)
+                reborn_players, state = _interact(key, state, actions)
             
-            claimed_indicator_new_grid = state.grid
+                claimed_indicator_new_grid = state.grid
 
 
-            def compare_grids(grid1, grid2, result):
-                return jnp.where(jnp.equal(grid1, grid2), result + 1, 0)
+                def compare_grids(grid1, grid2, result):
+                    return jnp.where(jnp.equal(grid1, grid2), jnp.minimum(result + 1, CLAIM_REWARD_DELAY), 0)
             
-            present_claimed_resources = jnp.equal(state.grid[None, ...], color[:, None, None])
-            owner = jnp.argmax(prev_claimed_resources, axis=0)
-            owner_expanded = jnp.expand_dims(owner, axis=0)
-            agents = jnp.arange(prev_claimed_resources.shape[0]).reshape(prev_claimed_resources.shape[0], 1, 1)
-            present_claimed_resources_updated = jnp.where(agents == owner_expanded, present_claimed_resources, False)
-
-            claimed_indicator_time_matrix = compare_grids(claimed_indicator_old_grid, claimed_indicator_new_grid, state.claimed_indicator_time_matrix)
-            rewards_matrix = jnp.logical_and(present_claimed_resources_updated,claimed_indicator_time_matrix[None, ...] >= 100)
+                present_claimed_resources = jnp.equal(state.grid[None, ...], color[:, None, None])
+                owner = jnp.argmax(prev_claimed_resources, axis=0)
+                owner_expanded = jnp.expand_dims(owner, axis=0)
+                agents = jnp.arange(prev_claimed_resources.shape[0]).reshape(prev_claimed_resources.shape[0], 1, 1)
+                present_claimed_resources_updated = jnp.where(agents == owner_expanded, present_claimed_resources, False)
+
+                claimed_indicator_time_matrix = compare_grids(claimed_indicator_old_grid, claimed_indicator_new_grid, state.claimed_indicator_time_matrix)
+                rewards_matrix = jnp.logical_and(present_claimed_resources_updated,claimed_indicator_time_matrix[None, ...] >= CLAIM_REWARD_DELAY)
             # rewards_matrix = jnp.logical_and(jnp.equal(state.grid[None, ...], color[:, None, None]),claimed_indicator_time_matrix[None, ...] >= 25)
             # rewards = jnp.sum(jnp.equal(state.grid[None, ...], color[:, None, None]), axis=(1, 2)) * 0.01
             # rewards = jnp.sum(rewards_matrix, axis=(1, 2)) * 0.01
-            if self.shared_rewards:
-                original_rewards = jnp.sum(rewards_matrix, axis=(1, 2)) * 0.01
-
-                reward_sum = jnp.sum(original_rewards)
-                rewards = jnp.full_like(original_rewards, reward_sum)/self.num_agents
-                info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.inequity_aversion:
-                original_rewards = jnp.sum(rewards_matrix, axis=(1, 2)) * 0.01
-                if self.smooth_rewards:
-                    should_smooth = (state.inner_t % 1) == 0
-                    new_smooth_rewards = 0.99 * 0.01* state.smooth_rewards + original_rewards
-                    rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(new_smooth_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
-                    state = state.replace(smooth_rewards=new_smooth_rewards)
+            with jax.named_scope("rewards"):
+                if self.shared_rewards:
+                    original_rewards = jnp.sum(rewards_matrix, axis=(1, 2)) * 0.01
+
+                    reward_sum = jnp.sum(original_rewards)
+                    rewards = jnp.full_like(original_rewards, reward_sum)/self.num_agents
                     info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "smooth_rewards": state.smooth_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-                else:
-                    rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(original_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        "original_rewards": original_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.inequity_aversion:
+                    original_rewards = jnp.sum(rewards_matrix, axis=(1, 2)) * 0.01
+                    if self.smooth_rewards:
+                        should_smooth = (state.inner_t % 1) == 0
+                        new_smooth_rewards = 0.99 * 0.01* state.smooth_rewards + original_rewards
+                        rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(new_smooth_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        state = state.replace(smooth_rewards=new_smooth_rewards)
+                        info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "smooth_rewards": state.smooth_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                    else:
+                        rewards, disadvantageous, advantageous = self.get_inequity_aversion_rewards_immediate(original_rewards, state.inner_t, self.inequity_aversion_target_agents, self.inequity_aversion_alpha, self.inequity_aversion_beta)
+                        info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.svo:
+                    original_rewards = jnp.sum(rewards_matrix, axis=(1, 2)) * 0.01
+                    rewards, theta = self.get_svo_rewards(original_rewards, self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents)
                     info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.svo:
-                original_rewards = jnp.sum(rewards_matrix, axis=(1, 2)) * 0.01
-                rewards, theta = self.get_svo_rewards(original_rewards, self.svo_w, self.svo_ideal_angle_degrees, self.svo_target_agents)
-                info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "svo_theta": theta.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                }
-            elif self.interest:
-                original_rewards = jnp.sum(rewards_matrix, axis=(1, 2)) * 0.01
+                        "original_rewards": original_rewards.squeeze(),
+                        "svo_theta": theta.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                    }
+                elif self.interest:
+                    original_rewards = jnp.sum(rewards_matrix, axis=(1, 2)) * 0.01
 
-                # Calculate current s_interest based on timestep
-                current_s_interest = get_current_s_interest(timestep)
-                original_flat = original_rewards.squeeze()
+                    # Calculate current s_interest based on timestep
+                    current_s_interest = get_current_s_interest(timestep)
+                    original_flat = original_rewards.squeeze()
 
-                # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
-                total_reward = jnp.sum(original_flat)
-                others_reward = total_reward - original_flat  # sum of all other agents' rewards
+                    # Each agent gets s * their_reward + (1-s)/(n-1) * sum_of_others
+                    total_reward = jnp.sum(original_flat)
+                    others_reward = total_reward - original_flat  # sum of all other agents' rewards
 
-                rewards = (current_s_interest * original_flat +
-                        (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
+                    rewards = (current_s_interest * original_flat +
+                            (1 - current_s_interest) / (self.num_agents - 1) * others_reward)
 
-                info = {
-                    "original_rewards": original_rewards.squeeze(),
-                    "shaped_rewards": rewards.squeeze(),
-                    "s_interest": current_s_interest,
-                }
-            else:
-                rewards = jnp.sum(rewards_matrix, axis=(1, 2)) * 0.01
-                info = {}
+                    info = {
+                        "original_rewards": original_rewards.squeeze(),
+                        "shaped_rewards": rewards.squeeze(),
+                        "s_interest": current_s_interest,
+                    }
+                else:
+                    rewards = jnp.sum(rewards_matrix, axis=(1, 2)) * 0.01
+                    info = {}
             
 
             # reward_sum = jnp.sum(rewards)
@@ -1928,11 +1434,12 @@ class Territory_open(MultiAgentEnv):
 
             # Occupancy-aware respawn: reborn agents are placed on spawn
             # cells not occupied by any survivor, so no overlap is possible.
-            key, respawn_key = jax.random.split(key)
-            new_re_locs = resolve_respawn(
-                respawn_key, new_locs, reborn_players.astype(bool), self.SPAWN_PLAYER
-            )
-            state = state.replace(reborn_locs=new_re_locs)
+            with jax.named_scope("respawn"):
+                key, respawn_key = jax.random.split(key)
+                new_re_locs = resolve_respawn(
+                    respawn_key, new_locs, reborn_players.astype(bool), self.SPAWN_PLAYER
+                )
+                state = state.replace(reborn_locs=new_re_locs)
 
             # state.reborn_locs = new_re_locs
             # jax.debug.print("state.grid🤯 {state} 🤯", state=state.grid)
@@ -1951,7 +1458,6 @@ class Territory_open(MultiAgentEnv):
                 inner_t=state.inner_t + 1,
                 outer_t=state.outer_t,
                 grid=state.grid,
-                resources=state.resources,
                 freeze=state.freeze,
                 reborn_locs=state.reborn_locs,
                 claimed_resources = state.claimed_resources,
@@ -1965,21 +1471,16 @@ class Territory_open(MultiAgentEnv):
             reset_inner = inner_t == num_inner_steps
 
             # if inner episode is done, return start state for next game
-            state_re = _reset_state(key)
-
-            state_re = state_re.replace(outer_t=outer_t + 1)
-            state = jax.tree.map(
-                lambda x, y: jnp.where(reset_inner, x, y),
-                state_re,
-                state_nxt,
-            )
+            with jax.named_scope("episode_reset"):
+                state = self.inner_reset(key, reset_inner, _reset_state, state_nxt)
             outer_t = state.outer_t
             reset_outer = outer_t == num_outer_steps
             done = {f'{a}': reset_outer for a in self.agents}
             # done = [reset_outer for _ in self.agents]
             done["__all__"] = reset_outer
 
-            obs = _get_obs(state)
+            with jax.named_scope("observation"):
+                obs = _get_obs(state)
             rewards = jnp.where(
                 reset_inner,
                 jnp.zeros_like(rewards, dtype=jnp.int16),
@@ -1991,7 +1492,7 @@ class Territory_open(MultiAgentEnv):
                 state,
                 rewards.squeeze(),
                 done,
-                info,
+                self.select_info(info),
             )
 
         def _reset_state(
@@ -2071,24 +1572,23 @@ class Territory_open(MultiAgentEnv):
 
             freeze = jnp.array(
                 [[-1]*num_agents]*num_agents,
-            dtype=jnp.int16
+            dtype=jnp.int8
             )
 
             return State(
                 agent_locs=agent_locs,
                 agent_invs=jnp.array([(0,0)]*num_agents, dtype=jnp.int8),
-                inner_t=0,
-                outer_t=0,
+                inner_t=jnp.zeros((), self._counter_dtype),
+                outer_t=jnp.zeros((), self._counter_dtype),
                 grid=grid,
-                resources=resource_pos,
                 freeze=freeze,
                 reborn_locs = agent_locs,
                 # claimed_resources = jnp.ones((180,3), dtype=jnp.int16) * 1000,
                 # claimed_coord = jnp.zeros((21,21), dtype=bool),
                 # claimed_indicator_time_matrix = jnp.zeros((21,21), dtype=jnp.int16),
-                claimed_resources = jnp.ones((88,3), dtype=jnp.int16) * 1000,
-                claimed_coord = jnp.zeros((23,39), dtype=bool),
-                claimed_indicator_time_matrix = jnp.zeros((23,39), dtype=jnp.int16),
+                claimed_resources = jnp.ones((self.NUM_RESOURCES, 3), dtype=jnp.int16) * 1000,
+                claimed_coord = jnp.zeros((self.GRID_SIZE_ROW, self.GRID_SIZE_COL), dtype=bool),
+                claimed_indicator_time_matrix = jnp.zeros((self.GRID_SIZE_ROW, self.GRID_SIZE_COL), dtype=jnp.uint8),
             )
 
         def reset(
@@ -2113,10 +1613,17 @@ class Territory_open(MultiAgentEnv):
 
         # for debugging
         self.get_obs = jax.jit(_get_obs)
+        self.get_agent_obs = jax.jit(_get_agent_obs)
         self.cnn = cnn
+        if obs_format not in ("full", "compact"):
+            raise ValueError(f"obs_format must be 'full' or 'compact', got {obs_format!r}")
+        self.obs_format = obs_format
+        if obs_format == "compact":
+            self.obs_encoding = compact_obs_encoding(len(Items), (len(Items)-1) + 10)
 
         self.num_inner_steps = num_inner_steps
         self.num_outer_steps = num_outer_steps
+        self._counter_dtype = counter_dtype(max(num_inner_steps, num_outer_steps))
 
     @property
     def name(self) -> str:
@@ -2142,6 +1649,14 @@ class Territory_open(MultiAgentEnv):
             else (self.OBS_SIZE**2 * ((len(Items)-1) + 10),)
         )
 
+        if self.obs_format == "compact":
+            channels = self.obs_encoding[1]
+            _shape_obs = (
+                (self.OBS_SIZE, self.OBS_SIZE, channels)
+                if self.cnn
+                else (self.OBS_SIZE**2 * channels,)
+            )
+
         return spaces.Box(
                 low=0, high=1E9, shape=_shape_obs, dtype=jnp.uint8
             ), _shape_obs
@@ -2193,7 +1708,7 @@ class Territory_open(MultiAgentEnv):
             fill_coords(img, point_in_rect(0, 1, 0, 1), (200.0, 200.0, 200.0))
         elif obj in claimed_resources_color_array:
             color_index = jnp.where(obj==claimed_resources_color_array)[0]
-            fill_coords(img, point_in_rect(0, 1, 0, 1), self.PLAYER_COLOURS[int(color_index)])
+            fill_coords(img, point_in_rect(0, 1, 0, 1), self.PLAYER_COLOURS[int(color_index[0])])
         elif obj == 999:
             fill_coords(img, point_in_rect(0.1, 0.9, 0.3, 0.9), (117, 88, 71))
         elif obj == Items.interact:
@@ -2261,80 +1776,29 @@ class Territory_open(MultiAgentEnv):
         :param r: target renderer object
         :param tile_size: tile size in pixels
         """
-        tile_size = 32
-        highlight_mask = onp.zeros_like(onp.array(self.GRID))
+        return onp.asarray(self.renderer.render(state))
 
-        # Compute the total grid size
-        width_px = self.GRID.shape[1] * tile_size
-        height_px = self.GRID.shape[0] * tile_size
+    def render_batch(self, states: State) -> jnp.ndarray:
+        """
+        Render a batch of states (leading batch axis on every field) in one
+        jitted call; returns uint8 frames of shape (B, H, W, 3).
+        """
+        return self.renderer.render_batch(states)
 
-        img = onp.zeros(shape=(height_px, width_px, 3), dtype=onp.uint8)
-        grid = onp.array(state.grid)
-        grid = onp.pad(
-            grid, ((self.PADDING, self.PADDING), (self.PADDING, self.PADDING)), constant_values=Items.wall
-        )
-        for a in range(self.num_agents):
-            startx, starty = self.get_obs_point(
-                state.agent_locs[a]
+    @property
+    def renderer(self) -> GridRenderer:
+        """Jittable tile-atlas renderer, built on first use."""
+        if self._renderer is None:
+            self._renderer = GridRenderer(
+                self,
+                values=list(range(len(Items)))
+                + list(onp.asarray(self._agents))
+                + [99, 100, 101, 999]
+                + list(range(1000, 1000 + self.num_agents)),
+                pad_value=Items.wall,
+                tile_size=32,
             )
-            highlight_mask[
-                startx : startx + self.OBS_SIZE, starty : starty + self.OBS_SIZE
-            ] = True
-
-        # Render the grid
-        for j in range(0, grid.shape[1]):
-            for i in range(0, grid.shape[0]):
-                cell = grid[i, j]
-                if cell == 0:
-                    cell = None
-                agent_here = []
-                for a in self._agents:
-                    agent_here.append(cell == a)
-                # if cell in [1,2]:
-                #     print(f'coordinates: {i},{j}')
-                #     print(cell)
-
-                agent_dir = None
-                for a in range(self.num_agents):
-                    agent_dir = (
-                        state.agent_locs[a,2].item()
-                        if agent_here[a]
-                        else agent_dir
-                    )
-                
-                agent_hat = False
-                # for a in range(self.num_agents):
-                #     agent_hat = (
-                #         bool(state.agent_invs[a].sum() > INTERACT_THRESHOLD)
-                #         if agent_here[a]
-                #         else agent_hat
-                #     )
-                # if jnp.any(jnp.all(jnp.array([i,j]) == state.claimed_resources[:, :2], axis=1)):
-                #     claimed_resources_array = jnp.arange(1000,1000+self.num_agents)
-                #     agent_index = state.claimed_resources[jnp.where(jnp.all(jnp.array([i,j]) == state.claimed_resources[:, :2], axis=1))][0][-1]
-                #     cell = claimed_resources_array[agent_index].item()
-                tile_img = self.render_tile(
-                    cell,
-                    agent_dir=agent_dir,
-                    agent_hat=agent_hat,
-                    highlight=highlight_mask[i, j],
-                    tile_size=tile_size,
-                )
-
-                ymin = i * tile_size
-                ymax = (i + 1) * tile_size
-                xmin = j * tile_size
-                xmax = (j + 1) * tile_size
-                img[ymin:ymax, xmin:xmax, :] = tile_img
-        img = onp.rot90(
-            img[
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                (self.PADDING - 1) * tile_size : -(self.PADDING - 1) * tile_size,
-                :,
-            ],
-            2,
-        )
-        return img
+        return self._renderer
 
     def render_inventory(self, inventory, width_px) -> onp.array:
         tile_height = 32
@@ -1,3 +1,5 @@
+import jax
+
 from socialjax.environments import (
     # Social dilemma environments
     Territory_open,
@@ -27,8 +29,19 @@ REGISTERED_ENVS = [
 ]
 
 
-def make(env_id: str, **env_kwargs):
-    """A JAX-version of OpenAI's env.make(env_name), built off Gymnax"""
+def make(env_id: str, reset_pool_size: int = 0, reset_pool_seed: int = 0, **env_kwargs):
+    """A JAX-version of OpenAI's env.make(env_name), built off Gymnax
+
+    With ``reset_pool_size > 0`` the env precomputes that many reset states
+    (seeded by ``reset_pool_seed``) and auto-resets by drawing one from the pool
+    instead of running a full reset on every step.
+
+    The pool changes the start-state distribution: after the first reset, every
+    episode starts from one of those ``reset_pool_size`` states, which are baked
+    into the compiled ``step``. That is fine for benchmarks, but a policy trained
+    on a small pool only ever sees those starts. ``run_train`` warns when a
+    trainer's ENV_KWARGS set it.
+    """
     if env_id not in REGISTERED_ENVS:
         raise ValueError(f"{env_id} is not in registered SocialJax environments")
 
@@ -52,4 +65,7 @@ def make(env_id: str, **env_kwargs):
         env = Gift(**env_kwargs)
     elif env_id == "lb_foraging":
         env = LBForaging(**env_kwargs)
-    return env
\ No newline at end of file
+
+    if reset_pool_size > 0:
+        env.build_reset_pool(jax.random.PRNGKey(reset_pool_seed), reset_pool_size)
+    return env
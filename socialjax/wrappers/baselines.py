@@ -119,6 +119,8 @@ class SVOLogWrapper(JaxMARLWrapper):
 
     def __init__(self, env: MultiAgentEnv, replace_info: bool = False):
         super().__init__(env)
+        if getattr(env, "info_level", "full") == "none":
+            raise ValueError("SVOLogWrapper needs the original_rewards info; use info_level 'rewards' or 'full'")
         self.replace_info = replace_info
 
     @partial(jax.jit, static_argnums=(0,))
@@ -0,0 +1,265 @@
+"""
+Steps-per-second benchmark over every registered SocialJax environment.
+
+For each env, NUM_ENVS and num_agents in the sweep, the `reset`, `step_env`
+and observation (`get_obs`) phases are timed separately. Each phase is one
+jitted lax.scan of --num-steps iterations over a vmapped batch of envs;
+compile time (lower + compile) is reported apart from run time, and SPS is
+env-steps (or resets / observation builds) per second of run time.
+
+Results go to a JSON file; pass --baseline to compare against a stored run
+(e.g. speed_test/baselines/cpu.json) and exit non-zero on a regression:
+
+    JAX_PLATFORMS=cpu python speed_test/benchmark_suite.py \
+        --output bench.json --baseline speed_test/baselines/cpu.json
+
+Baselines are only comparable on the same machine and backend.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+
+import jax
+import jax.numpy as jnp
+
+import socialjax
+from socialjax.registration import REGISTERED_ENVS
+
+PHASES = ["reset", "step_env", "get_obs"]
+OBS_TRAJECTORY_LEN = 16  # distinct states cycled through by the get_obs benchmark
+
+
+def _obs_fn(env):
+    # coop_mining and lb_foraging build observations in a `_get_obs` method;
+    # the other envs bind their observation closure to `get_obs`
+    return env._get_obs if hasattr(env, "_get_obs") else env.get_obs
+
+
+def _leaves_sum(tree):
+    # consume every output so XLA cannot dead-code eliminate part of a phase
+    return sum(jnp.sum(x.astype(jnp.float32)) for x in jax.tree.leaves(tree))
+
+
+def _random_actions(env, rng, num_envs):
+    actions = jax.random.randint(rng, (num_envs, env.num_agents), 0, env.action_space().n)
+    return [actions[:, i] for i in range(env.num_agents)]
+
+
+def make_reset_benchmark(env, num_envs, num_steps):
+    def benchmark(rng):
+        def reset_step(rng, _unused):
+            rng, _rng = jax.random.split(rng)
+            obs, state = jax.vmap(env.reset)(jax.random.split(_rng, num_envs))
+            return rng, _leaves_sum((obs, state))
+
+        _, sums = jax.lax.scan(reset_step, rng, None, num_steps)
+        return sums
+
+    return benchmark
+
+
+def make_step_benchmark(env, num_envs, num_steps):
+    def benchmark(rng, env_state):
+        def env_step(carry, _unused):
+            env_state, rng = carry
+            rng, _rng_act, _rng_step = jax.random.split(rng, 3)
+            obs, env_state, reward, _, _ = jax.vmap(env.step_env)(
+                jax.random.split(_rng_step, num_envs),
+                env_state,
+                _random_actions(env, _rng_act, num_envs),
+            )
+            return (env_state, rng), obs.sum() + reward.sum()
+
+        _, sums = jax.lax.scan(env_step, (env_state, rng), None, num_steps)
+        return sums
+
+    return benchmark
+
+
+def make_obs_benchmark(env, num_steps):
+    obs_fn = jax.vmap(_obs_fn(env))
+
+    def benchmark(rng, trajectory):
+        del rng
+
+        def obs_step(carry, _unused):
+            idx, total = carry
+            obs = obs_fn(jax.tree.map(lambda x: x[idx], trajectory))
+            obs_sum = obs.sum()
+            # the next index depends on this observation, so the build cannot
+            # be hoisted out of the loop
+            idx = (idx + 1 + (obs_sum < -1).astype(jnp.int32)) % OBS_TRAJECTORY_LEN
+            return (idx, total + obs_sum), None
+
+        (_, total), _ = jax.lax.scan(obs_step, (jnp.int32(0), jnp.float32(0)), None, num_steps)
+        return total
+
+    return benchmark
+
+
+def _rollout_states(env, rng, num_envs):
+    """A short random trajectory of batched states, (OBS_TRAJECTORY_LEN, num_envs, ...)."""
+
+    @jax.jit
+    def rollout(rng):
+        rng, _rng = jax.random.split(rng)
+        _, env_state = jax.vmap(env.reset)(jax.random.split(_rng, num_envs))
+
+        def env_step(carry, _unused):
+            env_state, rng = carry
+            rng, _rng_act, _rng_step = jax.random.split(rng, 3)
+            _, env_state, _, _, _ = jax.vmap(env.step_env)(
+                jax.random.split(_rng_step, num_envs),
+                env_state,
+                _random_actions(env, _rng_act, num_envs),
+            )
+            return (env_state, rng), env_state
+
+        (last_state, _), states = jax.lax.scan(
+            env_step, (env_state, rng), None, OBS_TRAJECTORY_LEN
+        )
+        return last_state, states
+
+    return rollout(rng)
+
+
+def time_phase(benchmark_fn, *args, repeats=1):
+    """Returns (compile seconds, best run seconds) of a jitted benchmark."""
+    before = time.perf_counter()
+    compiled = jax.jit(benchmark_fn).lower(*args).compile()
+    compile_s = time.perf_counter() - before
+    run_s = float("inf")
+    for _ in range(repeats):
+        before = time.perf_counter()
+        jax.block_until_ready(compiled(*args))
+        run_s = min(run_s, time.perf_counter() - before)
+    return compile_s, run_s
+
+
+def benchmark_env(env_id, num_envs, num_agents, num_steps, repeats=1, seed=0):
+    """Benchmarks the three phases of one env config; returns a list of result dicts."""
+    env_kwargs = {} if num_agents is None else {"num_agents": num_agents}
+    env = socialjax.make(env_id, **env_kwargs)
+    rng = jax.random.PRNGKey(seed)
+    rng, _rng = jax.random.split(rng)
+    env_state, trajectory = _rollout_states(env, _rng, num_envs)
+
+    phases = {
+        "reset": (make_reset_benchmark(env, num_envs, num_steps), (rng,)),
+        "step_env": (make_step_benchmark(env, num_envs, num_steps), (rng, env_state)),
+        "get_obs": (make_obs_benchmark(env, num_steps), (rng, trajectory)),
+    }
+    results = []
+    for phase in PHASES:
+        benchmark_fn, args = phases[phase]
+        compile_s, run_s = time_phase(benchmark_fn, *args, repeats=repeats)
+        results.append({
+            "env": env_id,
+            "num_envs": num_envs,
+            "num_agents": env.num_agents,
+            "phase": phase,
+            "num_steps": num_steps,
+            "compile_s": compile_s,
+            "run_s": run_s,
+            "sps": num_steps * num_envs / run_s,
+        })
+    return results
+
+
+def _key(result):
+    return (result["env"], result["num_envs"], result["num_agents"], result["phase"])
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Compares SPS against a baseline run. Returns the list of regressions, i.e.
+    results whose SPS dropped by more than `tolerance` (a fraction) relative to
+    the baseline entry with the same env, num_envs, num_agents and phase.
+    """
+    baseline_sps = {_key(r): r["sps"] for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = baseline_sps.get(_key(result))
+        if base is None:
+            continue
+        result["baseline_sps"] = base
+        result["sps_ratio"] = result["sps"] / base
+        if result["sps_ratio"] < 1.0 - tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def _metadata(args):
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "jax_version": jax.__version__,
+        "backend": jax.default_backend(),
+        "device": str(jax.devices()[0]),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "num_steps": args.num_steps,
+        "repeats": args.repeats,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--envs", nargs="+", default=REGISTERED_ENVS, choices=REGISTERED_ENVS)
+    parser.add_argument("--num-envs", nargs="+", type=int, default=[1, 128])
+    parser.add_argument(
+        "--num-agents", nargs="+", type=int, default=[None],
+        help="num_agents values to sweep (default: each env's default)",
+    )
+    parser.add_argument("--num-steps", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=3, help="run each phase this many times, keep the best")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed fractional SPS drop vs. the baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results, failures = [], []
+    for env_id in args.envs:
+        for num_agents in args.num_agents:
+            for num_envs in args.num_envs:
+                try:
+                    env_results = benchmark_env(
+                        env_id, num_envs, num_agents, args.num_steps, args.repeats, args.seed
+                    )
+                except Exception as e:  # e.g. a map without room for num_agents
+                    failures.append({"env": env_id, "num_envs": num_envs, "num_agents": num_agents, "error": repr(e)})
+                    print(f"{env_id}, Num Envs: {num_envs}, Num Agents: {num_agents}, FAILED: {e!r}")
+                    continue
+                for r in env_results:
+                    print(
+                        f"{r['env']}, Num Envs: {r['num_envs']}, Num Agents: {r['num_agents']}, "
+                        f"{r['phase']}: compile {r['compile_s']:.2f}s, run {r['run_s']:.3f}s, SPS {r['sps']:.0f}"
+                    )
+                results.extend(env_results)
+
+    regressions = []
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for r in regressions:
+            print(
+                f"REGRESSION {r['env']}, Num Envs: {r['num_envs']}, Num Agents: {r['num_agents']}, "
+                f"{r['phase']}: SPS {r['sps']:.0f} vs baseline {r['baseline_sps']:.0f} ({r['sps_ratio']:.2f}x)"
+            )
+
+    with open(args.output, "w") as f:
+        json.dump({"meta": _metadata(args), "results": results, "failures": failures}, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+    return 1 if regressions or failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Per-phase cost breakdown of step_env for every registered environment.
+
+Each phase (regrowth, movement, interaction, respawn, rewards, episode_reset,
+observation) is cut out of the traced step and timed as its own jitted
+function; see socialjax/environments/profiling.py.
+
+    JAX_PLATFORMS=cpu python speed_test/profile_phases.py --num-envs 128 --output phases.json
+"""
+
+import argparse
+import json
+
+import socialjax
+from socialjax.environments.profiling import profile_step_phases
+from socialjax.registration import REGISTERED_ENVS
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--envs", nargs="+", default=REGISTERED_ENVS, choices=REGISTERED_ENVS)
+    parser.add_argument("--num-envs", type=int, default=128)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default=None, help="optional JSON file for the breakdown")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    breakdown = {}
+    for env_id in args.envs:
+        env = socialjax.make(env_id, jit=False)
+        result = profile_step_phases(env, num_envs=args.num_envs, repeats=args.repeats)
+        breakdown[env_id] = result
+        print(f"{env_id}, Num Envs: {args.num_envs}, fused step: {result['step_s'] * 1e3:.3f} ms")
+        for phase, r in result["phases"].items():
+            print(f"    {phase:<14} {r['time_s'] * 1e3:9.3f} ms  {r['share']:6.1%}  ({r['num_eqns']} eqns)")
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"num_envs": args.num_envs, "envs": breakdown}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
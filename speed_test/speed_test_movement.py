@@ -0,0 +1,85 @@
+"""
+Speed test of the two movement conflict resolvers over the number of agents,
+to locate the crossover where the sort-based resolver overtakes the dense
+all-pairs one (``SORTED_RESOLVER_MIN_AGENTS`` in
+socialjax/environments/movement.py).
+
+Each benchmark resolves random moves (about a quarter of the board occupied,
+every agent moving or staying uniformly at random) for NUM_ENVS boards over
+NUM_STEPS steps in one jitted scan.
+"""
+
+import math
+import time
+
+import jax
+import jax.numpy as jnp
+
+from socialjax.environments.movement import (
+    SORTED_RESOLVER_MIN_AGENTS,
+    resolve_movement_dense,
+    resolve_movement_sorted,
+)
+
+DELTAS = jnp.array([[0, 0], [1, 0], [-1, 0], [0, 1], [0, -1]], dtype=jnp.int16)
+
+
+def random_moves(key, num_agents, board):
+    k_pos, k_act, k_dir = jax.random.split(key, 3)
+    cells = jax.random.permutation(k_pos, board * board)[:num_agents]
+    rc = jnp.stack([cells // board, cells % board], -1).astype(jnp.int16)
+    dirs = jax.random.randint(k_dir, (num_agents, 1), 0, 4, dtype=jnp.int16)
+    act = jax.random.randint(k_act, (num_agents,), 0, len(DELTAS))
+    new_rc = jnp.clip(rc + DELTAS[act], 0, board - 1)
+    return jnp.concatenate([rc, dirs], -1), jnp.concatenate([new_rc, dirs], -1)
+
+
+def make_benchmark(resolver, num_agents, config):
+    board = math.ceil(math.sqrt(4 * num_agents))
+
+    def benchmark(rng):
+        def step(rng, _unused):
+            rng, _rng = jax.random.split(rng)
+            keys = jax.random.split(_rng, (config["NUM_ENVS"], 2))
+            old, prop = jax.vmap(random_moves, in_axes=(0, None, None))(keys[:, 0], num_agents, board)
+            out = jax.vmap(resolver)(keys[:, 1], old, prop)
+            return rng, out.sum()
+
+        _, sums = jax.lax.scan(step, rng, None, config["NUM_STEPS"])
+        return sums
+
+    return benchmark
+
+
+def time_benchmark(benchmark_fn, rng):
+    benchmark_jit = jax.jit(benchmark_fn).lower(rng).compile()
+    before = time.perf_counter_ns()
+    jax.block_until_ready(benchmark_jit(rng))
+    after = time.perf_counter_ns()
+    return (after - before) / 1e9
+
+
+config = {
+    "NUM_STEPS": 100,
+    "NUM_ENVS": 128,
+    "SEED": 0,
+    # the dense resolver is O(N^3): 128 agents already take minutes
+    "MAX_DENSE_AGENTS": 64,
+}
+
+if __name__ == "__main__":
+    rng = jax.random.PRNGKey(config["SEED"])
+    crossover = None
+    for num_agents in [2, 4, 8, 12, 16, 32, 64, 128, 256, 512]:
+        sorted_time = time_benchmark(make_benchmark(resolve_movement_sorted, num_agents, config), rng)
+        if num_agents > config["MAX_DENSE_AGENTS"]:
+            print(f"Num Agents: {num_agents}, sorted (s): {sorted_time:.4f}")
+            continue
+        dense_time = time_benchmark(make_benchmark(resolve_movement_dense, num_agents, config), rng)
+        if crossover is None and sorted_time < dense_time:
+            crossover = num_agents
+        print(
+            f"Num Agents: {num_agents}, dense (s): {dense_time:.4f}, sorted (s): {sorted_time:.4f}, "
+            f"sorted speedup: {dense_time / sorted_time:.2f}x"
+        )
+    print(f"sorted resolver is faster from {crossover} agents (SORTED_RESOLVER_MIN_AGENTS = {SORTED_RESOLVER_MIN_AGENTS})")
@@ -18,7 +18,9 @@ def unbatchify(x: jnp.ndarray, agent_list, num_envs, num_actors):
     return {a: x[i] for i, a in enumerate(agent_list)}
 
 def make_benchmark(config):
-    env = socialjax.make(config["ENV_NAME"], **config["ENV_KWARGS"])
+    env = socialjax.make(
+        config["ENV_NAME"], reset_pool_size=config["RESET_POOL_SIZE"], **config["ENV_KWARGS"]
+    )
     config["NUM_ACTORS"] = env.num_agents * config["NUM_ENVS"]
 
     def benchmark(rng):
@@ -65,6 +67,7 @@ config = {
     "NUM_ENVS": 1000,
     "ACTIVATION": "relu",
     "ENV_KWARGS": {},
+    "RESET_POOL_SIZE": 64,  # 0 resets via env.reset on every auto-reset
     "ENV_NAME": ENV,
     "NUM_SEEDS": 1,
     "SEED": 0,
@@ -0,0 +1,86 @@
+"""
+Speed test of the PD Arena resource-regrowth kernel on its own, next to the
+full env step, so the cost of resource spawning can be tracked separately
+from movement and interaction.
+"""
+
+import time
+
+import jax
+
+import socialjax
+
+
+def make_regrowth_benchmark(env, config):
+    def benchmark(rng):
+        rng, _rng = jax.random.split(rng)
+        _, env_state = jax.vmap(env.reset)(jax.random.split(_rng, config["NUM_ENVS"]))
+
+        def regrow_step(rng, _unused):
+            # regrow on the reset grid every step, so the work per step stays
+            # constant instead of decaying as spawn cells fill up
+            rng, _rng = jax.random.split(rng)
+            keys = jax.random.split(_rng, (config["NUM_ENVS"], 2))
+            grid = jax.vmap(env.regrow_resources)(env_state.grid, keys[:, 0], keys[:, 1])
+            return rng, grid.sum()
+
+        _, grid_sums = jax.lax.scan(regrow_step, rng, None, config["NUM_STEPS"])
+        return grid_sums
+
+    return benchmark
+
+
+def make_step_benchmark(env, config):
+    def benchmark(rng):
+        rng, _rng = jax.random.split(rng)
+        obsv, env_state = jax.vmap(env.reset)(jax.random.split(_rng, config["NUM_ENVS"]))
+
+        def env_step(carry, _unused):
+            env_state, rng = carry
+            rng, _rng, _rng_step = jax.random.split(rng, 3)
+            actions = jax.random.randint(
+                _rng, (config["NUM_ENVS"], env.num_agents), 0, env.action_space().n
+            )
+            obsv, env_state, _, _, _ = jax.vmap(env.step)(
+                jax.random.split(_rng_step, config["NUM_ENVS"]), env_state, actions
+            )
+            # consume obs so the observation build is not dead-code eliminated
+            return (env_state, rng), obsv.sum()
+
+        _, obs_sums = jax.lax.scan(env_step, (env_state, rng), None, config["NUM_STEPS"])
+        return obs_sums
+
+    return benchmark
+
+
+def time_benchmark(benchmark_fn, rng):
+    benchmark_jit = jax.jit(benchmark_fn).lower(rng).compile()
+    before = time.perf_counter_ns()
+    jax.block_until_ready(benchmark_jit(rng))
+    after = time.perf_counter_ns()
+    return (after - before) / 1e9
+
+
+config = {
+    "NUM_STEPS": 1000,
+    "NUM_ENVS": 1000,
+    "ENV_KWARGS": {},
+    "ENV_NAME": "pd_arena",
+    "SEED": 0,
+}
+
+# num_envs = [1, 128, 1024, 4096]
+num_envs = [1, 128]
+env = socialjax.make(config["ENV_NAME"], **config["ENV_KWARGS"])
+for num in num_envs:
+    config["NUM_ENVS"] = num
+    rng = jax.random.PRNGKey(config["SEED"])
+    steps = config["NUM_STEPS"] * config["NUM_ENVS"]
+
+    regrow_time = time_benchmark(make_regrowth_benchmark(env, config), rng)
+    step_time = time_benchmark(make_step_benchmark(env, config), rng)
+    print(f"{config['ENV_NAME']} regrowth, Num Envs: {num}, Total Time (s): {regrow_time}")
+    print(f"{config['ENV_NAME']} regrowth, Num Envs: {num}, SPS: {steps / regrow_time}")
+    print(f"{config['ENV_NAME']} full step, Num Envs: {num}, Total Time (s): {step_time}")
+    print(f"{config['ENV_NAME']} full step, Num Envs: {num}, SPS: {steps / step_time}")
+    print(f"{config['ENV_NAME']}, Num Envs: {num}, regrowth share of step: {regrow_time / step_time:.2%}")
@@ -0,0 +1,154 @@
+"""Standalone checks for MultiAgentEnv.step auto-reset paths (no pytest).
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_auto_reset.py
+"""
+
+import jax
+import jax.numpy as jnp
+
+import socialjax
+
+INNER_STEPS = 3
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def tree_equal(a, b):
+    return all(
+        bool(jnp.array_equal(x, y))
+        for x, y in zip(jax.tree.leaves(a), jax.tree.leaves(b))
+    )
+
+
+def rollout(env, key, steps):
+    actions = jnp.zeros((env.num_agents,), dtype=jnp.int32)
+    _, state = env.reset(key)
+    out = []
+    for t in range(steps):
+        k = jax.random.fold_in(key, t)
+        obs_st, state_st, _, _, _ = env.step_env(jax.random.split(k)[0], state, actions)
+        obs, state, _, done, _ = env.step(k, state, actions)
+        out.append((k, obs_st, state_st, obs, state, bool(done["__all__"])))
+    return out
+
+
+def test_cond_reset_matches_select():
+    # The lax.cond path must return the step_env result while running and
+    # exactly `reset(key_reset)` on the terminal step, like the old select.
+    env = socialjax.make("coin_game", num_inner_steps=INNER_STEPS)
+    for k, obs_st, state_st, obs, state, done in rollout(
+        env, jax.random.PRNGKey(0), INNER_STEPS + 1
+    ):
+        if done:
+            obs_re, state_re = env.reset(jax.random.split(k)[1])
+            assert tree_equal(state, state_re) and tree_equal(obs, obs_re)
+        else:
+            assert tree_equal(state, state_st) and tree_equal(obs, obs_st)
+
+
+def test_pool_reset():
+    # Pooled auto-reset swaps in one of the precomputed reset states.
+    pool_size = 4
+    env = socialjax.make(
+        "coin_game", num_inner_steps=INNER_STEPS, reset_pool_size=pool_size
+    )
+    obs_pool, state_pool = env.reset_pool
+    assert jax.tree.leaves(state_pool)[0].shape[0] == pool_size
+    saw_done = False
+    for _, obs_st, state_st, obs, state, done in rollout(
+        env, jax.random.PRNGKey(1), 2 * INNER_STEPS + 1
+    ):
+        if done:
+            saw_done = True
+            hits = [
+                tree_equal(state, jax.tree.map(lambda x: x[i], state_pool))
+                and tree_equal(obs, obs_pool[i])
+                for i in range(pool_size)
+            ]
+            assert any(hits), "reset state must come from the pool"
+        else:
+            assert tree_equal(state, state_st) and tree_equal(obs, obs_st)
+    assert saw_done
+
+
+def test_pool_under_vmap():
+    env = socialjax.make("coin_game", num_inner_steps=INNER_STEPS, reset_pool_size=2)
+    num_envs = 3
+    keys = jax.random.split(jax.random.PRNGKey(2), num_envs)
+    _, state = jax.vmap(env.reset)(keys)
+    actions = jnp.zeros((num_envs, env.num_agents), dtype=jnp.int32)
+    step = jax.jit(jax.vmap(env.step))
+    for t in range(INNER_STEPS):
+        step_keys = jax.random.split(jax.random.fold_in(keys[0], t), num_envs)
+        _, state, _, done, _ = step(step_keys, state, actions)
+    assert bool(jnp.all(done["__all__"]))
+    assert bool(jnp.all(state.inner_t == 0))
+
+
+def count_primitive(jaxpr, name):
+    count = 0
+    for eqn in jaxpr.eqns:
+        count += eqn.primitive.name == name
+        for sub in jax.core.jaxprs_in_params(eqn.params):
+            count += count_primitive(sub, name)
+    return count
+
+
+def inner_rollover_state(env, key):
+    # step_env from a state on the last inner step of the first inner episode
+    actions = jnp.zeros((env.num_agents,), dtype=jnp.int32)
+    _, state = env.reset(key)
+    state = state.replace(inner_t=jnp.asarray(INNER_STEPS - 1, state.inner_t.dtype))
+    _, state, _, done, _ = env.step_env(key, state, actions)
+    return state, done["__all__"]
+
+
+def inner_rollover(env, key):
+    state, done = inner_rollover_state(env, key)
+    return state, bool(done)
+
+
+def test_inner_reset_is_cond_gated():
+    # the inner-episode reset in step_env only runs on the branch where the
+    # inner episode ended; under vmap the cond becomes a select, which must
+    # pick the same start state
+    env = socialjax.make("coin_game", num_inner_steps=INNER_STEPS, num_outer_steps=2, jit=False)
+    actions = jnp.zeros((env.num_agents,), dtype=jnp.int32)
+    _, state = env.reset(jax.random.PRNGKey(0))
+    jaxpr = jax.make_jaxpr(env.step_env)(jax.random.PRNGKey(0), state, actions)
+    assert count_primitive(jaxpr.jaxpr, "cond") == 1
+    key = jax.random.PRNGKey(3)
+    state, done = inner_rollover(env, key)
+    assert not done and int(state.inner_t) == 0 and int(state.outer_t) == 1
+    batched, _ = jax.vmap(lambda k: inner_rollover_state(env, k))(key[None])
+    assert tree_equal(state, jax.tree.map(lambda x: x[0], batched))
+
+
+def test_inner_reset_from_pool():
+    pool_size = 4
+    env = socialjax.make(
+        "coin_game", num_inner_steps=INNER_STEPS, num_outer_steps=2, reset_pool_size=pool_size
+    )
+    state_pool = env.reset_pool[1]
+    state, done = inner_rollover(env, jax.random.PRNGKey(4))
+    assert not done and int(state.outer_t) == 1
+    hits = [
+        tree_equal(state, jax.tree.map(lambda x: x[i], state_pool).replace(outer_t=state.outer_t))
+        for i in range(pool_size)
+    ]
+    assert any(hits), "inner reset state must come from the pool"
+
+
+if __name__ == "__main__":
+    run("cond-gated reset matches select semantics", test_cond_reset_matches_select)
+    run("pooled reset draws from pool", test_pool_reset)
+    run("pooled reset under vmap", test_pool_under_vmap)
+    run("inner-episode reset is cond-gated", test_inner_reset_is_cond_gated)
+    run("inner-episode reset draws from pool", test_inner_reset_from_pool)
+    print("ALL AUTO-RESET TESTS PASSED")
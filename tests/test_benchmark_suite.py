@@ -0,0 +1,45 @@
+"""Standalone checks for speed_test/benchmark_suite.py (no pytest).
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_benchmark_suite.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "speed_test"))
+
+from benchmark_suite import PHASES, benchmark_env, compare_to_baseline
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def test_benchmark_env_phases():
+    results = benchmark_env("coin_game", num_envs=2, num_agents=None, num_steps=3)
+    assert [r["phase"] for r in results] == PHASES, results
+    for r in results:
+        assert r["num_agents"] == 2 and r["num_envs"] == 2, r
+        assert r["compile_s"] > 0 and r["run_s"] > 0 and r["sps"] > 0, r
+
+
+def test_compare_to_baseline():
+    def result(phase, sps):
+        return {"env": "coin_game", "num_envs": 1, "num_agents": 2, "phase": phase, "sps": sps}
+
+    baseline = {"results": [result("reset", 100.0), result("step_env", 100.0)]}
+    results = [result("reset", 85.0), result("step_env", 70.0), result("get_obs", 1.0)]
+    regressions = compare_to_baseline(results, baseline, tolerance=0.2)
+    assert [r["phase"] for r in regressions] == ["step_env"], regressions
+    assert results[0]["sps_ratio"] == 0.85, results[0]
+    assert "baseline_sps" not in results[2]  # no baseline entry: not compared
+
+
+if __name__ == "__main__":
+    run("benchmark_env phases", test_benchmark_env_phases)
+    run("compare to baseline", test_compare_to_baseline)
+    print("ALL BENCHMARK SUITE TESTS PASSED")
@@ -0,0 +1,166 @@
+"""Standalone checks for the trainer compilation cache / export helpers (no pytest).
+
+An exported train function must be keyed by everything that changes the
+traced program, be built without host callbacks, and reproduce the jitted
+result after a reload.
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_compile_utils.py
+"""
+
+import importlib.util
+import os
+import tempfile
+import warnings
+
+import jax
+import jax.numpy as jnp
+import optax
+from flax.training.train_state import TrainState
+
+from algorithms.utils.metrics_utils import host_callbacks
+from algorithms.utils.compile_utils import (
+    code_hash,
+    config_hash,
+    export_key,
+    exported_train,
+    log_metrics,
+    run_train,
+)
+
+CONFIG = {"ENV_NAME": "coin_game", "LR": 5e-4, "NUM_ENVS": 4, "SEED": 0}
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def make_toy_train(config):
+    """A make_train-shaped builder: a TrainState, stacked metrics, a host callback unless turned off."""
+
+    def train(rng):
+        params = {"w": jax.random.normal(rng, (3,))}
+        state = TrainState.create(apply_fn=None, params=params, tx=optax.sgd(config["LR"]))
+
+        def update(state, _unused):
+            grads = jax.grad(lambda p: jnp.sum(p["w"] ** 2))(state.params)
+            state = state.apply_gradients(grads=grads)
+            metric = {"loss": jnp.sum(state.params["w"] ** 2)}
+            if host_callbacks(config):
+                jax.debug.callback(lambda m: None, metric)
+            return state, metric
+
+        state, metrics = jax.lax.scan(update, state, None, 5)
+        return {"runner_state": (state, rng), "metrics": metrics}
+
+    return train
+
+
+def build_toy_train(config):
+    return jax.vmap(make_toy_train(config))
+
+
+def test_config_hash():
+    assert config_hash(CONFIG) == config_hash({**CONFIG, "SEED": 42, "WANDB_MODE": "online"})
+    assert config_hash(CONFIG) != config_hash({**CONFIG, "LR": 1e-3})
+
+
+def test_export_key():
+    rngs = jax.random.split(jax.random.PRNGKey(0), 2)
+    key = export_key("coin_game", "IPPO", CONFIG, (rngs,))
+    assert key.startswith("IPPO_coin_game_")
+    assert key == export_key("coin_game", "IPPO", {**CONFIG, "SEED": 7}, (rngs,))
+    assert key != export_key("coin_game", "IPPO", CONFIG, (jax.random.split(rngs[0], 3),))
+
+
+def test_export_key_covers_source():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "toy_trainer.py")
+
+        def load(source):
+            with open(path, "w") as f:
+                f.write(source)
+            spec = importlib.util.spec_from_file_location("toy_trainer", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            return jax.vmap(module.train)
+
+        rngs = jax.random.split(jax.random.PRNGKey(0), 2)
+        before = load("def train(rng):\n    return rng\n")
+        key = export_key("coin_game", "IPPO", CONFIG, (rngs,), train_fn=before)
+        assert key == export_key("coin_game", "IPPO", CONFIG, (rngs,), train_fn=before)
+        # the trainer module is found through vmap and rehashed once edited
+        after = load("def train(rng):\n    return rng + 1\n")
+        os.utime(path, ns=(0, 0))  # a new mtime even on coarse-grained filesystems
+        assert code_hash(before) != code_hash(None)
+        assert key != export_key("coin_game", "IPPO", CONFIG, (rngs,), train_fn=after)
+
+
+def test_export_roundtrip():
+    rngs = jax.random.split(jax.random.PRNGKey(0), 2)
+    expected = jax.jit(build_toy_train(CONFIG))(rngs)
+    with tempfile.TemporaryDirectory() as export_dir:
+        config = {**CONFIG, "EXPORT_DIR": export_dir}
+        outputs = lambda out: {"params": out["runner_state"][0].params, "metrics": out["metrics"]}
+        # a host callback cannot be exported
+        try:
+            exported_train(build_toy_train(config), (rngs,), algo="TOY", config=config,
+                           export_dir=export_dir, outputs=outputs)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("exporting a host callback must raise ValueError")
+        train_fn = build_toy_train({**config, "HOST_CALLBACKS": False})
+        first = exported_train(train_fn, (rngs,), algo="TOY", config=config,
+                               export_dir=export_dir, outputs=outputs)(rngs)
+        assert len(os.listdir(export_dir)) == 1
+        reloaded = exported_train(train_fn, (rngs,), algo="TOY", config=config,
+                                  export_dir=export_dir, outputs=outputs)(rngs)
+        for out in (first, reloaded):
+            assert jnp.allclose(out["params"]["w"], expected["runner_state"][0].params["w"])
+            assert jnp.allclose(out["metrics"]["loss"], expected["metrics"]["loss"])
+
+        # run_train returns the same params/metrics layout on both paths
+        logged = []
+        exported = run_train(build_toy_train, rngs, algo="TOY", config=config,
+                             train_states=lambda out: out["runner_state"][0], log_fn=logged.append)
+        jitted = run_train(build_toy_train, rngs, algo="TOY", config=CONFIG,
+                           train_states=lambda out: out["runner_state"][0])
+        assert jax.tree.structure(exported) == jax.tree.structure(jitted)
+        assert jnp.allclose(exported["params"]["w"], jitted["params"]["w"])
+        assert len(logged) == 2 * 5
+
+        # sweep trials (export=False) never export, even with an export dir
+        run_train(build_toy_train, rngs, algo="TOY", config={**config, "LR": 1e-3},
+                  train_states=lambda out: out["runner_state"][0], export=False)
+        assert len(os.listdir(export_dir)) == 1
+
+
+def test_reset_pool_warning():
+    rngs = jax.random.split(jax.random.PRNGKey(0), 2)
+    for pool_size, expect_warning in ((0, False), (64, True)):
+        config = {**CONFIG, "ENV_KWARGS": {"reset_pool_size": pool_size}}
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            run_train(build_toy_train, rngs, algo="TOY", config=config, train_states=lambda out: out["runner_state"][0])
+        assert any("reset_pool_size" in str(w.message) for w in caught) == expect_warning
+
+
+def test_log_metrics():
+    metrics = {"loss": jnp.arange(6.0).reshape(2, 3)}
+    logged = []
+    log_metrics(metrics, logged.append)
+    assert [float(m["loss"]) for m in logged] == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+if __name__ == "__main__":
+    run("config hash ignores runtime keys", test_config_hash)
+    run("export key covers config and shapes", test_export_key)
+    run("export key covers the trainer source", test_export_key_covers_source)
+    run("exported train round-trips", test_export_roundtrip)
+    run("training on a reset pool warns", test_reset_pool_warning)
+    run("stacked metrics are logged per update", test_log_metrics)
+    print("ALL COMPILE UTILS TESTS PASSED")
@@ -0,0 +1,110 @@
+"""Standalone checks for CoopMining's batched mining (no pytest).
+
+``batched_mining`` must reproduce ``sequential_mining`` (the per-agent scan)
+bit for bit.
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_coop_mining.py
+"""
+
+import jax
+import jax.numpy as jnp
+
+from socialjax.environments.coop_mining.coop_mining import Actions, CoopMining, Items
+
+CONFIGS = [
+    dict(num_agents=4),
+    dict(num_agents=16, min_gold_miners=3),
+    dict(num_agents=16, min_gold_miners=1, max_miners=2),
+    dict(num_agents=12, min_gold_miners=2, max_miners=2, mining_range=5),
+]
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def random_mining_state(env, key):
+    """A state crowded with ore, partly mined gold and miners about to mine."""
+    k_reset, k_item, k_miner, k_cd, k_loc, k_mine = jax.random.split(key, 6)
+    _, state = env.reset(k_reset)
+    ore = jnp.array([Items.ore_wait, Items.iron_ore, Items.gold_ore, Items.gold_partial])
+    draw = ore[jax.random.randint(k_item, state.grid.shape, 0, len(ore))]
+    grid = jnp.where(state.grid == Items.wall, state.grid, draw)
+
+    # gold_partial cells carry fewer than min_gold_miners registered miners
+    # and a running window, as after earlier steps
+    num_prior = jax.random.randint(k_miner, grid.shape, 1, env.min_gold_miners)
+    slots = jnp.arange(env.max_miners)[None, None, :]
+    first = jax.random.randint(k_miner, grid.shape, 0, env.num_agents)
+    prior = (first[..., None] + slots) % env.num_agents  # distinct per cell
+    partial = (grid == Items.gold_partial)[..., None]
+    ore_miners = jnp.where(partial & (slots < num_prior[..., None]), prior, -1)
+    cd = jnp.where(partial[..., 0], jax.random.randint(k_cd, grid.shape, 1, env.partial_window + 1), 0)
+    if env.min_gold_miners == 1:
+        grid = jnp.where(grid == Items.gold_partial, Items.gold_ore, grid)
+        ore_miners = -1 * jnp.ones_like(ore_miners)
+        cd = jnp.zeros_like(cd)
+
+    free = jnp.argwhere(grid != Items.wall)
+    cells = free[jax.random.permutation(k_loc, len(free))[:env.num_agents]]
+    orient = jax.random.randint(k_loc, (env.num_agents, 1), 0, 4)
+    locs = jnp.concatenate([cells, orient], -1).astype(state.agent_locs.dtype)
+    mine_flags = jax.random.uniform(k_mine, (env.num_agents,)) < 0.8
+    state = state.replace(grid=grid, ore_miners=ore_miners.astype(state.ore_miners.dtype),
+                          partial_ore_countdown=cd.astype(state.partial_ore_countdown.dtype))
+    return locs, mine_flags, state
+
+
+def assert_same(a, b, what):
+    for x, y in zip(jax.tree_util.tree_leaves(a), jax.tree_util.tree_leaves(b)):
+        assert x.shape == y.shape and x.dtype == y.dtype, what
+        assert bool(jnp.array_equal(x, y)), what
+
+
+def test_batched_matches_sequential():
+    for config in CONFIGS:
+        env = CoopMining(**config)
+        batched = jax.jit(env.batched_mining)
+        sequential = jax.jit(env.sequential_mining)
+        for seed in range(20):
+            args = random_mining_state(env, jax.random.PRNGKey(seed))
+            assert_same(batched(*args), sequential(*args), (config, seed))
+
+
+def test_rollout_matches_sequential():
+    # whole steps, with a high regrowth rate so ore keeps reappearing
+    env = CoopMining(num_agents=12, regrowth_prob_iron=0.05, regrowth_prob_gold=0.05, jit=False)
+
+    def rollout(mining, key, num_steps=150):
+        env.batched_mining = mining
+        _, state = env.reset(key)
+
+        def step(carry, _unused):
+            state, key = carry
+            key, k_act, k_mine, k_step = jax.random.split(key, 4)
+            actions = jax.random.randint(k_act, (env.num_agents,), 0, len(Actions))
+            actions = jnp.where(jax.random.uniform(k_mine, (env.num_agents,)) < 0.5, Actions.mine, actions)
+            _, state, rewards, _, _ = env.step_env(k_step, state, actions)
+            return (state, key), (state, rewards)
+
+        return jax.lax.scan(step, (state, key), None, num_steps)[1]
+
+    batched = env.batched_mining
+    try:
+        for seed in range(2):
+            key = jax.random.PRNGKey(seed)
+            new = jax.jit(lambda k: rollout(batched, k))(key)
+            ref = jax.jit(lambda k: rollout(env.sequential_mining, k))(key)
+            assert_same(new, ref, seed)
+    finally:
+        del env.batched_mining
+
+
+if __name__ == "__main__":
+    run("batched mining matches sequential on random states", test_batched_matches_sequential)
+    run("rollouts match sequential mining", test_rollout_matches_sequential)
+    print("ALL COOP MINING TESTS PASSED")
@@ -0,0 +1,58 @@
+"""Standalone checks for the scan-compiled evaluation rollout (no pytest).
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_eval_rollout.py
+"""
+
+import jax
+
+import socialjax
+from algorithms.utils.eval_utils import make_eval_rollout
+
+EPISODE_LEN = 10
+NUM_EPISODES = 8
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def make_env_and_policy():
+    env = socialjax.make("coin_game", num_inner_steps=EPISODE_LEN)
+
+    def policy_fn(obs, rng):
+        return jax.random.randint(rng, (env.num_agents,), 0, env.action_space().n)
+
+    return env, policy_fn
+
+
+def test_shapes():
+    env, policy_fn = make_env_and_policy()
+    states, returns = make_eval_rollout(env, policy_fn, EPISODE_LEN, NUM_EPISODES)(
+        jax.random.PRNGKey(0)
+    )
+    assert returns.shape == (NUM_EPISODES, env.num_agents), returns.shape
+    assert states.grid.shape[:2] == (EPISODE_LEN + 1, NUM_EPISODES), states.grid.shape
+
+    states, _ = make_eval_rollout(
+        env, policy_fn, EPISODE_LEN, NUM_EPISODES, num_recorded_episodes=1
+    )(jax.random.PRNGKey(0))
+    assert states.grid.shape[:2] == (EPISODE_LEN + 1, 1), states.grid.shape
+
+
+def test_returns_stop_at_done():
+    # steps after the first episode ends (and auto-resets) must not count
+    env, policy_fn = make_env_and_policy()
+    rng = jax.random.PRNGKey(1)
+    _, one_episode = make_eval_rollout(env, policy_fn, EPISODE_LEN, NUM_EPISODES)(rng)
+    _, longer = make_eval_rollout(env, policy_fn, 3 * EPISODE_LEN, NUM_EPISODES)(rng)
+    assert bool((one_episode == longer).all()), (one_episode, longer)
+
+
+if __name__ == "__main__":
+    run("rollout shapes", test_shapes)
+    run("returns stop at done", test_returns_stop_at_done)
+    print("ALL EVAL ROLLOUT TESTS PASSED")
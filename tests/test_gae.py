@@ -0,0 +1,90 @@
+"""Standalone checks for the scan and associative-scan GAE (no pytest).
+
+Both implementations must match a plain Python loop over the rollout, and
+the associative one must not lower to a sequential loop over time.
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_gae.py
+"""
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+from algorithms.utils.gae_utils import calculate_gae, gae_associative, gae_scan
+
+GAMMA, GAE_LAMBDA = 0.99, 0.95
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def rollout(num_steps, shape, done_prob=0.02, seed=0):
+    k_done, k_value, k_reward, k_last = jax.random.split(jax.random.PRNGKey(seed), 4)
+    done = (jax.random.uniform(k_done, (num_steps, *shape)) < done_prob).astype(jnp.float32)
+    value = jax.random.normal(k_value, (num_steps, *shape))
+    reward = jax.random.normal(k_reward, (num_steps, *shape))
+    last_val = jax.random.normal(k_last, shape)
+    return done, value, reward, last_val
+
+
+def reference_gae(done, value, reward, last_val):
+    done, value, reward = (np.asarray(x, np.float64) for x in (done, value, reward))
+    gae, next_value = np.zeros_like(value[0]), np.asarray(last_val, np.float64)
+    advantages = np.zeros_like(value)
+    for t in reversed(range(value.shape[0])):
+        delta = reward[t] + GAMMA * next_value * (1 - done[t]) - value[t]
+        gae = delta + GAMMA * GAE_LAMBDA * (1 - done[t]) * gae
+        advantages[t], next_value = gae, value[t]
+    return advantages
+
+
+def test_matches_reference():
+    for num_steps, shape in ((1, (3,)), (7, (3,)), (1000, (16,)), (64, (4, 5))):
+        batch = rollout(num_steps, shape)
+        expected = reference_gae(*batch)
+        for gae_fn in (gae_scan, gae_associative):
+            out = gae_fn(*batch, GAMMA, GAE_LAMBDA)
+            assert out.shape == expected.shape
+            np.testing.assert_allclose(out, expected, rtol=1e-4, atol=1e-4, err_msg=gae_fn.__name__)
+
+
+def test_associative_matches_scan():
+    batch = rollout(1000, (256,), done_prob=0.001, seed=1)
+    scan = gae_scan(*batch, GAMMA, GAE_LAMBDA)
+    assoc = jax.jit(gae_associative, static_argnums=(4, 5))(*batch, GAMMA, GAE_LAMBDA)
+    np.testing.assert_allclose(assoc, scan, rtol=1e-5, atol=1e-5)
+    # per-agent GAE as IPPO computes it without parameter sharing
+    batch = jax.tree.map(lambda x: jnp.stack([x, 2 * x]), rollout(50, (8,), seed=2))
+    vmapped = [jax.vmap(lambda *b: calculate_gae(*b, GAMMA, GAE_LAMBDA, m))(*batch)
+               for m in ("scan", "associative")]
+    np.testing.assert_allclose(vmapped[1], vmapped[0], rtol=1e-5, atol=1e-5)
+
+
+def test_associative_has_no_time_loop():
+    batch = rollout(1000, (4,))
+    for method, loops in (("scan", 1), ("associative", 0)):
+        jaxpr = jax.make_jaxpr(lambda *b: calculate_gae(*b, GAMMA, GAE_LAMBDA, method))(*batch)
+        found = sum(eqn.primitive.name in ("scan", "while") for eqn in jaxpr.jaxpr.eqns)
+        assert found == loops, (method, found)
+
+
+def test_unknown_method():
+    try:
+        calculate_gae(*rollout(4, (2,)), GAMMA, GAE_LAMBDA, "parallel")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    run("scan and associative GAE match a Python loop", test_matches_reference)
+    run("associative GAE matches the scan", test_associative_matches_scan)
+    run("associative GAE has no loop over time", test_associative_has_no_time_loop)
+    run("unknown GAE_METHOD is rejected", test_unknown_method)
+    print("ALL GAE TESTS PASSED")
@@ -0,0 +1,89 @@
+"""Standalone checks for socialjax.environments.interaction (no pytest).
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_interaction.py
+"""
+
+import jax
+import jax.numpy as jnp
+import numpy as onp
+
+import socialjax
+from socialjax.environments.interaction import resolve_interaction_conflicts
+
+NUM_DRAWS = 6000
+# grid ids of agents 0..7; items below FIRST_AGENT are not agents
+FIRST_AGENT = 10
+AGENT_IDS = jnp.arange(8) + FIRST_AGENT
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+resolve = jax.jit(resolve_interaction_conflicts)
+
+
+def draws(targets):
+    targets = jnp.asarray(targets, dtype=jnp.int16)
+    keys = jax.random.split(jax.random.PRNGKey(0), NUM_DRAWS)
+    return onp.asarray(jax.vmap(resolve, in_axes=(0, None, None))(keys, targets, AGENT_IDS))
+
+
+def test_one_winner_per_target():
+    # agents 0,2,5 zap agent 3; agents 1,6 zap agent 4; agent 7 zaps agent 0
+    # alone; agent 3 caught a non-agent item; agent 4 zapped nothing
+    targets = onp.array([13, 14, 13, 2, 0, 13, 14, 10])
+    out = draws(targets)
+    assert out.dtype == onp.int16
+    for target in (13, 14, 10):
+        contenders = targets == target
+        assert ((out[:, contenders] == target).sum(-1) == 1).all(), target
+        assert ((out[:, contenders] == target) | (out[:, contenders] == 0)).all()
+    # unconflicted and non-agent entries are untouched
+    assert (out[:, [3, 4, 7]] == targets[[3, 4, 7]]).all()
+
+
+def test_uniform_and_independent_winners():
+    # two groups of contenders: agents 0,1 on agent 6 and agents 2,3,4 on
+    # agent 7; every (winner, winner) pair has probability 1/6, as with the
+    # old one-conflict-at-a-time resolution
+    targets = onp.array([16, 16, 17, 17, 17, 0, 0, 0])
+    out = draws(targets)
+    first = onp.argmax(out[:, :2] == 16, -1)
+    second = onp.argmax(out[:, 2:5] == 17, -1)
+    joint = onp.zeros((2, 3))
+    onp.add.at(joint, (first, second), 1)
+    freq = joint / NUM_DRAWS
+    se = onp.sqrt((1 / 6) * (5 / 6) / NUM_DRAWS)
+    worst = onp.max(onp.abs(freq - 1 / 6)) / se
+    assert worst < 5, f"winner pairs are not uniform (z={worst:.1f}): {freq}"
+
+
+def test_same_key_same_result():
+    targets = jnp.array([13, 13, 13, 13, 0, 0, 0, 0], dtype=jnp.int16)
+    key = jax.random.PRNGKey(3)
+    assert jnp.array_equal(resolve(key, targets, AGENT_IDS), resolve(key, targets, AGENT_IDS))
+
+
+def test_env_steps():
+    # the resolver runs on every step of these envs
+    for env_id in ("pd_arena", "territory_open"):
+        env = socialjax.make(env_id)
+        _, state = env.reset(jax.random.PRNGKey(0))
+        for t in range(5):
+            k_act, k_step = jax.random.split(jax.random.PRNGKey(t))
+            actions = jax.random.randint(k_act, (env.num_agents,), 0, env.action_space().n)
+            _, state, _, _, _ = env.step(k_step, state, actions)
+        assert state.freeze.shape == (env.num_agents, env.num_agents)
+
+
+if __name__ == "__main__":
+    run("one winner per targeted agent", test_one_winner_per_target)
+    run("winners uniform and independent across targets", test_uniform_and_independent_winners)
+    run("same key, same result", test_same_key_same_result)
+    run("pd_arena and territory step", test_env_steps)
+    print("ALL INTERACTION TESTS PASSED")
@@ -0,0 +1,127 @@
+"""Standalone checks for Level-Based Foraging's food loading (no pytest).
+
+A food is collected when the summed levels of the agents next to it (4-
+neighbourhood; LBF agents have no orientation) that LOAD reach its level.
+Each loader then gets agent_level * food_level, divided by the summed level
+when normalize_reward is on; loaders of a food that is not collected pay
+load_penalty.
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_lb_foraging.py
+"""
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+from socialjax.environments.lb_foraging.lb_foraging import Actions, LevelBasedForaging, State
+
+FOOD = (3, 3)  # an empty cell inside the walls of ASCII_MAP_LBF
+NORTH, SOUTH, WEST, EAST = (2, 3), (4, 3), (3, 2), (3, 4)
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def make_state(env, positions, levels, foods):
+    """A state with agents at `positions` and (position, level) `foods`; unused food slots are empty."""
+    foods = list(foods) + [((0, 0), 0)] * (env.num_food - len(foods))
+    return State(
+        agent_positions=jnp.array(positions, dtype=jnp.int32),
+        agent_levels=jnp.array(levels, dtype=jnp.int32),
+        food_positions=jnp.array([pos for pos, _ in foods], dtype=jnp.int32),
+        food_levels=jnp.array([level for _, level in foods], dtype=jnp.int32),
+        inner_t=jnp.zeros((), env._counter_dtype),
+        outer_t=jnp.zeros((), env._counter_dtype),
+    )
+
+
+def load(env, state, actions):
+    actions = jnp.array(actions, dtype=jnp.int32)
+    return env._process_load_actions(state, state.agent_positions, actions, jax.random.PRNGKey(0))
+
+
+def test_cooperative_load():
+    env = LevelBasedForaging(num_agents=3, num_food=2, jit=False)
+    # levels 1 + 2 reach the food's 3; the third loader is two cells away
+    state = make_state(env, [NORTH, EAST, (3, 1)], [1, 2, 2], [(FOOD, 3)])
+    rewards, food_levels = load(env, state, [Actions.LOAD] * 3)
+    np.testing.assert_allclose(rewards, [1.0, 2.0, 0.0], rtol=1e-6)  # level * 3 / 3
+    np.testing.assert_array_equal(food_levels, [0, 0])
+
+
+def test_failed_load():
+    env = LevelBasedForaging(num_agents=3, num_food=2, jit=False, load_penalty=0.25)
+    # the level 2 neighbour does not LOAD, so only level 1 counts against 3
+    state = make_state(env, [NORTH, EAST, SOUTH], [1, 2, 1], [(FOOD, 3)])
+    rewards, food_levels = load(env, state, [Actions.LOAD, Actions.NONE, Actions.NONE])
+    np.testing.assert_allclose(rewards, [-0.25, 0.0, 0.0])
+    np.testing.assert_array_equal(food_levels, [3, 0])
+
+
+def test_adjacency():
+    env = LevelBasedForaging(num_agents=1, num_food=1, jit=False)
+    # any of the four sides works, whatever the agent's last move
+    for side in (NORTH, SOUTH, WEST, EAST):
+        rewards, food_levels = load(env, make_state(env, [side], [2], [(FOOD, 1)]), [Actions.LOAD])
+        np.testing.assert_allclose(rewards, [1.0])
+        np.testing.assert_array_equal(food_levels, [0])
+    # diagonal and two-away cells are not adjacent: no reward, no penalty
+    for cell in [(2, 2), (4, 4), (1, 3), (3, 5)]:
+        rewards, food_levels = load(env, make_state(env, [cell], [2], [(FOOD, 1)]), [Actions.LOAD])
+        np.testing.assert_allclose(rewards, [0.0])
+        np.testing.assert_array_equal(food_levels, [1])
+    # an adjacent agent that does not LOAD collects nothing
+    rewards, food_levels = load(env, make_state(env, [NORTH], [2], [(FOOD, 1)]), [Actions.NONE])
+    np.testing.assert_allclose(rewards, [0.0])
+    np.testing.assert_array_equal(food_levels, [1])
+
+
+def test_agent_between_two_foods():
+    # each food is resolved on its own, so one loader can collect both
+    env = LevelBasedForaging(num_agents=2, num_food=2, jit=False, load_penalty=0.5)
+    state = make_state(env, [(3, 4), (1, 1)], [2, 1], [(FOOD, 1), ((3, 5), 3)])
+    rewards, food_levels = load(env, state, [Actions.LOAD, Actions.LOAD])
+    # food 0: 2 * 1 / 2; food 1 needs level 3: penalty
+    np.testing.assert_allclose(rewards, [1.0 - 0.5, 0.0])
+    np.testing.assert_array_equal(food_levels, [0, 3])
+
+
+def test_step_removes_food_and_splits_reward():
+    env = LevelBasedForaging(num_agents=2, num_food=2, normalize_reward=False, jit=False)
+    state = make_state(env, [WEST, SOUTH], [1, 2], [(FOOD, 2), ((1, 6), 1)])
+    # food blocks movement until it is collected
+    _, blocked, _, _, _ = env.step_env(jax.random.PRNGKey(0), state, jnp.array([Actions.EAST, Actions.NONE]))
+    np.testing.assert_array_equal(blocked.agent_positions[0], WEST)
+
+    before = state
+    obs, state, rewards, dones, _ = env.step_env(jax.random.PRNGKey(1), state, jnp.array([Actions.LOAD] * 2))
+    np.testing.assert_allclose(rewards, [2.0, 4.0])  # agent_level * food_level
+    np.testing.assert_array_equal(state.food_levels, [0, 1])
+    assert not bool(dones["__all__"])
+    # LOAD does not move, so the food layer only loses the collected food
+    food_layer = lambda obs: np.asarray(obs[..., 1], dtype=np.int32)
+    assert food_layer(env._get_obs(before)).max() == 2 and food_layer(obs).max() == 1
+    # and its cell is free again
+    _, moved, _, _, _ = env.step_env(jax.random.PRNGKey(2), state, jnp.array([Actions.EAST, Actions.NONE]))
+    np.testing.assert_array_equal(moved.agent_positions[0], FOOD)
+
+    # collecting the last food ends the episode
+    last = state.replace(agent_positions=jnp.array([(1, 5), (2, 6)], dtype=jnp.int32))
+    _, last, rewards, dones, _ = env.step_env(jax.random.PRNGKey(3), last, jnp.array([Actions.LOAD] * 2))
+    np.testing.assert_allclose(rewards, [1.0, 2.0])
+    np.testing.assert_array_equal(last.food_levels, [0, 0])
+    assert bool(dones["__all__"])
+
+
+if __name__ == "__main__":
+    run("summed levels collect a food together", test_cooperative_load)
+    run("too low a level is penalised", test_failed_load)
+    run("only LOADing 4-neighbours take part", test_adjacency)
+    run("one loader next to two foods", test_agent_between_two_foods)
+    run("step removes food and splits the reward", test_step_removes_food_and_splits_reward)
+    print("ALL LB FORAGING TESTS PASSED")
@@ -13,9 +13,13 @@ import numpy as onp
 from socialjax.environments.movement import (
     positions_unique,
     resolve_movement,
+    resolve_movement_dense,
+    resolve_movement_sorted,
     resolve_respawn,
 )
 
+RESOLVERS = [resolve_movement_dense, resolve_movement_sorted]
+
 
 def locs(*rows):
     return jnp.array(rows, dtype=jnp.int16)
@@ -26,14 +30,24 @@ def run(name, fn):
     print(f"ok: {name}")
 
 
-def test_head_on_same_target():
+def for_each_resolver(check):
+    """Turn ``check(resolve)`` into a test run against every resolver."""
+    def test():
+        for resolve in RESOLVERS:
+            check(jax.jit(resolve))
+    test.__name__ = check.__name__
+    return test
+
+
+@for_each_resolver
+def test_head_on_same_target(resolve):
     # Two movers contest (0,1); exactly one advances, and over many keys the
     # win rate is close to 50/50 (no index bias).
     old = locs([0, 0, 0], [0, 2, 0])
     prop = locs([0, 1, 0], [0, 1, 0])
     wins0 = 0
     trials = 1000
-    resolved = jax.jit(resolve_movement)
+    resolved = jax.jit(resolve)
     for i in range(trials):
         out = resolved(jax.random.PRNGKey(i), old, prop)
         a0_won = bool(jnp.all(out[0, :2] == prop[0, :2]))
@@ -45,58 +59,63 @@ def test_head_on_same_target():
     assert 0.4 <= rate <= 0.6, f"agent-0 win rate {rate} outside [0.4, 0.6]"
 
 
-def test_mover_vs_stayer_and_rotator():
+@for_each_resolver
+def test_mover_vs_stayer_and_rotator(resolve):
     # Agent 1 stays put; agent 0 tries to enter its cell -> 0 reverts.
     old = locs([0, 0, 0], [0, 1, 0])
     prop = locs([0, 1, 0], [0, 1, 0])
-    out = resolve_movement(jax.random.PRNGKey(0), old, prop)
+    out = resolve(jax.random.PRNGKey(0), old, prop)
     assert jnp.array_equal(out, old)
 
     # Agent 1 only rotates (rc unchanged, dir changes): keeps its cell AND
     # its new heading; the mover targeting it reverts.
     prop = locs([0, 1, 0], [0, 1, 3])
-    out = resolve_movement(jax.random.PRNGKey(0), old, prop)
+    out = resolve(jax.random.PRNGKey(0), old, prop)
     assert jnp.array_equal(out[0], old[0])
     assert jnp.array_equal(out[1], prop[1])
 
 
-def test_swap_blocked():
+@for_each_resolver
+def test_swap_blocked(resolve):
     old = locs([0, 0, 0], [0, 1, 2])
     prop = locs([0, 1, 0], [0, 0, 2])
     for i in range(20):
-        out = resolve_movement(jax.random.PRNGKey(i), old, prop)
+        out = resolve(jax.random.PRNGKey(i), old, prop)
         assert jnp.array_equal(out, old), "swap must revert both agents"
 
 
-def test_train_allowed():
+@for_each_resolver
+def test_train_allowed(resolve):
     # A vacates (0,0) -> (0,1); B follows into (0,0). Both succeed.
     old = locs([0, 0, 0], [1, 0, 0])
     prop = locs([0, 1, 0], [0, 0, 0])
     for i in range(20):
-        out = resolve_movement(jax.random.PRNGKey(i), old, prop)
+        out = resolve(jax.random.PRNGKey(i), old, prop)
         assert jnp.array_equal(out, prop)
         assert bool(positions_unique(out))
 
 
-def test_cascade_from_stayer():
+@for_each_resolver
+def test_cascade_from_stayer(resolve):
     # N stays on (1,2); A and B both try to enter it -> both revert.
     # C had targeted B's old cell, D had targeted C's old cell -> cascade.
     old = locs([0, 2, 0], [1, 1, 0], [1, 2, 0], [2, 1, 0], [3, 1, 0])
     #          A            B          N (stays)   C          D
     prop = locs([1, 2, 0], [1, 2, 0], [1, 2, 0], [1, 1, 0], [2, 1, 0])
     for i in range(20):
-        out = resolve_movement(jax.random.PRNGKey(i), old, prop)
+        out = resolve(jax.random.PRNGKey(i), old, prop)
         assert jnp.array_equal(out, old), "whole chain must revert"
 
 
-def test_cascade_from_random_loser():
+@for_each_resolver
+def test_cascade_from_random_loser(resolve):
     # A (0,2)->(1,2) and B (1,1)->(1,2) contest; the loser reverts, and if B
     # loses, C (2,1)->(1,1) and D (3,1)->(2,1) must cascade-revert behind it.
     old = locs([0, 2, 0], [1, 1, 0], [2, 1, 0], [3, 1, 0])
     prop = locs([1, 2, 0], [1, 2, 0], [1, 1, 0], [2, 1, 0])
     saw_b_lose = saw_b_win = False
     for i in range(200):
-        out = resolve_movement(jax.random.PRNGKey(i), old, prop)
+        out = resolve(jax.random.PRNGKey(i), old, prop)
         assert bool(positions_unique(out))
         b_won = bool(jnp.all(out[1, :2] == prop[1, :2]))
         if b_won:
@@ -110,28 +129,31 @@ def test_cascade_from_random_loser():
     assert saw_b_win and saw_b_lose, "both outcomes should occur across keys"
 
 
-def test_rotation_cycle_allowed():
+@for_each_resolver
+def test_rotation_cycle_allowed(resolve):
     # 3-cycle A->B->C->A: pairwise distinct targets, no 2-swap -> all move.
     old = locs([0, 0, 0], [0, 1, 0], [1, 1, 0])
     prop = locs([0, 1, 0], [1, 1, 0], [0, 0, 0])
     for i in range(20):
-        out = resolve_movement(jax.random.PRNGKey(i), old, prop)
+        out = resolve(jax.random.PRNGKey(i), old, prop)
         assert jnp.array_equal(out, prop)
 
 
-def test_swap_plus_contest():
+@for_each_resolver
+def test_swap_plus_contest(resolve):
     # A<->B swap while C also targets A's proposed cell. Swap kills A and B;
     # B reverts onto (0,1), so C's contest is now against a stayer -> C
     # reverts too. No pass-through survivor, uniqueness holds.
     old = locs([0, 0, 0], [0, 1, 0], [1, 1, 0])
     prop = locs([0, 1, 0], [0, 0, 0], [0, 1, 0])
     for i in range(20):
-        out = resolve_movement(jax.random.PRNGKey(i), old, prop)
+        out = resolve(jax.random.PRNGKey(i), old, prop)
         assert jnp.array_equal(out, old)
         assert bool(positions_unique(out))
 
 
-def test_property_random():
+@for_each_resolver
+def test_property_random(resolve):
     # Random boards: uniqueness, per-row ∈ {old, proposed}, non-movers keep
     # their proposal (rotation preserved), and no surviving swap pair.
     board = 10
@@ -155,7 +177,7 @@ def test_property_random():
                 dirs,
             )
             prop = jnp.concatenate([new_rc, new_dirs], -1)
-            out = resolve_movement(k_res, old, prop)
+            out = resolve(k_res, old, prop)
             return old, prop, out
 
         keys = jax.random.split(jax.random.PRNGKey(1234 + n), trials)
@@ -179,6 +201,33 @@ def test_property_random():
         assert not bool(jnp.any(swap)), "a swap survived resolution"
 
 
+def random_moves(key, n, board):
+    k_pos, k_act, k_dir = jax.random.split(key, 3)
+    cells = jax.random.permutation(k_pos, board * board)[:n]
+    rc = jnp.stack([cells // board, cells % board], -1).astype(jnp.int16)
+    dirs = jax.random.randint(k_dir, (n, 1), 0, 4, dtype=jnp.int16)
+    deltas = jnp.array([[0, 0], [1, 0], [-1, 0], [0, 1], [0, -1]], dtype=jnp.int16)
+    act = jax.random.randint(k_act, (n,), 0, 5)
+    new_rc = jnp.clip(rc + deltas[act], 0, board - 1)
+    return jnp.concatenate([rc, dirs], -1), jnp.concatenate([new_rc, dirs], -1)
+
+
+def test_resolvers_agree():
+    # Both resolvers run the same revert iteration with the same
+    # permutation, so they must agree exactly, on both sides of the
+    # dispatch threshold of resolve_movement.
+    board = 24
+    for n in (3, 9, 40, 100):
+        keys = jax.random.split(jax.random.PRNGKey(n), (200, 2))
+        old, prop = jax.vmap(random_moves, in_axes=(0, None, None))(keys[:, 0], n, board)
+        dense = jax.jit(jax.vmap(resolve_movement_dense))(keys[:, 1], old, prop)
+        sorted_ = jax.jit(jax.vmap(resolve_movement_sorted))(keys[:, 1], old, prop)
+        dispatched = jax.jit(jax.vmap(resolve_movement))(keys[:, 1], old, prop)
+        assert jnp.array_equal(dense, sorted_), n
+        assert jnp.array_equal(dense, dispatched), n
+        assert bool(jnp.all(jax.vmap(positions_unique)(sorted_))), n
+
+
 def test_respawn():
     spawns = jnp.array(
         [[0, 0], [0, 3], [3, 0], [3, 3], [1, 1], [2, 2]], dtype=jnp.int16
@@ -220,5 +269,6 @@ if __name__ == "__main__":
     run("rotation 3-cycle allowed", test_rotation_cycle_allowed)
     run("swap + contest interaction", test_swap_plus_contest)
     run("randomized property test", test_property_random)
+    run("dense and sorted resolvers agree", test_resolvers_agree)
     run("occupancy-aware respawn", test_respawn)
     print("ALL MOVEMENT TESTS PASSED")
@@ -0,0 +1,172 @@
+"""Standalone checks for the shared egocentric observation kernel (no pytest).
+
+GOLDEN holds digests of the observations of short random rollouts, recorded
+with the per-env observation code the kernel replaced. They pin its quirks,
+which the kernel keeps: the "self" flag is set on agent i+1's channel, and
+the inventory and frozen channels are read one agent down.
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_observation.py
+"""
+
+import hashlib
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+import socialjax
+from socialjax.environments.observation import (
+    egocentric_obs,
+    obs_window_origin,
+    pack_compact_obs,
+    rotation_tables,
+)
+
+ENVS = ["clean_up", "pd_arena"]
+STEPS = 3
+
+# (env_id, make kwargs, obs_format) -> digest of `golden_rollout`
+GOLDEN = {
+    ("clean_up", (), "full"): "5e43b9bcd8f44f78",
+    ("clean_up", (), "compact"): "4246a0b62faeb0ca",
+    ("clean_up", (("num_agents", 3),), "full"): "ddb573a50b110e35",
+    ("clean_up", (("num_agents", 3),), "compact"): "275efe0501e8b767",
+    ("coin_game", (), "full"): "26937365c102d7eb",
+    ("coin_game", (), "compact"): "8a2554fd57aabd90",
+    ("harvest_common_open", (), "full"): "5b9a8fe410aa94a4",
+    ("harvest_common_open", (), "compact"): "1b0d45f0c16dbe1f",
+    ("gift", (), "full"): "b4ff63b2d9289c41",
+    ("gift", (), "compact"): "4b8a0a1c3b7f2957",
+    ("mushrooms", (), "full"): "486352176a2ce5e8",
+    ("mushrooms", (), "compact"): "1de147851b1c73b3",
+    ("territory_open", (), "full"): "4159902586359b53",
+    ("territory_open", (), "compact"): "f47d3e061aeeb155",
+    ("pd_arena", (), "full"): "5936da3326110ea5",
+    ("pd_arena", (), "compact"): "88ceccb419067c4b",
+}
+GOLDEN_STEPS, GOLDEN_ENVS = 16, 2
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def test_rotation_tables_match_rot90():
+    # the gathered window equals slicing the padded grid and rotating it
+    obs_size, padding = 5, 4
+    grid = jax.random.randint(jax.random.PRNGKey(0), (7, 6), 1, 50)
+    padded = jnp.pad(grid, padding, constant_values=-1)
+    tables = rotation_tables(obs_size)
+    for row in range(grid.shape[0]):
+        for col in range(grid.shape[1]):
+            for heading in range(4):
+                x, y = obs_window_origin(jnp.array([row, col, heading]), obs_size, padding)
+                window = jax.lax.dynamic_slice(padded, (x, y), (obs_size, obs_size))
+                expected = jnp.rot90(window, k=heading, axes=(0, 1))
+                cells = tables[heading]
+                gathered = padded[x + cells[..., 0], y + cells[..., 1]]
+                assert jnp.array_equal(gathered, expected), (row, col, heading)
+
+
+def random_obs_args(env, key):
+    # a mid-episode state with random freeze counters and inventories, so
+    # the inventory and frozen channels are exercised
+    _, state = env.reset(key)
+    for t in range(STEPS):
+        k_act, k_step = jax.random.split(jax.random.fold_in(key, t))
+        actions = jax.random.randint(k_act, (env.num_agents,), 0, env.action_space().n)
+        _, state, _, _, _ = env.step(k_step, state, actions)
+    k_freeze, k_inv = jax.random.split(key)
+    freeze = jax.random.randint(k_freeze, state.freeze.shape, 0, 3)
+    invs = jax.random.randint(k_inv, state.agent_invs.shape, 0, 3)
+    return dict(
+        grid=state.grid,
+        agent_locs=state.agent_locs,
+        agent_invs=invs,
+        freeze=freeze,
+        num_items=env.obs_encoding[0] - 1,
+        obs_size=env.OBS_SIZE,
+        padding=env.PADDING,
+        pad_value=1,  # Items.wall in every grid env
+        agent_extras=(jnp.sum(invs, axis=-1) > 0)[:, None],
+    )
+
+
+def test_compact_is_packed_full():
+    for env_id in ENVS:
+        env = socialjax.make(env_id, obs_format="compact")
+        for seed in range(3):
+            args = random_obs_args(env, jax.random.PRNGKey(seed))
+            full = egocentric_obs(**args)
+            compact = egocentric_obs(**args, compact=True)
+            assert full.dtype == jnp.float32 and compact.dtype == jnp.uint8
+            packed = pack_compact_obs(full, args["num_items"])
+            assert jnp.array_equal(compact, packed), f"{env_id}: compact != packed full obs"
+
+
+def test_agent_subset():
+    # observing agents picked with `agents` get the rows of the all-agent obs
+    for env_id in ENVS:
+        env = socialjax.make(env_id, obs_format="compact")  # for env.obs_encoding
+        args = random_obs_args(env, jax.random.PRNGKey(7))
+        for compact in (False, True):
+            full = egocentric_obs(**args, compact=compact)
+            for agents in ([0], [env.num_agents - 1], [1, 0, 1]):
+                subset = egocentric_obs(**args, compact=compact, agents=jnp.array(agents))
+                assert jnp.array_equal(subset, full[jnp.array(agents)]), (env_id, compact, agents)
+
+
+def test_env_obs_shapes():
+    for env_id in ENVS:
+        for obs_format in ("full", "compact"):
+            env = socialjax.make(env_id, obs_format=obs_format)
+            obs, _ = env.reset(jax.random.PRNGKey(0))
+            shape = env.observation_space()[0].shape
+            assert obs.shape == (env.num_agents, *shape), (env_id, obs_format, obs.shape, shape)
+
+
+def golden_rollout(env, key):
+    """Obs of a vmapped reset and GOLDEN_STEPS random steps, with freeze and inventories randomised before each step."""
+    obs, state = jax.vmap(env.reset)(jax.random.split(key, GOLDEN_ENVS))
+
+    def _step(state, key):
+        k_freeze, k_inv, k_act, k_step = jax.random.split(key, 4)
+        state = state.replace(
+            freeze=jax.random.randint(k_freeze, state.freeze.shape, 0, 3).astype(state.freeze.dtype),
+            agent_invs=jax.random.randint(k_inv, state.agent_invs.shape, 0, 3).astype(state.agent_invs.dtype),
+        )
+        actions = jax.random.randint(k_act, (GOLDEN_ENVS, env.num_agents), 0, env.action_space().n)
+        obs, state, _, _, _ = jax.vmap(env.step)(jax.random.split(k_step, GOLDEN_ENVS), state, actions)
+        return state, obs
+
+    _, obs_seq = jax.lax.scan(_step, state, jax.random.split(key, GOLDEN_STEPS))
+    return obs, obs_seq
+
+
+def obs_digest(*arrays):
+    digest = hashlib.sha256()
+    for x in arrays:
+        x = np.asarray(x)
+        digest.update(str((x.shape, x.dtype)).encode())
+        digest.update(x.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def test_golden_obs():
+    for (env_id, kwargs, obs_format), expected in GOLDEN.items():
+        env = socialjax.make(env_id, obs_format=obs_format, **dict(kwargs))
+        obs = jax.jit(lambda key: golden_rollout(env, key))(jax.random.PRNGKey(0))
+        assert obs_digest(*obs) == expected, (env_id, kwargs, obs_format)
+
+
+if __name__ == "__main__":
+    run("rotation tables match dynamic_slice + rot90", test_rotation_tables_match_rot90)
+    run("compact obs equals packed full obs", test_compact_is_packed_full)
+    run("obs of an agent subset are rows of the all-agent obs", test_agent_subset)
+    run("env obs shapes match observation_space", test_env_obs_shapes)
+    run("obs match the golden digests", test_golden_obs)
+    print("ALL OBSERVATION TESTS PASSED")
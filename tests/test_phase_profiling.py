@@ -0,0 +1,78 @@
+"""Standalone checks for the per-phase step profiler (no pytest).
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_phase_profiling.py
+"""
+
+import types
+
+import jax
+import jax.numpy as jnp
+
+import socialjax
+from socialjax.environments.profiling import (
+    PHASES,
+    UNSCOPED,
+    _phase_of,
+    check_phase_split,
+    profile_step_phases,
+    split_step_phases,
+)
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def test_split_covers_step():
+    env = socialjax.make("harvest_common_open", jit=False)
+    key = jax.random.PRNGKey(0)
+    _, state = env.reset(key)
+    actions = [jnp.int32(0)] * env.num_agents
+    closed = jax.make_jaxpr(env.step_env)(key, state, actions)
+    phases = split_step_phases(closed)
+    for phase in ["regrowth", "movement", "interaction", "respawn", "episode_reset", "observation"]:
+        assert phase in phases, sorted(phases)
+    # every eqn lands in exactly one phase
+    assert sum(len(eqns) for eqns, _, _ in phases.values()) == len(closed.jaxpr.eqns)
+
+
+def test_profile_breakdown():
+    env = socialjax.make("coin_game", jit=False)
+    result = profile_step_phases(env, num_envs=2, repeats=1, warmup_steps=1)
+    assert result["step_s"] > 0
+    assert set(result["phases"]) <= set(PHASES) | {UNSCOPED}, result["phases"]
+    assert "observation" in result["phases"] and "movement" in result["phases"]
+    shares = sum(r["share"] for r in result["phases"].values())
+    assert abs(shares - 1.0) < 1e-6, shares
+
+
+def test_jitted_env_rejected():
+    env = socialjax.make("coin_game")
+    try:
+        profile_step_phases(env, num_envs=2, repeats=1, warmup_steps=0)
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError for a jitted step_env")
+
+
+def test_broken_split_raises():
+    check_phase_split()  # the installed JAX exposes the scopes
+    # an equation without the name stack the split reads, as after a JAX change
+    broken = types.SimpleNamespace(source_info=types.SimpleNamespace())
+    try:
+        _phase_of(broken)
+    except RuntimeError:
+        return
+    raise AssertionError("expected RuntimeError when the name stack cannot be read")
+
+
+if __name__ == "__main__":
+    run("split covers step", test_split_covers_step)
+    run("profile breakdown", test_profile_breakdown)
+    run("jitted env rejected", test_jitted_env_rejected)
+    run("unreadable phase scopes raise", test_broken_split_raises)
+    print("ALL PHASE PROFILING TESTS PASSED")
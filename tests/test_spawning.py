@@ -0,0 +1,143 @@
+"""Standalone checks for socialjax.environments.spawning (no pytest).
+
+The sort-free sampler is compared against the sort-based sampler Clean_up and
+Mushrooms used before (noise 1e-4 on the labels, full argsort, first k),
+both on the kernel and on spawn counts of whole rollouts.
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_spawning.py
+"""
+
+import jax
+import jax.numpy as jnp
+import numpy as onp
+
+import socialjax
+from socialjax.environments.cleanup import clean_up
+from socialjax.environments.mushrooms import mushrooms
+from socialjax.environments.spawning import sample_lowest
+
+NUM_DRAWS = 4000
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def sort_sampler(key, labels, k=1):
+    """The sampler replaced by ``sample_lowest``."""
+    noise = jax.random.uniform(key, shape=(len(labels),)) * 1e-4
+    return jnp.argsort(labels + noise)[:k]
+
+
+def selection_frequencies(sampler, labels, k):
+    keys = jax.random.split(jax.random.PRNGKey(0), NUM_DRAWS)
+    idx = onp.asarray(jax.jit(jax.vmap(lambda key: sampler(key, labels, k)))(keys))
+    counts = onp.zeros((k, labels.shape[0]))
+    for slot in range(k):
+        counts[slot] = onp.bincount(idx[:, slot], minlength=labels.shape[0])
+    return idx, counts / NUM_DRAWS
+
+
+def check_same_distribution(labels, k):
+    labels = jnp.asarray(labels, dtype=jnp.int16)
+    idx, freq = selection_frequencies(sample_lowest, labels, k)
+    _, ref_freq = selection_frequencies(sort_sampler, labels, k)
+
+    # every slot holds the same label as in the sorted order, no cell twice
+    sorted_labels = onp.sort(onp.asarray(labels))[:k]
+    assert (onp.asarray(labels)[idx] == sorted_labels).all()
+    assert all(len(set(row)) == k for row in idx)
+
+    # per-slot cell frequencies agree within 5 binomial standard errors
+    se = onp.sqrt(onp.maximum(ref_freq * (1 - ref_freq), 1 / NUM_DRAWS) / NUM_DRAWS)
+    worst = onp.max(onp.abs(freq - ref_freq) / (onp.sqrt(2) * se))
+    assert worst < 5, f"selection frequencies differ from the sort sampler (z={worst:.1f})"
+
+
+def test_single_cell_matches_sort():
+    # clean_up-like: potential dirt (7) and dirt (8); one cell per step
+    labels = onp.full(40, 8)
+    labels[::3] = 7
+    check_same_distribution(labels, k=1)
+
+
+def test_budget_matches_sort():
+    # mushrooms-like: empty (0), mushrooms (3-6), agents (7+); fewer empty
+    # cells than the budget, so the selection spills over into mushrooms
+    labels = onp.array([0] * 9 + [3] * 4 + [4] * 5 + [5] * 3 + [7, 8, 9] + [6] * 2)
+    check_same_distribution(labels, k=16)
+
+
+def test_uniform_over_ties():
+    labels = jnp.zeros(10, dtype=jnp.int16)
+    _, freq = selection_frequencies(sample_lowest, labels, 1)
+    se = onp.sqrt(0.1 * 0.9 / NUM_DRAWS)
+    assert onp.max(onp.abs(freq[0] - 0.1)) < 5 * se
+
+
+def spawn_counts(env_id, count_fn, num_envs=64, num_steps=150):
+    """Per-env item counts on the grid after a random rollout."""
+    env = socialjax.make(env_id, jit=False)
+
+    @jax.jit
+    def rollout(key):
+        key, _key = jax.random.split(key)
+        _, state = jax.vmap(env.reset)(jax.random.split(_key, num_envs))
+
+        def step(carry, _unused):
+            state, key = carry
+            key, k_act, k_step = jax.random.split(key, 3)
+            actions = jax.random.randint(k_act, (num_envs, env.num_agents), 0, env.action_space().n)
+            _, state, _, _, _ = jax.vmap(env.step_env)(
+                jax.random.split(k_step, num_envs), state,
+                [actions[:, i] for i in range(env.num_agents)],
+            )
+            return (state, key), None
+
+        (state, _), _ = jax.lax.scan(step, (state, key), None, num_steps)
+        return jax.vmap(count_fn)(state.grid)
+
+    return onp.asarray(rollout(jax.random.PRNGKey(1)), dtype=onp.float64)
+
+
+def check_same_counts(module, env_id, count_fn):
+    new = spawn_counts(env_id, count_fn)
+    # the env module's sample_lowest is looked up when the step is traced,
+    # so patching it swaps the sampler
+    original = module.sample_lowest
+    module.sample_lowest = sort_sampler
+    try:
+        ref = spawn_counts(env_id, count_fn)
+    finally:
+        module.sample_lowest = original
+    se = onp.sqrt(new.var() / len(new) + ref.var() / len(ref) + 1e-12)
+    z = abs(new.mean() - ref.mean()) / se
+    assert z < 4, f"{env_id}: mean count {new.mean():.2f} vs sort sampler {ref.mean():.2f} (z={z:.1f})"
+
+
+def test_clean_up_dirt_counts():
+    check_same_counts(clean_up, "clean_up", lambda grid: jnp.sum(grid == clean_up.Items.dirt))
+
+
+def test_mushrooms_counts():
+    mushroom_items = jnp.array([
+        mushrooms.Items.red_mushrooms, mushrooms.Items.green_mushrooms,
+        mushrooms.Items.blue_mushrooms, mushrooms.Items.orange_mushrooms,
+    ])
+    check_same_counts(
+        mushrooms, "mushrooms",
+        lambda grid: jnp.sum(jnp.isin(grid, mushroom_items)),
+    )
+
+
+if __name__ == "__main__":
+    run("single cell matches sort sampler", test_single_cell_matches_sort)
+    run("k-cell budget matches sort sampler", test_budget_matches_sort)
+    run("uniform over tied labels", test_uniform_over_ties)
+    run("clean_up dirt counts match sort sampler", test_clean_up_dirt_counts)
+    run("mushrooms counts match sort sampler", test_mushrooms_counts)
+    print("ALL SPAWNING TESTS PASSED")
@@ -0,0 +1,79 @@
+"""Standalone report and checks of env ``State`` sizes (no pytest).
+
+Every leaf of ``State`` is carried per env under ``vmap`` and copied by the
+auto-reset select on each step, so the state should hold only what changes
+during an episode, in narrow dtypes.
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_state_size.py
+"""
+
+import jax
+import jax.numpy as jnp
+
+import socialjax
+
+# default-config State bytes per env; a larger state is a regression
+MAX_STATE_BYTES = {
+    "coin_game": 388,
+    "harvest_common_open": 855,
+    "clean_up": 1509,
+    "coop_mining": 7390,
+    "territory_open": 4327,
+    "pd_arena": 1256,
+    "mushrooms": 1244,
+    "gift": 1474,
+    "lb_foraging": 100,
+}
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def reset_state(env):
+    # shapes and dtypes only, nothing is computed
+    return jax.eval_shape(env.reset, jax.random.PRNGKey(0))[1]
+
+
+def state_bytes(state):
+    return sum(x.size * x.dtype.itemsize for x in jax.tree_util.tree_leaves(state))
+
+
+def test_report_state_bytes():
+    print(f"{'env':<22}{'State bytes':>12}")
+    for env_id in socialjax.registered_envs:
+        nbytes = state_bytes(reset_state(socialjax.make(env_id)))
+        print(f"{env_id:<22}{nbytes:>12}")
+        assert nbytes <= MAX_STATE_BYTES[env_id], (env_id, nbytes)
+
+
+def test_step_keeps_state_layout():
+    # scan carries and the auto-reset select need identical leaves
+    for env_id in socialjax.registered_envs:
+        env = socialjax.make(env_id)
+        state = reset_state(env)
+        actions = jnp.zeros(env.num_agents, dtype=jnp.int32)
+        next_state = jax.eval_shape(env.step, jax.random.PRNGKey(1), state, actions)[1]
+        layout = jax.tree.map(lambda x: (x.shape, x.dtype), state)
+        assert jax.tree.map(lambda x: (x.shape, x.dtype), next_state) == layout, env_id
+
+
+def test_narrow_timers():
+    for env_id in socialjax.registered_envs:
+        state = reset_state(socialjax.make(env_id))
+        assert state.inner_t.dtype == jnp.uint16, env_id
+        assert state.outer_t.dtype == jnp.uint16, env_id
+    # episodes longer than a uint16 can count fall back to int32
+    state = reset_state(socialjax.make("clean_up", num_inner_steps=100_000))
+    assert state.inner_t.dtype == jnp.int32
+
+
+if __name__ == "__main__":
+    run("State bytes per env", test_report_state_bytes)
+    run("step keeps State shapes and dtypes", test_step_keeps_state_layout)
+    run("uint16 episode timers", test_narrow_timers)
+    print("ALL STATE SIZE TESTS PASSED")
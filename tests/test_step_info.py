@@ -0,0 +1,91 @@
+"""Standalone checks for the step info level and the in-scan info reduction (no pytest).
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_step_info.py
+"""
+
+from typing import NamedTuple
+
+import jax
+import jax.numpy as jnp
+
+import socialjax
+from socialjax.environments.multi_agent_env import REWARD_INFO_KEYS
+from socialjax.wrappers.baselines import SVOLogWrapper
+from algorithms.utils.data_utils import scan_rollout
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def step_info(env_id, info_level):
+    env = socialjax.make(env_id, info_level=info_level)
+    _, state = env.reset(jax.random.PRNGKey(0))
+    actions = jnp.zeros(env.num_agents, dtype=jnp.int32)
+    return env.step(jax.random.PRNGKey(1), state, actions)[-1]
+
+
+def test_info_levels():
+    for env_id in ("clean_up", "coin_game", "coop_mining"):
+        full = step_info(env_id, "full")
+        rewards = step_info(env_id, "rewards")
+        assert set(rewards) == set(full) & set(REWARD_INFO_KEYS), (env_id, set(rewards))
+        assert "original_rewards" in rewards, env_id
+        for k, v in rewards.items():
+            assert bool(jnp.array_equal(v, full[k])), (env_id, k)
+        assert step_info(env_id, "none") == {}, env_id
+
+
+def test_invalid_info_level():
+    try:
+        socialjax.make("coin_game", info_level="some")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+    try:
+        SVOLogWrapper(socialjax.make("coin_game", info_level="none"))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("SVOLogWrapper needs original_rewards")
+
+
+class Step(NamedTuple):
+    reward: jnp.ndarray
+    info: dict
+
+
+def test_scan_rollout_matches_stacked_mean():
+    def env_step(carry, unused):
+        rng, t = carry
+        rng, _rng = jax.random.split(rng)
+        info = {
+            "returns": jax.random.normal(_rng, (6,)),
+            "done": jnp.arange(6) < t,
+            "count": jnp.full((2, 3), t, dtype=jnp.int32),
+        }
+        return (rng, t + 1), Step(jnp.float32(t), info)
+
+    carry = (jax.random.PRNGKey(0), jnp.int32(0))
+    _, stacked = jax.lax.scan(env_step, carry, None, 10)
+    (_, t), traj, info = scan_rollout(env_step, carry, 10)
+    assert int(t) == 10
+    assert traj.info is None
+    assert bool(jnp.array_equal(traj.reward, stacked.reward))
+    for k, v in stacked.info.items():
+        assert jnp.allclose(info[k], v.mean(), atol=1e-6), (k, info[k], v.mean())
+    # per-step reduction, e.g. agent 0's entries only
+    _, _, info0 = scan_rollout(env_step, carry, 10, lambda x: x[0].mean())
+    assert jnp.allclose(info0["count"], stacked.info["count"][:, 0].mean())
+
+
+if __name__ == "__main__":
+    run("info levels keep the requested entries", test_info_levels)
+    run("invalid info levels are rejected", test_invalid_info_level)
+    run("scan_rollout averages info in the carry", test_scan_rollout_matches_stacked_mean)
+    print("ALL STEP INFO TESTS PASSED")
@@ -0,0 +1,89 @@
+"""Standalone checks for Clean_up's reward-only step (no pytest).
+
+``step_rewards`` must return the rewards of ``step_env`` whenever no apple
+regrows during the step, and counterfactual regret is computed from it.
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_step_rewards.py
+"""
+
+import jax
+import jax.numpy as jnp
+
+import socialjax
+from socialjax.environments.cleanup.clean_up import Items
+
+NUM_STATES = 12
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def visited_states(env, key, num_steps=120):
+    """Every NUM_STATES-th state of a random rollout, stacked."""
+    _, state = env.reset(key)
+
+    def step(carry, _unused):
+        state, key = carry
+        key, k_act, k_step = jax.random.split(key, 3)
+        actions = jax.random.randint(k_act, (env.num_agents,), 0, env.num_actions)
+        _, next_state, _, _, _ = env.step_env(k_step, state, actions)
+        return (next_state, key), state
+
+    _, states = jax.lax.scan(step, (state, key), None, num_steps)
+    states = jax.tree.map(lambda x: x[::num_steps // NUM_STATES], states)
+    # apples on every empty cell, so that most moves pick one up
+    return states.replace(grid=jnp.where(states.grid == Items.empty, Items.apple, states.grid))
+
+
+def check_matches_step_env(**kwargs):
+    # without regrowth, every apple an agent can reach is already on the grid
+    env = socialjax.make("clean_up", maxAppleGrowthRate=0.0, **kwargs)
+    states = visited_states(env, jax.random.PRNGKey(0))
+    keys = jax.random.split(jax.random.PRNGKey(1), NUM_STATES)
+    actions = jax.vmap(
+        lambda k: jax.random.randint(k, (env.num_agents,), 0, env.num_actions)
+    )(keys)
+    full = jax.vmap(env.step_env)(keys, states, actions)[2]
+    rewards = jax.vmap(env.step_rewards)(keys, states, actions)
+    assert rewards.shape == full.shape, (rewards.shape, full.shape)
+    assert jnp.any(full > 0)
+    assert jnp.array_equal(rewards, full), kwargs
+
+
+def test_matches_step_env_shared():
+    check_matches_step_env()
+
+
+def test_matches_step_env_individual():
+    check_matches_step_env(shared_rewards=False)
+
+
+def test_cf_regret():
+    env = socialjax.make("clean_up")
+    states = visited_states(env, jax.random.PRNGKey(2))
+    state = jax.tree.map(lambda x: x[-1], states)
+    key = jax.random.PRNGKey(3)
+    actions = jnp.zeros(env.num_agents, dtype=jnp.int32)
+    regret = jax.jit(env.get_cf_regret_from_state)(key, state, actions)
+    assert regret.shape == (env.num_agents,)
+    assert jnp.all(regret >= 0)
+
+    # regret is the gap to the best single-agent deviation
+    agent = 0
+    cf = jnp.stack([
+        env.step_rewards(key, state, actions.at[agent].set(a))[agent]
+        for a in range(env.num_actions)
+    ])
+    assert jnp.allclose(regret[agent], cf.max() - cf[actions[agent]])
+
+
+if __name__ == "__main__":
+    run("step_rewards matches step_env (shared rewards)", test_matches_step_env_shared)
+    run("step_rewards matches step_env (individual rewards)", test_matches_step_env_individual)
+    run("cf regret from step_rewards", test_cf_regret)
+    print("ALL STEP REWARDS TESTS PASSED")
@@ -0,0 +1,93 @@
+"""Standalone checks for Territory_open resource claims (no pytest).
+
+Run:
+  ulimit -c 0
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_territory.py
+"""
+
+import jax
+import jax.numpy as jnp
+import numpy as onp
+
+from socialjax.environments.territory.territory_env import Actions, Items, Territory_open
+
+CLAIMED = 1000  # grid value of a resource claimed by agent 0; agent i is CLAIMED + i
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def test_lookup_grids():
+    env = Territory_open()
+    resource_id = onp.asarray(env.RESOURCE_ID)
+    resources = onp.asarray(env.SPAWNS_RESOURCE_UNCLAIMED)
+    assert (resource_id >= 0).sum() == env.NUM_RESOURCES == len(resources)
+    assert (resource_id[resources[:, 0], resources[:, 1]] == onp.arange(len(resources))).all()
+    walls = onp.asarray(env.SPAWNS_WALL)
+    assert onp.asarray(env.WALL_MASK).sum() == len(walls)
+    assert onp.asarray(env.WALL_MASK)[walls[:, 0], walls[:, 1]].all()
+
+
+def free_resource(env, grid):
+    """A resource whose cells one up, one left and two left are empty."""
+    for r, c in onp.asarray(env.SPAWNS_RESOURCE_UNCLAIMED):
+        cells = [(r - 1, c), (r, c - 1), (r, c - 2)]
+        if all(0 <= i < env.GRID_SIZE_ROW and 0 <= j < env.GRID_SIZE_COL and grid[i, j] == Items.empty
+               for i, j in cells):
+            return int(r), int(c)
+    raise AssertionError("no resource with free neighbours")
+
+
+def step_from(env, locs, actions):
+    """One step from a reset state with the two agents placed at ``locs``."""
+    _, state = env.reset(jax.random.PRNGKey(0))
+    grid = state.grid.at[state.agent_locs[:, 0], state.agent_locs[:, 1]].set(Items.empty)
+    locs = jnp.array(locs, dtype=state.agent_locs.dtype)
+    grid = grid.at[locs[:, 0], locs[:, 1]].set(env._agents)
+    state = state.replace(grid=grid, agent_locs=locs, reborn_locs=locs)
+    _, state, _, _, _ = env.step(jax.random.PRNGKey(1), state, jnp.array(actions))
+    return state
+
+
+def test_facing_tie_goes_to_lowest_agent():
+    # agent 0 faces the resource from above, agent 1 from the left
+    env = Territory_open(num_agents=2)
+    _, state = env.reset(jax.random.PRNGKey(0))
+    r, c = free_resource(env, onp.asarray(state.grid))
+    state = step_from(env, [[r - 1, c, 0], [r, c - 1, 1]], [Actions.stay, Actions.stay])
+    assert int(state.grid[r, c]) == CLAIMED
+    assert state.claimed_resources.shape == (env.NUM_RESOURCES, 3)
+
+
+def test_claim_beam_tie_goes_to_last_beam():
+    # agent 0's one-step beam and agent 1's two-step beam hit the same
+    # resource; beams apply one-step before two-step, so agent 1 keeps it
+    env = Territory_open(num_agents=2)
+    _, state = env.reset(jax.random.PRNGKey(0))
+    r, c = free_resource(env, onp.asarray(state.grid))
+    state = step_from(env, [[r - 1, c, 0], [r, c - 2, 1]], [Actions.claim, Actions.claim])
+    assert int(state.grid[r, c]) == CLAIMED + 1
+
+
+def test_claims_stay_on_resources():
+    env = Territory_open()
+    _, state = env.reset(jax.random.PRNGKey(0))
+    step = jax.jit(env.step)
+    for t in range(60):
+        k_act, k_step = jax.random.split(jax.random.PRNGKey(t))
+        actions = jax.random.randint(k_act, (env.num_agents,), 0, env.action_space().n)
+        _, state, _, _, _ = step(k_step, state, actions)
+    claimed = onp.asarray(state.grid) >= CLAIMED
+    assert claimed.any()
+    assert (onp.asarray(env.RESOURCE_ID)[claimed] >= 0).all()
+
+
+if __name__ == "__main__":
+    run("resource and wall lookup grids", test_lookup_grids)
+    run("facing tie goes to the lowest agent", test_facing_tie_goes_to_lowest_agent)
+    run("claim beam tie goes to the last beam", test_claim_beam_tie_goes_to_last_beam)
+    run("claims stay on resource cells", test_claims_stay_on_resources)
+    print("ALL TERRITORY TESTS PASSED")
@@ -0,0 +1,70 @@
+"""Standalone checks for the per-env world-state batching used by MAPPO/IRAT (no pytest).
+
+Run:
+  export PYTHONPATH=$PWD:$PYTHONPATH
+  JAX_PLATFORMS=cpu python tests/test_world_state_batching.py
+"""
+
+import jax
+import jax.numpy as jnp
+
+from algorithms.utils.data_utils import actors_to_env_major, gather_env_major
+
+NUM_STEPS, NUM_AGENTS, NUM_ENVS = 3, 4, 5
+
+
+def run(name, fn):
+    fn()
+    print(f"ok: {name}")
+
+
+def test_env_major_layout():
+    # actor index = agent * NUM_ENVS + env, as produced by the rollout
+    t, a, e = jnp.meshgrid(
+        jnp.arange(NUM_STEPS), jnp.arange(NUM_AGENTS), jnp.arange(NUM_ENVS), indexing="ij"
+    )
+    code = (t * 100 + a * 10 + e).reshape(NUM_STEPS, NUM_AGENTS * NUM_ENVS)
+    out = actors_to_env_major(code, NUM_AGENTS, NUM_ENVS)
+    assert out.shape == (NUM_STEPS * NUM_ENVS, NUM_AGENTS), out.shape
+    for row in range(NUM_STEPS * NUM_ENVS):
+        step, env = divmod(row, NUM_ENVS)
+        expected = step * 100 + jnp.arange(NUM_AGENTS) * 10 + env
+        assert bool(jnp.array_equal(out[row], expected)), (row, out[row])
+
+
+def test_broadcast_matches_tiled_values():
+    # a per-env value tiled over agents in the rollout must equal the per-env
+    # value broadcast over the env-major rows in the update
+    env_value = jnp.arange(NUM_STEPS * NUM_ENVS, dtype=jnp.float32).reshape(NUM_STEPS, NUM_ENVS)
+    tiled = jnp.tile(env_value, (1, NUM_AGENTS))
+    grouped = actors_to_env_major(tiled, NUM_AGENTS, NUM_ENVS)
+    broadcast = jnp.broadcast_to(env_value.reshape(-1)[:, None], grouped.shape)
+    assert bool(jnp.array_equal(grouped, broadcast))
+
+
+def test_trailing_dims():
+    x = jnp.arange(NUM_STEPS * NUM_AGENTS * NUM_ENVS * 6).reshape(
+        NUM_STEPS, NUM_AGENTS * NUM_ENVS, 2, 3
+    )
+    out = actors_to_env_major(x, NUM_AGENTS, NUM_ENVS)
+    assert out.shape == (NUM_STEPS * NUM_ENVS, NUM_AGENTS, 2, 3), out.shape
+    assert bool(jnp.array_equal(out[NUM_ENVS + 2, 1], x[1, NUM_ENVS + 2]))
+
+
+def test_gather_matches_regrouped_rows():
+    # minibatches gather env-major rows straight from the agent-major rollout
+    x = jnp.arange(NUM_STEPS * NUM_AGENTS * NUM_ENVS * 6).reshape(
+        NUM_STEPS, NUM_AGENTS * NUM_ENVS, 2, 3
+    )
+    idx = jax.random.permutation(jax.random.PRNGKey(0), NUM_STEPS * NUM_ENVS)[:7]
+    out = gather_env_major(x, idx, NUM_AGENTS, NUM_ENVS)
+    assert out.shape == (7, NUM_AGENTS, 2, 3), out.shape
+    assert bool(jnp.array_equal(out, actors_to_env_major(x, NUM_AGENTS, NUM_ENVS)[idx]))
+
+
+if __name__ == "__main__":
+    run("env-major layout", test_env_major_layout)
+    run("broadcast matches tiled values", test_broadcast_matches_tiled_values)
+    run("trailing dims", test_trailing_dims)
+    run("gathered minibatch rows match the regrouped batch", test_gather_matches_regrouped_rows)
+    print("ALL WORLD STATE BATCHING TESTS PASSED")